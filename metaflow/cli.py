@@ -43,6 +43,7 @@ from .R import metaflow_r_version, use_r
 from .util import get_latest_run_id, resolve_identity, decompress_list
 from .user_configs.config_options import LocalFileInput, config_options
 from .user_configs.config_parameters import ConfigValue
+from .zygote import ZYGOTE_FD_ENV, serve as zygote_serve
 
 ERASE_TO_EOL = "\033[K"
 HIGHLIGHT = "red"
@@ -728,6 +729,11 @@ def main(flow, args=None, handle_exceptions=True, entrypoint=None):
     import warnings
 
     warnings.filterwarnings("ignore")
+    if args is None and ZYGOTE_FD_ENV in os.environ:
+        # This process is a task zygote for the local runtime; serve() only
+        # returns in the task processes forked off of it, with sys.argv set
+        # to the command line of the task.
+        zygote_serve(int(os.environ.pop(ZYGOTE_FD_ENV)))
     if entrypoint is None:
         entrypoint = [sys.executable, sys.argv[0]]
 
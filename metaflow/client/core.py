@@ -19,6 +19,7 @@ from typing import (
     Optional,
     TYPE_CHECKING,
     Tuple,
+    Union,
 )
 
 from metaflow.metaflow_current import current
@@ -30,7 +31,12 @@ from metaflow.exception import (
     MetaflowNotFound,
 )
 from metaflow.includefile import IncludedFile
-from metaflow.metaflow_config import DEFAULT_METADATA, MAX_ATTEMPTS
+from metaflow.metaflow_config import (
+    CLIENT_ITERATION_PAGE_SIZE,
+    CLIENT_STREAMING_ITERATION,
+    DEFAULT_METADATA,
+    MAX_ATTEMPTS,
+)
 from metaflow.metaflow_environment import MetaflowEnvironment
 from metaflow.package import MetaflowPackage
 from metaflow.packaging_sys import ContentType
@@ -385,6 +391,9 @@ class MetaflowObject(object):
         MetaflowObject
             Children of this object
         """
+        if CLIENT_STREAMING_ITERATION and self._CHILD_CLASS in ("run", "step", "task"):
+            return self._iter_children()
+
         query_filter = {}
 
         # skip namespace filtering if _namespace_check is unset.
@@ -421,6 +430,57 @@ class MetaflowObject(object):
         else:
             return iter([])
 
+    def _iter_children(self, limit=None):
+        """
+        Iterates lazily over the children of this object, newest first.
+
+        The children are fetched from the metadata provider page by page as
+        they are consumed.
+
+        Parameters
+        ----------
+        limit : int, optional, default None
+            Maximum number of children to fetch
+
+        Yields
+        ------
+        MetaflowObject
+            Children of this object
+        """
+        query_filter = {}
+
+        # skip namespace filtering if _namespace_check is unset.
+        if self._namespace_check and self._current_namespace:
+            query_filter = {"any_tags": self._current_namespace}
+
+        if limit is not None and limit <= 0:
+            return
+        child_class = _CLASSES[self._CHILD_CLASS]
+        count = 0
+        # The limit applies to the children which pass _iter_filter as well
+        for obj in self._metaflow.metadata.iter_objects(
+            self._NAME,
+            child_class._NAME,
+            query_filter,
+            *self.path_components,
+            page_size=CLIENT_ITERATION_PAGE_SIZE,
+        ):
+            child = child_class(
+                attempt=self._attempt,
+                _object=obj,
+                _parent=self,
+                _metaflow=self._metaflow,
+                _namespace_check=self._namespace_check,
+                _current_namespace=(
+                    self._current_namespace if self._namespace_check else None
+                ),
+            )
+            if self._iter_filter(child):
+                yield child
+                count += 1
+                if limit is not None and count >= limit:
+                    return
+
     def _iter_filter(self, x):
         return True
 
@@ -472,6 +532,8 @@ class MetaflowObject(object):
             Whether or not the object is in the current namespace
         """
         if self._NAME == "flow":
+            if CLIENT_STREAMING_ITERATION:
+                return any(True for _ in self._iter_children(limit=1))
             return any(True for _ in self)
         else:
             return ns is None or ns in self._tags
@@ -970,6 +1032,13 @@ class MetaflowCode(object):
         return "<MetaflowCode: %s>" % self._info["script"]
 
 
+# Encodings of artifacts made of a single blob whose metadata service record
+# is sufficient to load them
+_PICKLE_ENCODINGS = frozenset(
+    [None, "pickle-v2", "pickle-v4", "gzip+pickle-v2", "gzip+pickle-v4"]
+)
+
+
 class DataArtifact(MetaflowObject):
     """
     A single data artifact and associated metadata. Note that this object does
@@ -1025,6 +1094,13 @@ class DataArtifact(MetaflowObject):
             },
         }
         if location.startswith(":root:"):
+            if self._object["content_type"] not in _PICKLE_ENCODINGS:
+                # Artifacts written by other serializers may need information
+                # not recorded in the metadata service (additional blobs,
+                # serializer_info) so we use the task's full data metadata.
+                meta = filecache.get_task_data_metadata(
+                    ds_type, location[6:], self._attempt, *components[:-1]
+                )
             obj = filecache.get_artifact(ds_type, location[6:], meta, *components)
         else:
             # Older artifacts have a location information which we can use.
@@ -2046,6 +2122,68 @@ class Step(MetaflowObject):
                     ):
                         yield child
 
+    def artifact_data(
+        self, name: str, as_dict: bool = False
+    ) -> Union[Iterator[Tuple[str, Any]], Dict[str, Any]]:
+        """
+        Returns the value of the artifact `name` in all the tasks of this step.
+
+        This is equivalent to, but much faster than:
+        ```
+        {t.pathspec: t[name].data for t in step if name in t}
+        ```
+        as the artifacts of all the tasks are fetched in a single batch, and the
+        content shared by several tasks is fetched only once.
+
+        Tasks which are not done, or which did not produce the artifact, are
+        skipped.
+
+        Parameters
+        ----------
+        name : str
+            Name of the artifact
+        as_dict : bool, default False
+            If True, returns a dictionary keyed by the pathspec of the tasks.
+            Otherwise, returns an iterator over (pathspec, value) tuples, in
+            no particular order, which yields each value as soon as it is
+            loaded.
+
+        Returns
+        -------
+        Union[Iterator[Tuple[str, Any]], Dict[str, Any]]
+            Value of the artifact in each task
+        """
+        values = self._iter_artifact_data(name)
+        if as_dict:
+            return dict(values)
+        return values
+
+    def _iter_artifact_data(self, name):
+        global filecache
+
+        tasks = list(self)
+        if not tasks:
+            return
+        meta_dict = tasks[0].metadata_dict
+        ds_type = meta_dict.get("ds-type")
+        ds_root = meta_dict.get("ds-root")
+        if ds_type is None or ds_root is None:
+            # Older tasks did not record their datastore
+            for task in tasks:
+                if name in task:
+                    yield task.pathspec, task[name].data
+            return
+        if filecache is None:
+            filecache = FileCache()
+
+        pathspecs = {task.id: task.pathspec for task in tasks}
+        for task_id, obj in filecache.get_step_artifacts(
+            ds_type, ds_root, *self.path_components, list(pathspecs), name
+        ):
+            if isinstance(obj, IncludedFile):
+                obj = obj.decode(name)
+            yield pathspecs[task_id], obj
+
     def __iter__(self) -> Iterator[Task]:
         """
         Iterate over all children Task of this Step
@@ -2568,7 +2706,8 @@ class Flow(MetaflowObject):
         Run, optional
             Latest run of this flow
         """
-        for run in self:
+        runs = self._iter_children(limit=1) if CLIENT_STREAMING_ITERATION else self
+        for run in runs:
             return run
 
     @property
@@ -1,8 +1,11 @@
 from __future__ import print_function
 from collections import OrderedDict
+import heapq
 import json
+import mmap
 import os
 import sys
+import threading
 import time
 from tempfile import NamedTemporaryFile
 from hashlib import sha1
@@ -17,13 +20,29 @@ from metaflow.metaflow_config import (
     CLIENT_CACHE_PATH,
     CLIENT_CACHE_MAX_SIZE,
     CLIENT_CACHE_MAX_FLOWDATASTORE_COUNT,
+    DATASTORE_STEP_MANIFEST,
 )
 from metaflow.metaflow_profile import from_start
 
 from metaflow.plugins import DATASTORES
 
+try:
+    import sqlite3
+except ImportError:
+    # Some Python builds do not ship with sqlite3; we fall back to an
+    # in-memory index in that case.
+    sqlite3 = None
+
 NEW_FILE_QUARANTINE = 10
 
+# Name of the index database, stored at the root of the cache directory
+INDEX_FILE = ".index.sqlite3"
+
+# Accesses are recorded in the index in batches: we flush them when we have
+# that many pending or when that many seconds have elapsed since the last flush
+ACCESS_FLUSH_COUNT = 100
+ACCESS_FLUSH_INTERVAL = 1
+
 if sys.version_info[0] >= 3 and sys.version_info[1] >= 2:
 
     def od_move_to_end(od, key):
@@ -41,6 +60,315 @@ class FileCacheException(MetaflowException):
     headline = "File cache error"
 
 
+def _scan_cache_dir(cache_dir):
+    # Objects are stored in <cache_dir>/<cache_id>/<2 char prefix>/<object>.
+    # Yields (path, size, mtime) for each cached object.
+    try:
+        roots = list(os.scandir(cache_dir))
+    except OSError:
+        return
+    for root in roots:
+        if not root.is_dir():
+            continue
+        try:
+            subdirs = list(os.scandir(root.path))
+        except OSError:
+            continue
+        for subdir in subdirs:
+            if not subdir.is_dir():
+                continue
+            try:
+                objs = list(os.scandir(subdir.path))
+            except OSError:
+                continue
+            for obj in objs:
+                _, ext = os.path.splitext(obj.name)
+                if ext not in (".cached", ".blob"):
+                    continue
+                try:
+                    st = obj.stat()
+                except OSError:
+                    continue
+                yield obj.path, st.st_size, st.st_mtime
+
+
+class _SqliteCacheIndex(object):
+    """
+    Persistent index of the objects in a cache directory.
+
+    The index is a SQLite database stored in the cache directory and shared
+    by all processes using it. It records the size and last access time of
+    each object; the total size is maintained by triggers so that it never
+    requires a scan. Eviction walks the index on the access time in order
+    so adding, accessing and evicting an object are all O(log n).
+
+    All modifications happen in short `BEGIN IMMEDIATE` transactions which
+    serialize writers across processes.
+    """
+
+    SCHEMA = """
+    CREATE TABLE IF NOT EXISTS objects (
+        path TEXT PRIMARY KEY,
+        size INTEGER NOT NULL,
+        atime REAL NOT NULL
+    );
+    CREATE INDEX IF NOT EXISTS objects_atime ON objects (atime);
+    CREATE TABLE IF NOT EXISTS stats (
+        id INTEGER PRIMARY KEY CHECK (id = 0),
+        total INTEGER NOT NULL,
+        indexed INTEGER NOT NULL
+    );
+    INSERT OR IGNORE INTO stats VALUES (0, 0, 0);
+    CREATE TRIGGER IF NOT EXISTS objects_insert AFTER INSERT ON objects
+    BEGIN
+        UPDATE stats SET total = total + NEW.size WHERE id = 0;
+    END;
+    CREATE TRIGGER IF NOT EXISTS objects_delete AFTER DELETE ON objects
+    BEGIN
+        UPDATE stats SET total = total - OLD.size WHERE id = 0;
+    END;
+    CREATE TRIGGER IF NOT EXISTS objects_update AFTER UPDATE OF size ON objects
+    BEGIN
+        UPDATE stats SET total = total - OLD.size + NEW.size WHERE id = 0;
+    END;
+    """
+
+    EVICT_BATCH_SIZE = 256
+
+    def __init__(self, cache_dir, timeout=30):
+        self._cache_dir = cache_dir
+        self._db_path = os.path.join(cache_dir, INDEX_FILE)
+        self._timeout = timeout
+        self._lock = threading.Lock()
+        self._conn = None
+        self._pid = None
+        # Fail early if the database cannot be used at all
+        self._connection()
+
+    def _connection(self):
+        # SQLite connections must not be shared across a fork
+        if self._conn is None or self._pid != os.getpid():
+            conn = sqlite3.connect(
+                self._db_path,
+                timeout=self._timeout,
+                isolation_level=None,
+                check_same_thread=False,
+            )
+            try:
+                conn.execute("PRAGMA journal_mode=WAL")
+                conn.execute("PRAGMA synchronous=NORMAL")
+            except sqlite3.OperationalError:
+                # WAL is not supported everywhere (some network filesystems
+                # for example); the default journal works too, just slower.
+                pass
+            # executescript commits any pending transaction so the schema is
+            # created in a transaction of its own.
+            try:
+                conn.executescript("BEGIN IMMEDIATE;%sCOMMIT;" % self.SCHEMA)
+            except sqlite3.Error:
+                if conn.in_transaction:
+                    conn.execute("ROLLBACK")
+                conn.close()
+                raise
+            self._conn, self._pid = conn, os.getpid()
+            self._bootstrap()
+        return self._conn
+
+    @staticmethod
+    def _transaction(conn):
+        return _ImmediateTransaction(conn)
+
+    def _bootstrap(self):
+        # Caches created before the index existed are indexed once, by the
+        # first process that gets to it.
+        conn = self._conn
+        with self._transaction(conn):
+            if conn.execute("SELECT indexed FROM stats WHERE id = 0").fetchone()[0]:
+                return
+            conn.executemany(
+                "INSERT OR IGNORE INTO objects (path, size, atime) VALUES (?, ?, ?)",
+                _scan_cache_dir(self._cache_dir),
+            )
+            conn.execute("UPDATE stats SET indexed = 1 WHERE id = 0")
+
+    def total_size(self):
+        with self._lock:
+            return (
+                self._connection()
+                .execute("SELECT total FROM stats WHERE id = 0")
+                .fetchone()[0]
+            )
+
+    def __len__(self):
+        with self._lock:
+            return (
+                self._connection().execute("SELECT COUNT(*) FROM objects").fetchone()[0]
+            )
+
+    def add(self, path, size, atime):
+        with self._lock:
+            conn = self._connection()
+            with self._transaction(conn):
+                cur = conn.execute(
+                    "UPDATE objects SET size = ?, atime = ? WHERE path = ?",
+                    (size, atime, path),
+                )
+                if cur.rowcount == 0:
+                    conn.execute(
+                        "INSERT INTO objects (path, size, atime) VALUES (?, ?, ?)",
+                        (path, size, atime),
+                    )
+
+    def touch(self, accesses):
+        # accesses is a dict path -> atime; objects not in the index (evicted
+        # in the meantime) are ignored
+        with self._lock:
+            conn = self._connection()
+            try:
+                with self._transaction(conn):
+                    conn.executemany(
+                        "UPDATE objects SET atime = MAX(atime, ?) WHERE path = ?",
+                        ((atime, path) for path, atime in accesses.items()),
+                    )
+            except sqlite3.OperationalError:
+                # Access times are best effort (the database may be locked
+                # for longer than our timeout); at worst, an object is
+                # evicted a bit earlier than it should have been.
+                pass
+
+    def evict(self, max_size, not_after):
+        """
+        Removes least recently used objects from the index until the total
+        size is at most max_size. Objects accessed after `not_after` are never
+        evicted. Returns the paths of the evicted objects; it is up to the
+        caller to remove the files.
+        """
+        evicted = []
+        with self._lock:
+            conn = self._connection()
+            try:
+                with self._transaction(conn):
+                    total = conn.execute(
+                        "SELECT total FROM stats WHERE id = 0"
+                    ).fetchone()[0]
+                    while total > max_size:
+                        rows = conn.execute(
+                            "SELECT path, size FROM objects WHERE atime <= ? "
+                            "ORDER BY atime LIMIT ?",
+                            (not_after, self.EVICT_BATCH_SIZE),
+                        ).fetchall()
+                        if not rows:
+                            break
+                        batch = []
+                        for path, size in rows:
+                            if total <= max_size:
+                                break
+                            batch.append((path,))
+                            total -= size
+                        conn.executemany("DELETE FROM objects WHERE path = ?", batch)
+                        evicted.extend(p for p, in batch)
+            except sqlite3.OperationalError:
+                # Another process is holding the database; it will garbage
+                # collect itself or we will on our next write.
+                return []
+        return evicted
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None and self._pid == os.getpid():
+                self._conn.close()
+            self._conn = None
+
+
+class _ImmediateTransaction(object):
+    def __init__(self, conn):
+        self._conn = conn
+
+    def __enter__(self):
+        # Take the write lock upfront so that concurrent writers wait on the
+        # busy timeout instead of failing on a lock upgrade.
+        self._conn.execute("BEGIN IMMEDIATE")
+        return self._conn
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        if exc_type is None:
+            self._conn.execute("COMMIT")
+        else:
+            self._conn.execute("ROLLBACK")
+        return False
+
+
+class _HeapCacheIndex(object):
+    """
+    In-memory index of the objects in a cache directory, used when SQLite is
+    not available. The cache directory is scanned once when the index is
+    created; objects are kept in a heap ordered by access time. Accessing an
+    object pushes a new entry in the heap and stale entries are skipped (and
+    eventually compacted away) on eviction.
+    """
+
+    def __init__(self, cache_dir):
+        self._lock = threading.Lock()
+        # path -> (size, atime)
+        self._objects = {}
+        self._total = 0
+        for path, size, atime in _scan_cache_dir(cache_dir):
+            self._objects[path] = (size, atime)
+            self._total += size
+        self._heap = [(atime, path) for path, (_, atime) in self._objects.items()]
+        heapq.heapify(self._heap)
+
+    def total_size(self):
+        return self._total
+
+    def __len__(self):
+        return len(self._objects)
+
+    def add(self, path, size, atime):
+        with self._lock:
+            old = self._objects.get(path)
+            if old is not None:
+                self._total -= old[0]
+            self._objects[path] = (size, atime)
+            self._total += size
+            self._push(atime, path)
+
+    def touch(self, accesses):
+        with self._lock:
+            for path, atime in accesses.items():
+                old = self._objects.get(path)
+                if old is not None and atime > old[1]:
+                    self._objects[path] = (old[0], atime)
+                    self._push(atime, path)
+
+    def evict(self, max_size, not_after):
+        evicted = []
+        with self._lock:
+            while self._heap and self._total > max_size:
+                atime, path = self._heap[0]
+                cur = self._objects.get(path)
+                if cur is None or cur[1] != atime:
+                    # Stale entry: the object was accessed again or removed
+                    heapq.heappop(self._heap)
+                    continue
+                if atime > not_after:
+                    break
+                heapq.heappop(self._heap)
+                del self._objects[path]
+                self._total -= cur[0]
+                evicted.append(path)
+        return evicted
+
+    def close(self):
+        pass
+
+    def _push(self, atime, path):
+        heapq.heappush(self._heap, (atime, path))
+        if len(self._heap) > 2 * len(self._objects) + 1024:
+            self._heap = [(a, p) for p, (_, a) in self._objects.items()]
+            heapq.heapify(self._heap)
+
+
 class FileCache(object):
     def __init__(self, cache_dir=None, max_size=None):
         self._cache_dir = cache_dir
@@ -49,9 +377,12 @@ class FileCache(object):
             self._cache_dir = CLIENT_CACHE_PATH
         if self._max_size is None:
             self._max_size = int(CLIENT_CACHE_MAX_SIZE)
-        self._total = 0
 
-        self._objects = None
+        # Index of the cached objects, shared with other processes using the
+        # same cache directory. Accesses are recorded in batches.
+        self._index = None
+        self._accesses = {}
+        self._accesses_flushed = time.time()
         # We have a separate blob_cache per flow and datastore type.
         self._blob_caches = {}
 
@@ -61,6 +392,12 @@ class FileCache(object):
         # cache and keep only a certain number of these caches around.
         self._store_caches = OrderedDict()
 
+        # Completion manifests of the steps many tasks are accessed from, and
+        # the tasks accessed from each step since its manifest was last loaded
+        # (see FlowDataStore.load_step_manifest)
+        self._step_manifests = OrderedDict()
+        self._step_accesses = {}
+
         # We also keep a cache of data_metadata for TaskDatastore. This is used
         # when querying for sizes of artifacts. Once we have queried for the size
         # of one artifact in a TaskDatastore, caching this means that any
@@ -179,6 +516,15 @@ class FileCache(object):
         _, size = next(task_ds.get_artifact_sizes([name]))
         return size
 
+    def get_task_data_metadata(
+        self, ds_type, ds_root, attempt, flow_name, run_id, step_name, task_id
+    ):
+        """Gets the data metadata (artifact keys and info) of a task"""
+        task_ds = self._get_task_datastore(
+            ds_type, ds_root, flow_name, run_id, step_name, task_id, attempt
+        )
+        return task_ds.ds_metadata
+
     def get_artifact_by_location(
         self,
         ds_type,
@@ -255,11 +601,25 @@ class FileCache(object):
         # through one of the self._blob_cache
         return task_ds.load_artifacts(names)
 
+    def get_step_artifacts(
+        self, ds_type, ds_root, flow_name, run_id, step_name, task_ids, name
+    ):
+        """Gets the artifact `name` of several tasks of a step
+
+        Yields (task_id, object) tuples in no particular order; tasks which are
+        not done or do not have the artifact are skipped.
+        """
+        ds = self._get_flow_datastore(ds_type, ds_root, flow_name)
+        task_datastores = ds.get_task_datastores(
+            pathspecs=["/".join([run_id, step_name, t]) for t in task_ids]
+        )
+        for task_ds, obj in ds.load_artifact_from_tasks(task_datastores, name):
+            yield task_ds.task_id, obj
+
     def create_file(self, path, value):
-        if self._objects is None:
-            # Index objects lazily (when we first need to write to it).
-            # This can be an expensive operation
-            self._index_objects()
+        self.create_file_stream(path, lambda f: f.write(value))
+
+    def create_file_stream(self, path, write_fn):
         dirname = os.path.dirname(path)
         try:
             FileCache._makedirs(dirname)
@@ -268,49 +628,91 @@ class FileCache(object):
         tmpfile = NamedTemporaryFile(dir=dirname, prefix="dlobj", delete=False)
         # Now write out the file
         try:
-            tmpfile.write(value)
+            write_fn(tmpfile)
             tmpfile.flush()
+            tmpfile.close()
             os.rename(tmpfile.name, path)
         except:  # noqa E722
+            tmpfile.close()
             os.unlink(tmpfile.name)
             raise
         size = os.path.getsize(path)
-        self._total += size
-        self._objects.append((int(time.time()), size, path))
+        index = self._get_index()
+        index.add(path, size, time.time())
+        self._flush_accesses()
         self._garbage_collect()
 
     def read_file(self, path):
         if os.path.exists(path):
             try:
                 with open(path, "rb") as f:
-                    return f.read()
+                    data = f.read()
+                self._record_access(path)
+                return data
             except IOError:
                 # It may have been concurrently garbage collected by another
                 # process
                 pass
         return None
 
-    def _index_objects(self):
-        objects = []
-        if os.path.exists(self._cache_dir):
-            for flow_ds_id in os.listdir(self._cache_dir):
-                root = os.path.join(self._cache_dir, flow_ds_id)
-                if not os.path.isdir(root):
-                    continue
-                for subdir in os.listdir(root):
-                    root = os.path.join(self._cache_dir, flow_ds_id, subdir)
-                    if not os.path.isdir(root):
-                        continue
-                    for obj in os.listdir(root):
-                        sha, ext = os.path.splitext(obj)
-                        if ext in ["cached", "blob"]:
-                            path = os.path.join(root, obj)
-                            objects.insert(
-                                0, (os.path.getctime(path), os.path.getsize(path), path)
-                            )
-
-        self._total = sum(size for _, size, _ in objects)
-        self._objects = sorted(objects, reverse=False)
+    def mmap_file(self, path):
+        # Copy-on-write mapping: the returned buffer is writable but changes
+        # never make it back to the cached file
+        try:
+            with open(path, "rb") as f:
+                if os.fstat(f.fileno()).st_size == 0:
+                    return None
+                buf = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_COPY)
+            self._record_access(path)
+            return buf
+        except (IOError, OSError, ValueError):
+            # It may have been concurrently garbage collected by another
+            # process
+            return None
+
+    def _get_index(self):
+        # The index is created lazily (when we first need it) since opening
+        # (and possibly bootstrapping) it has a cost.
+        if self._index is None:
+            try:
+                FileCache._makedirs(self._cache_dir)
+            except:  # noqa E722
+                raise FileCacheException(
+                    "Could not create directory: %s" % self._cache_dir
+                )
+            index = None
+            if sqlite3 is not None:
+                try:
+                    index = _SqliteCacheIndex(self._cache_dir)
+                except sqlite3.Error:
+                    # Read-only or otherwise unusable database; we can still
+                    # manage the cache for this process only.
+                    pass
+            if index is None:
+                index = _HeapCacheIndex(self._cache_dir)
+            self._index = index
+        return self._index
+
+    def _record_access(self, path):
+        now = time.time()
+        self._accesses[path] = now
+        if (
+            len(self._accesses) >= ACCESS_FLUSH_COUNT
+            or now - self._accesses_flushed >= ACCESS_FLUSH_INTERVAL
+        ):
+            self._flush_accesses()
+
+    def _flush_accesses(self):
+        self._accesses_flushed = time.time()
+        if not self._accesses:
+            return
+        accesses, self._accesses = self._accesses, {}
+        try:
+            self._get_index().touch(accesses)
+        except FileCacheException:
+            # Reading from a cache we cannot write to is fine; we just cannot
+            # record accesses.
+            pass
 
     @staticmethod
     def flow_ds_id(ds_type, ds_root, flow_name):
@@ -335,12 +737,10 @@ class FileCache(object):
         )
 
     def _garbage_collect(self):
-        now = time.time()
-        while self._objects and self._total > self._max_size * 1024**2:
-            if now - self._objects[0][0] < NEW_FILE_QUARANTINE:
-                break
-            ctime, size, path = self._objects.pop(0)
-            self._total -= size
+        evicted = self._get_index().evict(
+            self._max_size * 1024**2, time.time() - NEW_FILE_QUARANTINE
+        )
+        for path in evicted:
             try:
                 os.remove(path)
             except OSError:
@@ -401,7 +801,42 @@ class FileCache(object):
     ):
         flow_ds = self._get_flow_datastore(ds_type, ds_root, flow_name)
 
-        return flow_ds.get_task_datastore(run_id, step_name, task_id, attempt=attempt)
+        data_metadata = None
+        if DATASTORE_STEP_MANIFEST and attempt is not None:
+            entry = self._get_step_manifest_entry(
+                flow_ds,
+                self.flow_ds_id(ds_type, ds_root, flow_name),
+                run_id,
+                step_name,
+                task_id,
+            )
+            if entry is not None and entry[0] == attempt:
+                data_metadata = entry[1]
+        return flow_ds.get_task_datastore(
+            run_id, step_name, task_id, attempt=attempt, data_metadata=data_metadata
+        )
+
+    def _get_step_manifest_entry(self, flow_ds, cache_id, run_id, step_name, task_id):
+        key = (cache_id, run_id, step_name)
+        manifest = self._step_manifests.get(key)
+        if manifest is not None:
+            od_move_to_end(self._step_manifests, key)
+            if task_id in manifest:
+                return manifest[task_id]
+        # The manifest is only worth loading once several tasks of the step are
+        # accessed; it is reloaded (tasks may have completed since) after as
+        # many accesses to tasks it does not contain.
+        accessed = self._step_accesses.setdefault(key, set())
+        accessed.add(task_id)
+        if len(accessed) < FlowDataStore.STEP_MANIFEST_MIN_TASKS:
+            return None
+        del self._step_accesses[key]
+        manifest = flow_ds.load_step_manifest(run_id, step_name)
+        self._step_manifests[key] = manifest
+        od_move_to_end(self._step_manifests, key)
+        if len(self._step_manifests) > CLIENT_CACHE_MAX_FLOWDATASTORE_COUNT:
+            self._step_manifests.popitem(last=False)
+        return manifest.get(task_id)
 
 
 class TaskMetadataCache(MetadataCache):
@@ -462,5 +897,12 @@ class FileBlobCache(BlobCache):
     def load_key(self, key):
         return self._filecache.read_file(self._path(key))
 
+    def load_key_mmap(self, key):
+        return self._filecache.mmap_file(self._path(key))
+
+    def store_key_stream(self, key, write_fn):
+        self._filecache.create_file_stream(self._path(key), write_fn)
+        return True
+
     def store_key(self, key, blob):
         self._filecache.create_file(self._path(key), blob)
@@ -117,21 +117,28 @@ class SerializedBlob(object):
     Represents a single blob produced by a serializer.
 
     A serializer may produce multiple blobs per artifact. Each blob is either:
-    - New bytes to be stored (is_reference=False, value is bytes)
+    - New bytes to be stored (is_reference=False, value is bytes or a
+      contiguous bytes-like object such as a memoryview, which avoids copying
+      large buffers)
     - A reference to already-stored data (is_reference=True, value is a string key)
 
+    When an artifact has multiple blobs, they are stored as separate objects
+    in the content-addressed store and passed back to ``deserialize`` in the
+    same order. Blobs other than the first one may be handed back as writable
+    buffers (e.g. memory-mapped files) instead of ``bytes``.
+
     Parameters
     ----------
-    value : Union[str, bytes]
-        The blob data (bytes) or a reference key (str).
+    value : Union[str, bytes, bytearray, memoryview]
+        The blob data (bytes-like) or a reference key (str).
     is_reference : bool, optional
         If None, auto-detected from value type: str -> reference, bytes -> new data.
     """
 
     def __init__(self, value, is_reference=None):
-        if not isinstance(value, (str, bytes)):
+        if not isinstance(value, (str, bytes, bytearray, memoryview)):
             raise TypeError(
-                "SerializedBlob value must be str or bytes, got %s"
+                "SerializedBlob value must be str or bytes-like, got %s"
                 % type(value).__name__
             )
         self.value = value
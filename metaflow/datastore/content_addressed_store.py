@@ -1,13 +1,131 @@
 import gzip
+import shutil
 
 from collections import namedtuple
 from hashlib import sha1
 from io import BytesIO
 
 from ..exception import MetaflowInternalError
+from ..metaflow_config import (
+    DATASTORE_CAS_CODEC,
+    DATASTORE_CAS_LARGE_BLOB_CODEC,
+    DATASTORE_CAS_LARGE_BLOB_SIZE,
+    DATASTORE_SAVE_BATCH_MAX_BYTES,
+)
+from ..util import bounded_imap
 from .exceptions import DataException
 
 
+def _identity(blob):
+    return blob
+
+
+def _copy_stream(fin, fout):
+    shutil.copyfileobj(fin, fout, _STREAM_CHUNK_SIZE)
+
+
+def _gzip_compress(blob):
+    buf = BytesIO()
+    with gzip.GzipFile(fileobj=buf, mode="wb", compresslevel=3) as f:
+        f.write(blob)
+    return buf.getvalue()
+
+
+def _gzip_decompress(data):
+    return gzip.decompress(data)
+
+
+def _gzip_decompress_stream(fin, fout):
+    with gzip.GzipFile(fileobj=fin, mode="rb") as f:
+        _copy_stream(f, fout)
+
+
+def _load_zstd():
+    try:
+        # Python 3.14+
+        from compression import zstd
+
+        def _decompress_stream(fin, fout):
+            with zstd.ZstdFile(fin, mode="rb") as f:
+                _copy_stream(f, fout)
+
+        return zstd.compress, zstd.decompress, _decompress_stream
+    except ImportError:
+        pass
+    import zstandard
+
+    def _compress(blob):
+        return zstandard.ZstdCompressor(level=3).compress(blob)
+
+    def _decompress(data):
+        return zstandard.ZstdDecompressor().decompressobj().decompress(data)
+
+    def _decompress_stream(fin, fout):
+        zstandard.ZstdDecompressor().copy_stream(fin, fout)
+
+    return _compress, _decompress, _decompress_stream
+
+
+def _load_lz4():
+    import lz4.frame
+
+    def _decompress_stream(fin, fout):
+        with lz4.frame.open(fin, mode="rb") as f:
+            _copy_stream(f, fout)
+
+    return lz4.frame.compress, lz4.frame.decompress, _decompress_stream
+
+
+_STREAM_CHUNK_SIZE = 1024 * 1024
+
+# Codecs available for the cas_version 2 encoding. Each entry is a function
+# returning a (compress, decompress, decompress_stream) tuple: the first two
+# are bytes -> bytes functions and the last one decompresses a file object
+# into another. It raises ImportError if the codec's optional dependency is
+# not installed.
+_CODECS = {
+    "none": lambda: (_identity, _identity, _copy_stream),
+    "gzip": lambda: (_gzip_compress, _gzip_decompress, _gzip_decompress_stream),
+    "zstd": _load_zstd,
+    "lz4": _load_lz4,
+}
+
+_loaded_codecs = {}
+
+
+def get_codec(name):
+    """
+    Returns the (compress, decompress, decompress_stream) functions for the
+    codec `name`.
+
+    Raises DataException if the codec is unknown or its dependency is missing.
+    """
+    codec = _loaded_codecs.get(name)
+    if codec is None:
+        loader = _CODECS.get(name)
+        if loader is None:
+            raise DataException(
+                "Unknown compression codec '%s' -- supported codecs are %s"
+                % (name, ", ".join(sorted(_CODECS)))
+            )
+        try:
+            codec = _loaded_codecs[name] = loader()
+        except ImportError as e:
+            raise DataException(
+                "Compression codec '%s' is not available (%s); install the "
+                "corresponding package to use it" % (name, e)
+            )
+    return codec
+
+
+def is_codec_available(name):
+    try:
+        get_codec(name)
+        return True
+    except DataException:
+        return False
+
+
 class ContentAddressedStore(object):
     """
     This class is not meant to be overridden and is meant to be common across
@@ -16,7 +134,7 @@ class ContentAddressedStore(object):
 
     save_blobs_result = namedtuple("save_blobs_result", "uri key")
 
-    def __init__(self, prefix, storage_impl):
+    def __init__(self, prefix, storage_impl, codec=None, large_blob_codec=None):
         """
         Initialize a ContentAddressedStore
 
@@ -29,16 +147,33 @@ class ContentAddressedStore(object):
             Prefix that will be prepended when storing a file
         storage_impl : type
             Implementation for the backing storage implementation to use
+        codec : str, optional
+            Codec to compress non-raw blobs with; defaults to
+            DATASTORE_CAS_CODEC
+        large_blob_codec : Tuple[str, int], optional
+            (codec, min_size) tuple: blobs of at least min_size bytes are
+            compressed with codec instead. Defaults to
+            DATASTORE_CAS_LARGE_BLOB_CODEC and DATASTORE_CAS_LARGE_BLOB_SIZE
         """
         self._prefix = prefix
         self._storage_impl = storage_impl
         self.TYPE = self._storage_impl.TYPE
         self._blob_cache = None
+        self._codec = codec or DATASTORE_CAS_CODEC
+        if large_blob_codec is None and DATASTORE_CAS_LARGE_BLOB_CODEC:
+            large_blob_codec = (
+                DATASTORE_CAS_LARGE_BLOB_CODEC,
+                int(DATASTORE_CAS_LARGE_BLOB_SIZE),
+            )
+        self._large_blob_codec = large_blob_codec
+        self._batch_max_bytes = int(DATASTORE_SAVE_BATCH_MAX_BYTES)
 
     def set_blob_cache(self, blob_cache):
         self._blob_cache = blob_cache
 
-    def save_blobs(self, blob_iter, raw=False, len_hint=0, is_transfer=False):
+    def save_blobs(
+        self, blob_iter, raw=False, len_hint=0, is_transfer=False, executor=None
+    ):
         """
         Saves blobs of data to the datastore
 
@@ -57,6 +192,9 @@ class ContentAddressedStore(object):
           - The API also specifically takes a list to allow for parallel writes
             if available in the datastore. We could also make a single
             save_blob' API and save_blobs but this seems superfluous
+          - Blobs are processed in batches of at most DATASTORE_SAVE_BATCH_MAX_BYTES
+            bytes: the existence of all the blobs in a batch is checked with a
+            single call and only the missing ones are processed and saved.
 
         Parameters
         ----------
@@ -70,6 +208,9 @@ class ContentAddressedStore(object):
         is_transfer : bool, default False
             If True, this indicates we are saving blobs directly from the output of another
             content addressed store's
+        executor : concurrent.futures.Executor, optional
+            If provided, blobs are hashed and compressed in parallel using this
+            executor, by default None
 
         Returns
         -------
@@ -79,10 +220,10 @@ class ContentAddressedStore(object):
         """
         results = []
 
-        def packing_iter():
-            for blob in blob_iter:
-                if is_transfer:
-                    key, blob_data, meta = blob
+        if is_transfer:
+
+            def transfer_iter():
+                for key, blob_data, _ in blob_iter:
                     path = self._storage_impl.path_join(self._prefix, key[:2], key)
                     # Transfer data is always raw/decompressed, so mark it as such
                     meta_corrected = {"cas_raw": True, "cas_version": 1}
@@ -94,32 +235,93 @@ class ContentAddressedStore(object):
                         )
                     )
                     yield path, (BytesIO(blob_data), meta_corrected)
-                    continue
-                sha = sha1(blob).hexdigest()
-                path = self._storage_impl.path_join(self._prefix, sha[:2], sha)
-                results.append(
-                    self.save_blobs_result(
-                        uri=self._storage_impl.full_uri(path) if raw else None,
-                        key=sha,
-                    )
+
+            self._storage_impl.save_bytes(
+                transfer_iter(), overwrite=True, len_hint=len_hint
+            )
+            return results
+
+        if executor is None:
+            hashed_iter = map(self._hash_blob, blob_iter)
+        else:
+            hashed_iter = bounded_imap(executor, self._hash_blob, blob_iter)
+
+        # We hash blobs as they come and accumulate them in a batch so that we
+        # can check for their existence in the backing datastore using a single
+        # bulk call instead of one round trip per blob.
+        batch = {}
+        batch_size = 0
+        for sha, blob in hashed_iter:
+            path = self._storage_impl.path_join(self._prefix, sha[:2], sha)
+            results.append(
+                self.save_blobs_result(
+                    uri=self._storage_impl.full_uri(path) if raw else None,
+                    key=sha,
                 )
+            )
+            # Identical blobs in the same batch are only checked and saved once
+            if path not in batch:
+                batch[path] = blob
+                batch_size += len(blob)
+            if batch_size >= self._batch_max_bytes:
+                self._save_batch(batch, raw, executor)
+                batch = {}
+                batch_size = 0
+        self._save_batch(batch, raw, executor)
+        return results
 
-                if not self._storage_impl.is_file([path])[0]:
-                    # only process blobs that don't exist already in the
-                    # backing datastore
-                    meta = {"cas_raw": raw, "cas_version": 1}
-                    if raw:
-                        yield path, (BytesIO(blob), meta)
-                    else:
-                        yield path, (self._pack_v1(blob), meta)
+    @staticmethod
+    def _hash_blob(blob):
+        return sha1(blob).hexdigest(), blob
+
+    def _save_batch(self, batch, raw, executor):
+        if not batch:
+            return
+        check_paths = list(batch)
+        exists = self._storage_impl.is_file(check_paths)
+        missing = [path for path, found in zip(check_paths, exists) if not found]
+        if not missing:
+            return
+
+        def _process(path):
+            # Release our reference to the blob as soon as it is processed
+            blob = batch.pop(path)
+            if raw:
+                return path, (BytesIO(blob), {"cas_raw": True, "cas_version": 1})
+            return path, self._pack(blob)
+
+        # Only process blobs that don't exist already in the backing datastore
+        if executor is None:
+            packing_iter = map(_process, missing)
+        else:
+            packing_iter = bounded_imap(executor, _process, missing)
 
         # We don't actually want to overwrite but by saying =True, we avoid
         # checking again saving some operations. We are already sure we are not
         # sending duplicate files since we already checked.
-        self._storage_impl.save_bytes(packing_iter(), overwrite=True, len_hint=len_hint)
-        return results
+        self._storage_impl.save_bytes(
+            packing_iter, overwrite=True, len_hint=len(missing)
+        )
+
+    def blobs_exist(self, keys):
+        """
+        Checks whether blobs are stored
+
+        Parameters
+        ----------
+        keys : List of string
+            Keys of the blobs
+
+        Returns
+        -------
+        List of bool
+            For each key, whether its blob is stored
+        """
+        return self._storage_impl.is_file(
+            [self._storage_impl.path_join(self._prefix, key[:2], key) for key in keys]
+        )
 
-    def load_blobs(self, keys, force_raw=False, is_transfer=False):
+    def load_blobs(self, keys, force_raw=False, is_transfer=False, use_mmap=False):
         """
         Mirror function of save_blobs
 
@@ -138,6 +340,10 @@ class ContentAddressedStore(object):
             If True, this indicates we are loading blobs to transfer them directly
             to another datastore. We will, in this case, also transfer the metadata
             and do minimal processing. This is for internal use only.
+        use_mmap : bool, default False
+            If True and the blob cache supports it, blobs are returned as
+            memory-mapped (copy-on-write) views of the cached files instead of
+            bytes.
 
         Returns
         -------
@@ -149,7 +355,10 @@ class ContentAddressedStore(object):
         for key in keys:
             blob = None
             if self._blob_cache:
-                blob = self._blob_cache.load_key(key)
+                if use_mmap:
+                    blob = self._blob_cache.load_key_mmap(key)
+                if blob is None:
+                    blob = self._blob_cache.load_key(key)
             if blob is not None:
                 if is_transfer:
                     # Cached blobs are decompressed/processed bytes regardless of original format
@@ -163,6 +372,15 @@ class ContentAddressedStore(object):
         with self._storage_impl.load_bytes([p for _, p in load_paths]) as loaded:
             for path_key, file_path, meta in loaded:
                 key = self._storage_impl.path_split(path_key)[-1]
+                if use_mmap and self._blob_cache and not is_transfer:
+                    # Decode the blob directly into the blob cache and map it
+                    # instead of materializing it in memory
+                    blob = self._load_to_blob_cache(
+                        key, path_key, file_path, meta, force_raw
+                    )
+                    if blob is not None:
+                        yield key, blob
+                        continue
                 # At this point, we either return the object as is (if raw) or
                 # decode it according to the encoding version
                 with open(file_path, "rb") as f:
@@ -189,7 +407,10 @@ class ContentAddressedStore(object):
                                     "version" % (version, path_key)
                                 )
                         try:
-                            blob = unpack_code(f)
+                            if meta is not None and version > 1:
+                                blob = unpack_code(f, meta)
+                            else:
+                                blob = unpack_code(f)
                         except Exception as e:
                             raise DataException(
                                 "Could not unpack artifact '%s': %s" % (path_key, e)
@@ -197,32 +418,96 @@ class ContentAddressedStore(object):
 
                 if self._blob_cache:
                     self._blob_cache.store_key(key, blob)
+                    if use_mmap:
+                        mapped = self._blob_cache.load_key_mmap(key)
+                        if mapped is not None:
+                            blob = mapped
 
                 if is_transfer:
                     yield key, blob, meta  # Preserve exact original metadata from storage
                 else:
                     yield key, blob
 
+    def _load_to_blob_cache(self, key, path_key, file_path, meta, force_raw):
+        if force_raw or (meta and meta.get("cas_raw", False)):
+            unpack_stream = _copy_stream
+        elif meta is None or meta.get("cas_version") == 1:
+            unpack_stream = _gzip_decompress_stream
+        elif meta.get("cas_version") == 2 and is_codec_available(meta.get("cas_codec")):
+            unpack_stream = get_codec(meta["cas_codec"])[2]
+        else:
+            # Let the regular path deal with (and report) unknown encodings
+            return None
+        with open(file_path, "rb") as f:
+            try:
+                stored = self._blob_cache.store_key_stream(
+                    key, lambda out: unpack_stream(f, out)
+                )
+            except Exception as e:
+                raise DataException(
+                    "Could not unpack artifact '%s': %s" % (path_key, e)
+                )
+        if not stored:
+            return None
+        return self._blob_cache.load_key_mmap(key)
+
     def _unpack_backward_compatible(self, blob):
         # This is the backward compatible unpack
         # (if the blob doesn't have a version encoded)
         return self._unpack_v1(blob)
 
-    def _pack_v1(self, blob):
-        buf = BytesIO()
-        with gzip.GzipFile(fileobj=buf, mode="wb", compresslevel=3) as f:
-            f.write(blob)
-        buf.seek(0)
-        return buf
+    def _select_codec(self, blob):
+        codec = self._codec
+        if self._large_blob_codec and len(blob) >= self._large_blob_codec[1]:
+            codec = self._large_blob_codec[0]
+        if codec != "gzip" and not is_codec_available(codec):
+            # Fall back to the default encoding rather than failing the task
+            # if the environment is missing the optional codec dependency
+            codec = "gzip"
+        return codec
+
+    def _pack(self, blob):
+        codec = self._select_codec(blob)
+        if codec == "gzip":
+            # Keep using the v1 encoding for gzip so that older versions of
+            # Metaflow can still read these blobs; it is the encoding of the
+            # gzip codec.
+            return BytesIO(_gzip_compress(blob)), {"cas_raw": False, "cas_version": 1}
+        return self._pack_v2(blob, codec), {
+            "cas_raw": False,
+            "cas_version": 2,
+            "cas_codec": codec,
+        }
 
     def _unpack_v1(self, blob):
         with gzip.GzipFile(fileobj=blob, mode="rb") as f:
             return f.read()
 
+    def _pack_v2(self, blob, codec):
+        compress = get_codec(codec)[0]
+        return BytesIO(compress(blob))
+
+    def _unpack_v2(self, blob, meta):
+        codec = meta.get("cas_codec")
+        if codec is None:
+            raise DataException("Missing compression codec in blob metadata")
+        decompress = get_codec(codec)[1]
+        return decompress(blob.read())
+
 
 class BlobCache(object):
     def load_key(self, key):
         pass
 
+    def load_key_mmap(self, key):
+        # Optional: return a writable (copy-on-write) memory-mapped view of
+        # the blob or None if not supported or not cached
+        return None
+
+    def store_key_stream(self, key, write_fn):
+        # Optional: store the blob by calling write_fn with a file object open
+        # for writing. Returns True if the blob was stored
+        return False
+
     def store_key(self, key, blob):
         pass
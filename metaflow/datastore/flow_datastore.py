@@ -1,6 +1,9 @@
+import gzip
 import itertools
 import json
 from abc import ABC, abstractmethod
+from collections import defaultdict
+from io import BytesIO
 
 from .. import metaflow_config
 
@@ -13,6 +16,28 @@ from ..metaflow_profile import from_start
 class FlowDataStore(object):
     default_storage_impl = None
 
+    # Directory, in each step, holding the completion manifest of the step.
+    # Each task adds an entry, named like the metadata of its attempt
+    # (`<attempt>.<task_id>`), when it is done. Retries also add a
+    # `_start.<attempt>.<task_id>` entry when they start, so that readers do
+    # not use a previous attempt while a later one runs. Readers which had to
+    # load many entries individually compact them in a
+    # `_segment.<number of entries>` object which later readers load instead.
+    STEP_MANIFEST_DIR = "_manifest"
+    STEP_MANIFEST_SEGMENT_PREFIX = "_segment."
+    STEP_MANIFEST_START_PREFIX = "_start."
+    # Only use the manifest when resolving at least this many tasks of a step;
+    # probing a couple of tasks is cheaper than listing a large manifest.
+    STEP_MANIFEST_MIN_TASKS = 8
+    # Number of entries loaded individually after which readers compact them
+    STEP_MANIFEST_COMPACT_MIN_ENTRIES = 64
+
+    # Prefix, at the root of the datastore, of the content-addressed store
+    # shared by all flows (for content that does not depend on the flow like
+    # the Metaflow layer of code packages). Flow names can't contain a '.' so
+    # this never clashes with the directory of a flow.
+    SHARED_DATA_PREFIX = "mf.shared"
+
     def __init__(
         self,
         flow_name,
@@ -65,6 +90,10 @@ class FlowDataStore(object):
         self.ca_store = ContentAddressedStore(
             self._storage_impl.path_join(self.flow_name, "data"), self._storage_impl
         )
+        self.shared_ca_store = ContentAddressedStore(
+            self._storage_impl.path_join(self.SHARED_DATA_PREFIX, "data"),
+            self._storage_impl,
+        )
 
         # Private
         self._metadata_cache = None
@@ -159,7 +188,25 @@ class FlowDataStore(object):
                 task.path
                 for task in self._storage_impl.list_content(step_urls)
                 if task.is_file is False
+                and self._storage_impl.basename(task.path.rstrip("/"))
+                != self.STEP_MANIFEST_DIR
             ]
+
+        latest_started_attempts = {}
+        done_attempts = set()
+        data_objs = {}
+        # The latest completed attempt of a task can be resolved from the
+        # manifest of its step. Other cases (specific or prior attempts, tasks
+        # which are not done) require probing.
+        if (
+            metaflow_config.DATASTORE_STEP_MANIFEST
+            and attempt is None
+            and not allow_not_done
+            and not include_prior
+        ):
+            task_urls = self._resolve_from_step_manifests(
+                task_urls, latest_started_attempts, done_attempts, data_objs
+            )
         urls = []
         # parse content urls for specific attempt only, or for all attempts in max range
         attempt_range = range(metaflow_config.MAX_ATTEMPTS)
@@ -187,9 +234,6 @@ class FlowDataStore(object):
                         )
                     )
 
-        latest_started_attempts = {}
-        done_attempts = set()
-        data_objs = {}
         with self._storage_impl.load_bytes(urls) as get_results:
             for key, path, meta in get_results:
                 if path is not None:
@@ -254,6 +298,183 @@ class FlowDataStore(object):
             latest_to_fetch.sort(key=lambda v: position[v[1], v[2]])
         return list(itertools.starmap(self.get_task_datastore, latest_to_fetch))
 
+    def _resolve_from_step_manifests(
+        self, task_urls, latest_started_attempts, done_attempts, data_objs
+    ):
+        # Returns the task URLs which could not be resolved from the manifests
+        tasks_per_step = defaultdict(list)
+        for task_url in task_urls:
+            task_splits = task_url.rstrip("/").split("/")
+            # Tasks with a specific attempt are probed
+            if len(task_splits) == 4:
+                tasks_per_step[tuple(task_splits[1:3])].append(task_url)
+        resolved = set()
+        for (run_id, step_name), step_task_urls in tasks_per_step.items():
+            if len(step_task_urls) < self.STEP_MANIFEST_MIN_TASKS:
+                continue
+            manifest = self.load_step_manifest(run_id, step_name)
+            for task_url in step_task_urls:
+                task_id = task_url.rstrip("/").split("/")[3]
+                if task_id in manifest:
+                    attempt, data_obj = manifest[task_id]
+                    latest_started_attempts[(run_id, step_name, task_id)] = attempt
+                    done_attempts.add((run_id, step_name, task_id, attempt))
+                    data_objs[(run_id, step_name, task_id, attempt)] = data_obj
+                    resolved.add(task_url)
+        return [task_url for task_url in task_urls if task_url not in resolved]
+
+    def _step_manifest_path(self, run_id, step_name, name=None):
+        components = [self.flow_name, run_id, step_name, self.STEP_MANIFEST_DIR]
+        if name is not None:
+            components.append(name)
+        return self._storage_impl.path_join(*components)
+
+    def record_task_start(self, run_id, step_name, task_id, attempt):
+        """
+        Adds the start of a retry of a task to the manifest of its step.
+
+        Until the retry is done, the manifest does not return the task.
+
+        Parameters
+        ----------
+        run_id : str
+            Run ID of the task
+        step_name : str
+            Step of the task
+        task_id : str
+            ID of the task
+        attempt : int
+            Attempt which started
+        """
+        entry = json.dumps({"task_id": task_id, "attempt": attempt}).encode("utf-8")
+        path = self._step_manifest_path(
+            run_id,
+            step_name,
+            self.STEP_MANIFEST_START_PREFIX
+            + TaskDataStore.metadata_name_for_attempt(task_id, attempt),
+        )
+        self._storage_impl.save_bytes([(path, BytesIO(entry))], overwrite=True)
+
+    def record_task_completion(self, run_id, step_name, task_id, attempt, data_obj):
+        """
+        Adds the completed attempt of a task to the manifest of its step.
+
+        This should only be called once the task is marked as done.
+
+        Parameters
+        ----------
+        run_id : str
+            Run ID of the task
+        step_name : str
+            Step of the task
+        task_id : str
+            ID of the task
+        attempt : int
+            Completed attempt
+        data_obj : Dict
+            Data metadata of the attempt (as stored in its data.json)
+        """
+        entry = json.dumps(
+            {"task_id": task_id, "attempt": attempt, "data": data_obj}
+        ).encode("utf-8")
+        path = self._step_manifest_path(
+            run_id,
+            step_name,
+            TaskDataStore.metadata_name_for_attempt(task_id, attempt),
+        )
+        self._storage_impl.save_bytes([(path, BytesIO(entry))], overwrite=True)
+
+    def load_step_manifest(self, run_id, step_name, compact=True):
+        """
+        Loads the manifest of a step.
+
+        Parameters
+        ----------
+        run_id : str
+            Run ID of the step
+        step_name : str
+            Name of the step
+        compact : bool, default True
+            If True and many entries had to be loaded individually, save them
+            in a segment for the benefit of later readers.
+
+        Returns
+        -------
+        Dict[str, Tuple[int, Dict]]
+            Latest completed attempt and its data metadata, keyed by task ID,
+            for the tasks present in the manifest. As when probing, a task
+            is left out while a later attempt than its latest completed one
+            has started: we do *NOT* return the previous attempt.
+        """
+        entry_paths = {}
+        segments = {}
+        for item in self._storage_impl.list_content(
+            [self._step_manifest_path(run_id, step_name)]
+        ):
+            if not item.is_file:
+                continue
+            name = self._storage_impl.basename(item.path)
+            if name.startswith(self.STEP_MANIFEST_SEGMENT_PREFIX):
+                try:
+                    num = int(name[len(self.STEP_MANIFEST_SEGMENT_PREFIX) :])
+                except ValueError:
+                    continue
+                segments[num] = item.path
+            else:
+                entry_paths[name] = item.path
+
+        entries = {}
+        if segments:
+            with self._storage_impl.load_bytes([segments[max(segments)]]) as results:
+                for _, path, _ in results:
+                    if path is not None:
+                        with gzip.open(path, "rt", encoding="utf-8") as f:
+                            entries.update(json.load(f))
+        to_load = [path for name, path in entry_paths.items() if name not in entries]
+        if to_load:
+            with self._storage_impl.load_bytes(to_load) as results:
+                for key, path, _ in results:
+                    if path is not None:
+                        with open(path, encoding="utf-8") as f:
+                            entries[self._storage_impl.basename(key)] = json.load(f)
+            if (
+                compact
+                and len(to_load) >= self.STEP_MANIFEST_COMPACT_MIN_ENTRIES
+                and set(entry_paths).issubset(entries)
+            ):
+                # Entries are never removed, so a segment with as many entries
+                # as another one has the same entries.
+                self._save_step_manifest_segment(run_id, step_name, entries)
+
+        manifest = {}
+        latest_started = {}
+        for entry in entries.values():
+            task_id, attempt = entry["task_id"], entry["attempt"]
+            latest_started[task_id] = max(latest_started.get(task_id, 0), attempt)
+            if "data" not in entry:
+                continue
+            if task_id not in manifest or manifest[task_id][0] < attempt:
+                manifest[task_id] = (attempt, entry["data"])
+        return {
+            task_id: done
+            for task_id, done in manifest.items()
+            if done[0] == latest_started[task_id]
+        }
+
+    def _save_step_manifest_segment(self, run_id, step_name, entries):
+        path = self._step_manifest_path(
+            run_id,
+            step_name,
+            "%s%d" % (self.STEP_MANIFEST_SEGMENT_PREFIX, len(entries)),
+        )
+        blob = gzip.compress(json.dumps(entries).encode("utf-8"), compresslevel=3)
+        try:
+            self._storage_impl.save_bytes([(path, BytesIO(blob))], overwrite=False)
+        except Exception:
+            # Compaction is an optimization; readers (e.g. the client) may not
+            # be allowed to write to the datastore.
+            pass
+
     def get_task_datastore(
         self,
         run_id,
@@ -366,6 +587,28 @@ class FlowDataStore(object):
         save_results = self.ca_store.save_blobs(data_iter, raw=True, len_hint=len_hint)
         return [(r.uri, r.key) for r in save_results]
 
+    def save_shared_data(self, data_iter, len_hint=0):
+        """Saves data to the content-addressed store shared by all flows
+
+        Parameters
+        ----------
+        data_iter : Iterator[bytes]
+            Iterator over blobs to save; each item in the list will be saved individually.
+        len_hint : int
+            Estimate of the number of items that will be produced by the iterator,
+            by default 0.
+
+        Returns
+        -------
+        (str, str)
+            Tuple containing the URI to access the saved resource as well as
+            its key. This is returned in the same order as the input.
+        """
+        save_results = self.shared_ca_store.save_blobs(
+            data_iter, raw=True, len_hint=len_hint
+        )
+        return [(r.uri, r.key) for r in save_results]
+
     def load_data(self, keys, force_raw=False):
         """Retrieves data from the underlying content-addressed store
 
@@ -387,6 +630,52 @@ class FlowDataStore(object):
         for key, blob in self.ca_store.load_blobs(keys, force_raw=force_raw):
             yield key, blob
 
+    def load_artifact_from_tasks(self, task_datastores, name):
+        """
+        Retrieves the artifact `name` of several tasks.
+
+        The blobs of all the tasks are fetched in a single batch and the
+        content shared by several tasks is only fetched once. Each artifact is
+        deserialized as soon as its blob is available and the blob is released
+        once all the tasks sharing it are served.
+
+        Parameters
+        ----------
+        task_datastores : List[TaskDataStore]
+            Datastores of the tasks; tasks without the artifact are skipped
+        name : str
+            Name of the artifact
+
+        Returns
+        -------
+        Iterator[(TaskDataStore, object)]
+            Iterator over the artifact of each task, in the order in which
+            the blobs are loaded
+        """
+        to_load = defaultdict(list)  # key -> [(task datastore, deserializers)]
+        extra_to_load = set()
+        for task_ds in task_datastores:
+            if name not in task_ds:
+                continue
+            task_to_load, task_extra, deserializers = task_ds._plan_artifact_loads(
+                [name]
+            )
+            extra_to_load.update(task_extra)
+            for key in task_to_load:
+                to_load[key].append((task_ds, deserializers))
+
+        loaded_extra = {}
+        if extra_to_load:
+            loaded_extra = dict(
+                self.ca_store.load_blobs(list(extra_to_load), use_mmap=True)
+            )
+        handed_out = set()
+        for key, blob in self.ca_store.load_blobs(list(to_load)):
+            for task_ds, deserializers in to_load.pop(key):
+                yield task_ds, TaskDataStore._deserialize_artifact(
+                    name, blob, deserializers, loaded_extra, handed_out
+                )
+
 
 class MetadataCache(ABC):
     @abstractmethod
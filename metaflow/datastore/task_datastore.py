@@ -1,4 +1,5 @@
 from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
 import json
 import sys
 import time
@@ -11,8 +12,9 @@ from types import MethodType, FunctionType
 from .. import metaflow_config
 from ..exception import MetaflowException, MetaflowInternalError
 from ..metadata_provider import DataArtifact, MetaDatum
+from ..mflog import log_chunk_index_name, log_chunk_name
 from ..parameters import Parameter
-from ..util import Path, is_stringish, to_fileobj
+from ..util import Path, bounded_imap, is_stringish, to_fileobj
 
 from .artifacts.serializer import (
     SerializationFormat,
@@ -307,6 +309,11 @@ class TaskDataStore(object):
         This method requires mode 'w'.
         """
         self.save_metadata({self.METADATA_ATTEMPT_SUFFIX: {"time": time.time()}})
+        if metaflow_config.DATASTORE_STEP_MANIFEST and self._attempt:
+            # A retry hides the previous attempts of the task in the manifest
+            self._parent.record_task_start(
+                self._run_id, self._step_name, self._task_id, self._attempt
+            )
 
     @only_if_not_done
     @require_mode("w")
@@ -350,18 +357,25 @@ class TaskDataStore(object):
             return
 
         # Get SHA keys for artifacts to transfer
-        shas_to_transfer = [
-            other_datastore._objects[name] for name in artifacts_to_transfer
-        ]
+        shas_to_transfer = []
+        for name in artifacts_to_transfer:
+            shas_to_transfer.extend(
+                other_datastore._info.get(name, {}).get("blobs")
+                or [other_datastore._objects[name]]
+            )
 
         # Check which blobs are missing locally
-        missing_shas = []
-        for sha in shas_to_transfer:
-            local_path = self._ca_store._storage_impl.path_join(
-                self._ca_store._prefix, sha[:2], sha
+        local_paths = [
+            self._ca_store._storage_impl.path_join(self._ca_store._prefix, sha[:2], sha)
+            for sha in shas_to_transfer
+        ]
+        missing_shas = [
+            sha
+            for sha, found in zip(
+                shas_to_transfer, self._ca_store._storage_impl.is_file(local_paths)
             )
-            if not self._ca_store._storage_impl.is_file([local_path])[0]:
-                missing_shas.append(sha)
+            if not found
+        ]
 
         if not missing_shas:
             return  # All blobs already exist locally
@@ -395,105 +409,167 @@ class TaskDataStore(object):
         len_hint: integer
             Estimated number of items in artifacts_iter
         """
-        artifact_names = []
-
-        def serialize_iter():
-            for name, obj in artifacts_iter:
-                # Find the first serializer that can handle this object
-                serializer = None
-                for s in self._serializers:
-                    try:
-                        if s.can_serialize(obj):
-                            serializer = s
-                            break
-                    except Exception as e:
-                        _record_dispatch_error(s, e)
-                        continue
-                if serializer is None:
-                    raise DataException(
-                        "No serializer claimed artifact '%s' (type: %s). "
-                        "The PickleSerializer fallback normally handles all "
-                        "objects — check that it is installed and enabled."
-                        % (name, type(obj).__name__)
-                    )
+        for name, keys, info in self._store_artifacts(artifacts_iter, len_hint):
+            self._info[name] = info
+            # The first blob is the one referenced in _objects; artifacts made
+            # of multiple blobs also record the ordered list of all their blobs
+            self._objects[name] = keys[0]
 
-                try:
-                    blobs, metadata = serializer.serialize(
-                        obj, format=SerializationFormat.STORAGE
-                    )
-                except UnpicklableArtifactException as e:
-                    # ``PickleSerializer`` raises this from inside
-                    # ``serialize()`` when ``pickle.dumps`` rejects the object;
-                    # it doesn't know the artifact name so we re-raise with
-                    # the name attached for the historical message.
-                    raise UnpicklableArtifactException(name) from e
-                except MetaflowException:
-                    # Any framework-level exception (e.g. an extension
-                    # serializer surfacing an IOType validation error) is
-                    # already user-facing — let it propagate unchanged so its
-                    # original headline and message reach the user.
-                    raise
-                except Exception as e:
-                    # Everything else (``ValueError``, ``OSError``,
-                    # ``RuntimeError``, ...) gets wrapped so the top frame
-                    # of the traceback names the failing serializer and
-                    # artifact instead of dropping the user into the
-                    # serializer's internals.
-                    raise DataException(
-                        "Serializer %s failed on artifact '%s': %s: %s"
-                        % (serializer.__name__, name, type(e).__name__, e)
-                    ) from e
-
-                # Validate the blob shape BEFORE recording anything in
-                # ``_info`` — a failure here must not leave ``_info[name]``
-                # populated for an artifact we refused to persist.
-                if not blobs:
-                    raise DataException(
-                        "Serializer %s returned no blobs for artifact '%s'"
-                        % (serializer.__name__, name)
-                    )
-                if len(blobs) > 1:
-                    # The datastore currently stores a single blob per
-                    # artifact. Silently dropping blobs[1:] would corrupt
-                    # multi-blob IOType extensions (e.g. chunked tensors) on
-                    # load. Fail loudly until multi-blob support lands.
-                    raise DataException(
-                        "Serializer %s returned %d blobs for artifact '%s'; "
-                        "only single-blob serializers are supported at this "
-                        "time. If you have a need for multi blob serializers, "
-                        "please reach out to the Metaflow team."
-                        % (serializer.__name__, len(blobs), name)
-                    )
+    @only_if_not_done
+    @require_mode("w")
+    def save_foreach_shards(self, name, shards_iter, len_hint=0):
+        """
+        Saves the shards of the foreach iterable `name`, each serialized like
+        an artifact but not recorded as an artifact of the task.
+
+        This method requires mode 'w'.
 
-                # Auto-inject ``source`` into serializer_info so the
-                # "no deserializer claimed artifact" load error can point at
-                # the extension to install. Authors who set their own
-                # ``source`` in the returned ``serializer_info`` are not
-                # overridden. Copy the dict so we don't mutate the
-                # serializer's returned value across calls.
-                merged_info = (
-                    dict(metadata.serializer_info) if metadata.serializer_info else {}
+        Parameters
+        ----------
+        name : string
+            Name of the artifact holding the foreach iterable
+        shards_iter : Iterator[object]
+            Iterator over the shards (lists of consecutive elements) of the
+            iterable
+        len_hint: integer
+            Estimated number of items in shards_iter
+
+        Returns
+        -------
+        List[Dict]
+            For each shard, in order, the description needed to load it back
+            with load_foreach_shard
+        """
+        return [
+            {"key": keys[0], "info": info}
+            for _, keys, info in self._store_artifacts(
+                ((name, shard) for shard in shards_iter), len_hint
+            )
+        ]
+
+    def _store_artifacts(self, artifacts_iter, len_hint):
+        # Serializes the objects of artifacts_iter and saves their blobs.
+        # Returns, in order, the name, blob keys and info of each object.
+        artifact_keys = []
+
+        def serialize_iter(serialized_iter):
+            # Book-keeping happens here, in order, so that artifact blobs line
+            # up with the results of save_blobs even if the artifacts were
+            # serialized in parallel
+            for name, blobs, info in serialized_iter:
+                keys = []
+                for blob in blobs:
+                    if blob.is_reference:
+                        keys.append(blob.value)
+                    else:
+                        # Filled in with the key returned by save_blobs
+                        keys.append(None)
+                        yield blob.value
+                artifact_keys.append((name, keys, info))
+
+        workers = int(metaflow_config.DATASTORE_SAVE_WORKERS)
+        if workers > 1:
+            # Pipelined mode: serialization, hashing and compression run on a
+            # pool of threads while blobs are streamed, in bounded batches, to
+            # the storage backend.
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                save_result = self._ca_store.save_blobs(
+                    serialize_iter(
+                        bounded_imap(executor, self._serialize_artifact, artifacts_iter)
+                    ),
+                    len_hint=len_hint,
+                    executor=executor,
                 )
-                if "source" not in merged_info:
-                    auto_source = SerializerStore.get_source_for(serializer)
-                    if auto_source:
-                        merged_info["source"] = auto_source
-
-                self._info[name] = {
-                    "size": metadata.size,
-                    "type": metadata.obj_type,
-                    "encoding": metadata.encoding,
-                }
-                if merged_info:
-                    self._info[name]["serializer_info"] = merged_info
-
-                artifact_names.append(name)
-                yield blobs[0].value
-
-        # Use the content-addressed store to store all artifacts
-        save_result = self._ca_store.save_blobs(serialize_iter(), len_hint=len_hint)
-        for name, result in zip(artifact_names, save_result):
-            self._objects[name] = result.key
+        else:
+            save_result = self._ca_store.save_blobs(
+                serialize_iter(map(self._serialize_artifact, artifacts_iter)),
+                len_hint=len_hint,
+            )
+        save_result = iter(save_result)
+        stored = []
+        for name, keys, info in artifact_keys:
+            keys = [k if k is not None else next(save_result).key for k in keys]
+            if len(keys) > 1:
+                info["blobs"] = keys
+            stored.append((name, keys, info))
+        return stored
+
+    def _serialize_artifact(self, name_and_obj):
+        name, obj = name_and_obj
+        # Find the first serializer that can handle this object
+        serializer = None
+        for s in self._serializers:
+            try:
+                if s.can_serialize(obj):
+                    serializer = s
+                    break
+            except Exception as e:
+                _record_dispatch_error(s, e)
+                continue
+        if serializer is None:
+            raise DataException(
+                "No serializer claimed artifact '%s' (type: %s). "
+                "The PickleSerializer fallback normally handles all "
+                "objects — check that it is installed and enabled."
+                % (name, type(obj).__name__)
+            )
+
+        try:
+            blobs, metadata = serializer.serialize(
+                obj, format=SerializationFormat.STORAGE
+            )
+        except UnpicklableArtifactException as e:
+            # ``PickleSerializer`` raises this from inside
+            # ``serialize()`` when ``pickle.dumps`` rejects the object;
+            # it doesn't know the artifact name so we re-raise with
+            # the name attached for the historical message.
+            raise UnpicklableArtifactException(name) from e
+        except MetaflowException:
+            # Any framework-level exception (e.g. an extension
+            # serializer surfacing an IOType validation error) is
+            # already user-facing — let it propagate unchanged so its
+            # original headline and message reach the user.
+            raise
+        except Exception as e:
+            # Everything else (``ValueError``, ``OSError``,
+            # ``RuntimeError``, ...) gets wrapped so the top frame
+            # of the traceback names the failing serializer and
+            # artifact instead of dropping the user into the
+            # serializer's internals.
+            raise DataException(
+                "Serializer %s failed on artifact '%s': %s: %s"
+                % (serializer.__name__, name, type(e).__name__, e)
+            ) from e
+
+        # Validate the blob shape BEFORE recording anything in
+        # ``_info`` — a failure here must not leave ``_info[name]``
+        # populated for an artifact we refused to persist.
+        if not blobs:
+            raise DataException(
+                "Serializer %s returned no blobs for artifact '%s'"
+                % (serializer.__name__, name)
+            )
+
+        # Auto-inject ``source`` into serializer_info so the
+        # "no deserializer claimed artifact" load error can point at
+        # the extension to install. Authors who set their own
+        # ``source`` in the returned ``serializer_info`` are not
+        # overridden. Copy the dict so we don't mutate the
+        # serializer's returned value across calls.
+        merged_info = dict(metadata.serializer_info) if metadata.serializer_info else {}
+        if "source" not in merged_info:
+            auto_source = SerializerStore.get_source_for(serializer)
+            if auto_source:
+                merged_info["source"] = auto_source
+
+        info = {
+            "size": metadata.size,
+            "type": metadata.obj_type,
+            "encoding": metadata.encoding,
+        }
+        if merged_info:
+            info["serializer_info"] = merged_info
+        return name, blobs, info
 
     @require_mode(None)
     def load_artifacts(self, names):
@@ -526,56 +602,125 @@ class TaskDataStore(object):
                 "Datastore for task '%s' does not have the required metadata to "
                 "load artifacts" % self._path
             )
-        to_load = defaultdict(list)
-        deserializers = {}  # name -> serializer class
-        for name in names:
-            info = self._info.get(name, {})
-            metadata = SerializationMetadata(
-                obj_type=info.get("type", "object"),
-                size=info.get("size", 0),
-                # Default to gzip+pickle-v2 for very old artifacts without encoding
-                encoding=info.get("encoding", "gzip+pickle-v2"),
-                serializer_info=info.get("serializer_info", {}),
+        to_load, extra_to_load, deserializers = self._plan_artifact_loads(names)
+
+        # Additional blobs of multi-blob artifacts are typically large buffers
+        # (e.g. out-of-band pickle buffers); we ask for them as memory-mapped
+        # files when the blob cache supports it.
+        loaded_extra = {}
+        if extra_to_load:
+            loaded_extra = dict(
+                self._ca_store.load_blobs(list(extra_to_load), use_mmap=True)
             )
+        handed_out = set()
 
-            # Find deserializer via metadata
-            deserializer = None
-            for s in self._serializers:
-                try:
-                    if s.can_deserialize(metadata):
-                        deserializer = s
-                        break
-                except Exception as e:
-                    _record_dispatch_error(s, e)
-                    continue
-            if deserializer is None:
-                source_hint = ""
-                serializer_source = metadata.serializer_info.get("source")
-                if serializer_source:
-                    source_hint = (
-                        " The artifact was written by '%s' — the "
-                        "corresponding extension may not be installed."
-                        % serializer_source
-                    )
-                raise DataException(
-                    "No deserializer claimed artifact '%s' (encoding: %s, "
-                    "serializer_info: %s).%s"
-                    % (name, metadata.encoding, metadata.serializer_info, source_hint)
+        # Load blobs from CAS and deserialize
+        for key, blob in self._ca_store.load_blobs(to_load.keys()):
+            for name in to_load[key]:
+                yield name, self._deserialize_artifact(
+                    name, blob, deserializers, loaded_extra, handed_out
                 )
-            deserializers[name] = (deserializer, metadata)
+
+    def _plan_artifact_loads(self, names):
+        # Returns the blobs to load for the artifacts `names` (main blob key ->
+        # names, additional blob keys) and how to deserialize each artifact.
+        to_load = defaultdict(list)
+        extra_to_load = set()
+        deserializers = {}  # name -> (serializer class, metadata, blob keys)
+        for name in names:
+            info = self._info.get(name, {})
+            deserializer, metadata = self._find_deserializer(name, info)
+            blob_keys = info.get("blobs") or []
+            deserializers[name] = (deserializer, metadata, blob_keys)
+            extra_to_load.update(blob_keys[1:])
             to_load[self._objects[name]].append(name)
 
-        # Load blobs from CAS and deserialize
-        for key, blob in self._ca_store.load_blobs(to_load.keys()):
-            loaded_names = to_load[key]
-            for name in loaded_names:
-                deserializer, metadata = deserializers[name]
-                # Deserialize each time to have fully distinct objects (the user
-                # would not expect two artifacts with different names to actually
-                # be aliases of one another)
-                yield name, deserializer.deserialize(
-                    [blob], metadata, format=SerializationFormat.STORAGE
+        return to_load, extra_to_load, deserializers
+
+    def _find_deserializer(self, name, info):
+        metadata = SerializationMetadata(
+            obj_type=info.get("type", "object"),
+            size=info.get("size", 0),
+            # Default to gzip+pickle-v2 for very old artifacts without encoding
+            encoding=info.get("encoding", "gzip+pickle-v2"),
+            serializer_info=info.get("serializer_info", {}),
+        )
+
+        # Find deserializer via metadata
+        deserializer = None
+        for s in self._serializers:
+            try:
+                if s.can_deserialize(metadata):
+                    deserializer = s
+                    break
+            except Exception as e:
+                _record_dispatch_error(s, e)
+                continue
+        if deserializer is None:
+            source_hint = ""
+            serializer_source = metadata.serializer_info.get("source")
+            if serializer_source:
+                source_hint = (
+                    " The artifact was written by '%s' — the "
+                    "corresponding extension may not be installed." % serializer_source
                 )
+            raise DataException(
+                "No deserializer claimed artifact '%s' (encoding: %s, "
+                "serializer_info: %s).%s"
+                % (name, metadata.encoding, metadata.serializer_info, source_hint)
+            )
+        return deserializer, metadata
+
+    @require_mode(None)
+    def load_foreach_shard(self, name, shard):
+        """
+        Loads a shard saved by save_foreach_shards.
+
+        This method can be used in both 'r' and 'w' mode.
+
+        Parameters
+        ----------
+        name : string
+            Name of the artifact holding the foreach iterable
+        shard : Dict
+            Description of the shard, as returned by save_foreach_shards
+
+        Returns
+        -------
+        object
+            The shard
+        """
+        deserializer, metadata = self._find_deserializer(name, shard["info"])
+        blob_keys = shard["info"].get("blobs") or []
+        loaded_extra = {}
+        if len(blob_keys) > 1:
+            loaded_extra = dict(self._ca_store.load_blobs(blob_keys[1:], use_mmap=True))
+        _, blob = next(iter(self._ca_store.load_blobs([shard["key"]])))
+        return self._deserialize_artifact(
+            name,
+            blob,
+            {name: (deserializer, metadata, blob_keys)},
+            loaded_extra,
+            set(),
+        )
+
+    @staticmethod
+    def _deserialize_artifact(name, blob, deserializers, loaded_extra, handed_out):
+        deserializer, metadata, blob_keys = deserializers[name]
+        data = [blob]
+        for extra_key in blob_keys[1:]:
+            extra = loaded_extra[extra_key]
+            if extra_key in handed_out:
+                # Buffers may be mutable so give each artifact its own
+                extra = bytearray(extra)
+            handed_out.add(extra_key)
+            data.append(extra)
+        # Deserialize each time to have fully distinct objects (the user
+        # would not expect two artifacts with different names to actually
+        # be aliases of one another)
+        return deserializer.deserialize(
+            data, metadata, format=SerializationFormat.STORAGE
+        )
 
     @require_mode("r")
     def get_artifact_sizes(self, names):
@@ -620,6 +765,16 @@ class TaskDataStore(object):
         paths = list(map(_path, logsources))
         sizes = [self._storage_impl.size_file(p) for p in paths]
 
+        # Logs of a running task may only exist as chunks
+        missing = [
+            self._metadata_name_for_attempt(self._get_log_location(s, stream))
+            for s, size in zip(logsources, sizes)
+            if size is None
+        ]
+        if missing:
+            indices = self._load_log_chunk_indices(missing)
+            sizes.extend(index["size"] for index in indices.values())
+
         return sum(size for size in sizes if size is not None)
 
     @only_if_not_done
@@ -799,34 +954,27 @@ class TaskDataStore(object):
 
         Will throw an exception if mode != 'w'
         """
+        data_obj = {
+            "datastore": self.TYPE,
+            "version": "1.0",
+            "attempt": self._attempt,
+            "python_version": sys.version,
+            "objects": self._objects,
+            "info": self._info,
+        }
         self.save_metadata(
             {
-                self.METADATA_DATA_SUFFIX: {
-                    "datastore": self.TYPE,
-                    "version": "1.0",
-                    "attempt": self._attempt,
-                    "python_version": sys.version,
-                    "objects": self._objects,
-                    "info": self._info,
-                },
+                self.METADATA_DATA_SUFFIX: data_obj,
                 self.METADATA_DONE_SUFFIX: "",
             }
         )
+        if metaflow_config.DATASTORE_STEP_MANIFEST and self._attempt is not None:
+            # Only recorded once the attempt is marked as done
+            self._parent.record_task_completion(
+                self._run_id, self._step_name, self._task_id, self._attempt, data_obj
+            )
 
         if self._metadata:
-            self._metadata.register_metadata(
-                self._run_id,
-                self._step_name,
-                self._task_id,
-                [
-                    MetaDatum(
-                        field="attempt-done",
-                        value=str(self._attempt),
-                        type="attempt-done",
-                        tags=["attempt_id:{0}".format(self._attempt)],
-                    )
-                ],
-            )
             artifacts = [
                 DataArtifact(
                     name=var,
@@ -839,9 +987,27 @@ class TaskDataStore(object):
                 for var, sha in self._objects.items()
             ]
 
+            # The artifacts are registered first so that once attempt-done is
+            # recorded, everything about the attempt is
             self._metadata.register_data_artifacts(
                 self.run_id, self.step_name, self.task_id, self._attempt, artifacts
             )
+            self._metadata.register_metadata(
+                self._run_id,
+                self._step_name,
+                self._task_id,
+                [
+                    MetaDatum(
+                        field="attempt-done",
+                        value=str(self._attempt),
+                        type="attempt-done",
+                        tags=["attempt_id:{0}".format(self._attempt)],
+                    )
+                ],
+            )
+            # The attempt is only done once its metadata is recorded; this
+            # raises if a registration failed
+            self._metadata.flush()
 
         self._is_done_set = True
 
@@ -971,6 +1137,38 @@ class TaskDataStore(object):
                 to_store_dict[n] = data
         self._save_file(to_store_dict)
 
+    @only_if_not_done
+    @require_mode("w")
+    def save_log_chunks(self, logsource, stream_chunks):
+        """
+        Append a chunk to log files saved in the segmented format used while
+        a task is running. The chunks of a log are stitched back together by
+        load_logs until the complete log is saved with save_logs.
+
+        Parameters
+        ----------
+        logsource : string
+            Identifies the source of the stream (runtime, task, etc)
+
+        stream_chunks : Dict[string -> Tuple[int, int, bytes]]
+            Each entry should have a string as the key indicating the type
+            of the stream ('stderr', 'stdout') and as value a tuple of the
+            index of the chunk (starting at 0), the offset of the chunk in the
+            log and the contents of the chunk.
+        """
+        chunks = {}
+        indices = {}
+        for stream, (index, offset, data) in stream_chunks.items():
+            n = self._get_log_location(logsource, stream)
+            chunks[log_chunk_name(n, index)] = data
+            indices[log_chunk_index_name(n)] = json.dumps(
+                {"chunks": index + 1, "size": offset + len(data)}
+            ).encode("utf-8")
+        # Chunks are saved before the index referencing them so readers never
+        # see an index pointing to a chunk which does not exist yet.
+        self._save_file(chunks)
+        self._save_file(indices)
+
     @require_mode("d")
     def scrub_logs(self, logsources, stream, attempt_override=None):
         path_logsources = {
@@ -999,6 +1197,18 @@ class TaskDataStore(object):
             for path in existing_paths
         }
 
+        # Chunks uploaded while the task was running hold the same contents
+        chunk_indices = self._load_log_chunk_indices(path_logsources.keys())
+        for path, index in chunk_indices.items():
+            redacted = bytes(
+                "[REDACTED %s %s]" % (path_logsources[path], stream), "utf-8"
+            )
+            for i in range(index["chunks"]):
+                to_store_dict[log_chunk_name(path, i)] = redacted if i == 0 else b""
+            to_store_dict[log_chunk_index_name(path)] = json.dumps(
+                {"chunks": index["chunks"], "size": len(redacted)}
+            ).encode("utf-8")
+
         self._save_file(to_store_dict, add_attempt=False, allow_overwrite=True)
 
     @require_mode("r")
@@ -1025,6 +1235,9 @@ class TaskDataStore(object):
             )
         )
         r = self._load_file(paths.keys(), add_attempt=False)
+        missing = [k for k, v in r.items() if v is None]
+        if missing:
+            r.update(self._load_log_chunks(missing))
         return [(paths[k], v if v is not None else b"") for k, v in r.items()]
 
     @require_mode(None)
@@ -1106,6 +1319,58 @@ class TaskDataStore(object):
     def _get_log_location(logprefix, stream):
         return "%s_%s.log" % (logprefix, stream)
 
+    def _load_log_chunk_indices(self, log_names):
+        """
+        Loads the chunk indices of logs saved with save_log_chunks.
+
+        Parameters
+        ----------
+        log_names : List[string]
+            Names of the log files (including the attempt)
+
+        Returns
+        -------
+        Dict: string -> Dict
+            Chunk index indexed by the name of the log file, for the logs
+            which have one
+        """
+        index_names = {log_chunk_index_name(name): name for name in log_names}
+        indices = {}
+        for name, blob in self._load_file(index_names, add_attempt=False).items():
+            if blob is not None:
+                indices[index_names[name]] = json.loads(blob.decode("utf-8"))
+        return indices
+
+    def _load_log_chunks(self, log_names):
+        """
+        Loads and stitches together the chunks of logs saved with
+        save_log_chunks. All chunks are fetched with a single load.
+
+        Parameters
+        ----------
+        log_names : List[string]
+            Names of the log files (including the attempt)
+
+        Returns
+        -------
+        Dict: string -> bytes
+            Contents of the logs indexed by the name of the log file, for the
+            logs which have chunks
+        """
+        chunk_names = {
+            name: [log_chunk_name(name, i) for i in range(index["chunks"])]
+            for name, index in self._load_log_chunk_indices(log_names).items()
+        }
+        if not chunk_names:
+            return {}
+        chunks = self._load_file(
+            [c for names in chunk_names.values() for c in names], add_attempt=False
+        )
+        return {
+            name: b"".join(chunks[c] or b"" for c in names)
+            for name, names in chunk_names.items()
+        }
+
     def _save_file(self, contents, allow_overwrite=True, add_attempt=True):
         """
         Saves files in the directory for this TaskDataStore. This can be
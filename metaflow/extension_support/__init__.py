@@ -1,12 +1,14 @@
 from __future__ import print_function
 
 import importlib
+import json
 import os
 import re
 import sys
 import types
 
 from collections import defaultdict, namedtuple
+from hashlib import sha1
 
 from importlib.abc import MetaPathFinder, Loader
 from itertools import chain
@@ -97,6 +99,14 @@ EXTENSIONS_SEARCH_DIRS = os.environ.get("METAFLOW_EXTENSIONS_SEARCH_DIRS", "").s
     os.pathsep
 )
 
+# If set, the extensions found are cached in this directory and reused by the next
+# processes using the same environment instead of scanning all the installed
+# distributions again. Like EXTENSIONS_SEARCH_DIRS, this is only read from the
+# environment.
+EXTENSIONS_CACHE_DIR = os.environ.get("METAFLOW_EXTENSIONS_CACHE_DIR")
+# Bump when the format of the cache (or what is cached) changes
+_EXTENSIONS_CACHE_VERSION = 1
+
 MFExtPackage = namedtuple("MFExtPackage", "package_name tl_package config_module")
 MFExtModule = namedtuple("MFExtModule", "package_name tl_package module")
 
@@ -395,6 +405,16 @@ def _get_extension_packages(ignore_info_file=False, restrict_to_directories=None
             Path(p).resolve().as_posix() for p in restrict_to_directories
         ]
 
+    cache_path = _extensions_cache_path(
+        extensions_module.__spec__.submodule_search_locations,
+        restrict_to_directories,
+    )
+    if cache_path:
+        cached = _read_extensions_cache(cache_path)
+        if cached is not None:
+            _ext_debug("Loading cached information from %s" % cache_path)
+            return cached
+
     # There are two "types" of packages:
     #   - those installed on the system (distributions)
     #   - those present in the PYTHONPATH
@@ -928,9 +948,65 @@ def _get_extension_packages(ignore_info_file=False, restrict_to_directories=None
                     )
             final_list.append(pkg)
         extension_points_to_pkg[k] = final_list
+    if cache_path:
+        _write_extensions_cache(cache_path, mf_ext_packages, extension_points_to_pkg)
     return mf_ext_packages, extension_points_to_pkg
 
 
+def _extensions_cache_path(search_locations, restrict_to_directories):
+    # The extensions found depend on the Python path, on what is installed in it and
+    # on the files of the extensions. Installing or removing a distribution changes
+    # the modification time of the directory it is installed in. The first entry of
+    # the path (the directory of the script) is skipped as it changes often; the
+    # extensions it may contain are in search_locations.
+    if not EXTENSIONS_CACHE_DIR:
+        return None
+    search_locations = list(search_locations)
+    key = [
+        _EXTENSIONS_CACHE_VERSION,
+        sys.version,
+        sys.executable,
+        restrict_to_directories,
+        search_locations,
+    ]
+    for p in sys.path[1:]:
+        try:
+            key.append((p, os.stat(p or ".").st_mtime_ns))
+        except OSError:
+            key.append((p, None))
+    for location in search_locations:
+        for root, dirs, files in os.walk(location):
+            dirs[:] = sorted(d for d in dirs if d != "__pycache__")
+            key.append((root, sorted(files)))
+    return os.path.join(
+        EXTENSIONS_CACHE_DIR,
+        "%s.json" % sha1(json.dumps(key).encode("utf-8")).hexdigest(),
+    )
+
+
+def _read_extensions_cache(path):
+    try:
+        with open(path, "r") as f:
+            all_pkg, ext_to_pkg = json.load(f)
+        return all_pkg, {
+            k: [MFExtPackage(*d) for d in v] for k, v in ext_to_pkg.items()
+        }
+    except (OSError, ValueError, TypeError):
+        return None
+
+
+def _write_extensions_cache(path, all_pkg, ext_to_pkg):
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = "%s.%d" % (path, os.getpid())
+        with open(tmp_path, "w") as f:
+            json.dump([all_pkg, ext_to_pkg], f)
+        os.replace(tmp_path, path)
+    except (OSError, TypeError, ValueError):
+        # The cache is best effort
+        _ext_debug("Could not cache extension information in %s" % path)
+
+
 def _attempt_load_module(module_name):
     try:
         extension_module = importlib.import_module(module_name)
@@ -137,8 +137,70 @@ def get_plugin(category, class_path, name):
     return cls
 
 
-def resolve_plugins(category, path_only=False):
+class LazyPlugin(object):
+    # Stands for the plugin class at class_path until the class is actually used:
+    # the name of the plugin is known without importing it so the plugin can be
+    # looked up by name (`[d for d in DATASTORES if d.TYPE == "s3"]` for example)
+    # and its module is only imported when the plugin is used (called, or any other
+    # attribute accessed or set).
+
+    def __init__(self, category, class_path, name):
+        self._lazy_category = category
+        self._lazy_class_path = class_path
+        self._lazy_name = name
+        self._lazy_cls = None
+
+    def resolve(self):
+        if self._lazy_cls is None:
+            self._lazy_cls = get_plugin(
+                self._lazy_category, self._lazy_class_path, self._lazy_name
+            )
+        return self._lazy_cls
+
+    def __getattr__(self, attr):
+        if attr.startswith("_lazy_"):
+            raise AttributeError(attr)
+        if self._lazy_cls is None and attr == _lazy_name_attrs.get(self._lazy_category):
+            return self._lazy_name
+        return getattr(self.resolve(), attr)
+
+    def __setattr__(self, attr, value):
+        if attr.startswith("_lazy_"):
+            object.__setattr__(self, attr, value)
+        else:
+            setattr(self.resolve(), attr, value)
+
+    def __call__(self, *args, **kwargs):
+        return self.resolve()(*args, **kwargs)
+
+    def __instancecheck__(self, instance):
+        return isinstance(instance, self.resolve())
+
+    def __subclasscheck__(self, subclass):
+        return issubclass(subclass, self.resolve())
+
+    def __repr__(self):
+        if self._lazy_cls is None:
+            return "<lazy %s plugin '%s' from '%s'>" % (
+                self._lazy_category,
+                self._lazy_name,
+                self._lazy_class_path,
+            )
+        return repr(self._lazy_cls)
+
+
+def resolve_plugin(plugin):
+    # Returns the class of a plugin returned by resolve_plugins (importing it if
+    # the plugin was resolved lazily)
+    if isinstance(plugin, LazyPlugin):
+        return plugin.resolve()
+    return plugin
+
+
+def resolve_plugins(category, path_only=False, lazy=False):
     # Called to return a list of classes that are the available plugins for 'category'
+    # If lazy is True (and plugins of 'category' can be looked up by name without
+    # importing them), LazyPlugin are returned instead of the classes.
 
     # The ENABLED_<category> variable is set in process_plugins
     # based on all the plugins that are found; it can contain either names of
@@ -158,6 +220,7 @@ def resolve_plugins(category, path_only=False):
 
     available_plugins = globals()[_dict_for_category(category)]
     name_extractor = _plugin_categories[category]
+    lazy = lazy and category in _lazy_name_attrs
     if path_only or not name_extractor:
         # If we have no name function, it means we just use the name in the dictionary
         # and we return a dictionary. This is for sidecars mostly as they do not have
@@ -179,10 +242,14 @@ def resolve_plugins(category, path_only=False):
         if path_only:
             to_return[name] = class_path
         else:
+            if lazy:
+                plugin = LazyPlugin(category, class_path, name)
+            else:
+                plugin = get_plugin(category, class_path, name)
             if name_extractor is not None:
-                to_return.append(get_plugin(category, class_path, name))
+                to_return.append(plugin)
             else:
-                to_return[name] = get_plugin(category, class_path, name)
+                to_return[name] = plugin
 
     return to_return
 
@@ -221,6 +288,27 @@ _plugin_categories = {
 }
 
 
+# Plugins that can be resolved lazily: the value is the attribute holding the name of
+# the plugin (the name is checked against it once the plugin is imported) or None if
+# the plugin has no such attribute (the plugins are then returned in a dictionary
+# keyed by name).
+_lazy_name_attrs = {
+    "step_decorator": "name",
+    "flow_decorator": "name",
+    "environment": "TYPE",
+    "metadata_provider": "TYPE",
+    "datastore": "TYPE",
+    "dataclient": "TYPE",
+    "secrets_provider": "TYPE",
+    "gcp_client_provider": "name",
+    "azure_client_provider": "name",
+    "aws_client_provider": "name",
+    "sidecar": None,
+    "logging_sidecar": None,
+    "monitor_sidecar": None,
+}
+
+
 def get_plugin_name(category, plugin):
     extractor = _plugin_categories[category]
     if extractor:
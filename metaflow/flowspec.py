@@ -47,6 +47,7 @@ from .datastore.inputs import Inputs
 INTERNAL_ARTIFACTS_SET = set(
     [
         "_foreach_values",
+        "_foreach_shards",
         "_unbounded_foreach",
         "_control_mapper_tasks",
         "_control_task_is_mapper_zero",
@@ -715,6 +716,11 @@ class FlowSpec(metaclass=FlowSpecMeta):
             # right split. One can override this method with a more efficient
             # input data handler if this is a problem.
             frame = self._foreach_stack[stack_index]
+            if stack_index == len(self._foreach_stack) - 1:
+                found, value = self._find_sharded_input(frame)
+                if found:
+                    self._cached_input[stack_index] = value
+                    return value
             try:
                 var = getattr(self, frame.var)
             except AttributeError:
@@ -735,6 +741,31 @@ class FlowSpec(metaclass=FlowSpecMeta):
                     )
             return self._cached_input[stack_index]
 
+    def _find_sharded_input(self, frame):
+        # If the split step saved the foreach iterable in shards (see
+        # FOREACH_SHARDED_INPUTS), load only the shard holding the input of
+        # this task. Returns whether the input was found and the input.
+        if frame.var in self.__dict__ or not hasattr(
+            self._datastore, "load_foreach_shard"
+        ):
+            # the iterable is already loaded (or was overwritten by the step)
+            return False, None
+        if "_foreach_shards" not in self._datastore:
+            return False, None
+        shards = self._datastore["_foreach_shards"]
+        if (
+            shards is None
+            or shards["step"] != frame.step
+            or shards["var"] != frame.var
+            or shards["num_splits"] != frame.num_splits
+        ):
+            # the shards of another foreach, passed down to this task
+            return False, None
+        shard = self._datastore.load_foreach_shard(
+            frame.var, shards["shards"][frame.index // shards["size"]]
+        )
+        return True, shard[frame.index % shards["size"]]
+
     def merge_artifacts(
         self,
         inputs: Inputs,
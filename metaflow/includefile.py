@@ -5,6 +5,9 @@ import importlib
 import io
 import json
 import os
+import shutil
+import sys
+import tempfile
 
 from hashlib import sha1
 from typing import Any, Callable, Dict, Optional, Union
@@ -13,6 +16,7 @@ from metaflow._vendor import click
 from metaflow._vendor import yaml
 
 from .exception import MetaflowException
+from .metaflow_config import CLIENT_CACHE_PATH, INCLUDEFILE_SHA_CACHE
 from .parameters import (
     DelayedEvaluationParameter,
     DeployTimeField,
@@ -54,6 +58,9 @@ _DelayedExecContext = namedtuple(
 # From here on out, this is the IncludeFile implementation.
 _dict_dataclients = {d.TYPE: d for d in DATACLIENTS}
 
+# Included files are read, hashed and compressed in chunks of this size
+_CHUNK_SIZE = 4 * 1024 * 1024
+
 
 class IncludedFile(object):
     # Thin wrapper to indicate to the MF client that this object is special
@@ -94,6 +101,24 @@ class IncludedFile(object):
             )
         return handler.load(self._descriptor)
 
+    def open(self):
+        """
+        Opens the included file for reading. The content of the file is
+        decompressed as it is read instead of being loaded in memory.
+
+        Returns
+        -------
+        Union[io.BufferedReader, io.TextIOWrapper]
+            Binary file object, or text file object if the file was included
+            as text.
+        """
+        handler = UPLOADERS.get(self.descriptor.get("type", None), None)
+        if handler is None:
+            raise MetaflowException(
+                "Could not open IncludedFile: %s" % json.dumps(self.descriptor)
+            )
+        return handler.open(self._descriptor)
+
 
 class FilePathClass(click.ParamType):
     name = "FilePath"
@@ -268,6 +293,11 @@ class IncludeFile(Parameter):
         a function (like "my_parser_package.my_parser.my_parser_function") which should
         be able to parse the file contents. If the name starts with a ".", it is assumed
         to be relative to "metaflow".
+    lazy : bool, optional, default None
+        If True, the parameter is an `IncludedFile` whose content is read on
+        demand, through its `open()` method, instead of being loaded in memory
+        when the parameter is accessed. Cannot be used with `parser`. A value of
+        None is equivalent to False.
     """
 
     def __init__(
@@ -278,8 +308,14 @@ class IncludeFile(Parameter):
         encoding: Optional[str] = None,
         help: Optional[str] = None,
         parser: Optional[Union[str, Callable[[str], Any]]] = None,
+        lazy: Optional[bool] = None,
         **kwargs: Dict[str, str]
     ):
+        if lazy and parser is not None:
+            raise MetaflowException(
+                "IncludeFile '%s' cannot be both lazy and parsed" % name
+            )
+        self._lazy = bool(lazy)
         self._includefile_overrides = {}
         if is_text is not None:
             self._includefile_overrides["is_text"] = is_text
@@ -343,7 +379,7 @@ class IncludeFile(Parameter):
             )
 
     def load_parameter(self, v):
-        if v is None:
+        if v is None or self._lazy:
             return v
 
         # Get the raw content from the file
@@ -383,6 +419,95 @@ class IncludeFile(Parameter):
         return do_eval
 
 
+def _file_sha(path):
+    # SHA1 of the file at `path`, read in chunks. With INCLUDEFILE_SHA_CACHE,
+    # the SHA1 of a file whose path, size and modification time did not change
+    # since it was last included is not computed again.
+    cache_file = None
+    if INCLUDEFILE_SHA_CACHE:
+        st = os.stat(path)
+        cache_key = "%s\0%d\0%d" % (os.path.realpath(path), st.st_size, st.st_mtime_ns)
+        cache_file = os.path.join(
+            CLIENT_CACHE_PATH,
+            "includefile",
+            sha1(cache_key.encode("utf-8")).hexdigest(),
+        )
+        try:
+            with io.open(cache_file, mode="r") as f:
+                sha = f.read()
+            if len(sha) == 40:
+                return sha
+        except OSError:
+            pass
+
+    h = sha1()
+    with io.open(path, mode="rb") as f:
+        for chunk in iter(lambda: f.read(_CHUNK_SIZE), b""):
+            h.update(chunk)
+    sha = h.hexdigest()
+
+    if cache_file is not None:
+        new_st = os.stat(path)
+        if (new_st.st_size, new_st.st_mtime_ns) != (st.st_size, st.st_mtime_ns):
+            # The file changed while we were reading it
+            return sha
+        try:
+            os.makedirs(os.path.dirname(cache_file), exist_ok=True)
+            tmp_file = "%s.%d" % (cache_file, os.getpid())
+            with io.open(tmp_file, mode="w") as f:
+                f.write(sha)
+            os.replace(tmp_file, cache_file)
+        except OSError:
+            # The cache is best effort
+            pass
+    return sha
+
+
+class _DownloadedFile(io.RawIOBase):
+    # Raw stream over a file downloaded by a data client; the client, which
+    # may remove the downloaded file, is closed with the stream.
+    def __init__(self, client, fileobj):
+        self._client = client
+        self._fileobj = fileobj
+
+    def readable(self):
+        return True
+
+    def readinto(self, b):
+        return self._fileobj.readinto(b)
+
+    def close(self):
+        if not self.closed:
+            try:
+                self._fileobj.close()
+            finally:
+                self._client.__exit__(None, None, None)
+        super(_DownloadedFile, self).close()
+
+
+def _open_url(url, compressed, is_text, encoding):
+    # Opens the file at `url` for streaming reads; returns None if it does not
+    # exist.
+    client = UploaderV1._get_handler(url)()
+    client.__enter__()
+    try:
+        obj = client.get(url, return_missing=True)
+        if not obj.exists:
+            client.__exit__(None, None, None)
+            return None
+        if compressed:
+            f = gzip.GzipFile(filename=obj.path, mode="rb")
+        else:
+            f = io.open(obj.path, mode="rb")
+    except BaseException:
+        client.__exit__(*sys.exc_info())
+        raise
+    stream = io.BufferedReader(_DownloadedFile(client, f), _CHUNK_SIZE)
+    if is_text:
+        return io.TextIOWrapper(stream, encoding=encoding)
+    return stream
+
+
 class UploaderV1:
     file_type = "uploader-v1"
 
@@ -405,25 +530,23 @@ class UploaderV1:
         else:
             extra = ""
         echo("Including file %s of size %d%s %s" % (path, sz, unit[pos], extra))
-        try:
-            input_file = io.open(path, mode="rb").read()
-        except IOError:
-            # If we get an error here, since we know that the file exists already,
-            # it means that read failed which happens with Python 2.7 for large files
-            raise MetaflowException(
-                "Cannot read file at %s -- this is likely because it is too "
-                "large to be properly handled by Python 2.7" % path
-            )
-        sha = sha1(input_file).hexdigest()
-        path = os.path.join(handler.get_root_from_config(echo, True), flow_name, sha)
-        buf = io.BytesIO()
-
-        with gzip.GzipFile(fileobj=buf, mode="wb", compresslevel=3) as f:
-            f.write(input_file)
-        buf.seek(0)
+        sha = _file_sha(path)
+        key = os.path.join(handler.get_root_from_config(echo, True), flow_name, sha)
 
         with handler() as client:
-            url = client.put(path, buf.getvalue(), overwrite=False)
+            obj = client.info(key, return_missing=True)
+            if obj.exists:
+                # Files are stored by content: this one was already uploaded
+                url = obj.url
+            else:
+                with tempfile.TemporaryFile() as buf:
+                    with io.open(path, mode="rb") as src:
+                        with gzip.GzipFile(
+                            fileobj=buf, mode="wb", compresslevel=3
+                        ) as f:
+                            shutil.copyfileobj(src, f, _CHUNK_SIZE)
+                    buf.seek(0)
+                    url = client.put(key, buf, overwrite=False)
 
         return cls.encode_url(cls.file_type, url, is_text=is_text, encoding=encoding)
 
@@ -440,28 +563,22 @@ class UploaderV1:
 
     @classmethod
     def load(cls, descriptor):
-        url = descriptor["url"]
-        handler = cls._get_handler(url)
-        with handler() as client:
-            obj = client.get(url, return_missing=True)
-            if obj.exists:
-                if descriptor["type"] == cls.file_type:
-                    # We saved this file directly, so we know how to read it out
-                    with gzip.GzipFile(filename=obj.path, mode="rb") as f:
-                        if descriptor["is_text"]:
-                            return io.TextIOWrapper(
-                                f, encoding=descriptor.get("encoding")
-                            ).read()
-                        return f.read()
-                else:
-                    # We open this file according to the is_text and encoding information
-                    if descriptor["is_text"]:
-                        return io.open(
-                            obj.path, mode="rt", encoding=descriptor.get("encoding")
-                        ).read()
-                    else:
-                        return io.open(obj.path, mode="rb").read()
+        with cls.open(descriptor) as f:
+            return f.read()
+
+    @classmethod
+    def open(cls, descriptor):
+        # Files we saved directly are compressed; we open the other ones
+        # according to the is_text and encoding information
+        f = _open_url(
+            descriptor["url"],
+            descriptor["type"] == cls.file_type,
+            descriptor["is_text"],
+            descriptor.get("encoding"),
+        )
+        if f is None:
             raise FileNotFoundError("File at '%s' does not exist" % descriptor["url"])
+        return f
 
     @staticmethod
     def _get_handler(url):
@@ -519,33 +636,23 @@ class UploaderV2:
 
     @classmethod
     def load(cls, descriptor):
-        url = descriptor["url"]
-        # We know the URL is in a <prefix>:// format so we just extract the handler
-        handler = cls._get_handler(url)
-        with handler() as client:
-            obj = client.get(url, return_missing=True)
-            if obj.exists:
-                if descriptor["sub-type"] == "uploaded":
-                    # We saved this file directly, so we know how to read it out
-                    with gzip.GzipFile(filename=obj.path, mode="rb") as f:
-                        if descriptor["is_text"]:
-                            return io.TextIOWrapper(
-                                f, encoding=descriptor.get("encoding")
-                            ).read()
-                        return f.read()
-                else:
-                    # We open this file according to the is_text and encoding information
-                    if descriptor["is_text"]:
-                        return io.open(
-                            obj.path, mode="rt", encoding=descriptor.get("encoding")
-                        ).read()
-                    else:
-                        return io.open(obj.path, mode="rb").read()
-            # If we are here, the file does not exist
+        with cls.open(descriptor) as f:
+            return f.read()
+
+    @classmethod
+    def open(cls, descriptor):
+        f = _open_url(
+            descriptor["url"],
+            descriptor["sub-type"] == "uploaded",
+            descriptor["is_text"],
+            descriptor.get("encoding"),
+        )
+        if f is None:
             raise FileNotFoundError(
                 "%s file at '%s' does not exist"
-                % (descriptor["sub-type"].capitalize(), url)
+                % (descriptor["sub-type"].capitalize(), descriptor["url"])
             )
+        return f
 
     @staticmethod
     def _get_handler(url):
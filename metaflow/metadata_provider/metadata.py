@@ -289,6 +289,16 @@ class MetadataProvider(object):
     def stop_heartbeat(self):
         pass
 
+    def flush(self):
+        """
+        Waits for all the data artifacts and metadata registered so far to be
+        recorded.
+
+        Providers recording registrations in the background raise the error of
+        the first registration which failed, if any.
+        """
+        pass
+
     @classmethod
     def _get_object_internal(
         cls, obj_type, obj_order, sub_type, sub_order, filters, attempt, *args
@@ -439,6 +449,84 @@ class MetadataProvider(object):
             pre_filter, attempt_int
         )
 
+    @classmethod
+    def iter_objects(
+        cls, obj_type, sub_type, filters, *args, limit=None, page_size=1000
+    ):
+        """Iterates over the children of type sub_type of an object, newest first
+
+        Unlike get_object, the children are fetched page by page, as they are
+        consumed, so the first ones are returned without fetching all of them.
+
+        Parameters
+        ----------
+        obj_type : string
+            One of 'root', 'flow', 'run' or 'step'
+        sub_type : string
+            One of 'flow', 'run', 'step' or 'task', slotted below obj_type
+        filters : dict
+            Same as for get_object
+        limit : int, optional, default None
+            Maximum number of children to return, once filtered
+        page_size : int, default 1000
+            Number of children fetched at once. It does not depend on `limit`
+            since the children are filtered once fetched: the first children
+            matching the filters may not be in the first ones fetched.
+
+        Yields
+        ------
+        dict
+            Children, in decreasing order of creation time
+        """
+        type_order = ObjectOrder.type_to_order(obj_type)
+        sub_order = ObjectOrder.type_to_order(sub_type)
+
+        if type_order is None:
+            raise MetaflowInternalError(msg="Cannot find type %s" % obj_type)
+        if sub_type not in ("flow", "run", "step", "task"):
+            raise MetaflowInternalError(
+                msg="Cannot iterate over objects of type %s" % sub_type
+            )
+        if type_order >= sub_order:
+            raise MetaflowInternalError(
+                msg="Subtype %s not allowed for %s" % (sub_type, obj_type)
+            )
+        if limit is not None and limit <= 0:
+            return
+
+        count = 0
+        for page in cls._iter_objects_internal(
+            obj_type, type_order, sub_type, sub_order, filters, page_size, *args
+        ):
+            for obj in page:
+                yield obj
+                count += 1
+                if limit is not None and count >= limit:
+                    return
+
+    @classmethod
+    def _iter_objects_internal(
+        cls, obj_type, obj_order, sub_type, sub_order, filters, page_size, *args
+    ):
+        """
+        Yields pages of the children of an object, newest first.
+
+        See iter_objects for the description of what this function does. This
+        default implementation fetches all the children at once; implementations
+        able to fetch them page by page should override it.
+
+        Yields
+        ------
+        List[dict]
+            Pages of at most page_size children
+        """
+        objs = cls._get_object_internal(
+            obj_type, obj_order, sub_type, sub_order, filters, None, *args
+        )
+        objs = sorted(objs or [], reverse=True, key=lambda x: x["ts_epoch"])
+        for start in range(0, len(objs), page_size):
+            yield objs[start : start + page_size]
+
     @classmethod
     def mutate_user_tags_for_run(
         cls, flow_id, run_id, tags_to_remove=None, tags_to_add=None
@@ -5,16 +5,19 @@ import tarfile
 
 from metaflow import util
 from metaflow.plugins.datastores.local_storage import LocalStorage
+from metaflow.plugins.metadata_providers.local_index import INDEX_FILE
 
 
-def copy_tree(src, dst, update=False):
+def copy_tree(src, dst, update=False, exclude=()):
     if not os.path.exists(dst):
         os.makedirs(dst)
     for item in os.listdir(src):
         s = os.path.join(src, item)
         d = os.path.join(dst, item)
         if os.path.isdir(s):
-            copy_tree(s, d, update)
+            copy_tree(s, d, update, exclude)
+        elif item in exclude:
+            continue
         else:
             if (
                 update
@@ -45,8 +48,11 @@ def sync_local_metadata_from_datastore(metadata_local_dir, task_ds):
     with util.TempDir() as td:
         with tarfile.open(fileobj=BytesIO(tarball), mode="r:gz") as tar:
             util.tar_safe_extract(tar, td)
+        # The metadata index of the run is local to each machine; the synced
+        # tasks are indexed from their files when needed.
         copy_tree(
             os.path.join(td, metadata_local_dir),
             LocalStorage.get_datastore_root_from_config(echo_none),
             update=True,
+            exclude=(INDEX_FILE, INDEX_FILE + "-journal"),
         )
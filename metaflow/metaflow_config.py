@@ -42,6 +42,20 @@ DEFAULT_EVENT_LOGGER = from_conf("DEFAULT_EVENT_LOGGER", "nullSidecarLogger")
 DEFAULT_METADATA = from_conf("DEFAULT_METADATA", "local")
 DEFAULT_MONITOR = from_conf("DEFAULT_MONITOR", "nullSidecarMonitor")
 DEFAULT_PACKAGE_SUFFIXES = from_conf("DEFAULT_PACKAGE_SUFFIXES", ".py,.R,.RDS")
+# Keep a manifest of the content of the last code package of each flow, in the
+# `package` directory of CLIENT_CACHE_PATH, and reuse the package already in the
+# datastore instead of building and uploading it again if its content is unchanged.
+PACKAGE_MANIFEST_CACHE = from_conf("PACKAGE_MANIFEST_CACHE", False)
+# Archive format of the code packages ("tgz" or "zip"). Members of a "zip" package
+# are compressed individually so any of them can be read without decompressing the
+# whole package.
+PACKAGE_ARCHIVE_FORMAT = from_conf("PACKAGE_ARCHIVE_FORMAT", "tgz")
+# Package Metaflow and the Metaflow extensions in a separate layer, stored once in
+# the datastore and shared by all flows using the same version of them, instead of
+# in the code package of each flow. Tasks can keep the layers they download in
+# METAFLOW_CODE_LAYER_CACHE_DIR (if set in their environment) to extract them
+# without downloading them again.
+PACKAGE_SHARED_LAYER = from_conf("PACKAGE_SHARED_LAYER", False)
 DEFAULT_AWS_CLIENT_PROVIDER = from_conf("DEFAULT_AWS_CLIENT_PROVIDER", "boto3")
 DEFAULT_AZURE_CLIENT_PROVIDER = from_conf(
     "DEFAULT_AZURE_CLIENT_PROVIDER", "azure-default"
@@ -104,6 +118,41 @@ DATASTORE_SYSROOT_AZURE = from_conf("DATASTORE_SYSROOT_AZURE")
 DATASTORE_SYSROOT_GS = from_conf("DATASTORE_SYSROOT_GS")
 # GS bucket and prefix to store artifacts for 'gs' datastore
 
+# Codec used to compress artifacts in the content-addressed store. "gzip" keeps
+# the original (cas_version 1) encoding readable by all versions of Metaflow;
+# "zstd", "lz4" (if the corresponding packages are installed) and "none" use the
+# cas_version 2 encoding which records the codec alongside the blob.
+DATASTORE_CAS_CODEC = from_conf("DATASTORE_CAS_CODEC", "gzip")
+# Codec to use instead of DATASTORE_CAS_CODEC for blobs that are at least
+# DATASTORE_CAS_LARGE_BLOB_SIZE bytes. Large artifacts typically benefit the
+# most from a faster codec.
+DATASTORE_CAS_LARGE_BLOB_CODEC = from_conf("DATASTORE_CAS_LARGE_BLOB_CODEC")
+DATASTORE_CAS_LARGE_BLOB_SIZE = from_conf(
+    "DATASTORE_CAS_LARGE_BLOB_SIZE", 64 * 1024 * 1024
+)
+# Use pickle protocol 5 for NumPy, pandas and Arrow artifacts. Their buffers
+# of at least DATASTORE_PICKLE_OOB_MIN_BUFFER_SIZE bytes are stored out-of-band
+# as separate blobs which avoids copying them when saving and allows the client
+# to memory-map them when loading. Artifacts saved this way cannot be read by
+# older versions of Metaflow.
+DATASTORE_PICKLE_OOB = from_conf("DATASTORE_PICKLE_OOB", False)
+DATASTORE_PICKLE_OOB_MIN_BUFFER_SIZE = from_conf(
+    "DATASTORE_PICKLE_OOB_MIN_BUFFER_SIZE", 1024 * 1024
+)
+# Number of threads used to serialize, hash and compress artifacts when they
+# are persisted. 1 processes artifacts sequentially.
+DATASTORE_SAVE_WORKERS = from_conf("DATASTORE_SAVE_WORKERS", 1)
+# Record the completed attempt of each task in a per-step manifest and use it
+# to resolve the tasks of a step (e.g. the inputs of a join) instead of probing
+# the metadata files of every possible attempt of every task. All the tasks of a
+# run should use the same setting since retries are recorded in the manifest.
+DATASTORE_STEP_MANIFEST = from_conf("DATASTORE_STEP_MANIFEST", False)
+# Serialized artifacts are uploaded in batches of at most this many bytes
+# (a single larger artifact forms its own batch) to bound memory usage.
+DATASTORE_SAVE_BATCH_MAX_BYTES = from_conf(
+    "DATASTORE_SAVE_BATCH_MAX_BYTES", 512 * 1024 * 1024
+)
+
 
 ###
 # Datastore local cache
@@ -121,6 +170,22 @@ CLIENT_CACHE_MAX_TASKDATASTORE_COUNT = from_conf(
     "CLIENT_CACHE_MAX_TASKDATASTORE_COUNT", CLIENT_CACHE_MAX_FLOWDATASTORE_COUNT * 100
 )
 
+# Iterate over the runs of a flow, the steps of a run and the tasks of a step
+# lazily, newest first, fetching them page by page from the metadata provider
+# instead of fetching and sorting all of them upfront.
+CLIENT_STREAMING_ITERATION = from_conf("CLIENT_STREAMING_ITERATION", False)
+# Number of objects fetched at once when iterating in streaming mode
+CLIENT_ITERATION_PAGE_SIZE = from_conf("CLIENT_ITERATION_PAGE_SIZE", 1000)
+
+# Cache the responses of the Metadata service to the client on disk, in the
+# `metadata` directory of CLIENT_CACHE_PATH. The objects of finished tasks are
+# cached for good; the other ones are revalidated after CLIENT_METADATA_CACHE_TTL
+# seconds.
+CLIENT_METADATA_CACHE = from_conf("CLIENT_METADATA_CACHE", False)
+CLIENT_METADATA_CACHE_TTL = from_conf("CLIENT_METADATA_CACHE_TTL", 60)
+# Maximum size (in MB) of the cache
+CLIENT_METADATA_CACHE_MAX_SIZE = from_conf("CLIENT_METADATA_CACHE_MAX_SIZE", 100)
+
 
 ###
 # Datatools (S3) configuration
@@ -152,6 +217,26 @@ S3_TRANSIENT_RETRY_COUNT = from_conf("S3_TRANSIENT_RETRY_COUNT", 20)
 # Whether to log transient retry messages to stdout
 S3_LOG_TRANSIENT_RETRIES = from_conf("S3_LOG_TRANSIENT_RETRIES", False)
 
+# Share a single S3 context (temporary directory, client and worker threads)
+# between all the operations of the S3 datastore for the lifetime of the process
+# instead of setting one up on every call.
+S3_STORAGE_SESSION = from_conf("S3_STORAGE_SESSION", False)
+# Transfers of the S3 datastore involving up to this many objects, and up to this
+# many bytes, are performed by threads in the process instead of an s3op subprocess.
+S3_TRANSFER_INPROCESS_MAX_COUNT = from_conf("S3_TRANSFER_INPROCESS_MAX_COUNT", 128)
+S3_TRANSFER_INPROCESS_MAX_BYTES = from_conf(
+    "S3_TRANSFER_INPROCESS_MAX_BYTES", 512 * 1024 * 1024
+)
+# Objects at least this large are uploaded one at a time, each with multipart
+# ranged requests, instead of as part of a batch.
+S3_TRANSFER_LARGE_OBJECT_SIZE = from_conf(
+    "S3_TRANSFER_LARGE_OBJECT_SIZE", 64 * 1024 * 1024
+)
+# The objects uploaded by the S3 datastore are planned, and held in memory, in
+# batches of up to this many objects and up to this many bytes.
+S3_UPLOAD_BATCH_MAX_COUNT = from_conf("S3_UPLOAD_BATCH_MAX_COUNT", 4096)
+S3_UPLOAD_BATCH_MAX_BYTES = from_conf("S3_UPLOAD_BATCH_MAX_BYTES", 1024 * 1024 * 1024)
+
 # S3 retry configuration used in the aws client
 # Use the adaptive retry strategy by default
 S3_CLIENT_RETRY_CONFIG = from_conf(
@@ -217,6 +302,11 @@ DATATOOLS_LOCALROOT = from_conf(
     ),
 )
 
+# Remember the SHA1 of the files included with IncludeFile, keyed by their path,
+# size and modification time, in the `includefile` directory of
+# CLIENT_CACHE_PATH so that unchanged files are not read again to be hashed.
+INCLUDEFILE_SHA_CACHE = from_conf("INCLUDEFILE_SHA_CACHE", False)
+
 # Secrets Backend - AWS Secrets Manager configuration
 AWS_SECRETS_MANAGER_DEFAULT_REGION = from_conf("AWS_SECRETS_MANAGER_DEFAULT_REGION")
 AWS_SECRETS_MANAGER_DEFAULT_ROLE = from_conf("AWS_SECRETS_MANAGER_DEFAULT_ROLE")
@@ -263,6 +353,10 @@ CARD_NO_WARNING = from_conf("CARD_NO_WARNING", False)
 
 RUNTIME_CARD_RENDER_INTERVAL = from_conf("RUNTIME_CARD_RENDER_INTERVAL", 60)
 
+# Render the runtime updates of the cards of a task in a single long-lived worker
+# process instead of starting a `card create` subprocess for every update.
+CARD_RENDER_WORKER = from_conf("CARD_RENDER_WORKER", False)
+
 # Azure storage account URL
 AZURE_STORAGE_BLOB_SERVICE_ENDPOINT = from_conf("AZURE_STORAGE_BLOB_SERVICE_ENDPOINT")
 
@@ -293,6 +387,13 @@ if SERVICE_AUTH_KEY is not None:
     SERVICE_HEADERS["x-api-key"] = SERVICE_AUTH_KEY
 # Checks version compatibility with Metadata service
 SERVICE_VERSION_CHECK = from_conf("SERVICE_VERSION_CHECK", True)
+# Send the metadata and artifacts registered by a task to the Metadata service in
+# the background, batched, instead of waiting for each registration. They are
+# all sent before the task is marked as done.
+SERVICE_ASYNC_REGISTRATION = from_conf("SERVICE_ASYNC_REGISTRATION", False)
+# Maintain a per-run index of task metadata for the local metadata provider so
+# that tasks can be filtered by metadata without reading every metadata file.
+LOCAL_METADATA_INDEX = from_conf("LOCAL_METADATA_INDEX", False)
 
 # Default container image
 DEFAULT_CONTAINER_IMAGE = from_conf("DEFAULT_CONTAINER_IMAGE")
@@ -302,6 +403,11 @@ DEFAULT_CONTAINER_REGISTRY = from_conf("DEFAULT_CONTAINER_REGISTRY")
 INCLUDE_FOREACH_STACK = from_conf("INCLUDE_FOREACH_STACK", True)
 # Maximum length of the foreach value string to be stored in each ForeachFrame.
 MAXIMUM_FOREACH_VALUE_CHARS = from_conf("MAXIMUM_FOREACH_VALUE_CHARS", 30)
+# Save the iterable of a foreach in shards of FOREACH_SHARD_SIZE elements so that
+# each foreach task loads only the shard holding its input instead of the whole
+# iterable.
+FOREACH_SHARDED_INPUTS = from_conf("FOREACH_SHARDED_INPUTS", False)
+FOREACH_SHARD_SIZE = from_conf("FOREACH_SHARD_SIZE", 1)
 # The default runtime limit (In seconds) of jobs launched by any compute provider. Default of 5 days.
 DEFAULT_RUNTIME_LIMIT = from_conf("DEFAULT_RUNTIME_LIMIT", 5 * 24 * 60 * 60)
 
@@ -455,6 +561,11 @@ KUBERNETES_JOB_TTL_SECONDS_AFTER_FINISHED = from_conf(
     "KUBERNETES_JOB_TTL_SECONDS_AFTER_FINISHED", 7 * 24 * 60 * 60
 )
 
+# Follow the status of the Kubernetes jobs of a run through a single watch of the
+# API server, shared by all the local processes waiting on the jobs of the run,
+# instead of each process polling the API server for its own job.
+KUBERNETES_SHARED_WATCH = from_conf("KUBERNETES_SHARED_WATCH", False)
+
 ##
 # Argo Events Configuration
 ##
@@ -524,6 +635,23 @@ ESCAPE_HATCH_WARNING = from_conf("ESCAPE_HATCH_WARNING", True)
 # Features
 ###
 FEAT_ALWAYS_UPLOAD_CODE_PACKAGE = from_conf("FEAT_ALWAYS_UPLOAD_CODE_PACKAGE", False)
+
+###
+# Local runtime configuration
+###
+# Launch local tasks by forking them off a pre-warmed process which has already
+# imported the flow (see metaflow/zygote.py) instead of starting a new
+# interpreter for each task.
+RUNTIME_ZYGOTE = from_conf("RUNTIME_ZYGOTE", False)
+
+###
+# Log configuration
+###
+# Upload only the newly written part of the logs of a running remote task, as
+# numbered chunks, instead of re-uploading the complete log files every time
+# they change. The complete log files are still uploaded when the task ends.
+MFLOG_INCREMENTAL_UPLOAD = from_conf("MFLOG_INCREMENTAL_UPLOAD", False)
+
 ###
 # Profile
 ###
@@ -558,6 +686,12 @@ for typ in DEBUG_OPTIONS:
 # ENABLED_STEP_DECORATOR = ["batch", "resources"] will enable only those two step
 # decorators and none other.
 
+# Only import a plugin (step and flow decorators, environments, metadata providers,
+# datastores, dataclients, sidecars, secrets and client providers) when it is first
+# used instead of importing all of them when Metaflow is imported. Plugins are still
+# listed and looked up by name without being imported.
+PLUGINS_LAZY_RESOLVE = from_conf("PLUGINS_LAZY_RESOLVE", False)
+
 ###
 # Command configuration
 ###
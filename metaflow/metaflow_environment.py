@@ -10,6 +10,7 @@ from metaflow.exception import MetaflowException
 from metaflow.extension_support import dump_module_info
 from metaflow.mflog import BASH_MFLOG, BASH_FLUSH_LOGS
 from metaflow.package import MetaflowPackage
+from metaflow.packaging_sys.backend import PackagingBackend
 
 from . import R
 
@@ -109,12 +110,15 @@ class MetaflowEnvironment(object):
         """
         return "Local environment"
 
-    def _get_download_code_package_cmd(self, code_package_url, datastore_type):
+    def _get_download_code_package_cmd(
+        self, code_package_url, datastore_type, output_file="job.tar"
+    ):
         """Return a command that downloads the code package from the datastore. We use various
         cloud storage CLI tools because we don't have access to Metaflow codebase (which we
         are about to download in the command).
 
-        The command should download the package to "job.tar" in the current directory.
+        The command should download the package to output_file ("job.tar" by default) in
+        the current directory.
 
         It should work silently if everything goes well.
         """
@@ -128,8 +132,8 @@ class MetaflowEnvironment(object):
             # Boto3 does not play well with passing None or an empty string to endpoint_url
             return "{python} -c '{script}'".format(
                 python=self._python(),
-                script='import boto3, os; ep=os.getenv(\\"METAFLOW_S3_ENDPOINT_URL\\"); boto3.client(\\"s3\\", **({\\"endpoint_url\\":ep} if ep else {})).download_file(\\"%s\\", \\"%s\\", \\"job.tar\\")'
-                % (bucket, s3_object),
+                script='import boto3, os; ep=os.getenv(\\"METAFLOW_S3_ENDPOINT_URL\\"); boto3.client(\\"s3\\", **({\\"endpoint_url\\":ep} if ep else {})).download_file(\\"%s\\", \\"%s\\", \\"%s\\")'
+                % (bucket, s3_object, output_file),
             )
         elif datastore_type == "azure":
             from .plugins.azure.azure_utils import parse_azure_full_path
@@ -137,18 +141,20 @@ class MetaflowEnvironment(object):
             container_name, blob = parse_azure_full_path(code_package_url)
             # remove a trailing slash, if present
             blob_endpoint = "${METAFLOW_AZURE_STORAGE_BLOB_SERVICE_ENDPOINT%/}"
-            return "download-azure-blob --blob-endpoint={blob_endpoint} --container={container} --blob={blob} --output-file=job.tar".format(
+            return "download-azure-blob --blob-endpoint={blob_endpoint} --container={container} --blob={blob} --output-file={output_file}".format(
                 blob_endpoint=blob_endpoint,
                 blob=blob,
                 container=container_name,
+                output_file=output_file,
             )
         elif datastore_type == "gs":
             from .plugins.gcp.gs_utils import parse_gs_full_path
 
             bucket_name, gs_object = parse_gs_full_path(code_package_url)
-            return (
-                "download-gcp-object --bucket=%s --object=%s --output-file=job.tar"
-                % (bucket_name, gs_object)
+            return "download-gcp-object --bucket=%s --object=%s --output-file=%s" % (
+                bucket_name,
+                gs_object,
+                output_file,
             )
         else:
             raise NotImplementedError(
@@ -189,6 +195,51 @@ class MetaflowEnvironment(object):
         # skip pip installs if we know that packages might already be available
         return "if [ -z $METAFLOW_SKIP_INSTALL_DEPENDENCIES ]; then {}; fi".format(cmd)
 
+    def _get_code_layer_cmds(self, code_package_metadata, datastore_type):
+        # Layers of the code package (see PACKAGE_SHARED_LAYER) are extracted before
+        # the package itself. They are shared by many tasks and flows so they are
+        # kept in METAFLOW_CODE_LAYER_CACHE_DIR, if set, and only downloaded if they
+        # are not already there.
+        # NOTE: the commands are inserted into a double-quoted command so double
+        # quotes are escaped.
+        cmds = []
+        for layer in json.loads(code_package_metadata).get("layers", []):
+            layer_file = "layer_%s" % layer["sha"]
+            cmds.append(
+                'if [ -n \\"$METAFLOW_CODE_LAYER_CACHE_DIR\\" ] && '
+                '[ -f \\"{cached}\\" ]; then '
+                'cp \\"{cached}\\" {layer_file}; '
+                "else "
+                "i=0; while [ $i -le 5 ]; do "
+                "mflog 'Downloading code layer...'; "
+                "{download} && mflog 'Code layer downloaded.' && break; "
+                "sleep 10; i=$((i+1)); "
+                "done; "
+                "if [ $i -gt 5 ]; then "
+                "mflog 'Failed to download code layer from {url} "
+                "after 6 tries. Exiting...' && exit 1; "
+                "fi; "
+                'if [ -n \\"$METAFLOW_CODE_LAYER_CACHE_DIR\\" ]; then '
+                'mkdir -p \\"$METAFLOW_CODE_LAYER_CACHE_DIR\\" && '
+                'cp {layer_file} \\"{cached}.$$\\" && '
+                'mv \\"{cached}.$$\\" \\"{cached}\\" || true; '
+                "fi; "
+                "fi".format(
+                    cached="$METAFLOW_CODE_LAYER_CACHE_DIR/%s" % layer["sha"],
+                    layer_file=layer_file,
+                    download=self._get_download_code_package_cmd(
+                        layer["url"], datastore_type, output_file=layer_file
+                    ),
+                    url=layer["url"],
+                )
+            )
+            cmds.extend(
+                PackagingBackend.get_backend(
+                    layer["archive_format"]
+                ).get_extract_commands(layer_file, ".")
+            )
+        return cmds
+
     def get_package_commands(
         self, code_package_url, datastore_type, code_package_metadata=None
     ):
@@ -237,6 +288,7 @@ class MetaflowEnvironment(object):
                 "after 6 tries. Exiting...' && exit 1; "
                 "fi" % code_package_url,
             ]
+            + self._get_code_layer_cmds(code_package_metadata, datastore_type)
             + MetaflowPackage.get_extract_commands(
                 code_package_metadata, "job.tar", dest_dir="."
             )
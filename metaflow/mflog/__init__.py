@@ -3,6 +3,7 @@ import time
 
 from .mflog import refine, set_should_persist
 
+from metaflow.metaflow_config import MFLOG_INCREMENTAL_UPLOAD
 from metaflow.util import to_unicode
 from metaflow.exception import MetaflowInternalError
 
@@ -47,6 +48,20 @@ BASH_SAVE_LOGS = " ".join(BASH_SAVE_LOGS_ARGS)
 BASH_FLUSH_LOGS = "flush_mflogs(){ " f"{BASH_SAVE_LOGS}; " "}"
 
 
+# While a task is running, logs can be uploaded in a segmented format: every
+# upload appends a numbered chunk next to the (not yet existing) log file,
+# e.g. `0.task_stdout.log.000003`, and rewrites a small index file,
+# `0.task_stdout.log.chunks`, which records the number of chunks and the total
+# size of the log. The complete log file is still uploaded when the task
+# finishes and always takes precedence over the chunks.
+def log_chunk_index_name(log_name):
+    return "%s.chunks" % log_name
+
+
+def log_chunk_name(log_name, index):
+    return "%s.%06d" % (log_name, index)
+
+
 # this function returns a bash expression that redirects stdout
 # and stderr of the given bash expression to mflog.tee
 def bash_capture_logs(bash_expr, var_transform=None):
@@ -109,6 +124,8 @@ def export_mflog_env_vars(
         env_vars["MF_DATASTORE_ROOT"] = datastore_root
     if periodical_uploader_log_path is not None:
         env_vars["PERIODICAL_UPLOADER_LOG_PATH"] = periodical_uploader_log_path
+    if MFLOG_INCREMENTAL_UPLOAD:
+        env_vars["METAFLOW_MFLOG_INCREMENTAL_UPLOAD"] = 1
 
     return "export " + " ".join("%s=%s" % kv for kv in env_vars.items())
 
@@ -152,7 +169,13 @@ def tail_logs(prefix, stdout_tail, stderr_tail, echo, has_log_updates):
 
 
 def get_log_tailer(log_url, datastore_type):
-    if datastore_type == "s3":
+    if MFLOG_INCREMENTAL_UPLOAD:
+        from metaflow.plugins import DATASTORES
+        from .chunk_tail import LogChunkTail
+
+        storage_impl = [d for d in DATASTORES if d.TYPE == datastore_type][0]
+        return LogChunkTail(log_url, storage_impl)
+    elif datastore_type == "s3":
         from metaflow.plugins.datatools.s3.s3tail import S3Tail
 
         return S3Tail(log_url)
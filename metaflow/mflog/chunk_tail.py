@@ -0,0 +1,86 @@
+import json
+from io import BytesIO
+
+from . import log_chunk_index_name, log_chunk_name
+
+
+class LogChunkTail(object):
+    """
+    Tails a log uploaded in chunks while the task is running (see
+    TaskDataStore.save_log_chunks). Works with any datastore: the chunks are
+    stored next to the log file, so they are loaded through a storage rooted
+    at the directory of the log.
+    """
+
+    def __init__(self, log_url, storage_impl):
+        self._storage = storage_impl(storage_impl.dirname(log_url))
+        self._log_name = storage_impl.basename(log_url)
+        self._index_name = log_chunk_index_name(self._log_name)
+        self._pos = 0
+        self._num_chunks = 0
+        self._tail = b""
+        self._complete = False
+
+    @property
+    def bytes_read(self):
+        return self._pos
+
+    @property
+    def tail(self):
+        return self._tail
+
+    def __iter__(self):
+        buf = self._fill_buf()
+        if buf is not None:
+            for line in buf:
+                if line.endswith(b"\n"):
+                    yield line
+                else:
+                    self._tail = line
+                    break
+
+    def _load(self, names):
+        results = {}
+        with self._storage.load_bytes(names) as load_results:
+            for key, path, _ in load_results:
+                name = self._storage.basename(key)
+                if path is None:
+                    results[name] = None
+                else:
+                    with open(path, "rb") as f:
+                        results[name] = f.read()
+        return results
+
+    def _new_data(self):
+        if self._complete:
+            return b""
+        loaded = self._load([self._log_name, self._index_name])
+        # The complete log is uploaded when the task finishes. Chunks always
+        # hold a prefix of it, so we can continue from where we are.
+        if loaded[self._log_name] is not None:
+            self._complete = True
+            return loaded[self._log_name][self._pos :]
+        if loaded[self._index_name] is None:
+            return b""
+        num_chunks = json.loads(loaded[self._index_name].decode("utf-8"))["chunks"]
+        names = [
+            log_chunk_name(self._log_name, i)
+            for i in range(self._num_chunks, num_chunks)
+        ]
+        if not names:
+            return b""
+        chunks = self._load(names)
+        if any(chunks[name] is None for name in names):
+            # Not visible yet, try again next time
+            return b""
+        self._num_chunks = num_chunks
+        return b"".join(chunks[name] for name in names)
+
+    def _fill_buf(self):
+        data = self._new_data()
+        if data:
+            buf = BytesIO(self._tail + data)
+            self._pos += len(data)
+            self._tail = b""
+            return buf
+        return None
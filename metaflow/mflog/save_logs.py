@@ -15,18 +15,12 @@ from metaflow.tracing import cli
 SMALL_FILE_LIMIT = 1024 * 1024
 
 
-@cli("save_logs")
-def save_logs():
-    def _read_file(path):
-        with open(path, "rb") as f:
-            return f.read()
-
+def get_task_datastore():
     # these env vars are set by mflog.mflog_env
     pathspec = os.environ["MF_PATHSPEC"]
     attempt = os.environ["MF_ATTEMPT"]
     ds_type = os.environ["MF_DATASTORE"]
     ds_root = os.environ.get("MF_DATASTORE_ROOT")
-    paths = (os.environ["MFLOG_STDOUT"], os.environ["MFLOG_STDERR"])
 
     flow_name, run_id, step_name, task_id = pathspec.split("/")
     storage_impl = [d for d in DATASTORES if d.TYPE == ds_type][0]
@@ -39,10 +33,21 @@ def save_logs():
     flow_datastore = FlowDataStore(
         flow_name, None, storage_impl=storage_impl, ds_root=ds_root
     )
-    task_datastore = flow_datastore.get_task_datastore(
+    return flow_datastore.get_task_datastore(
         run_id, step_name, task_id, int(attempt), mode="w"
     )
 
+
+@cli("save_logs")
+def save_logs():
+    def _read_file(path):
+        with open(path, "rb") as f:
+            return f.read()
+
+    ds_type = os.environ["MF_DATASTORE"]
+    paths = (os.environ["MFLOG_STDOUT"], os.environ["MFLOG_STDERR"])
+    task_datastore = get_task_datastore()
+
     # Diagnostics intentionally go to stdout and stderr. The parent process is
     # responsible for capturing and routing these streams to the appropriate
     # destination, keeping this bootstrap module independent of platform-specific
@@ -4,6 +4,7 @@ import time
 import subprocess
 from threading import Thread
 
+from metaflow.metaflow_config import MFLOG_INCREMENTAL_UPLOAD
 from metaflow.sidecar import MessageTypes
 from metaflow.util import to_unicode
 from . import update_delay, BASH_SAVE_LOGS_ARGS, TASK_LOG_SOURCE
@@ -49,6 +50,56 @@ def _write_save_logs_output(stream, output):
         _write_uploader_log("[save_logs %s] %s" % (stream, to_unicode(line)))
 
 
+class LogChunkUploader(object):
+    """
+    Uploads the lines appended to the log files since the previous upload as
+    numbered chunks (see TaskDataStore.save_log_chunks). The datastore, and
+    the connection it holds, is kept open across uploads.
+    """
+
+    STREAMS = ("stdout", "stderr")
+
+    def __init__(self, paths, task_datastore=None):
+        from .save_logs import get_task_datastore
+
+        if task_datastore is None:
+            task_datastore = get_task_datastore()
+        self._task_datastore = task_datastore
+        self._paths = dict(zip(self.STREAMS, paths))
+        self._offsets = {stream: 0 for stream in self.STREAMS}
+        self._num_chunks = {stream: 0 for stream in self.STREAMS}
+
+    def _read_new_lines(self, stream):
+        path = self._paths[stream]
+        if not os.path.exists(path):
+            return b""
+        with open(path, "rb") as f:
+            f.seek(self._offsets[stream])
+            data = f.read()
+        # A partial line at the end is uploaded once it is complete
+        return data[: data.rfind(b"\n") + 1]
+
+    def upload(self):
+        """
+        Returns the number of bytes uploaded for each stream
+        """
+        chunks = {}
+        for stream in self.STREAMS:
+            data = self._read_new_lines(stream)
+            if data:
+                chunks[stream] = (
+                    self._num_chunks[stream],
+                    self._offsets[stream],
+                    data,
+                )
+        if chunks:
+            self._task_datastore.save_log_chunks(TASK_LOG_SOURCE, chunks)
+            for stream, (_, _, data) in chunks.items():
+                self._num_chunks[stream] += 1
+                self._offsets[stream] += len(data)
+        return {stream: len(data) for stream, (_, _, data) in chunks.items()}
+
+
 class SaveLogsPeriodicallySidecar(object):
     def __init__(self, options=None):
         options = options or {}
@@ -83,6 +134,39 @@ class SaveLogsPeriodicallySidecar(object):
         _write_save_logs_output("stderr", stderr)
         return process.returncode
 
+    def _get_chunk_uploader(self, paths):
+        if not MFLOG_INCREMENTAL_UPLOAD:
+            return None
+        try:
+            return LogChunkUploader(paths)
+        except BaseException as error:
+            # Fall back to uploading complete logs with save_logs
+            if self._enable_debug_logs:
+                _write_uploader_log(
+                    "[save_logs_periodically] incremental upload unavailable "
+                    "error=%r" % (error,)
+                )
+            return None
+
+    def _upload_log_chunks(self, uploader):
+        start_time = time.time()
+        try:
+            uploaded = uploader.upload()
+        except BaseException as error:
+            if self._enable_debug_logs:
+                _write_uploader_log(
+                    "[save_logs_periodically] chunk_upload_failure error=%r "
+                    "elapsed_seconds=%.3f" % (error, time.time() - start_time)
+                )
+            # Upload failing is not considered a fatal error. The same lines
+            # are uploaded again next time.
+            return
+        if self._enable_debug_logs:
+            _write_uploader_log(
+                "[save_logs_periodically] chunk_upload_success bytes=%s "
+                "elapsed_seconds=%.3f" % (uploaded, time.time() - start_time)
+            )
+
     def _update_loop(self):
         def _file_size(path):
             if os.path.exists(path):
@@ -92,6 +176,7 @@ class SaveLogsPeriodicallySidecar(object):
 
         # these env vars are set by mflog.mflog_env
         FILES = [os.environ["MFLOG_STDOUT"], os.environ["MFLOG_STDERR"]]
+        uploader = self._get_chunk_uploader(FILES)
         start_time = time.time()
         sizes = [0 for _ in FILES]
         while self.is_alive:
@@ -110,7 +195,10 @@ class SaveLogsPeriodicallySidecar(object):
                             % (path, previous, current, current - previous, elapsed),
                         )
                 try:
-                    self._call_save_logs()
+                    if uploader is None:
+                        self._call_save_logs()
+                    else:
+                        self._upload_log_chunks(uploader)
                 except:
                     pass
             time.sleep(update_delay(time.time() - start_time))
@@ -1,8 +1,13 @@
 import sys
 import os
+import mmap
+import select
+import shutil
+import signal
+import struct
 import traceback
 from itertools import islice
-from tempfile import NamedTemporaryFile
+from tempfile import NamedTemporaryFile, mkdtemp, mkstemp
 import time
 import metaflow.tracing as tracing
 
@@ -41,6 +46,15 @@ class MulticoreException(Exception):
     pass
 
 
+# Buffers of at least this many bytes in the results of the workers of
+# parallel_imap_unordered/parallel_map with a chunk_size (bytes and bytearray
+# results and buffers of objects supporting pickle protocol 5 like NumPy
+# arrays) are passed back through shared memory instead of the result pipe.
+SHARED_MEMORY_MIN_SIZE = 1024 * 1024
+_SHARED_MEMORY_DIR = "/dev/shm"
+_HEADER = struct.Struct("!Q")
+
+
 _A = TypeVar("_A")
 _R = TypeVar("_R")
 
@@ -79,11 +93,216 @@ def _spawn(
                 os._exit(exit_code)
 
 
+def _write_msg(fd, obj):
+    data = pickle.dumps(obj, protocol=pickle.HIGHEST_PROTOCOL)
+    view = memoryview(_HEADER.pack(len(data)) + data)
+    while view:
+        view = view[os.write(fd, view) :]
+
+
+def _read_exact(fd, size):
+    chunks = []
+    while size:
+        chunk = os.read(fd, min(size, 1 << 20))
+        if not chunk:
+            return None
+        chunks.append(chunk)
+        size -= len(chunk)
+    return b"".join(chunks)
+
+
+def _read_msg(fd):
+    # Returns None if the other end of the pipe was closed
+    header = _read_exact(fd, _HEADER.size)
+    if header is None:
+        return None
+    data = _read_exact(fd, _HEADER.unpack(header)[0])
+    if data is None:
+        return None
+    return pickle.loads(data)
+
+
+def _to_shared_memory(buf, dir):
+    fd, path = mkstemp(prefix="parallel_map_", dir=dir)
+    try:
+        view = memoryview(buf).cast("B")
+        while view:
+            view = view[os.write(fd, view) :]
+    finally:
+        os.close(fd)
+    return path
+
+
+def _from_shared_memory(path):
+    try:
+        with open(path, "rb") as f:
+            # ACCESS_COPY keeps e.g. NumPy arrays created from it writable
+            return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_COPY)
+    finally:
+        os.unlink(path)
+
+
+def _dump_results(results, shm_dir):
+    # Returns what to send to the parent for a list of (index, result).
+    if pickle.HIGHEST_PROTOCOL < 5:
+        return results, None
+    buffers = []
+
+    def _out_of_band(buf):
+        if buf.raw().nbytes >= SHARED_MEMORY_MIN_SIZE:
+            buffers.append(buf)
+            return False
+        return True
+
+    results = [
+        (
+            (idx, pickle.PickleBuffer(r), type(r))
+            if isinstance(r, (bytes, bytearray)) and len(r) >= SHARED_MEMORY_MIN_SIZE
+            else (idx, r, None)
+        )
+        for idx, r in results
+    ]
+    payload = pickle.dumps(results, protocol=5, buffer_callback=_out_of_band)
+    return payload, [_to_shared_memory(buf.raw(), shm_dir) for buf in buffers]
+
+
+def _load_results(payload, paths):
+    if paths is None:
+        return payload
+    buffers = [_from_shared_memory(path) for path in paths]
+    results = []
+    for idx, r, result_type in pickle.loads(payload, buffers=buffers):
+        if result_type is not None:
+            # The result is the memory map of the bytes
+            with r:
+                r = result_type(r)
+        results.append((idx, r))
+    return results
+
+
+def _spawn_worker(func, args, shm_dir, parent_fds):
+    task_r, task_w = os.pipe()
+    result_r, result_w = os.pipe()
+    sys.stderr.flush()
+    sys.stdout.flush()
+    pid = os.fork()
+    if pid:
+        os.close(task_r)
+        os.close(result_w)
+        return pid, task_w, result_r
+    else:
+        # The ends of the pipes of the other workers must only be held by the
+        # parent or the workers would not see their task pipe being closed
+        for fd in parent_fds + [task_w, result_r]:
+            os.close(fd)
+        with tracing.post_fork():
+            try:
+                exit_code = 1
+                while True:
+                    chunk = _read_msg(task_r)
+                    if chunk is None:
+                        break
+                    start, end = chunk
+                    results = [(idx, func(args[idx])) for idx in range(start, end)]
+                    _write_msg(result_w, _dump_results(results, shm_dir))
+                exit_code = 0
+            except:
+                # we must not let any exceptions escape this function
+                # which might trigger unintended side-effects
+                traceback.print_exc()
+            finally:
+                sys.stderr.flush()
+                sys.stdout.flush()
+                os._exit(exit_code)
+
+
+def _parallel_imap_chunks(func, iterable, max_parallel, chunk_size, dir):
+    # Yields (index, result) for all the items of iterable, computed by up to
+    # max_parallel long-lived workers, chunk_size items at a time.
+    #
+    # The items are inherited by the workers when they are forked so, as with
+    # the one process per item mode, they do not need to be picklable; only
+    # the results are sent back to the parent.
+    if not isinstance(chunk_size, int) or chunk_size <= 0:
+        raise ValueError(
+            "chunk_size must be a positive integer, got %r" % (chunk_size,)
+        )
+    args = list(iterable)
+    chunks = [
+        (start, min(start + chunk_size, len(args)))
+        for start in range(0, len(args), chunk_size)
+    ]
+    # result pipe -> [pid, task pipe, number of chunks sent and not returned]
+    workers = {}
+    next_chunk = 0
+    done = False
+    # The results in shared memory are unlinked as they are loaded. Those
+    # which are not -- results not consumed or being written by a worker
+    # which was killed -- are removed with the directory of this call.
+    shm_dir = mkdtemp(
+        prefix="parallel_map_",
+        dir=_SHARED_MEMORY_DIR if os.path.isdir(_SHARED_MEMORY_DIR) else dir,
+    )
+
+    def _send_next_chunk(worker):
+        if next_chunk < len(chunks):
+            try:
+                _write_msg(worker[1], chunks[next_chunk])
+            except OSError:
+                raise MulticoreException("Child failed")
+            worker[2] += 1
+            return 1
+        return 0
+
+    try:
+        for _ in range(min(max_parallel, len(chunks))):
+            parent_fds = [w[1] for w in workers.values()] + list(workers)
+            pid, task_w, result_r = _spawn_worker(func, args, shm_dir, parent_fds)
+            workers[result_r] = [pid, task_w, 0]
+        # Each worker has up to two chunks to process so that it does not
+        # have to wait for the parent once it is done with one
+        for _ in range(2):
+            for worker in workers.values():
+                next_chunk += _send_next_chunk(worker)
+        while any(worker[2] for worker in workers.values()):
+            ready, _, _ = select.select(
+                [fd for fd, worker in workers.items() if worker[2]], [], []
+            )
+            for result_r in ready:
+                msg = _read_msg(result_r)
+                if msg is None:
+                    raise MulticoreException("Child failed")
+                worker = workers[result_r]
+                worker[2] -= 1
+                next_chunk += _send_next_chunk(worker)
+                for result in _load_results(*msg):
+                    yield result
+        done = True
+    finally:
+        for result_r, (pid, task_w, _) in workers.items():
+            os.close(task_w)
+            if not done:
+                # Do not wait for the chunks the workers are processing
+                try:
+                    os.kill(pid, signal.SIGKILL)
+                except OSError:
+                    pass
+        failed = False
+        for result_r, (pid, _, _) in workers.items():
+            os.close(result_r)
+            _, exit_code = os.waitpid(pid, 0)
+            failed = failed or exit_code != 0
+        shutil.rmtree(shm_dir, ignore_errors=True)
+        if done and failed:
+            raise MulticoreException("Child failed")
+
+
 def parallel_imap_unordered(
     func: Callable[[_A], _R],
     iterable: Iterable[_A],
     max_parallel: Optional[int] = None,
     dir: Optional[str] = None,
+    chunk_size: Optional[int] = None,
 ) -> Iterator[_R]:
     """
     Parallelizes execution of a function using multiprocessing. The result
@@ -99,6 +318,12 @@ def parallel_imap_unordered(
         Maximum parallelism. If not specified, it uses the number of CPUs
     dir : str, optional, default None
         If specified, it's the directory where temporary files are created
+    chunk_size : int, optional, default None
+        If specified, instead of forking a process per argument, up to
+        `max_parallel` long-lived processes call `func` on `chunk_size`
+        arguments at a time. This is much faster for many short calls but
+        calls of `func` share the state of their process. `iterable` is
+        consumed upfront. Must be a positive integer.
 
     Yields
     ------
@@ -111,6 +336,13 @@ def parallel_imap_unordered(
 
         max_parallel = cpu_count()
 
+    if chunk_size is not None:
+        for _, result in _parallel_imap_chunks(
+            func, iterable, max_parallel, chunk_size, dir
+        ):
+            yield result
+        return
+
     args_iter = iter(iterable)
     pids = [_spawn(func, arg, dir) for arg in islice(args_iter, max_parallel)]
 
@@ -142,6 +374,7 @@ def parallel_map(
     iterable: Iterable[_A],
     max_parallel: Optional[int] = None,
     dir: Optional[str] = None,
+    chunk_size: Optional[int] = None,
 ) -> List[_R]:
     """
     Parallelizes execution of a function using multiprocessing. The result
@@ -157,6 +390,12 @@ def parallel_map(
         Maximum parallelism. If not specified, it uses the number of CPUs
     dir : str, optional, default None
         If specified, it's the directory where temporary files are created
+    chunk_size : int, optional, default None
+        If specified, instead of forking a process per argument, up to
+        `max_parallel` long-lived processes call `func` on `chunk_size`
+        arguments at a time. This is much faster for many short calls but
+        calls of `func` share the state of their process. Must be a positive
+        integer.
 
     Returns
     -------
@@ -164,6 +403,18 @@ def parallel_map(
         Results. The items in the list are in the same order as the items
         in `iterable`.
     """
+    if chunk_size is not None:
+        if max_parallel is None:
+            from multiprocessing import cpu_count
+
+            max_parallel = cpu_count()
+        return [
+            r
+            for _, r in sorted(
+                _parallel_imap_chunks(func, iterable, max_parallel, chunk_size, dir),
+                key=lambda idx_result: idx_result[0],
+            )
+        ]
 
     def wrapper(arg_with_idx):
         idx, arg = arg_with_idx
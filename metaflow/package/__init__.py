@@ -1,3 +1,4 @@
+import itertools
 import json
 import os
 import sys
@@ -11,14 +12,19 @@ from typing import Any, Callable, Dict, List, Optional, TYPE_CHECKING, Type, cas
 from ..debug import debug
 from ..packaging_sys import ContentType, MetaflowCodeContent
 from ..packaging_sys.backend import PackagingBackend
-from ..packaging_sys.tar_backend import TarPackagingBackend
 from ..packaging_sys.v1 import MetaflowCodeContentV1
 from ..packaging_sys.utils import suffix_filter, walk
-from ..metaflow_config import DEFAULT_PACKAGE_SUFFIXES
+from ..metaflow_config import (
+    DEFAULT_PACKAGE_SUFFIXES,
+    PACKAGE_ARCHIVE_FORMAT,
+    PACKAGE_MANIFEST_CACHE,
+    PACKAGE_SHARED_LAYER,
+)
 from ..exception import MetaflowException
 from ..system_context import system_context
 from ..user_configs.config_parameters import dump_config_values
 from .. import R
+from .manifest import PackageManifest
 
 DEFAULT_SUFFIXES_LIST = DEFAULT_PACKAGE_SUFFIXES.split(",")
 
@@ -51,7 +57,8 @@ class MetaflowPackage(object):
         flow_datastore: Optional["metaflow.datastore.FlowDataStore"] = None,
         mfcontent: Optional[MetaflowCodeContent] = None,
         exclude_tl_dirs=None,
-        backend: Type[PackagingBackend] = TarPackagingBackend,
+        backend: Optional[Type[PackagingBackend]] = None,
+        upload: bool = True,
     ):
         self._environment = environment
         self._environment.init_environment(echo)
@@ -59,7 +66,15 @@ class MetaflowPackage(object):
         self._echo = echo
         self._flow = flow
         self._flow_datastore = flow_datastore
-        self._backend = backend
+        # If False, the package is not uploaded to flow_datastore but a package
+        # with the same content already there is reused
+        self._upload = upload
+        self._backend = backend or PackagingBackend.get_backend(PACKAGE_ARCHIVE_FORMAT)
+        # With PACKAGE_SHARED_LAYER, Metaflow and its extensions are packaged in a
+        # layer stored in the datastore and shared by all flows. Only packages that
+        # are stored in the datastore (flow_datastore given) can have layers.
+        self._shared_layer = PACKAGE_SHARED_LAYER and flow_datastore is not None
+        self._layers = []  # type: List[Dict[str, str]]
 
         # Info about the package
         self._name = None
@@ -131,6 +146,11 @@ class MetaflowPackage(object):
         self._blob_sha = None
         self._blob_url = None
         self._blob = None
+        self._blob_size = None
+        # Time it took to build and upload the package, and time saved when a
+        # package with the same content was reused instead
+        self._build_time = None
+        self._time_saved = None
 
         # USER_CONTENT files contributed by decorators/mutators via add_to_package.
         # Keyed by arcname (path relative to the flow directory) -> absolute file path.
@@ -163,6 +183,11 @@ class MetaflowPackage(object):
             if self._is_package_available is not None:
                 # We have our result now
                 if self._is_package_available:
+                    if self._blob is None:
+                        # The package was reused: it is only in the datastore
+                        _, self._blob = next(
+                            self._flow_datastore.load_data([self._blob_sha])
+                        )
                     return self._blob
                 else:
                     raise self._packaging_exception
@@ -192,13 +217,22 @@ class MetaflowPackage(object):
 
     @property
     def package_metadata(self):
-        return json.dumps(
-            {
-                "version": 0,
-                "archive_format": self._backend.backend_type(),
-                "mfcontent_version": self._mfcontent.get_package_version(),
-            }
-        )
+        if not self._shared_layer:
+            return self._metadata()
+        # The layers are only known once the package is created
+        _ = self.package_sha()
+        return self._metadata(self._layers or None)
+
+    def _metadata(self, layers: Optional[List[Dict[str, str]]] = None) -> str:
+        metadata = {
+            "version": 0,
+            "archive_format": self._backend.backend_type(),
+            "mfcontent_version": self._mfcontent.get_package_version(),
+        }
+        if layers:
+            # Archives to extract, in order, before the package itself
+            metadata["layers"] = layers
+        return json.dumps(metadata)
 
     @classmethod
     def get_backend(cls, pkg_metadata: str) -> PackagingBackend:
@@ -376,14 +410,14 @@ class MetaflowPackage(object):
             backend.cls_extract_members(opened_archive, include_members, dest_dir)
 
     def user_tuples(self, timeout: Optional[float] = None):
-        # Wait for at least the blob to be formed
-        _ = self.blob_with_timeout(timeout=timeout)
+        # Wait for at least the package to be formed
+        _ = self.package_sha(timeout=timeout)
         for path, arcname in self._cached_user_members:
             yield path, arcname
 
     def path_tuples(self, timeout: Optional[float] = None):
-        # Wait for at least the blob to be formed
-        _ = self.blob_with_timeout(timeout=timeout)
+        # Wait for at least the package to be formed
+        _ = self.package_sha(timeout=timeout)
         # Files included in the environment
         yield from self._mfcontent.content_names()
 
@@ -392,12 +426,24 @@ class MetaflowPackage(object):
 
     def show(self, timeout: Optional[float] = None) -> str:
         # Human-readable content of the package
-        blob = self.blob_with_timeout(timeout=timeout)  # Ensure the package is created
+        _ = self.package_sha(timeout=timeout)  # Ensure the package is created
         lines = [
-            f"Package size: {self._format_size(len(blob))}",
+            f"Package size: {self._format_size(self._blob_size)}",
             f"Number of files: {sum(1 for _ in self.path_tuples())}",
-            self._mfcontent.show(),
         ]
+        if self._time_saved is not None:
+            lines.append(
+                "Package content unchanged: reused the stored package, saving "
+                f"{self._time_saved:.2f}s of building and uploading"
+            )
+        elif self._build_time is not None:
+            lines.append(f"Package built and uploaded in {self._build_time:.2f}s")
+        for layer in self._layers:
+            lines.append(
+                f"Metaflow and extensions in the shared layer {layer['sha']} "
+                f"({self._format_size(layer['size'])})"
+            )
+        lines.append(self._mfcontent.show())
 
         if self._flow:
             lines.append(f"\nUser code in flow {self._name}:")
@@ -564,8 +610,34 @@ class MetaflowPackage(object):
                     f"User files to package: {self._cached_user_members}"
                 )
 
-            self._blob = self._make()
-            if self._flow_datastore:
+            if self._reuse_package():
+                self._is_package_available = True
+                return
+
+            start = time.time()
+            contents = self._mfcontent.contents()
+            if self._shared_layer and self._upload:
+                shared = list(self._mfcontent.shared_contents())
+                shared_names = set(arcname for _, arcname in shared)
+                contents = (c for c in contents if c[1] not in shared_names)
+                layer_blob = self._make(shared)
+                # Identical layers are only stored once in the datastore
+                layer_url, layer_sha = self._flow_datastore.save_shared_data(
+                    [layer_blob], len_hint=1
+                )[0]
+                self._layers = [
+                    {
+                        "sha": layer_sha,
+                        "url": layer_url,
+                        "size": len(layer_blob),
+                        "archive_format": self._backend.backend_type(),
+                    }
+                ]
+            self._blob = self._make(
+                itertools.chain(contents, self._cached_user_members)
+            )
+            self._blob_size = len(self._blob)
+            if self._flow_datastore and self._upload:
                 if len(self._blob) > 100 * 1024 * 1024:
                     self._echo(
                         f"Warning: The code package for {self._flow.name} is larger than "
@@ -578,6 +650,15 @@ class MetaflowPackage(object):
                 self._blob_url, self._blob_sha = self._flow_datastore.save_data(
                     [self._blob], len_hint=1
                 )[0]
+                self._build_time = time.time() - start
+                if self._manifest is not None:
+                    self._manifest.store(
+                        self._blob_sha,
+                        self._blob_url,
+                        self._blob_size,
+                        self._build_time,
+                        self._layers or None,
+                    )
             else:
                 self._blob_url = self._blob_sha = ""
             self._is_package_available = True
@@ -586,6 +667,49 @@ class MetaflowPackage(object):
             self._echo(f"Package creation/upload failed for {self._flow.name}: {e}")
             self._is_package_available = False
 
+    def _reuse_package(self):
+        # With PACKAGE_MANIFEST_CACHE, reuses the package stored for the same
+        # content by a previous build, if it is still in the datastore. Returns
+        # whether the package was reused.
+        self._manifest = None
+        if not (PACKAGE_MANIFEST_CACHE and self._flow and self._flow_datastore):
+            return False
+        start = time.time()
+        self._manifest = PackageManifest.for_flow(
+            self._flow.name,
+            self._user_flow_dir,
+            self._flow_datastore.TYPE,
+            self._flow_datastore.datastore_root,
+        )
+        self._manifest.digest(
+            self._metadata(),
+            itertools.chain(self._mfcontent.contents(), self._cached_user_members),
+        )
+        cached = self._manifest.lookup()
+        if cached is None:
+            return False
+        layers = cached.get("layers") or []
+        # A package that is uploaded must be layered as requested; a package
+        # that is only shown can be either
+        if self._upload and bool(layers) != self._shared_layer:
+            return False
+        if not self._flow_datastore.ca_store.blobs_exist([cached["sha"]])[0] or (
+            layers
+            and not all(
+                self._flow_datastore.shared_ca_store.blobs_exist(
+                    [layer["sha"] for layer in layers]
+                )
+            )
+        ):
+            return False
+        self._layers = layers
+        self._blob_sha = cached["sha"]
+        self._blob_url = cached["url"]
+        self._blob_size = cached["size"]
+        self._time_saved = max(0.0, cached["build_time"] - (time.time() - start))
+        debug.package_exec(f"Reusing package {self._blob_sha} for unchanged content")
+        return True
+
     def _add_addl_files(self):
         # Look at all decorators that provide additional files
         deco_module_paths = {}
@@ -735,19 +859,15 @@ class MetaflowPackage(object):
                 continue
             yield (file_path, arcname)
 
-    def _make(self):
+    def _make(self, contents):
+        # contents are the environment and user code as (path or bytes, arcname)
         backend = self._backend()
         with backend.create() as archive:
-            # Package the environment
-            for path_or_bytes, arcname in self._mfcontent.contents():
+            for path_or_bytes, arcname in contents:
                 if isinstance(path_or_bytes, str):
                     archive.add_file(path_or_bytes, arcname=arcname)
                 else:
                     archive.add_data(BytesIO(path_or_bytes), arcname=arcname)
-
-            # Package the user code
-            for path, arcname in self._cached_user_members:
-                archive.add_file(path, arcname=arcname)
         return backend.get_blob()
 
     def __str__(self):
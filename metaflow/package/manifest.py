@@ -0,0 +1,168 @@
+import json
+import os
+
+from hashlib import sha1
+from typing import Any, Dict, Iterable, List, Optional, Tuple, Union
+
+from ..metaflow_config import CLIENT_CACHE_PATH
+
+# Bump when the format of the manifest changes
+_MANIFEST_VERSION = 1
+
+
+def _file_sha(path: str) -> str:
+    h = sha1()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+class PackageManifest(object):
+    """
+    Manifest of the content of the last code package built for a flow, along
+    with the package stored in the datastore for that content.
+
+    The content of a package is summarized by a digest over the name, mode and
+    hash of each of its files. The hash of a file is reused from the previous
+    manifest when the path, size and modification time of the file did not
+    change so that unchanged files are not read again.
+
+    Parameters
+    ----------
+    path : str
+        File holding the manifest
+    """
+
+    def __init__(self, path: str):
+        self._path = path
+        self._previous = self._read()
+        self._files = {}  # arcname -> [path, size, mtime_ns, sha]
+        self._digest = None
+
+    @classmethod
+    def for_flow(
+        cls, flow_name: str, flow_dir: str, ds_type: str, ds_root: str
+    ) -> "PackageManifest":
+        # Packages are stored per datastore so the manifest of a flow is too
+        key = sha1(
+            ("%s\0%s\0%s\0%s" % (flow_name, flow_dir, ds_type, ds_root)).encode("utf-8")
+        ).hexdigest()
+        return cls(os.path.join(CLIENT_CACHE_PATH, "package", "%s.json" % key))
+
+    def digest(
+        self,
+        package_metadata: str,
+        contents: Iterable[Tuple[Union[str, bytes], str]],
+    ) -> str:
+        """
+        Computes the digest of the content of a package.
+
+        Parameters
+        ----------
+        package_metadata : str
+            Metadata of the package (format and version of its content)
+        contents : Iterable[Tuple[Union[str, bytes], str]]
+            Path of each file of the package, or its content for generated
+            files, and its name in the archive
+
+        Returns
+        -------
+        str
+            Digest of the content
+        """
+        previous_files = self._previous.get("files", {})
+        lines = []
+        for path_or_bytes, arcname in contents:
+            if isinstance(path_or_bytes, str):
+                st = os.stat(path_or_bytes)
+                entry = [path_or_bytes, st.st_size, st.st_mtime_ns]
+                previous = previous_files.get(arcname)
+                if previous is not None and previous[:3] == entry:
+                    file_sha = previous[3]
+                else:
+                    file_sha = _file_sha(path_or_bytes)
+                self._files[arcname] = entry + [file_sha]
+                lines.append("%s\0%o\0%s" % (arcname, st.st_mode & 0o777, file_sha))
+            else:
+                lines.append("%s\0\0%s" % (arcname, sha1(path_or_bytes).hexdigest()))
+        h = sha1(package_metadata.encode("utf-8"))
+        for line in sorted(lines):
+            h.update(("%s\n" % line).encode("utf-8"))
+        self._digest = h.hexdigest()
+        return self._digest
+
+    def lookup(self) -> Optional[Dict[str, Any]]:
+        """
+        Returns the package stored for the content digested last, if the previous
+        manifest had the same content.
+
+        Returns
+        -------
+        Optional[Dict[str, Any]]
+            The `sha`, `url` and `size` of the package, the time, in seconds,
+            it took to build and upload it and its `layers`, if any; None if the
+            content changed.
+        """
+        if self._digest is None or self._previous.get("digest") != self._digest:
+            return None
+        return self._previous.get("package")
+
+    def store(
+        self,
+        sha: str,
+        url: str,
+        size: int,
+        build_time: float,
+        layers: Optional[List[Dict[str, Any]]] = None,
+    ):
+        """
+        Records the package stored for the content digested last.
+
+        Parameters
+        ----------
+        sha : str
+            Key of the package in the datastore
+        url : str
+            URL of the package
+        size : int
+            Size of the package, in bytes
+        build_time : float
+            Time, in seconds, it took to build and upload the package
+        layers : List[Dict[str, Any]], optional
+            Layers stored separately from the package, if any
+        """
+        manifest = {
+            "version": _MANIFEST_VERSION,
+            "digest": self._digest,
+            "files": self._files,
+            "package": {
+                "sha": sha,
+                "url": url,
+                "size": size,
+                "build_time": build_time,
+            },
+        }
+        if layers:
+            manifest["package"]["layers"] = layers
+        try:
+            os.makedirs(os.path.dirname(self._path), exist_ok=True)
+            tmp_path = "%s.%d" % (self._path, os.getpid())
+            with open(tmp_path, "w") as f:
+                json.dump(manifest, f)
+            os.replace(tmp_path, self._path)
+        except OSError:
+            # The manifest is best effort
+            pass
+
+    def _read(self) -> Dict[str, Any]:
+        try:
+            with open(self._path, "r") as f:
+                manifest = json.load(f)
+        except (OSError, ValueError):
+            return {}
+        if not isinstance(manifest, dict) or (
+            manifest.get("version") != _MANIFEST_VERSION
+        ):
+            return {}
+        return manifest
@@ -20,6 +20,7 @@ from metaflow.packaging_sys.distribution_support import PackagedDistributionFind
 
 from .backend import PackagingBackend
 from .tar_backend import TarPackagingBackend
+from .zip_backend import ZipPackagingBackend
 
 from ..util import get_metaflow_root
 
@@ -416,6 +417,19 @@ class MetaflowCodeContent:
         """
         raise NotImplementedError("content not implemented")
 
+    def shared_contents(self) -> Generator[Tuple[str, str], None, None]:
+        """
+        Subset of the files returned by contents that do not depend on the flow
+        (Metaflow itself and its extensions for example). These files can be
+        packaged in a layer that is shared by all flows using the same content.
+
+        Yields
+        ------
+        Generator[Tuple[str, str], None, None]
+            Path on the filesystem and the name in the archive
+        """
+        yield from ()
+
     def show(self) -> str:
         """
         Returns a more human-readable string representation of the content of this
@@ -158,6 +158,18 @@ class MetaflowCodeContentV1(MetaflowCodeContentV1Base):
         """
         yield from self._content(content_types, generate_value=True)
 
+    def shared_contents(self) -> Generator[Tuple[str, str], None, None]:
+        """
+        Metaflow and the Metaflow extensions: these files do not depend on the flow
+        and can be packaged in a layer shared by all flows.
+
+        Yields
+        ------
+        Generator[Tuple[str, str], None, None]
+            Path on the filesystem and the name in the archive
+        """
+        yield from self._cached_metaflow_files
+
     def show(self) -> str:
         """
         Returns a more human-readable string representation of the content of this
@@ -0,0 +1,108 @@
+import os
+import shutil
+import zipfile
+
+from io import BytesIO
+from typing import IO, List, Optional, Union
+
+from .backend import PackagingBackend
+
+# Setting this default to Dec 3, 2019 (same as for tarballs)
+_DEFAULT_DATE_TIME = (2019, 12, 3, 0, 0, 0)
+
+
+class ZipPackagingBackend(PackagingBackend):
+    """
+    Zip archives: each member is compressed on its own and the archive ends with
+    an index of its members so any member can be read without decompressing the
+    rest of the archive.
+    """
+
+    type = "zip"
+
+    @classmethod
+    def get_extract_commands(cls, archive_name: str, dest_dir: str) -> List[str]:
+        return [f"python -m zipfile -e {archive_name} {dest_dir}"]
+
+    def __init__(self):
+        super().__init__()
+        self._buf = None
+
+    def create(self):
+        self._buf = BytesIO()
+        self._archive = zipfile.ZipFile(
+            self._buf, mode="w", compression=zipfile.ZIP_DEFLATED, compresslevel=3
+        )
+        return self
+
+    def add_file(self, filename: str, arcname: Optional[str] = None):
+        info = zipfile.ZipInfo(arcname or filename, date_time=_DEFAULT_DATE_TIME)
+        info.compress_type = zipfile.ZIP_DEFLATED
+        # Keep the permissions of the file (they are restored on extraction)
+        info.external_attr = (os.stat(filename).st_mode & 0xFFFF) << 16
+        with open(filename, mode="rb") as f, self._archive.open(info, mode="w") as out:
+            shutil.copyfileobj(f, out)
+
+    def add_data(self, data: BytesIO, arcname: str):
+        info = zipfile.ZipInfo(arcname, date_time=_DEFAULT_DATE_TIME)
+        info.compress_type = zipfile.ZIP_DEFLATED
+        info.external_attr = 0o100644 << 16
+        self._archive.writestr(info, data.getvalue())
+
+    def close(self):
+        if self._archive:
+            self._archive.close()
+
+    def get_blob(self) -> Optional[Union[bytes, bytearray]]:
+        if self._buf:
+            return self._buf.getvalue()
+        return None
+
+    @classmethod
+    def cls_open(cls, content: IO[bytes]) -> zipfile.ZipFile:
+        return zipfile.ZipFile(content, mode="r")
+
+    @classmethod
+    def cls_member_name(cls, member: Union[zipfile.ZipInfo, str]) -> str:
+        """
+        Returns the name of the member as a string.
+        """
+        return member.filename if isinstance(member, zipfile.ZipInfo) else member
+
+    @classmethod
+    def cls_has_member(cls, archive: zipfile.ZipFile, name: str) -> bool:
+        try:
+            archive.getinfo(name)
+            return True
+        except KeyError:
+            return False
+
+    @classmethod
+    def cls_get_member(cls, archive: zipfile.ZipFile, name: str) -> Optional[bytes]:
+        try:
+            return archive.read(name)
+        except KeyError:
+            return None
+
+    @classmethod
+    def cls_extract_members(
+        cls,
+        archive: zipfile.ZipFile,
+        members: Optional[List[zipfile.ZipInfo]] = None,
+        dest_dir: str = ".",
+    ) -> None:
+        for member in members if members is not None else archive.infolist():
+            path = archive.extract(member, path=dest_dir)
+            mode = (member.external_attr >> 16) & 0o777
+            if mode:
+                os.chmod(path, mode)
+
+    @classmethod
+    def cls_list_members(
+        cls, archive: zipfile.ZipFile
+    ) -> Optional[List[zipfile.ZipInfo]]:
+        return archive.infolist() or None
+
+    @classmethod
+    def cls_list_names(cls, archive: zipfile.ZipFile) -> Optional[List[str]]:
+        return archive.namelist() or None
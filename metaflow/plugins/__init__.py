@@ -1,5 +1,6 @@
 import sys
 
+from metaflow.metaflow_config import PLUGINS_LAZY_RESOLVE
 from metaflow.extension_support.plugins import (
     get_trampoline_cli_names,
     merge_lists,
@@ -190,6 +191,10 @@ TL_PLUGINS_DESC = [
 # Add artifact serializers here. Ordering is by PRIORITY (lower = tried first).
 # PickleSerializer is the universal fallback (PRIORITY=9999).
 ARTIFACT_SERIALIZERS_DESC = [
+    (
+        "pickle_oob",
+        ".datastores.serializers.pickle_oob_serializer.PickleOOBSerializer",
+    ),
     ("pickle", ".datastores.serializers.pickle_serializer.PickleSerializer"),
 ]
 
@@ -212,23 +217,25 @@ def get_runner_cli_path():
     return resolve_plugins("runner_cli", path_only=True)
 
 
-STEP_DECORATORS = resolve_plugins("step_decorator")
-FLOW_DECORATORS = resolve_plugins("flow_decorator")
-ENVIRONMENTS = resolve_plugins("environment")
-METADATA_PROVIDERS = resolve_plugins("metadata_provider")
-DATASTORES = resolve_plugins("datastore")
-DATACLIENTS = resolve_plugins("dataclient")
-SIDECARS = resolve_plugins("sidecar")
-LOGGING_SIDECARS = resolve_plugins("logging_sidecar")
-MONITOR_SIDECARS = resolve_plugins("monitor_sidecar")
+STEP_DECORATORS = resolve_plugins("step_decorator", lazy=PLUGINS_LAZY_RESOLVE)
+FLOW_DECORATORS = resolve_plugins("flow_decorator", lazy=PLUGINS_LAZY_RESOLVE)
+ENVIRONMENTS = resolve_plugins("environment", lazy=PLUGINS_LAZY_RESOLVE)
+METADATA_PROVIDERS = resolve_plugins("metadata_provider", lazy=PLUGINS_LAZY_RESOLVE)
+DATASTORES = resolve_plugins("datastore", lazy=PLUGINS_LAZY_RESOLVE)
+DATACLIENTS = resolve_plugins("dataclient", lazy=PLUGINS_LAZY_RESOLVE)
+SIDECARS = resolve_plugins("sidecar", lazy=PLUGINS_LAZY_RESOLVE)
+LOGGING_SIDECARS = resolve_plugins("logging_sidecar", lazy=PLUGINS_LAZY_RESOLVE)
+MONITOR_SIDECARS = resolve_plugins("monitor_sidecar", lazy=PLUGINS_LAZY_RESOLVE)
 
 SIDECARS.update(LOGGING_SIDECARS)
 SIDECARS.update(MONITOR_SIDECARS)
 
-AWS_CLIENT_PROVIDERS = resolve_plugins("aws_client_provider")
-SECRETS_PROVIDERS = resolve_plugins("secrets_provider")
-AZURE_CLIENT_PROVIDERS = resolve_plugins("azure_client_provider")
-GCP_CLIENT_PROVIDERS = resolve_plugins("gcp_client_provider")
+AWS_CLIENT_PROVIDERS = resolve_plugins("aws_client_provider", lazy=PLUGINS_LAZY_RESOLVE)
+SECRETS_PROVIDERS = resolve_plugins("secrets_provider", lazy=PLUGINS_LAZY_RESOLVE)
+AZURE_CLIENT_PROVIDERS = resolve_plugins(
+    "azure_client_provider", lazy=PLUGINS_LAZY_RESOLVE
+)
+GCP_CLIENT_PROVIDERS = resolve_plugins("gcp_client_provider", lazy=PLUGINS_LAZY_RESOLVE)
 
 if sys.version_info >= (3, 7):
     DEPLOYER_IMPL_PROVIDERS = resolve_plugins("deployer_impl_provider")
@@ -7,7 +7,6 @@ import shlex
 import time
 
 from metaflow import util
-from metaflow.plugins.datatools.s3.s3tail import S3Tail
 from metaflow.plugins.aws.aws_utils import sanitize_batch_tag
 from metaflow.exception import MetaflowException
 from metaflow.metaflow_config import (
@@ -31,6 +30,7 @@ from metaflow.metaflow_config_funcs import config_values
 from metaflow.mflog import (
     export_mflog_env_vars,
     bash_capture_logs,
+    get_log_tailer,
     tail_logs,
     BASH_SAVE_LOGS,
 )
@@ -75,7 +75,7 @@ class Batch(object):
             datastore_type="s3",
             stdout_path=STDOUT_PATH,
             stderr_path=STDERR_PATH,
-            **task_spec
+            **task_spec,
         )
         init_cmds = environment.get_package_commands(
             code_package_url, "s3", code_package_metadata
@@ -538,8 +538,8 @@ class Batch(object):
                 select.poll().poll(200)
 
         prefix = b"[%s] " % util.to_bytes(self.job.id)
-        stdout_tail = S3Tail(stdout_location)
-        stderr_tail = S3Tail(stderr_location)
+        stdout_tail = get_log_tailer(stdout_location, "s3")
+        stderr_tail = get_log_tailer(stderr_location, "s3")
 
         child_jobs = []
         if self.num_parallel > 1:
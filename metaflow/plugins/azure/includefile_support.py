@@ -80,19 +80,18 @@ class Azure(object):
     def put(self, key, obj, overwrite=True):
         """Key MUST be a fully qualified path.  <container_name>/b/l/o/b/n/a/m/e"""
         storage = self._get_storage_backend(key)
-        storage.save_bytes([(key, io.BytesIO(obj))], overwrite=overwrite)
+        storage.save_bytes(
+            [(key, obj if hasattr(obj, "read") else io.BytesIO(obj))],
+            overwrite=overwrite,
+        )
         # We fabricate a uri scheme to fit into existing includefile code (just like local://)
         return "azure://%s" % key
 
     def info(self, key=None, return_missing=False):
         # We fabricate a uri scheme to fit into existing includefile code (just like local://)
-        if not key.startswith("azure://"):
-            raise MetaflowInternalError(
-                msg="Expected Azure object key to start with 'azure://'"
-            )
-        # aliasing this purely for clarity
-        uri_style_key = key
-        short_key = key[8:]
+        # The key may also be given as passed to put(), without the scheme
+        short_key = key[8:] if key.startswith("azure://") else key
+        uri_style_key = "azure://%s" % short_key
         storage = self._get_storage_backend(short_key)
         blob_size = storage.size_file(short_key)
         blob_exists = blob_size is not None
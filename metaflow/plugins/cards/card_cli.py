@@ -14,6 +14,8 @@ import os
 import time
 import json
 import uuid
+import sys
+import hashlib
 import signal
 import random
 from contextlib import contextmanager
@@ -405,6 +407,12 @@ def _extract_reload_token(data, task, mf_card):
         return mf_card.reload_content_token(task, data)
 
 
+def _content_digest(content):
+    if not isinstance(content, str):
+        content = json.dumps(content, sort_keys=True)
+    return hashlib.sha1(content.encode("utf-8")).hexdigest()
+
+
 def update_card(mf_card, mode, task, data, timeout_value=None):
     """
     This method will be responsible for creating a card/data-update based on the `mode`.
@@ -539,147 +547,47 @@ def update_card(mf_card, mode, task, data, timeout_value=None):
         return render_info
 
 
-@card.command(help="create a HTML card")
-@click.argument("pathspec", type=str)
-@click.option(
-    "--type",
-    default="default",
-    show_default=True,
-    type=str,
-    help="Type of card being created",
-)
-@click.option(
-    "--options",
-    default=None,
-    show_default=True,
-    type=JSONTypeClass(),
-    help="arguments of the card being created.",
-)
-@click.option(
-    "--timeout",
-    default=None,
-    show_default=True,
-    type=int,
-    help="Maximum amount of time allowed to create card.",
-)
-@click.option(
-    "--render-error-card",
-    default=False,
-    is_flag=True,
-    help="Upon failing to render a card, render a card holding the stack trace",
-)
-@click.option(
-    "--id",
-    default=None,
-    show_default=True,
-    type=str,
-    help="ID of the card",
-)
-@click.option(
-    "--component-file",
-    default=None,
-    show_default=True,
-    type=str,
-    help="JSON File with pre-rendered components. (internal)",
-)
-@click.option(
-    "--mode",
-    default="render",
-    show_default=True,
-    type=click.Choice(["render", "render_runtime", "refresh"]),
-    help="Rendering mode. (internal)",
-)
-@click.option(
-    "--data-file",
-    default=None,
-    show_default=True,
-    type=str,
-    hidden=True,
-    help="JSON file containing data to be updated. (internal)",
-)
-@click.option(
-    "--card-uuid",
-    default=None,
-    show_default=True,
-    type=str,
-    hidden=True,
-    help="Card UUID. (internal)",
-)
-@click.option(
-    "--delete-input-files",
-    default=False,
-    is_flag=True,
-    show_default=True,
-    hidden=True,
-    help="Delete data-file and component-file after reading. (internal)",
-)
-@click.option(
-    "--save-metadata",
-    default=None,
-    show_default=True,
-    type=JSONTypeClass(),
-    hidden=True,
-    help="JSON string containing metadata to be saved. (internal)",
-)
-@click.pass_context
-def create(
-    ctx,
+def _create_card(
+    obj,
     pathspec,
-    mode=None,
+    mode="render",
     type=None,
     options=None,
     timeout=None,
-    component_file=None,
-    data_file=None,
+    component_arr=None,
+    data=None,
     render_error_card=False,
     card_uuid=None,
-    delete_input_files=None,
-    id=None,
+    card_id=None,
     save_metadata=None,
+    saved_digests=None,
 ):
-    card_id = id
+    """
+    Renders a card (or a data update) of a task and saves it in the card datastore.
+
+    `saved_digests` maps each card file and data file to a digest of what was last
+    saved for it; when it is passed, files whose content did not change are not
+    saved again and the dictionary is updated with what was saved.
+    """
     rendered_info = None  # Variable holding all the information which will be rendered
     error_stack_trace = None  # Variable which will keep a track of error
+    component_arr = component_arr or []
+    data = data or {}
 
-    if len(pathspec.split("/")) != 3:
-        raise CommandException(
-            msg="Expecting pathspec of form <runid>/<stepname>/<taskid>"
-        )
-    flowname = ctx.obj.flow.name
+    flowname = obj.flow.name
     full_pathspec = "/".join([flowname, pathspec])
 
-    graph_dict, _ = ctx.obj.graph.output_steps()
+    graph_dict, _ = obj.graph.output_steps()
     # Backward-compat: `graph` keeps the old shape (dict of step_name -> info)
     # so third-party card modules that expect the pre-annotation format continue
     # to work. New cards should use `graph_info` which carries start/end
     # metadata needed for flows with custom-named entry/terminal steps.
     graph_info = {
         "steps": graph_dict,
-        "start_step": ctx.obj.graph.start_step,
-        "end_step": ctx.obj.graph.end_step,
+        "start_step": obj.graph.start_step,
+        "end_step": obj.graph.end_step,
     }
 
-    if card_uuid is None:
-        card_uuid = str(uuid.uuid4()).replace("-", "")
-
-    # Components are rendered in a Step and added via `current.card.append` are added here.
-    component_arr = []
-    if component_file is not None:
-        with open(component_file, "r") as f:
-            component_arr = json.load(f)
-        # Component data used in card runtime is passed in as temporary files which can be deleted after use
-        if delete_input_files:
-            os.remove(component_file)
-
-    # Load data to be refreshed for runtime cards
-    data = {}
-    if data_file is not None:
-        with open(data_file, "r") as f:
-            data = json.load(f)
-        # data is passed in as temporary files which can be deleted after use
-        if delete_input_files:
-            os.remove(data_file)
-
     task = Task(full_pathspec)
     from metaflow.plugins import CARDS
     from metaflow.plugins.cards.exception import CARD_ID_PATTERN, TYPE_CHECK_REGEX
@@ -687,7 +595,7 @@ def create(
 
     error_card = ErrorCard
     filtered_cards = [CardClass for CardClass in CARDS if CardClass.type == type]
-    card_datastore = CardDatastore(ctx.obj.flow_datastore, pathspec=full_pathspec)
+    card_datastore = CardDatastore(obj.flow_datastore, pathspec=full_pathspec)
 
     if len(filtered_cards) == 0 or type is None:
         if render_error_card:
@@ -697,7 +605,7 @@ def create(
 
     if len(filtered_cards) > 0:
         filtered_card = filtered_cards[0]
-        ctx.obj.echo(
+        obj.echo(
             "Creating new card of type %s with timeout %s"
             % (filtered_card.type, timeout),
             fg="green",
@@ -725,14 +633,14 @@ def create(
                     options=options,
                     components=component_arr,
                     graph=graph_dict,
-                    flow=ctx.obj.flow,
+                    flow=obj.flow,
                     **extra_kwargs,
                 )
             else:
                 mf_card = filtered_card(
                     components=component_arr,
                     graph=graph_dict,
-                    flow=ctx.obj.flow,
+                    flow=obj.flow,
                     **extra_kwargs,
                 )
         except TypeError as e:
@@ -837,31 +745,47 @@ def create(
 
     # If card_id is doesn't match regex pattern then we will set it as None
     if card_id is not None and re.match(CARD_ID_PATTERN, card_id) is None:
-        ctx.obj.echo(
+        obj.echo(
             "`--id=%s` doesn't match REGEX pattern. `--id` will be set to `None`. Please create `--id` of pattern %s."
             % (card_id, TYPE_CHECK_REGEX),
             fg="red",
         )
         card_id = None
 
+    if rendered_content is not None:
+        if mode == "refresh":
+            # `created_on` changes with every update; the content does not
+            digest = _content_digest(
+                {k: v for k, v in rendered_content.items() if k != "created_on"}
+            )
+            digest_key = ("data", card_uuid, save_type, card_id)
+        else:
+            digest = _content_digest(rendered_content)
+            digest_key = ("card", card_uuid, save_type, card_id)
+        if saved_digests is not None and saved_digests.get(digest_key) == digest:
+            obj.echo("Card unchanged", fg="green")
+            rendered_content = None
+        elif saved_digests is not None:
+            saved_digests[digest_key] = digest
+
     if rendered_content is not None:
         if mode == "refresh":
             card_datastore.save_data(
                 card_uuid, save_type, rendered_content, card_id=card_id
             )
-            ctx.obj.echo("Data updated", fg="green")
+            obj.echo("Data updated", fg="green")
         else:
             card_info = card_datastore.save_card(
                 card_uuid, save_type, rendered_content, card_id=card_id
             )
-            ctx.obj.echo(
+            obj.echo(
                 "Card created with type: %s and hash: %s"
                 % (card_info.type, card_info.hash[:NUM_SHORT_HASH_CHARS]),
                 fg="green",
             )
             if save_metadata:
                 _save_metadata(
-                    ctx.obj.metadata,
+                    obj.metadata,
                     task.parent.parent.id,
                     task.parent.id,
                     task.id,
@@ -871,6 +795,184 @@ def create(
                 )
 
 
+@card.command(help="create a HTML card")
+@click.argument("pathspec", type=str)
+@click.option(
+    "--type",
+    default="default",
+    show_default=True,
+    type=str,
+    help="Type of card being created",
+)
+@click.option(
+    "--options",
+    default=None,
+    show_default=True,
+    type=JSONTypeClass(),
+    help="arguments of the card being created.",
+)
+@click.option(
+    "--timeout",
+    default=None,
+    show_default=True,
+    type=int,
+    help="Maximum amount of time allowed to create card.",
+)
+@click.option(
+    "--render-error-card",
+    default=False,
+    is_flag=True,
+    help="Upon failing to render a card, render a card holding the stack trace",
+)
+@click.option(
+    "--id",
+    default=None,
+    show_default=True,
+    type=str,
+    help="ID of the card",
+)
+@click.option(
+    "--component-file",
+    default=None,
+    show_default=True,
+    type=str,
+    help="JSON File with pre-rendered components. (internal)",
+)
+@click.option(
+    "--mode",
+    default="render",
+    show_default=True,
+    type=click.Choice(["render", "render_runtime", "refresh"]),
+    help="Rendering mode. (internal)",
+)
+@click.option(
+    "--data-file",
+    default=None,
+    show_default=True,
+    type=str,
+    hidden=True,
+    help="JSON file containing data to be updated. (internal)",
+)
+@click.option(
+    "--card-uuid",
+    default=None,
+    show_default=True,
+    type=str,
+    hidden=True,
+    help="Card UUID. (internal)",
+)
+@click.option(
+    "--delete-input-files",
+    default=False,
+    is_flag=True,
+    show_default=True,
+    hidden=True,
+    help="Delete data-file and component-file after reading. (internal)",
+)
+@click.option(
+    "--save-metadata",
+    default=None,
+    show_default=True,
+    type=JSONTypeClass(),
+    hidden=True,
+    help="JSON string containing metadata to be saved. (internal)",
+)
+@click.pass_context
+def create(
+    ctx,
+    pathspec,
+    mode=None,
+    type=None,
+    options=None,
+    timeout=None,
+    component_file=None,
+    data_file=None,
+    render_error_card=False,
+    card_uuid=None,
+    delete_input_files=None,
+    id=None,
+    save_metadata=None,
+):
+    if len(pathspec.split("/")) != 3:
+        raise CommandException(
+            msg="Expecting pathspec of form <runid>/<stepname>/<taskid>"
+        )
+
+    if card_uuid is None:
+        card_uuid = str(uuid.uuid4()).replace("-", "")
+
+    # Components are rendered in a Step and added via `current.card.append` are added here.
+    component_arr = []
+    if component_file is not None:
+        with open(component_file, "r") as f:
+            component_arr = json.load(f)
+        # Component data used in card runtime is passed in as temporary files which can be deleted after use
+        if delete_input_files:
+            os.remove(component_file)
+
+    # Load data to be refreshed for runtime cards
+    data = {}
+    if data_file is not None:
+        with open(data_file, "r") as f:
+            data = json.load(f)
+        # data is passed in as temporary files which can be deleted after use
+        if delete_input_files:
+            os.remove(data_file)
+
+    _create_card(
+        ctx.obj,
+        pathspec,
+        mode=mode,
+        type=type,
+        options=options,
+        timeout=timeout,
+        component_arr=component_arr,
+        data=data,
+        render_error_card=render_error_card,
+        card_uuid=card_uuid,
+        card_id=id,
+        save_metadata=save_metadata,
+    )
+
+
+@card.command(
+    name="render-worker",
+    hidden=True,
+    help="Render the cards of a running task until stdin is closed. (internal)",
+)
+@click.argument("pathspec", type=str)
+@click.pass_context
+def render_worker(ctx, pathspec):
+    from .card_worker import serve
+
+    if len(pathspec.split("/")) != 3:
+        raise CommandException(
+            msg="Expecting pathspec of form <runid>/<stepname>/<taskid>"
+        )
+
+    # Only the card and data files whose content changed are saved again.
+    saved_digests = {}
+
+    def _render(request, components):
+        _create_card(
+            ctx.obj,
+            pathspec,
+            mode=request["mode"],
+            card_uuid=request["card_uuid"],
+            component_arr=components,
+            saved_digests=saved_digests,
+            **request["args"],
+        )
+
+    # The replies go to the original stdout; anything printed while rendering
+    # the cards goes to stderr instead.
+    replies = os.fdopen(os.dup(sys.stdout.fileno()), "wb")
+    sys.stdout.flush()
+    os.dup2(sys.stderr.fileno(), sys.stdout.fileno())
+    with replies:
+        serve(_render, sys.stdin.buffer, replies)
+
+
 @card.command()
 @click.argument("pathspec")
 @card_read_options_and_arguments
@@ -5,11 +5,23 @@ import json
 import sys
 import os
 from metaflow import current
+from metaflow.metaflow_config import CARD_RENDER_WORKER
 from typing import Callable, Tuple, Dict
 
+from .card_worker import (
+    CardRenderWorker,
+    CardRenderWorkerException,
+    CardRenderWorkerTimeout,
+    STATUS_FAILED,
+)
+
 
 ASYNC_TIMEOUT = 30
 
+# Cards are rendered by `card create` subprocesses after this many render workers
+# of a task died.
+MAX_RENDER_WORKER_FAILURES = 3
+
 
 class CardProcessManager:
     """
@@ -58,6 +70,15 @@ class CardCreator:
         # up writing to the metadata store once.
         self._top_level_options = top_level_options
         self._should_save_metadata = should_save_metadata_lambda
+        self._render_worker = None
+        self._render_worker_runspec = None
+        self._render_worker_failures = 0
+
+    def close(self):
+        # Lets the render worker, if any, finish the pending updates and exit.
+        if self._render_worker is not None:
+            self._render_worker.close(timeout=ASYNC_TIMEOUT)
+            self._render_worker = None
 
     def create(
         self,
@@ -124,6 +145,22 @@ class CardCreator:
         components_file = data_file = None
         wait = final or sync
 
+        if CARD_RENDER_WORKER and self._render_in_worker(
+            card_uuid,
+            user_set_card_id,
+            mode,
+            runspec,
+            decorator_attributes,
+            card_options,
+            component_strings,
+            logger,
+            data,
+            wait=wait,
+            save_metadata=save_metadata,
+            metadata_dict=metadata_dict,
+        ):
+            return
+
         if len(component_strings) > 0:
             # note that we can't delete temporary files here when calling the subprocess
             # async due to a race condition. The subprocess must delete them
@@ -194,6 +231,107 @@ class CardCreator:
                 bad=True,
             )
 
+    def _render_in_worker(
+        self,
+        card_uuid,
+        user_set_card_id,
+        mode,
+        runspec,
+        decorator_attributes,
+        card_options,
+        component_strings,
+        logger,
+        data,
+        wait=False,
+        save_metadata=False,
+        metadata_dict=None,
+    ):
+        # Returns False if the card needs to be rendered by a `card create`
+        # subprocess instead.
+        worker = self._get_render_worker(runspec)
+        if worker is None:
+            return False
+        timeout = decorator_attributes["timeout"]
+        if timeout is not None:
+            timeout = int(timeout)
+        args = dict(
+            type=decorator_attributes["type"],
+            options=card_options if card_options else None,
+            timeout=timeout,
+            card_id=None if user_set_card_id is None else str(user_set_card_id),
+            render_error_card=bool(decorator_attributes["save_errors"]),
+            save_metadata=metadata_dict if save_metadata else None,
+            data=data,
+        )
+        if timeout is not None:
+            wait_timeout = timeout + 10
+        else:
+            # Same as the `card create` subprocesses: synchronous renders are
+            # waited for without a timeout.
+            wait_timeout = None if wait else ASYNC_TIMEOUT
+        try:
+            status, output = worker.render(
+                card_uuid,
+                mode,
+                args,
+                component_strings,
+                wait=wait,
+                timeout=wait_timeout,
+            )
+        except CardRenderWorkerTimeout as e:
+            self._stop_render_worker()
+            status, output = STATUS_FAILED, str(e)
+        except CardRenderWorkerException:
+            self._stop_render_worker()
+            self._render_worker_failures += 1
+            return False
+        if status == STATUS_FAILED:
+            logger(
+                "Card render failed with error : \n\n %s" % output,
+                timestamp=False,
+                bad=True,
+            )
+        return True
+
+    def _get_render_worker(self, runspec):
+        worker = self._render_worker
+        if worker is not None and runspec != self._render_worker_runspec:
+            # The creator is reused by the next task run in the same process
+            self.close()
+            worker = None
+        if worker is not None:
+            try:
+                alive = worker.is_alive()
+                if alive and worker.is_stuck():
+                    # Like the `card create` subprocesses, a worker which does
+                    # not finish rendering a card within its timeout is killed.
+                    self._stop_render_worker()
+                    worker = None
+            except CardRenderWorkerException:
+                alive = False
+            if not alive:
+                self._stop_render_worker()
+                self._render_worker_failures += 1
+                worker = None
+        if worker is None:
+            if self._render_worker_failures >= MAX_RENDER_WORKER_FAILURES:
+                return None
+            cmd = [sys.executable, sys.argv[0]] + self._top_level_options
+            cmd += ["card", "render-worker", runspec]
+            try:
+                worker = CardRenderWorker(cmd, os.environ)
+            except OSError:
+                self._render_worker_failures += 1
+                return None
+            self._render_worker = worker
+            self._render_worker_runspec = runspec
+        return worker
+
+    def _stop_render_worker(self):
+        if self._render_worker is not None:
+            self._render_worker.kill()
+            self._render_worker = None
+
     def _wait_for_async_processes_to_finish(self, card_uuid, async_timeout):
         _async_proc, _async_started = CardProcessManager._get_card_process(card_uuid)
         while _async_proc is not None and _async_proc.poll() is None:
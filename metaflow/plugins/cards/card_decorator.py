@@ -365,6 +365,7 @@ class CardDecorator(StepDecorator):
     def _cleanup(self, step_name):
         self._increment_completed_counter()
         if self.task_finished_decos == self.total_decos_on_step[step_name]:
+            self.card_creator.close()
             # Unlink the config file if it exists
             if self._config_file_name:
                 try:
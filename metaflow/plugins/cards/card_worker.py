@@ -0,0 +1,289 @@
+"""
+Long-lived card render worker of a task.
+
+Instead of starting a `card create` subprocess -- and paying for the interpreter
+startup and the import of the flow -- for every runtime update of a card, the
+CardCreator of a task can send its render requests to a single worker process
+which runs `card render-worker` for as long as the task runs.
+
+Requests and replies are exchanged as lines of JSON over the stdin and the
+stdout of the worker:
+  - a request carries the card to render, the mode, the arguments of
+    `card create` and the components of the card. The components are only sent
+    when they changed since the last request for the card, and only the
+    components which changed are sent when the number of components did not
+    change.
+  - the worker replies to every request with its id and a status: "ok",
+    "failed" (with the error) or "coalesced" when a newer request for the same
+    card and mode arrived before the worker got to it.
+"""
+
+import json
+import os
+import select
+import subprocess
+import threading
+import time
+import traceback
+
+from collections import OrderedDict
+
+
+STATUS_OK = "ok"
+STATUS_FAILED = "failed"
+STATUS_COALESCED = "coalesced"
+
+
+class CardRenderWorkerException(Exception):
+    """
+    The worker died or could not be reached.
+    """
+
+
+class CardRenderWorkerTimeout(CardRenderWorkerException):
+    """
+    The worker did not reply in time.
+    """
+
+
+def _apply_components(components, request):
+    card_uuid = request["card_uuid"]
+    if "components" in request:
+        components[card_uuid] = request["components"]
+    elif "component_updates" in request:
+        card_components = components.setdefault(card_uuid, [])
+        for idx, component in request["component_updates"]:
+            card_components[idx] = component
+
+
+def serve(render, infile, outfile):
+    """
+    Runs a card render worker until `infile` is closed.
+
+    Requests are read from `infile` by a separate thread so that, while a card
+    renders, the requests which arrive for the same card and mode replace one
+    another and only the latest one is rendered. The cards are rendered in the
+    calling (main) thread as the card timeouts rely on SIGALRM.
+
+    Parameters
+    ----------
+    render : Callable[[Dict, List], None]
+        Renders the card of a request given its current components. Any
+        exception is reported as a failure of the request.
+    infile : BinaryIO
+        Stream of requests
+    outfile : BinaryIO
+        Stream of replies
+    """
+    pending = OrderedDict()
+    components = {}
+    state = {"eof": False}
+    cond = threading.Condition()
+    write_lock = threading.Lock()
+
+    def _reply(request_id, status, output=""):
+        msg = {"id": request_id, "status": status, "output": output}
+        with write_lock:
+            try:
+                outfile.write(json.dumps(msg).encode("utf-8") + b"\n")
+                outfile.flush()
+            except (OSError, ValueError):
+                # Nobody is listening anymore
+                pass
+
+    def _read_requests():
+        try:
+            for line in infile:
+                if not line.strip():
+                    continue
+                request = json.loads(line)
+                with cond:
+                    _apply_components(components, request)
+                    key = (request["card_uuid"], request["mode"])
+                    # Assigning an existing key keeps its place in the queue
+                    superseded = pending.get(key)
+                    pending[key] = request
+                    cond.notify()
+                if superseded is not None:
+                    _reply(superseded["id"], STATUS_COALESCED)
+        finally:
+            with cond:
+                state["eof"] = True
+                cond.notify()
+
+    reader = threading.Thread(target=_read_requests, daemon=True)
+    reader.start()
+    while True:
+        with cond:
+            while not pending and not state["eof"]:
+                cond.wait()
+            if not pending:
+                break
+            _, request = pending.popitem(last=False)
+            if request["mode"] == "refresh":
+                # Data updates do not need the components
+                card_components = []
+            else:
+                card_components = list(components.get(request["card_uuid"], []))
+        try:
+            render(request, card_components)
+        except Exception:
+            _reply(request["id"], STATUS_FAILED, traceback.format_exc())
+        else:
+            _reply(request["id"], STATUS_OK)
+
+
+class CardRenderWorker(object):
+    """
+    Handle on a card render worker process, used by the CardCreator of a task.
+
+    Parameters
+    ----------
+    cmd : List[str]
+        Command running the worker (see `serve`)
+    env : Dict[str, str]
+        Environment of the worker
+    """
+
+    def __init__(self, cmd, env):
+        self._proc = subprocess.Popen(
+            cmd,
+            env=env,
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL,
+        )
+        self._next_id = 0
+        # Requests sent without waiting for their reply: id -> timeout
+        self._in_flight = {}
+        self._last_progress = time.monotonic()
+        self._buffer = b""
+        self._replies = {}
+        # Components last sent for each card
+        self._components = {}
+
+    def is_alive(self):
+        return self._proc.poll() is None
+
+    def is_stuck(self):
+        """
+        Returns True if the worker made no progress on the requests sent to it
+        for longer than their timeout.
+        """
+        self._read_replies(0)
+        if not self._in_flight:
+            return False
+        return time.monotonic() - self._last_progress > max(self._in_flight.values())
+
+    def render(self, card_uuid, mode, args, components, wait=False, timeout=None):
+        """
+        Sends a render request to the worker.
+
+        Parameters
+        ----------
+        card_uuid : str
+            UUID of the card
+        mode : str
+            One of "render", "render_runtime" or "refresh"
+        args : Dict
+            Arguments of `card create` (type, options, timeout, ...)
+        components : List
+            Serialized components of the card
+        wait : bool, default False
+            Wait for the card to be rendered
+        timeout : float, optional, default None
+            When waiting, maximum time to wait for. When not waiting, time
+            after which the worker is considered stuck if it made no progress.
+
+        Returns
+        -------
+        Tuple[str, str]
+            Status of the request and its error, if any. Requests which are
+            not waited for are always successful.
+        """
+        request_id = self._next_id
+        self._next_id += 1
+        request = {"id": request_id, "card_uuid": card_uuid, "mode": mode}
+        request["args"] = args
+        if mode != "refresh":
+            self._add_components(request, card_uuid, components)
+        if not self._in_flight:
+            self._last_progress = time.monotonic()
+        try:
+            self._proc.stdin.write(json.dumps(request).encode("utf-8") + b"\n")
+            self._proc.stdin.flush()
+        except (OSError, ValueError) as e:
+            raise CardRenderWorkerException(str(e))
+        if not wait:
+            self._in_flight[request_id] = float("inf") if timeout is None else timeout
+            return STATUS_OK, ""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while request_id not in self._replies:
+            if deadline is None:
+                self._read_replies(None)
+            else:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise CardRenderWorkerTimeout(
+                        "Card rendering did not finish in %s seconds" % timeout
+                    )
+                self._read_replies(remaining)
+        return self._replies.pop(request_id)
+
+    def _add_components(self, request, card_uuid, components):
+        previous = self._components.get(card_uuid)
+        if previous is None or len(previous) != len(components):
+            request["components"] = components
+        else:
+            updates = [
+                [idx, component]
+                for idx, (old, component) in enumerate(zip(previous, components))
+                if old != component
+            ]
+            if updates:
+                request["component_updates"] = updates
+        self._components[card_uuid] = list(components)
+
+    def _read_replies(self, timeout):
+        # Reads the replies available within `timeout` seconds (None to block
+        # until some are available).
+        fd = self._proc.stdout.fileno()
+        while True:
+            readable, _, _ = select.select([fd], [], [], timeout)
+            if not readable:
+                return
+            chunk = os.read(fd, 65536)
+            if not chunk:
+                raise CardRenderWorkerException("Card render worker exited")
+            self._buffer += chunk
+            lines = self._buffer.split(b"\n")
+            self._buffer = lines.pop()
+            for line in lines:
+                reply = json.loads(line)
+                self._last_progress = time.monotonic()
+                if self._in_flight.pop(reply["id"], None) is None:
+                    self._replies[reply["id"]] = (reply["status"], reply["output"])
+            if lines:
+                # Do not wait for more replies than the ones available now
+                timeout = 0
+
+    def close(self, timeout=None):
+        """
+        Lets the worker finish the pending requests and exit; kills it if it
+        does not exit within `timeout` seconds.
+        """
+        try:
+            self._proc.stdin.close()
+        except OSError:
+            pass
+        try:
+            self._proc.wait(timeout=timeout)
+        except subprocess.TimeoutExpired:
+            self.kill()
+        else:
+            self._proc.stdout.close()
+
+    def kill(self):
+        self._proc.kill()
+        self._proc.wait()
+        self._proc.stdout.close()
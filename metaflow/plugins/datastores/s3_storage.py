@@ -1,10 +1,29 @@
+import atexit
 import os
+import threading
 
+from contextlib import contextmanager
+from functools import partial
 from itertools import starmap
 
 from metaflow.plugins.datatools.s3.s3 import S3, S3Client, S3PutObject, check_s3_deps
-from metaflow.metaflow_config import DATASTORE_SYSROOT_S3, ARTIFACT_LOCALROOT
+from metaflow.metaflow_config import (
+    DATASTORE_SYSROOT_S3,
+    ARTIFACT_LOCALROOT,
+    S3_STORAGE_SESSION,
+    S3_TRANSFER_INPROCESS_MAX_BYTES,
+    S3_TRANSFER_INPROCESS_MAX_COUNT,
+    S3_TRANSFER_LARGE_OBJECT_SIZE,
+    S3_UPLOAD_BATCH_MAX_BYTES,
+    S3_UPLOAD_BATCH_MAX_COUNT,
+)
 from metaflow.datastore.datastore_storage import CloseAfterUse, DataStoreStorage
+from metaflow.plugins.storage_executor import (
+    StorageExecutor,
+    _determine_effective_cpu_limit,
+    handle_executor_exceptions,
+)
+from metaflow.util import bounded_imap
 
 
 try:
@@ -15,6 +34,229 @@ except:
     from urllib.parse import urlparse
 
 
+# How a batch of objects is transferred:
+#  - sequential: one object after the other, in the process. A single large
+#    object is transferred with multipart ranged requests by boto3.
+#  - threads: in parallel by worker threads, in the process.
+#  - s3op: in parallel by the worker processes of an s3op subprocess.
+TRANSFER_SEQUENTIAL = "sequential"
+TRANSFER_THREADS = "threads"
+TRANSFER_S3OP = "s3op"
+
+
+_multiple_cpus = None
+
+
+def _has_multiple_cpus():
+    global _multiple_cpus
+    if _multiple_cpus is None:
+        cpu_limit = _determine_effective_cpu_limit()
+        if cpu_limit <= 0:
+            # No (or an unknown) limit: use the CPUs we can be scheduled on
+            if hasattr(os, "sched_getaffinity"):
+                cpu_limit = len(os.sched_getaffinity(0))
+            else:
+                cpu_limit = os.cpu_count() or 1
+        _multiple_cpus = cpu_limit > 1
+    return _multiple_cpus
+
+
+def plan_transfer(num_objects, total_size=None):
+    """
+    Chooses how to transfer a batch of objects.
+
+    Starting an s3op subprocess costs more than transferring a few objects
+    so batches with few objects, and not too many bytes, are transferred in
+    the process. The worker processes of s3op only help if they can run on
+    several CPUs; otherwise, all batches are transferred in the process.
+
+    Parameters
+    ----------
+    num_objects : int
+        Number of objects in the batch
+    total_size : int, optional, default None
+        Total size of the objects, if known
+
+    Returns
+    -------
+    str
+        One of TRANSFER_SEQUENTIAL, TRANSFER_THREADS or TRANSFER_S3OP
+    """
+    if num_objects <= 1:
+        return TRANSFER_SEQUENTIAL
+    if _has_multiple_cpus() and (
+        num_objects > S3_TRANSFER_INPROCESS_MAX_COUNT
+        or (total_size is not None and total_size > S3_TRANSFER_INPROCESS_MAX_BYTES)
+    ):
+        return TRANSFER_S3OP
+    return TRANSFER_THREADS
+
+
+def plan_upload(sizes):
+    """
+    Plans the upload of objects of the given sizes.
+
+    Large objects are uploaded one at a time as each of them is already split
+    in parts uploaded in parallel; the other objects are uploaded as a batch.
+
+    Parameters
+    ----------
+    sizes : List[Optional[int]]
+        Size of each object, None if unknown
+
+    Returns
+    -------
+    Tuple[List[int], List[int], str]
+        Indices of the large objects, indices of the other objects and how
+        to transfer the latter (see plan_transfer)
+    """
+    large, batch = [], []
+    for idx, size in enumerate(sizes):
+        if size is not None and size >= S3_TRANSFER_LARGE_OBJECT_SIZE:
+            large.append(idx)
+        else:
+            batch.append(idx)
+    if not batch:
+        return large, batch, TRANSFER_SEQUENTIAL
+    if any(sizes[idx] is None for idx in batch):
+        total_size = None
+    else:
+        total_size = sum(sizes[idx] for idx in batch)
+    return large, batch, plan_transfer(len(batch), total_size)
+
+
+def _object_size(obj):
+    if isinstance(obj, (bytes, bytearray, str)):
+        return len(obj)
+    try:
+        if hasattr(obj, "getbuffer"):
+            return obj.getbuffer().nbytes
+        pos = obj.tell()
+        size = obj.seek(0, os.SEEK_END)
+        obj.seek(pos)
+        return size
+    except Exception:
+        return None
+
+
+def _iter_upload_batches(objects):
+    # Groups the objects to upload in batches of a bounded number of objects
+    # and bytes so that they are not all held in memory at once. A large
+    # object is a batch of its own.
+    batch, sizes, batch_size = [], [], 0
+    for obj in objects:
+        size = _object_size(obj[1])
+        if size is not None and size >= S3_TRANSFER_LARGE_OBJECT_SIZE:
+            yield [obj], [size]
+            continue
+        batch.append(obj)
+        sizes.append(size)
+        batch_size += size or 0
+        if (
+            len(batch) >= S3_UPLOAD_BATCH_MAX_COUNT
+            or batch_size >= S3_UPLOAD_BATCH_MAX_BYTES
+        ):
+            yield batch, sizes
+            batch, sizes, batch_size = [], [], 0
+    if batch:
+        yield batch, sizes
+
+
+class _S3Transfers(object):
+    """
+    S3 context and worker threads used by the operations of S3Storage.
+    """
+
+    def __init__(self, s3):
+        self.s3 = s3
+        self._executor = None
+        self._executor_lock = threading.Lock()
+
+    @property
+    def executor(self):
+        with self._executor_lock:
+            if self._executor is None:
+                self._executor = StorageExecutor(use_processes=False)
+            return self._executor
+
+    def close(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+            self._executor = None
+        self.s3.close()
+
+    def map(self, func, items, mode):
+        # Iterates lazily over the results, in order
+        if mode == TRANSFER_THREADS:
+            return bounded_imap(
+                self.executor, func, items, max_pending=S3_TRANSFER_INPROCESS_MAX_COUNT
+            )
+        return map(func, items)
+
+    def list_path(self, path):
+        # Same as S3.list_paths([path]) without an s3op subprocess
+        url = self.s3._url(path).rstrip("/") + "/"
+        src = urlparse(url, allow_fragments=False)
+
+        def _list(s3, _):
+            result = []
+            paginator = s3.get_paginator("list_objects_v2")
+            for page in paginator.paginate(
+                Bucket=src.netloc, Prefix=src.path.lstrip("/"), Delimiter="/"
+            ):
+                result.extend((obj["Key"], True) for obj in page.get("Contents", []))
+                result.extend(
+                    (prefix["Prefix"], False)
+                    for prefix in page.get("CommonPrefixes", [])
+                )
+            return result
+
+        _, keys = self.s3._one_boto_op(_list, url, create_tmp_file=False)
+        return [("s3://%s/%s" % (src.netloc, key), is_file) for key, is_file in keys]
+
+
+class _S3StorageSession(_S3Transfers):
+    """
+    S3 context, temporary directory, client and worker threads shared by all the
+    S3Storage operations on a datastore root for the lifetime of the process.
+    """
+
+    _sessions = {}
+    _lock = threading.Lock()
+
+    def __init__(self, datastore_root):
+        self.pid = os.getpid()
+        self.client = S3Client()
+        super(_S3StorageSession, self).__init__(
+            S3(
+                s3root=datastore_root,
+                tmproot=ARTIFACT_LOCALROOT,
+                external_client=self.client,
+            )
+        )
+
+    @classmethod
+    def get(cls, datastore_root):
+        with cls._lock:
+            session = cls._sessions.get(datastore_root)
+            # A forked process can use neither the threads nor the temporary
+            # directory of the session of its parent.
+            if session is None or session.pid != os.getpid():
+                session = cls._sessions[datastore_root] = cls(datastore_root)
+            return session
+
+    @classmethod
+    def close_all(cls):
+        with cls._lock:
+            for session in cls._sessions.values():
+                if session.pid == os.getpid():
+                    session.close()
+            cls._sessions.clear()
+
+
+atexit.register(_S3StorageSession.close_all)
+
+
 class S3Storage(DataStoreStorage):
     TYPE = "s3"
 
@@ -27,120 +269,149 @@ class S3Storage(DataStoreStorage):
     def get_datastore_root_from_config(cls, echo, create_on_absent=True):
         return DATASTORE_SYSROOT_S3
 
+    @contextmanager
+    def _transfers(self):
+        if S3_STORAGE_SESSION:
+            yield _S3StorageSession.get(self.datastore_root)
+        else:
+            with S3(
+                s3root=self.datastore_root,
+                tmproot=ARTIFACT_LOCALROOT,
+                external_client=self.s3_client,
+            ) as s3:
+                transfers = _S3Transfers(s3)
+                try:
+                    yield transfers
+                finally:
+                    transfers.close()
+
+    @handle_executor_exceptions
     def is_file(self, paths):
-        with S3(
-            s3root=self.datastore_root,
-            tmproot=ARTIFACT_LOCALROOT,
-            external_client=self.s3_client,
-        ) as s3:
-            if len(paths) > 10:
-                s3objs = s3.info_many(paths, return_missing=True)
-                return [s3obj.exists for s3obj in s3objs]
+        mode = plan_transfer(len(paths))
+        with self._transfers() as transfers:
+            if mode == TRANSFER_S3OP:
+                s3objs = transfers.s3.info_many(paths, return_missing=True)
             else:
-                result = []
-                for path in paths:
-                    result.append(s3.info(path, return_missing=True).exists)
-                return result
+                s3objs = transfers.map(
+                    partial(transfers.s3.info, return_missing=True), paths, mode
+                )
+            return [s3obj.exists for s3obj in s3objs]
 
     def info_file(self, path):
-        with S3(
-            s3root=self.datastore_root,
-            tmproot=ARTIFACT_LOCALROOT,
-            external_client=self.s3_client,
-        ) as s3:
-            s3obj = s3.info(path, return_missing=True)
+        with self._transfers() as transfers:
+            s3obj = transfers.s3.info(path, return_missing=True)
             return s3obj.exists, s3obj.metadata
 
     def size_file(self, path):
-        with S3(
-            s3root=self.datastore_root,
-            tmproot=ARTIFACT_LOCALROOT,
-            external_client=self.s3_client,
-        ) as s3:
-            s3obj = s3.info(path, return_missing=True)
+        with self._transfers() as transfers:
+            s3obj = transfers.s3.info(path, return_missing=True)
             return s3obj.size
 
+    @handle_executor_exceptions
     def list_content(self, paths):
         strip_prefix_len = len(self.datastore_root.rstrip("/")) + 1
-        with S3(
-            s3root=self.datastore_root,
-            tmproot=ARTIFACT_LOCALROOT,
-            external_client=self.s3_client,
-        ) as s3:
-            results = s3.list_paths(paths)
-            return [
-                self.list_content_result(
-                    path=o.url[strip_prefix_len:], is_file=o.exists
+        mode = plan_transfer(len(paths))
+        with self._transfers() as transfers:
+            if mode == TRANSFER_S3OP:
+                listing = ((o.url, o.exists) for o in transfers.s3.list_paths(paths))
+            else:
+                listing = (
+                    entry
+                    for entries in transfers.map(transfers.list_path, paths, mode)
+                    for entry in entries
                 )
-                for o in results
+            return [
+                self.list_content_result(path=url[strip_prefix_len:], is_file=is_file)
+                for url, is_file in listing
             ]
 
+    @handle_executor_exceptions
     def save_bytes(self, path_and_bytes_iter, overwrite=False, len_hint=0):
-        def _convert():
-            # Output format is the same as what is needed for S3PutObject:
-            # key, value, path, content_type, encryption, metadata
-            for path, obj in path_and_bytes_iter:
-                if isinstance(obj, tuple):
-                    yield path, obj[0], None, None, None, obj[1]
+        # Output format is the same as what is needed for S3PutObject:
+        # key, value, path, content_type, encryption, metadata
+        to_save = (
+            (
+                (path, obj[0], None, None, None, obj[1])
+                if isinstance(obj, tuple)
+                else (path, obj, None, None, None, None)
+            )
+            for path, obj in path_and_bytes_iter
+        )
+
+        with self._transfers() as transfers:
+
+            def _put(args):
+                key, obj, _, _, _, metadata = args
+                return transfers.s3.put(
+                    key, obj, overwrite=overwrite, metadata=metadata
+                )
+
+            # Each batch is planned from both the number and the size of its
+            # objects, and uploaded, before the next one is read.
+            for objects, sizes in _iter_upload_batches(to_save):
+                large, batch, mode = plan_upload(sizes)
+                for idx in large:
+                    _put(objects[idx])
+                if mode == TRANSFER_S3OP:
+                    transfers.s3.put_many(
+                        starmap(S3PutObject, (objects[idx] for idx in batch)),
+                        overwrite,
+                    )
                 else:
-                    yield path, obj, None, None, None, None
-
-        with S3(
-            s3root=self.datastore_root,
-            tmproot=ARTIFACT_LOCALROOT,
-            external_client=self.s3_client,
-        ) as s3:
-            # HACK: The S3 datatools we rely on does not currently do a good job
-            # determining if uploading things in parallel is more efficient than
-            # serially. We use a heuristic for now where if we have a lot of
-            # files, we will go in parallel and if we have few files, we will
-            # serially upload them. This is not ideal because there is also a size
-            # factor and one very large file with a few other small files, for
-            # example, would benefit from a parallel upload.
-            #
-            # In the case of save_artifacts, currently len_hint is based on the
-            # total number of artifacts, not taking into account how many of them
-            # already exist in the CAS, i.e. it can be a gross overestimate. As a
-            # result, it is possible we take a latency hit by using put_many only
-            # for a few artifacts.
-            #
-            # A better approach would be to e.g. write all blobs to temp files
-            # and based on the total size and number of files use either put_files
-            # (which avoids re-writing the files) or s3.put sequentially.
-            if len_hint > 10:
-                # Use put_many
-                s3.put_many(starmap(S3PutObject, _convert()), overwrite)
-            else:
-                # Sequential upload
-                for key, obj, _, _, _, metadata in _convert():
-                    s3.put(key, obj, overwrite=overwrite, metadata=metadata)
+                    for _ in transfers.map(_put, [objects[idx] for idx in batch], mode):
+                        pass
 
+    @handle_executor_exceptions
     def load_bytes(self, paths):
         if len(paths) == 0:
             return CloseAfterUse(iter([]))
 
-        s3 = S3(
-            s3root=self.datastore_root,
-            tmproot=ARTIFACT_LOCALROOT,
-            external_client=self.s3_client,
-        )
+        # The size of the objects is not known upfront. A single large object
+        # is downloaded with multipart ranged requests by S3.get.
+        mode = plan_transfer(len(paths))
+        shared = S3_STORAGE_SESSION
+        if shared:
+            transfers = _S3StorageSession.get(self.datastore_root)
+        else:
+            transfers = _S3Transfers(
+                S3(
+                    s3root=self.datastore_root,
+                    tmproot=ARTIFACT_LOCALROOT,
+                    external_client=self.s3_client,
+                )
+            )
+        downloaded = []
+
+        class _Closer(object):
+            @staticmethod
+            def close():
+                if not shared:
+                    transfers.close()
+                    return
+                # The files are downloaded to the temporary directory of the
+                # session so only the ones of this call are removed.
+                while downloaded:
+                    try:
+                        os.unlink(downloaded.pop())
+                    except OSError:
+                        pass
 
         def iter_results():
-            # We similarly do things in parallel for many files. This is again
-            # a hack.
-            if len(paths) > 10:
-                results = s3.get_many(paths, return_missing=True, return_info=True)
-                for r in results:
-                    if r.exists:
-                        yield r.key, r.path, r.metadata
-                    else:
-                        yield r.key, None, None
+            if mode == TRANSFER_S3OP:
+                results = transfers.s3.get_many(
+                    paths, return_missing=True, return_info=True
+                )
             else:
-                for p in paths:
-                    r = s3.get(p, return_missing=True, return_info=True)
-                    if r.exists:
-                        yield r.key, r.path, r.metadata
-                    else:
-                        yield r.key, None, None
-
-        return CloseAfterUse(iter_results(), closer=s3)
+                results = transfers.map(
+                    partial(transfers.s3.get, return_missing=True, return_info=True),
+                    paths,
+                    mode,
+                )
+            for r in results:
+                if r.exists:
+                    downloaded.append(r.path)
+                    yield r.key, r.path, r.metadata
+                else:
+                    yield r.key, None, None
+
+        return CloseAfterUse(iter_results(), closer=_Closer)
@@ -0,0 +1,94 @@
+import pickle
+
+from metaflow.datastore.artifacts.serializer import (
+    ArtifactSerializer,
+    SerializationFormat,
+    SerializationMetadata,
+    SerializedBlob,
+)
+
+# Top-level modules whose objects export their data through PickleBuffer when
+# pickled with protocol 5
+_OOB_MODULES = frozenset(["numpy", "pandas", "pyarrow"])
+
+
+class PickleOOBSerializer(ArtifactSerializer):
+    """
+    Serializer using pickle protocol 5 with out-of-band buffers.
+
+    Large buffers (NumPy arrays, pandas and Arrow columns, ...) are not copied
+    into the pickle stream; each one is returned as an additional blob that
+    the datastore stores as its own object. When loading, these buffers are
+    handed back to ``pickle.loads`` which rebuilds the objects on top of them
+    without copying (the client passes memory-mapped files from its cache).
+
+    This serializer is only used if DATASTORE_PICKLE_OOB is set and only for
+    objects from modules known to support out-of-band buffers; everything
+    else falls through to PickleSerializer.
+    """
+
+    TYPE = "pickle_oob"
+    PRIORITY = 9000
+
+    _ENCODING = "pickle-v5-oob"
+
+    @classmethod
+    def can_serialize(cls, obj):
+        from metaflow.metaflow_config import DATASTORE_PICKLE_OOB
+
+        if not DATASTORE_PICKLE_OOB or pickle.HIGHEST_PROTOCOL < 5:
+            return False
+        return type(obj).__module__.split(".", 1)[0] in _OOB_MODULES
+
+    @classmethod
+    def can_deserialize(cls, metadata):
+        return metadata.encoding == cls._ENCODING
+
+    @classmethod
+    def serialize(cls, obj, format=SerializationFormat.STORAGE):
+        from metaflow.metaflow_config import DATASTORE_PICKLE_OOB_MIN_BUFFER_SIZE
+
+        if format == SerializationFormat.WIRE:
+            raise NotImplementedError(
+                "PickleOOBSerializer does not support the WIRE format."
+            )
+        min_size = int(DATASTORE_PICKLE_OOB_MIN_BUFFER_SIZE)
+        buffers = []
+
+        def _buffer_callback(buf):
+            view = buf.raw()
+            if view.nbytes < min_size:
+                # Small buffers are kept in-band
+                return True
+            buffers.append(view)
+            return False
+
+        try:
+            blob = pickle.dumps(obj, protocol=5, buffer_callback=_buffer_callback)
+        except TypeError as e:
+            from metaflow.datastore.exceptions import UnpicklableArtifactException
+
+            raise UnpicklableArtifactException() from e
+        return (
+            [SerializedBlob(blob, is_reference=False)]
+            + [SerializedBlob(view, is_reference=False) for view in buffers],
+            SerializationMetadata(
+                obj_type=str(type(obj)),
+                size=len(blob) + sum(view.nbytes for view in buffers),
+                encoding=cls._ENCODING,
+                serializer_info={"num_buffers": len(buffers)},
+            ),
+        )
+
+    @classmethod
+    def deserialize(cls, data, metadata=None, format=SerializationFormat.STORAGE):
+        if format == SerializationFormat.WIRE:
+            raise NotImplementedError(
+                "PickleOOBSerializer does not support the WIRE format."
+            )
+        # Objects are rebuilt on top of the buffers; make sure they are
+        # writable like the objects that were saved (bytes are read-only).
+        buffers = [
+            bytearray(buf) if isinstance(buf, bytes) else buf for buf in data[1:]
+        ]
+        return pickle.loads(data[0], buffers=buffers)
@@ -1,4 +1,5 @@
 import os
+import shutil
 
 from metaflow.exception import MetaflowException
 from metaflow.metaflow_config import DATATOOLS_LOCALROOT, DATATOOLS_SUFFIX
@@ -140,7 +141,10 @@ class Local(object):
         if overwrite or (not os.path.exists(p)):
             Local._makedirs(os.path.dirname(p))
             with open(p, "wb") as f:
-                f.write(obj)
+                if hasattr(obj, "read"):
+                    shutil.copyfileobj(obj, f)
+                else:
+                    f.write(obj)
         return "local://%s" % p
 
     def info(self, key=None, return_missing=False):
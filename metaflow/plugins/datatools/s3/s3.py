@@ -1388,6 +1388,8 @@ class S3(object):
                 from . import s3op
 
                 error_code = s3op.normalize_client_error(err)
+                if tmp and error_code in (404, 403, 416, "NoSuchBucket"):
+                    os.unlink(tmp.name)
                 if error_code == 404:
                     raise MetaflowS3NotFound(url)
                 elif error_code == 403:
@@ -71,7 +71,10 @@ class GS(object):
     def put(self, key, obj, overwrite=True):
         """Key MUST be a fully qualified path.  gs://<bucket_name>/b/l/o/b/n/a/m/e"""
         storage, subpath = self._get_storage_backend_and_subpath(key)
-        storage.save_bytes([(subpath, io.BytesIO(obj))], overwrite=overwrite)
+        storage.save_bytes(
+            [(subpath, obj if hasattr(obj, "read") else io.BytesIO(obj))],
+            overwrite=overwrite,
+        )
         return key
 
     def info(self, key=None, return_missing=False):
@@ -33,6 +33,7 @@ from metaflow.metaflow_config import (
     GCP_SECRET_MANAGER_PREFIX,
     KUBERNETES_FETCH_EC2_METADATA,
     KUBERNETES_SANDBOX_INIT_SCRIPT,
+    KUBERNETES_SHARED_WATCH,
     OTEL_ENDPOINT,
     OTEL_SERVICE_NAME,
     S3_ENDPOINT_URL,
@@ -53,6 +54,7 @@ from metaflow.mflog import (
 
 from .kube_utils import KubernetesException
 from .kubernetes_client import KubernetesClient
+from .kubernetes_watch import WATCH_POLL_INTERVAL, run_labels
 
 # Redirect structured logs to $PWD/.logs/
 LOGS_DIR = "$PWD/.logs"
@@ -155,6 +157,8 @@ class Kubernetes(object):
             kwargs.pop("num_parallel", None)
             kwargs["name_pattern"] = "t-{uid}-".format(uid=str(uuid4())[:8])
             self._job = self.create_job_object(**kwargs).create().execute()
+            if KUBERNETES_SHARED_WATCH:
+                self._job.watch_run(kwargs["flow_name"], kwargs["run_id"])
 
     def create_jobset(
         self,
@@ -666,6 +670,9 @@ class Kubernetes(object):
             "app.kubernetes.io/name": "metaflow-task",
             "app.kubernetes.io/part-of": "metaflow",
         }
+        if KUBERNETES_SHARED_WATCH:
+            # The watch of the run only follows the jobs labelled with its ID
+            system_labels.update(run_labels(run_id) or {})
         for name, value in system_labels.items():
             job.label(name, value)
 
@@ -725,7 +732,11 @@ class Kubernetes(object):
                         job_id=job.id,
                     )
                     t = time.time()
-                time.sleep(update_delay(time.time() - start_time))
+                delay = update_delay(time.time() - start_time)
+                if getattr(job, "is_watched", False):
+                    # Reading the state published by the watch is cheap
+                    delay = min(delay, WATCH_POLL_INTERVAL)
+                time.sleep(delay)
 
         prefix = lambda: b"[%s] " % util.to_bytes(self._job.id)
 
@@ -16,6 +16,7 @@ DELETE_JOB_PROPAGATION_POLICY = "Background"
 DELETE_JOB_TERMINATION_MODE = "delete"
 
 from .kube_utils import qos_requests_and_limits
+from .kubernetes_watch import KubernetesRunWatch
 from .kubernetes_jobsets import (
     KubernetesJobSet,
 )  # We need this import for Kubernetes Client.
@@ -434,6 +435,7 @@ class RunningJob(object):
         self._pod_name = None
         self._id = uid
         self._namespace = namespace
+        self._watch = None
 
         self._job = self._fetch_job()
         self._pod = self._fetch_pod()
@@ -453,8 +455,27 @@ class RunningJob(object):
             self.__class__.__name__, self._namespace, self._name
         )
 
-    @k8s_retry()
+    def watch_run(self, flow_name, run_id):
+        # Follow the state of the job, and of its pod, through the watch shared
+        # by all the jobs of the run instead of polling the API server.
+        self._watch = KubernetesRunWatch.get(
+            self._client, self._namespace, flow_name, run_id
+        )
+        return self
+
+    @property
+    def is_watched(self):
+        return self._watch is not None
+
     def _fetch_job(self):
+        if self._watch is not None:
+            job = self._watch.job(self._name)
+            if job is not None:
+                return job
+        return self._read_job()
+
+    @k8s_retry()
+    def _read_job(self):
         client = self._client.get()
         try:
             return (
@@ -469,8 +490,15 @@ class RunningJob(object):
                 )
             raise
 
-    @k8s_retry()
     def _fetch_pod(self):
+        if self._watch is not None:
+            pod = self._watch.pod(self._name)
+            if pod is not None:
+                return pod
+        return self._read_pod()
+
+    @k8s_retry()
+    def _read_pod(self):
         # Fetch pod metadata.
         client = self._client.get()
         pods = (
@@ -0,0 +1,387 @@
+"""
+Watch of the Kubernetes jobs and pods of a run, shared by all the local processes
+waiting on the jobs of the run.
+
+Each `kubernetes step` process waits on its own job. Instead of every process
+polling the API server for the state of its job and of its pod, one of them -- the
+leader, which holds an exclusive lock on a file -- watches the jobs and the pods
+of the run and publishes their latest state in a local directory, one file per
+job and per pod. The other processes read the state of their job from there.
+When the leader exits, its lock is released and the next process to read a state
+takes over. The last process to stop using the directory removes it.
+
+Only the jobs and pods labelled with the ID of the run are listed and watched,
+so the jobs of other runs in the namespace are not pulled in.
+
+The published state is only used while it is fresh: the leader refreshes it at
+least every WATCH_TIMEOUT_SECONDS. Otherwise -- and for the jobs the watch has
+not seen yet -- the processes fall back to querying the API server.
+"""
+
+import atexit
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import threading
+import time
+
+try:
+    import fcntl
+except ImportError:
+    # Not available on Windows
+    fcntl = None
+
+from .kube_utils import KubernetesException, validate_kube_labels
+
+
+# All the jobs, and pods, launched by Metaflow carry this label. The ones followed
+# by a watch also carry the ID of their run (RUN_ID_LABEL) which is part of the
+# label selector of the watch; jobs of other flows with the same run ID are
+# filtered out based on their annotations.
+WATCH_LABEL_SELECTOR = "app.kubernetes.io/name=metaflow-task"
+RUN_ID_LABEL = "metaflow/run_id"
+
+# Duration of each watch request; the published state is refreshed at least
+# this often.
+WATCH_TIMEOUT_SECONDS = 30
+
+# The published state is not used if it was not refreshed for this long.
+WATCH_STALE_SECONDS = 3 * WATCH_TIMEOUT_SECONDS
+
+# How often to check the published state of a job waiting to start
+WATCH_POLL_INTERVAL = 1.0
+
+JOBS = "jobs"
+PODS = "pods"
+
+
+def run_labels(run_id):
+    """
+    Returns the labels through which the watch of a run finds the jobs of the
+    run, None if the run cannot be watched (its ID is not a valid label value).
+    """
+    labels = {RUN_ID_LABEL: str(run_id)}
+    try:
+        validate_kube_labels(labels)
+    except KubernetesException:
+        return None
+    return labels
+
+
+def _is_job_done(job):
+    status = job.get("status") or {}
+    return bool(status.get("succeeded")) or bool(status.get("failed"))
+
+
+class KubernetesRunWatch(object):
+    """
+    Shared watch of the jobs and pods of a run.
+
+    Parameters
+    ----------
+    client : KubernetesClient
+        Client used to watch the API server
+    namespace : str
+        Namespace of the jobs
+    flow_name : str
+        Name of the flow
+    run_id : str
+        ID of the run
+    root : str, optional, default None
+        Directory in which the state is published. Defaults to the temporary
+        directory of the system.
+    """
+
+    _watches = {}
+    _lock = threading.Lock()
+
+    def __init__(self, client, namespace, flow_name, run_id, root=None):
+        self._client = client
+        self._namespace = namespace
+        self._flow_name = flow_name
+        self._run_id = str(run_id)
+        key = hashlib.sha1(
+            "/".join([namespace, flow_name, self._run_id]).encode("utf-8")
+        ).hexdigest()
+        self._label_selector = "%s,%s=%s" % (
+            WATCH_LABEL_SELECTOR,
+            RUN_ID_LABEL,
+            self._run_id,
+        )
+        self._dir = os.path.join(
+            root or tempfile.gettempdir(), "metaflow-kubernetes-watch", key
+        )
+        self._users_file = self._join()
+        for kind in (JOBS, PODS):
+            os.makedirs(os.path.join(self._dir, kind), exist_ok=True)
+        self._lock_file = open(os.path.join(self._dir, "leader.lock"), "a")
+        self._is_leader = False
+        self._stopped = threading.Event()
+        self._threads = []
+
+    @classmethod
+    def get(cls, client, namespace, flow_name, run_id):
+        """
+        Returns the watch of a run, None if watches cannot be shared on this
+        platform.
+        """
+        if fcntl is None or run_labels(run_id) is None:
+            return None
+        key = (namespace, flow_name, str(run_id))
+        with cls._lock:
+            watch = cls._watches.get(key)
+            if watch is None:
+                watch = cls._watches[key] = cls(client, namespace, flow_name, run_id)
+            return watch
+
+    @classmethod
+    def close_all(cls):
+        # The watching threads are not waited for since they may be in the
+        # middle of a watch request.
+        with cls._lock:
+            for watch in cls._watches.values():
+                watch.close(wait=False)
+            cls._watches.clear()
+
+    @property
+    def is_leader(self):
+        return self._is_leader
+
+    def job(self, name):
+        """
+        Returns the latest state of a job, as returned by `V1Job.to_dict()`, or
+        None if it is not known.
+        """
+        if not self.is_fresh():
+            return None
+        return self._read(JOBS, name)
+
+    def pod(self, job_name):
+        """
+        Returns the latest state of the pod of a job, as returned by
+        `V1Pod.to_dict()`, {} if the job has no pod yet or None if it is not
+        known.
+        """
+        if not self.is_fresh():
+            return None
+        pod = self._read(PODS, job_name)
+        if pod is not None:
+            return pod
+        job = self._read(JOBS, job_name)
+        if job is None or _is_job_done(job):
+            # The pod of a finished job may just not have been seen yet
+            return None
+        return {}
+
+    def is_fresh(self):
+        """
+        Returns True if the published state is being kept up to date.
+        """
+        self._try_to_lead()
+        now = time.time()
+        for kind in (JOBS, PODS):
+            try:
+                refreshed = os.path.getmtime(self._heartbeat_path(kind))
+            except OSError:
+                return False
+            if now - refreshed > WATCH_STALE_SECONDS:
+                return False
+        return True
+
+    def close(self, wait=True):
+        """
+        Stops watching, if this process is the leader, and lets another process
+        take over. The published state is removed if no other process uses it.
+
+        Parameters
+        ----------
+        wait : bool, optional, default True
+            Wait for the watching threads to stop
+        """
+        if self._stopped.is_set():
+            return
+        self._stopped.set()
+        if wait:
+            for thread in self._threads:
+                thread.join()
+        self._threads = []
+        if self._is_leader:
+            fcntl.flock(self._lock_file, fcntl.LOCK_UN)
+            self._is_leader = False
+        self._lock_file.close()
+        self._leave()
+
+    def _join(self):
+        # Registers this process as a user of the state directory by holding a
+        # shared lock on a file in it. If the directory was removed while we
+        # were waiting for the lock, we start over with a new one.
+        users_path = os.path.join(self._dir, "users.lock")
+        while True:
+            os.makedirs(self._dir, exist_ok=True)
+            users_file = open(users_path, "a")
+            fcntl.flock(users_file, fcntl.LOCK_SH)
+            try:
+                if os.path.samestat(os.fstat(users_file.fileno()), os.stat(users_path)):
+                    return users_file
+            except OSError:
+                pass
+            users_file.close()
+
+    def _leave(self):
+        # The last user removes the directory. It is first moved out of the way
+        # so that a process joining in the meantime starts with a new one. The
+        # shared lock is released first: if several users leave at the same
+        # time, the last one to try gets the exclusive lock.
+        fcntl.flock(self._users_file, fcntl.LOCK_UN)
+        try:
+            fcntl.flock(self._users_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            # Other processes still use the directory
+            self._users_file.close()
+            return
+        removed = "%s.%d.removed" % (self._dir, os.getpid())
+        try:
+            os.rename(self._dir, removed)
+        except OSError:
+            pass
+        else:
+            shutil.rmtree(removed, ignore_errors=True)
+        finally:
+            self._users_file.close()
+
+    def _try_to_lead(self):
+        if self._is_leader or self._stopped.is_set():
+            return
+        try:
+            fcntl.flock(self._lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            # Another process is watching
+            return
+        self._is_leader = True
+        for kind in (JOBS, PODS):
+            thread = threading.Thread(target=self._watch, args=(kind,), daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def _heartbeat_path(self, kind):
+        return os.path.join(self._dir, "%s.heartbeat" % kind)
+
+    def _path(self, kind, name):
+        return os.path.join(self._dir, kind, "%s.json" % name)
+
+    def _read(self, kind, name):
+        try:
+            with open(self._path(kind, name), "r") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def _heartbeat(self, kind):
+        with open(self._heartbeat_path(kind), "a"):
+            pass
+        os.utime(self._heartbeat_path(kind), None)
+
+    def _publish(self, kind, event_type, obj):
+        metadata = obj.get("metadata") or {}
+        annotations = metadata.get("annotations") or {}
+        if (
+            annotations.get("metaflow/flow_name") != self._flow_name
+            or annotations.get("metaflow/run_id") != self._run_id
+        ):
+            return
+        if kind == JOBS:
+            name = metadata.get("name")
+        else:
+            name = (metadata.get("labels") or {}).get("job-name")
+        if not name:
+            return
+        path = self._path(kind, name)
+        if event_type == "DELETED":
+            try:
+                os.unlink(path)
+            except OSError:
+                pass
+            return
+        # Readers only ever see complete states
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w") as f:
+                json.dump(obj, f, default=str)
+            os.replace(tmp_path, path)
+        except Exception:
+            try:
+                os.unlink(tmp_path)
+            except OSError:
+                pass
+            raise
+
+    def _list_func(self, kind):
+        client = self._client.get()
+        if kind == JOBS:
+            return client, client.BatchV1Api().list_namespaced_job
+        return client, client.CoreV1Api().list_namespaced_pod
+
+    def _list(self, kind):
+        # Publishes the current state of all the objects; returns the version
+        # to watch from.
+        _, list_func = self._list_func(kind)
+        _continue = None
+        while True:
+            result = list_func(
+                namespace=self._namespace,
+                label_selector=self._label_selector,
+                limit=1000,
+                _continue=_continue,
+            )
+            for item in result.items:
+                self._publish(kind, "ADDED", item.to_dict())
+            _continue = result.metadata._continue
+            if not _continue:
+                return result.metadata.resource_version
+
+    def _watch(self, kind):
+        from kubernetes import watch
+
+        backoff = 1
+        while not self._stopped.is_set():
+            try:
+                resource_version = self._list(kind)
+                self._heartbeat(kind)
+                while not self._stopped.is_set():
+                    client, list_func = self._list_func(kind)
+                    stream = watch.Watch()
+                    for event in stream.stream(
+                        list_func,
+                        namespace=self._namespace,
+                        label_selector=self._label_selector,
+                        resource_version=resource_version,
+                        timeout_seconds=WATCH_TIMEOUT_SECONDS,
+                    ):
+                        if event["type"] == "ERROR":
+                            raise client.rest.ApiException(
+                                status=(event["raw_object"] or {}).get("code"),
+                                reason="Watch error",
+                            )
+                        if event["type"] != "BOOKMARK":
+                            self._publish(
+                                kind, event["type"], event["object"].to_dict()
+                            )
+                        if stream.resource_version:
+                            resource_version = stream.resource_version
+                        self._heartbeat(kind)
+                        if self._stopped.is_set():
+                            stream.stop()
+                    self._heartbeat(kind)
+                    backoff = 1
+            except Exception:
+                # The watch expired (410 Gone) or the API server could not be
+                # reached: list the objects again, after a while. The state is
+                # not refreshed in the meantime so that readers fall back to
+                # the API server if this lasts.
+                self._stopped.wait(backoff)
+                backoff = min(2 * backoff, WATCH_TIMEOUT_SECONDS)
+
+
+atexit.register(KubernetesRunWatch.close_all)
@@ -11,10 +11,12 @@ from typing import List
 
 from metaflow.exception import MetaflowInternalError, MetaflowTaggingError
 from metaflow.metadata_provider.metadata import ObjectOrder
-from metaflow.metaflow_config import DATASTORE_LOCAL_DIR
+from metaflow.metaflow_config import DATASTORE_LOCAL_DIR, LOCAL_METADATA_INDEX
 from metaflow.metadata_provider import MetadataProvider
 from metaflow.tagging_util import MAX_USER_TAG_SET_SIZE, validate_tags
 
+from .local_index import RunMetadataIndex
+
 
 class LocalMetadataProvider(MetadataProvider):
     TYPE = "local"
@@ -115,7 +117,9 @@ class LocalMetadataProvider(MetadataProvider):
             run_id, step_name, task_id, attempt_id, artifacts
         )
         artdict = {"%d_artifact_%s" % (attempt_id, art["name"]): art for art in artlist}
+        mtime_before = os.stat(meta_dir).st_mtime_ns
         self._save_meta(meta_dir, artdict)
+        self._index_task_metadata(run_id, step_name, task_id, meta_dir, mtime_before)
 
     def register_metadata(self, run_id, step_name, task_id, metadata):
         meta_dir = self.__class__._create_and_get_metadir(
@@ -126,7 +130,57 @@ class LocalMetadataProvider(MetadataProvider):
         metadict = {
             "sysmeta_%s_%d" % (meta["field_name"], ts): meta for meta in metalist
         }
+        mtime_before = os.stat(meta_dir).st_mtime_ns
         self._save_meta(meta_dir, metadict)
+        self._index_task_metadata(
+            run_id,
+            step_name,
+            task_id,
+            meta_dir,
+            mtime_before,
+            [
+                (name, meta["field_name"], meta.get("value", ""))
+                for name, meta in metadict.items()
+            ],
+        )
+
+    def _index_task_metadata(
+        self, run_id, step_name, task_id, meta_dir, mtime_before, rows=()
+    ):
+        # The index is best effort: tasks it does not know about are read from
+        # their metadata files when filtering.
+        index = self.__class__._open_run_index(self._flow_name, run_id)
+        if index is None:
+            return
+        with index:
+            index.add(
+                step_name,
+                task_id,
+                meta_dir,
+                mtime_before,
+                os.stat(meta_dir).st_mtime_ns,
+                rows,
+            )
+
+    @classmethod
+    def _open_run_index(cls, flow_name, run_id):
+        if not LOCAL_METADATA_INDEX:
+            return None
+        return RunMetadataIndex.open(cls._get_metadir(flow_name, run_id))
+
+    @classmethod
+    def _get_task_metadirs(cls, flow_name, run_id, step_name):
+        storage_class = cls._get_storage_class()
+        step_path = cls._make_path(flow_name, run_id, step_name, create_on_absent=False)
+        task_metadirs = {}
+        if step_path is None or not os.path.isdir(step_path):
+            return task_metadirs
+        with os.scandir(step_path) as entries:
+            for entry in entries:
+                meta_dir = os.path.join(entry.path, storage_class.METADATA_DIR)
+                if os.path.isfile(os.path.join(meta_dir, "_self.json")):
+                    task_metadirs[entry.name] = meta_dir
+        return task_metadirs
 
     @classmethod
     def _mutate_user_tags_for_run(
@@ -236,11 +290,27 @@ class LocalMetadataProvider(MetadataProvider):
         List[str]
             List of task pathspecs that match the query criteria
         """
+        regex = re.compile(pattern)
+        if pattern != ".*":
+            index = cls._open_run_index(flow_name, run_id)
+            if index is not None:
+                with index:
+                    task_metadirs = cls._get_task_metadirs(flow_name, run_id, step_name)
+                    values = index.filter(step_name, task_metadirs, field_name)
+                if values is not None:
+                    matching = set(
+                        task_id for task_id, value in values if regex.match(value)
+                    )
+                    return [
+                        f"{flow_name}/{run_id}/{step_name}/{task_id}"
+                        for task_id in task_metadirs
+                        if task_id in matching
+                    ]
+
         tasks = cls.get_object("step", "task", {}, None, flow_name, run_id, step_name)
         if not tasks:
             return []
 
-        regex = re.compile(pattern)
         matching_task_pathspecs = []
 
         for task in tasks:
@@ -447,6 +517,58 @@ class LocalMetadataProvider(MetadataProvider):
 
         return MetadataProvider._apply_filter(result, filters)
 
+    @classmethod
+    def _iter_objects_internal(
+        cls, obj_type, obj_order, sub_type, sub_order, filters, page_size, *args
+    ):
+        # Objects are ordered by the modification time of their _self.json which
+        # is written when they are created (and, for runs, when their tags
+        # change, which also updates their ts_epoch). Only that file needs to be
+        # stat'ed upfront; the objects are read page by page.
+        obj_path = cls._make_path(*args[:obj_order], create_on_absent=False)
+        if obj_path is None:
+            return
+        skip_dirs = "*/" * (sub_order - obj_order)
+        storage_class = cls._get_storage_class()
+        all_meta = os.path.join(obj_path, skip_dirs, storage_class.METADATA_DIR)
+        self_files = []
+        for meta_path in glob.iglob(all_meta):
+            self_file = os.path.join(meta_path, "_self.json")
+            try:
+                self_files.append((os.path.getmtime(self_file), self_file))
+            except OSError:
+                continue
+        self_files.sort(reverse=True)
+
+        RUN_ORDER = ObjectOrder.type_to_order("run")
+        run_tags = {}
+        for start in range(0, len(self_files), page_size):
+            page = []
+            for _, self_file in self_files[start : start + page_size]:
+                obj = cls._read_json_file(self_file)
+                if sub_type in ("step", "task"):
+                    run_id = cls._deduce_run_id_from_meta_dir(
+                        os.path.dirname(self_file), sub_type
+                    )
+                    if obj_order >= RUN_ORDER and run_id != args[RUN_ORDER - 1]:
+                        raise MetaflowInternalError(
+                            msg="Unexpected run id %s deduced from meta path" % run_id
+                        )
+                    # All the steps and tasks of a run share its tags
+                    if run_id not in run_tags:
+                        run = cls.get_object("run", "self", {}, None, args[0], run_id)
+                        if not run:
+                            raise MetaflowInternalError(
+                                msg="Could not find run %s, %s" % (args[0], run_id)
+                            )
+                        run_tags[run_id] = (
+                            run.get("tags", []),
+                            run.get("system_tags", []),
+                        )
+                    obj["tags"], obj["system_tags"] = run_tags[run_id]
+                page.append(obj)
+            yield MetadataProvider._apply_filter(page, filters)
+
     @classmethod
     def _deduce_run_id_from_meta_dir(cls, meta_dir_path, sub_type):
         curr_order = ObjectOrder.type_to_order(sub_type)
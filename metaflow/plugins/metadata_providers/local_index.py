@@ -0,0 +1,230 @@
+import json
+import os
+from contextlib import contextmanager
+
+try:
+    import sqlite3
+except ImportError:
+    # Some Python builds do not ship with sqlite3; the local metadata provider
+    # reads the metadata files directly in that case.
+    sqlite3 = None
+
+# Name of the index database, stored in the metadata directory of the run
+INDEX_FILE = "_metadata_index.sqlite3"
+
+
+def _read_task_metadata(task_meta_dir):
+    rows = []
+    with os.scandir(task_meta_dir) as entries:
+        for entry in entries:
+            if entry.name.startswith("sysmeta_") and entry.name.endswith(".json"):
+                with open(entry.path, "r") as f:
+                    meta = json.load(f)
+                rows.append(
+                    (entry.name[:-5], meta.get("field_name"), meta.get("value", ""))
+                )
+    return rows
+
+
+def _mtime(path):
+    return os.stat(path).st_mtime_ns
+
+
+class RunMetadataIndex(object):
+    """
+    Index of the metadata of all the tasks of a run, stored in a single SQLite
+    database in the metadata directory of the run.
+
+    The metadata files remain the source of truth. For each task, the index
+    records the modification time of the metadata directory of the task as of
+    when it was indexed; a task whose directory changed since (metadata synced
+    from a remote datastore, written by an older version of Metaflow or while
+    the index was locked, etc.) is indexed again from its files when queried.
+
+    None of the methods raise: errors are reported by returning None (or
+    False) so that callers can fall back to reading the metadata files.
+    """
+
+    SCHEMA = """
+    CREATE TABLE IF NOT EXISTS tasks (
+        step TEXT NOT NULL,
+        task_id TEXT NOT NULL,
+        mtime INTEGER NOT NULL,
+        PRIMARY KEY (step, task_id)
+    );
+    CREATE TABLE IF NOT EXISTS metadata (
+        step TEXT NOT NULL,
+        task_id TEXT NOT NULL,
+        name TEXT NOT NULL,
+        field_name TEXT,
+        value TEXT,
+        PRIMARY KEY (step, task_id, name)
+    );
+    CREATE INDEX IF NOT EXISTS metadata_field ON metadata (step, field_name);
+    """
+
+    def __init__(self, run_meta_dir, timeout=30):
+        conn = sqlite3.connect(
+            os.path.join(run_meta_dir, INDEX_FILE),
+            timeout=timeout,
+            isolation_level=None,
+        )
+        try:
+            # Avoid taking the write lock when the schema already exists.
+            # executescript commits any pending transaction so the schema is
+            # created in a transaction of its own.
+            if not conn.execute(
+                "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'metadata'"
+            ).fetchone():
+                conn.executescript("BEGIN IMMEDIATE;%sCOMMIT;" % self.SCHEMA)
+        except sqlite3.Error:
+            if conn.in_transaction:
+                conn.execute("ROLLBACK")
+            conn.close()
+            raise
+        self._conn = conn
+
+    @classmethod
+    def open(cls, run_meta_dir):
+        if sqlite3 is None or run_meta_dir is None:
+            return None
+        try:
+            return cls(run_meta_dir)
+        except sqlite3.Error:
+            return None
+
+    def close(self):
+        self._conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    @contextmanager
+    def _transaction(self):
+        # Take the write lock upfront so that concurrent writers wait on the
+        # busy timeout instead of failing on a lock upgrade.
+        self._conn.execute("BEGIN IMMEDIATE")
+        try:
+            yield self._conn
+        except BaseException:
+            self._conn.execute("ROLLBACK")
+            raise
+        self._conn.execute("COMMIT")
+
+    def _reindex(self, conn, step, task_id, task_meta_dir):
+        # The modification time is read first: a file written while we are
+        # reading the directory makes the task stale again.
+        mtime = _mtime(task_meta_dir)
+        rows = _read_task_metadata(task_meta_dir)
+        conn.execute(
+            "DELETE FROM metadata WHERE step = ? AND task_id = ?", (step, task_id)
+        )
+        conn.executemany(
+            "INSERT INTO metadata (step, task_id, name, field_name, value) "
+            "VALUES (?, ?, ?, ?, ?)",
+            ((step, task_id) + row for row in rows),
+        )
+        conn.execute(
+            "INSERT OR REPLACE INTO tasks (step, task_id, mtime) VALUES (?, ?, ?)",
+            (step, task_id, mtime),
+        )
+
+    def add(self, step, task_id, task_meta_dir, mtime_before, mtime_after, rows=()):
+        """
+        Records that files were written to the metadata directory of a task.
+
+        Parameters
+        ----------
+        step : str
+            Name of the step of the task
+        task_id : str
+            ID of the task
+        task_meta_dir : str
+            Metadata directory of the task
+        mtime_before : int
+            Modification time of task_meta_dir before the files were written
+        mtime_after : int
+            Modification time of task_meta_dir after the files were written
+        rows : Iterable[Tuple[str, str, str]]
+            (name, field_name, value) of the metadata files which were written
+
+        Returns
+        -------
+        bool
+            True if the index was updated
+        """
+        try:
+            with self._transaction() as conn:
+                recorded = conn.execute(
+                    "SELECT mtime FROM tasks WHERE step = ? AND task_id = ?",
+                    (step, task_id),
+                ).fetchone()
+                if recorded is None or recorded[0] != mtime_before:
+                    # We do not know what else is in the directory
+                    self._reindex(conn, step, task_id, task_meta_dir)
+                    return True
+                conn.executemany(
+                    "INSERT OR IGNORE INTO metadata "
+                    "(step, task_id, name, field_name, value) VALUES (?, ?, ?, ?, ?)",
+                    ((step, task_id) + tuple(row) for row in rows),
+                )
+                conn.execute(
+                    "UPDATE tasks SET mtime = ? WHERE step = ? AND task_id = ?",
+                    (mtime_after, step, task_id),
+                )
+            return True
+        except (sqlite3.Error, OSError, ValueError):
+            return False
+
+    def filter(self, step, task_meta_dirs, field_name):
+        """
+        Returns the values of a metadata field for the given tasks of a step.
+
+        Parameters
+        ----------
+        step : str
+            Name of the step
+        task_meta_dirs : Dict[str, str]
+            Metadata directory of each task to consider, keyed by task ID
+        field_name : str
+            Name of the metadata field
+
+        Returns
+        -------
+        List[Tuple[str, str]]
+            (task_id, value) for each metadata entry of the field, or None if
+            the index could not be used
+        """
+        try:
+            mtimes = {
+                task_id: _mtime(meta_dir)
+                for task_id, meta_dir in task_meta_dirs.items()
+            }
+            recorded = dict(
+                self._conn.execute(
+                    "SELECT task_id, mtime FROM tasks WHERE step = ?", (step,)
+                ).fetchall()
+            )
+            stale = [
+                task_id
+                for task_id, mtime in mtimes.items()
+                if recorded.get(task_id) != mtime
+            ]
+            if stale:
+                with self._transaction() as conn:
+                    for task_id in stale:
+                        self._reindex(conn, step, task_id, task_meta_dirs[task_id])
+            return [
+                (task_id, value)
+                for task_id, value in self._conn.execute(
+                    "SELECT task_id, value FROM metadata "
+                    "WHERE step = ? AND field_name = ?",
+                    (step, field_name),
+                )
+                if task_id in task_meta_dirs
+            ]
+        except (sqlite3.Error, OSError, ValueError):
+            return None
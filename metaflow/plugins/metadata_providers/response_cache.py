@@ -0,0 +1,193 @@
+import hashlib
+import json
+import os
+import re
+import time
+
+from metaflow.metaflow_config import (
+    CLIENT_CACHE_PATH,
+    CLIENT_METADATA_CACHE_MAX_SIZE,
+    CLIENT_METADATA_CACHE_TTL,
+)
+
+# Path of a task and of its sub-objects in the Metadata service
+_TASK_PATH_RE = re.compile(r"^(/flows/[^/]+/runs/[^/]+/steps/[^/]+/tasks/[^/]+)(/.*)?$")
+
+# Response headers used to revalidate a cached response and the request
+# headers they are sent back in.
+_VALIDATORS = {"ETag": "If-None-Match", "Last-Modified": "If-Modified-Since"}
+
+
+def _attempt_of(metadatum):
+    for tag in metadatum.get("tags") or []:
+        if tag.startswith("attempt_id:"):
+            return tag[len("attempt_id:") :]
+    return None
+
+
+def _is_finished(task_metadata):
+    # A task which succeeded will not be attempted again. Its metadata and
+    # artifacts are complete once the attempt is also marked as done: the
+    # artifacts are registered before attempt-done, after attempt_ok.
+    succeeded = set()
+    done = set()
+    for m in task_metadata:
+        if m.get("field_name") == "attempt_ok" and m.get("value") == "True":
+            succeeded.add(_attempt_of(m))
+        elif m.get("field_name") == "attempt-done":
+            done.add(_attempt_of(m) or m.get("value"))
+    return bool(succeeded & done)
+
+
+class CachedResponse(object):
+    def __init__(self, body, validators, immutable, fetched_at):
+        self.body = body
+        self.validators = validators
+        self.immutable = immutable
+        self.fetched_at = fetched_at
+
+    def is_fresh(self, ttl):
+        return self.immutable or time.time() - self.fetched_at < ttl
+
+
+class MetadataResponseCache(object):
+    """
+    On-disk cache of the responses of the Metadata service to the GET requests
+    of the client, shared by all the processes using the same cache directory.
+
+    The responses describing a finished task -- its metadata, and its
+    artifacts once its metadata says an attempt succeeded and is done -- as
+    well as the artifacts of a specific attempt never change: they are served
+    from the cache for as long as it holds them. Other responses (runs and
+    their tags, listings, tasks still running) are served for `ttl` seconds,
+    then revalidated with the ETag or Last-Modified header of the response
+    when the service provided one, or fetched again.
+
+    The least recently used responses are evicted once the cache exceeds
+    `max_size` MB.
+
+    Parameters
+    ----------
+    service_url : str
+        URL of the Metadata service; responses of different services are
+        cached separately
+    cache_dir : str, optional, default None
+        Directory of the cache. Defaults to the `metadata` directory of
+        CLIENT_CACHE_PATH.
+    max_size : int, optional, default None
+        Size of the cache in MB. Defaults to CLIENT_METADATA_CACHE_MAX_SIZE.
+    ttl : float, optional, default None
+        Duration for which mutable responses are served without being
+        revalidated. Defaults to CLIENT_METADATA_CACHE_TTL.
+    """
+
+    def __init__(self, service_url, cache_dir=None, max_size=None, ttl=None):
+        from metaflow.client.filecache import FileCache
+
+        self._service_url = service_url
+        self._ttl = float(CLIENT_METADATA_CACHE_TTL if ttl is None else ttl)
+        self._filecache = FileCache(
+            cache_dir=cache_dir or os.path.join(CLIENT_CACHE_PATH, "metadata"),
+            max_size=int(
+                CLIENT_METADATA_CACHE_MAX_SIZE if max_size is None else max_size
+            ),
+        )
+
+    def lookup(self, path):
+        """
+        Returns the cached response for `path`, fresh or not, or None.
+        """
+        data = self._filecache.read_file(self._file(path))
+        if data is None:
+            return None
+        try:
+            entry = json.loads(data)
+            return CachedResponse(
+                entry["body"],
+                entry["validators"],
+                entry["immutable"],
+                entry["fetched_at"],
+            )
+        except (ValueError, KeyError):
+            return None
+
+    def is_fresh(self, response):
+        return response.is_fresh(self._ttl)
+
+    def validation_headers(self, response):
+        """
+        Returns the headers making a request conditional on the cached response
+        being stale.
+        """
+        return {_VALIDATORS[name]: value for name, value in response.validators.items()}
+
+    def store(self, path, body, headers=None):
+        """
+        Caches the response of the service for `path`.
+        """
+        validators = {}
+        for name in _VALIDATORS:
+            value = (headers or {}).get(name)
+            if value is not None:
+                validators[name] = value
+        self._write(
+            path,
+            CachedResponse(body, validators, self._is_immutable(path, body), 0),
+        )
+
+    def revalidated(self, path, response):
+        """
+        Records that the service confirmed the cached response is current.
+        """
+        self._write(path, response)
+
+    def invalidate(self, path):
+        """
+        Drops the cached response for `path`, known to be outdated.
+        """
+        try:
+            os.remove(self._file(path))
+        except OSError:
+            pass
+
+    def _write(self, path, response):
+        response.fetched_at = time.time()
+        entry = {
+            "path": path,
+            "body": response.body,
+            "validators": response.validators,
+            "immutable": response.immutable,
+            "fetched_at": response.fetched_at,
+        }
+        try:
+            self._filecache.create_file(
+                self._file(path), json.dumps(entry).encode("utf-8")
+            )
+        except Exception:
+            # Caching is best effort
+            pass
+
+    def _file(self, path):
+        key = hashlib.sha1(
+            ("%s%s" % (self._service_url, path)).encode("utf-8")
+        ).hexdigest()
+        return os.path.join(self._filecache.cache_dir, key[:2], "%s.json" % key)
+
+    def _is_immutable(self, path, body):
+        match = _TASK_PATH_RE.match(path)
+        if match is None or not body:
+            return False
+        task_path, rest = match.groups()
+        if rest == "/metadata":
+            return _is_finished(body)
+        if rest and "/attempt/" in rest:
+            # The artifacts of an attempt are registered together, at the end
+            # of the attempt
+            return True
+        if rest and rest.startswith("/artifacts"):
+            # The latest attempt of a finished task is final; this relies on
+            # the metadata of the task, cached when it was finished
+            metadata = self.lookup(task_path + "/metadata")
+            return metadata is not None and metadata.immutable
+        # The task itself carries the tags of its run
+        return False
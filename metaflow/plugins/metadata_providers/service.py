@@ -1,6 +1,9 @@
+import atexit
 import os
 import random
+import threading
 import time
+from collections import deque
 
 import requests
 
@@ -12,7 +15,14 @@ from metaflow.exception import (
 )
 from metaflow.metadata_provider import MetadataProvider
 from metaflow.metadata_provider.heartbeat import HB_URL_KEY
-from metaflow.metaflow_config import SERVICE_HEADERS, SERVICE_RETRY_COUNT, SERVICE_URL
+from metaflow.plugins.metadata_providers.response_cache import MetadataResponseCache
+from metaflow.metaflow_config import (
+    CLIENT_METADATA_CACHE,
+    SERVICE_ASYNC_REGISTRATION,
+    SERVICE_HEADERS,
+    SERVICE_RETRY_COUNT,
+    SERVICE_URL,
+)
 from metaflow.sidecar import Message, MessageTypes, Sidecar
 from urllib.parse import urlencode
 from metaflow.util import version_parse
@@ -33,6 +43,81 @@ class ServiceException(MetaflowException):
         super(ServiceException, self).__init__(msg)
 
 
+class _RegistrationQueue(object):
+    """
+    Sends registrations (POST requests whose body is a list) from a background
+    thread.
+
+    Registrations are sent in the order in which they were queued. While a
+    request is in flight, the registrations queued behind it for the same path
+    -- typically the metadata or the artifacts of the same task -- are merged
+    into a single request, up to MAX_BATCH_SIZE items.
+
+    Once a registration fails (after the retries of `send`), no further
+    registration is sent: the error is raised by the next `flush` and by any
+    later `put`. Pending registrations are flushed at exit.
+    """
+
+    MAX_BATCH_SIZE = 1000
+
+    def __init__(self, send):
+        self._send = send
+        self._queue = deque()
+        self._pending = 0  # Queued or in flight
+        self._error = None
+        self._error_raised = False
+        self._cond = threading.Condition()
+        self._thread = None
+
+    def put(self, path, data):
+        with self._cond:
+            if self._error is not None:
+                raise self._error
+            self._queue.append((path, data))
+            self._pending += 1
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, daemon=True)
+                self._thread.start()
+                atexit.register(self.flush)
+            self._cond.notify_all()
+
+    def flush(self):
+        with self._cond:
+            while self._pending and self._error is None:
+                self._cond.wait()
+            if self._error is not None and not self._error_raised:
+                self._error_raised = True
+                raise self._error
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._queue:
+                    self._cond.wait()
+                path, data = self._queue.popleft()
+                data = list(data)
+                count = 1
+                while (
+                    self._queue
+                    and self._queue[0][0] == path
+                    and len(data) + len(self._queue[0][1]) <= self.MAX_BATCH_SIZE
+                ):
+                    data.extend(self._queue.popleft()[1])
+                    count += 1
+            try:
+                self._send(path, data)
+            except Exception as ex:
+                with self._cond:
+                    self._error = ex
+                    self._queue.clear()
+                    self._pending = 0
+                    self._cond.notify_all()
+                return
+            with self._cond:
+                self._pending -= count
+                self._cond.notify_all()
+
+
 class ServiceMetadataProvider(MetadataProvider):
     TYPE = "service"
 
@@ -55,6 +140,7 @@ class ServiceMetadataProvider(MetadataProvider):
 
     _supports_attempt_gets = None
     _supports_tag_mutation = None
+    _response_caches = {}
 
     def __init__(self, environment, flow, event_logger, monitor):
         super(ServiceMetadataProvider, self).__init__(
@@ -68,6 +154,11 @@ class ServiceMetadataProvider(MetadataProvider):
             SERVICE_URL, "flows/{flow_id}/runs/{run_number}/heartbeat"
         )
         self.sidecar = None
+        self._registrations = None
+        if SERVICE_ASYNC_REGISTRATION:
+            self._registrations = _RegistrationQueue(
+                lambda path, data: self._request(self._monitor, path, "POST", data)
+            )
 
     @classmethod
     def compute_info(cls, val):
@@ -193,7 +284,7 @@ class ServiceMetadataProvider(MetadataProvider):
         data = self._artifacts_to_json(
             run_id, step_name, task_id, attempt_id, artifacts
         )
-        self._request(self._monitor, url, "POST", data)
+        self._register(url, data)
 
     def register_metadata(self, run_id, step_name, task_id, metadata):
         url = ServiceMetadataProvider._obj_path(
@@ -201,7 +292,17 @@ class ServiceMetadataProvider(MetadataProvider):
         )
         url += "/metadata"
         data = self._metadata_to_json(run_id, step_name, task_id, metadata)
-        self._request(self._monitor, url, "POST", data)
+        self._register(url, data)
+
+    def flush(self):
+        if self._registrations is not None:
+            self._registrations.flush()
+
+    def _register(self, url, data):
+        if self._registrations is not None:
+            self._registrations.put(url, data)
+        else:
+            self._request(self._monitor, url, "POST", data)
 
     @classmethod
     def _mutate_user_tags_for_run(
@@ -236,6 +337,9 @@ class ServiceMetadataProvider(MetadataProvider):
             status_codes_seen.add(resp.status_code)
             # happy path
             if resp.status_code < 300:
+                cache = cls._response_cache()
+                if cache is not None:
+                    cache.invalidate(ServiceMetadataProvider._obj_path(flow_id, run_id))
                 return frozenset(resp.json()["tags"])
             # definitely NOT retriable
             if resp.status_code in (400, 422):
@@ -278,7 +382,7 @@ class ServiceMetadataProvider(MetadataProvider):
             else:
                 url = ServiceMetadataProvider._obj_path(*args[:obj_order])
             try:
-                v, _ = cls._request(None, url, "GET")
+                v = cls._get(url)
                 return MetadataProvider._apply_filter([v], filters)[0]
             except ServiceException as ex:
                 if ex.http_code == 404:
@@ -297,13 +401,60 @@ class ServiceMetadataProvider(MetadataProvider):
         else:
             url += "/%ss" % sub_type
         try:
-            v, _ = cls._request(None, url, "GET")
+            v = cls._get(url)
             return MetadataProvider._apply_filter(v, filters)
         except ServiceException as ex:
             if ex.http_code == 404:
                 return None
             raise
 
+    @classmethod
+    def _iter_objects_internal(
+        cls, obj_type, obj_order, sub_type, sub_order, filters, page_size, *args
+    ):
+        # The objects are requested page by page, ordered by the service. A
+        # service which does not support pagination returns all the objects at
+        # once; they are then ordered here.
+        if obj_type != "root":
+            url = ServiceMetadataProvider._obj_path(*args[:obj_order])
+        else:
+            url = ""
+        url += "/%ss" % sub_type
+        first = None
+        page_number = 1
+        while True:
+            query_params = {
+                "_order": "-ts_epoch",
+                "_limit": page_size,
+                "_page": page_number,
+            }
+            try:
+                objs, _ = cls._request(
+                    None, "%s?%s" % (url, urlencode(query_params)), "GET"
+                )
+            except ServiceException as ex:
+                if ex.http_code == 404:
+                    return
+                raise
+            objs = objs or []
+            if objs and page_number > 1 and objs[0] == first:
+                # The service ignored the page number
+                return
+            # No-op if the service ordered the objects
+            objs = sorted(objs, reverse=True, key=lambda x: x["ts_epoch"])
+            if len(objs) > page_size:
+                for start in range(0, len(objs), page_size):
+                    yield MetadataProvider._apply_filter(
+                        objs[start : start + page_size], filters
+                    )
+                return
+            if objs:
+                first = objs[0] if first is None else first
+                yield MetadataProvider._apply_filter(objs, filters)
+            if len(objs) < page_size:
+                return
+            page_number += 1
+
     def _new_run(self, run_id=None, tags=None, sys_tags=None):
         # first ensure that the flow exists
         self._get_or_create("flow")
@@ -462,6 +613,46 @@ class ServiceMetadataProvider(MetadataProvider):
             else:
                 raise
 
+    @classmethod
+    def _response_cache(cls):
+        if not CLIENT_METADATA_CACHE:
+            return None
+        cache = cls._response_caches.get(cls.INFO)
+        if cache is None:
+            cache = cls._response_caches[cls.INFO] = MetadataResponseCache(cls.INFO)
+        return cache
+
+    @classmethod
+    def _get(cls, path):
+        # GET request of the client, served from the response cache if enabled
+        cache = cls._response_cache()
+        if cache is None:
+            v, _ = cls._request(None, path, "GET")
+            return v
+        cached = cache.lookup(path)
+        if cached is not None and cache.is_fresh(cached):
+            return cached.body
+        headers = None if cached is None else cache.validation_headers(cached)
+        resp, _ = cls._request(None, path, "GET", headers=headers, return_raw_resp=True)
+        if resp.status_code == 304 and cached is not None:
+            cache.revalidated(path, cached)
+            return cached.body
+        if resp.status_code < 300:
+            v = resp.json()
+            cache.store(path, v, resp.headers)
+            return v
+        if resp.status_code != 503:
+            raise ServiceException(
+                "Metadata request (%s) failed (code %s): %s"
+                % (path, resp.status_code, resp.text),
+                resp.status_code,
+                resp.text,
+            )
+        # Unavailable service: retried as usual
+        v, _ = cls._request(None, path, "GET")
+        cache.store(path, v)
+        return v
+
     # TODO _request() needs a more deliberate refactor at some point, it looks quite overgrown.
     @classmethod
     def _request(
@@ -472,6 +663,7 @@ class ServiceMetadataProvider(MetadataProvider):
         data=None,
         retry_409_path=None,
         return_raw_resp=False,
+        headers=None,
     ):
         if cls.INFO is None:
             raise MetaflowException(
@@ -485,14 +677,16 @@ class ServiceMetadataProvider(MetadataProvider):
                 % (supported_methods, method)
             )
         url = os.path.join(cls.INFO, path.lstrip("/"))
+        get_headers = SERVICE_HEADERS.copy()
+        get_headers.update(headers or {})
         for i in range(SERVICE_RETRY_COUNT):
             try:
                 if method == "GET":
                     if monitor:
                         with monitor.measure("metaflow.service_metadata.get"):
-                            resp = cls._session.get(url, headers=SERVICE_HEADERS.copy())
+                            resp = cls._session.get(url, headers=get_headers.copy())
                     else:
-                        resp = cls._session.get(url, headers=SERVICE_HEADERS.copy())
+                        resp = cls._session.get(url, headers=get_headers.copy())
                 elif method == "POST":
                     if monitor:
                         with monitor.measure("metaflow.service_metadata.post"):
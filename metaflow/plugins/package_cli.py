@@ -15,13 +15,15 @@ def cli():
 @click.pass_obj
 def package(obj, timeout):
     # Prepare the package before any of the sub-commands are invoked.
-    # We explicitly will *not* upload it to the datastore.
+    # We explicitly will *not* upload it to the datastore but an identical
+    # package already there is reused (see PACKAGE_MANIFEST_CACHE).
     obj.package = MetaflowPackage(
         obj.flow,
         obj.environment,
         obj.echo,
         suffixes=obj.package_suffixes,
-        flow_datastore=None,
+        flow_datastore=obj.flow_datastore,
+        upload=False,
     )
     obj.package_op_timeout = timeout
 
@@ -142,6 +142,9 @@ class StorageExecutor(object):
     def submit(self, *args, **kwargs):
         return self._executor.submit(*args, **kwargs)
 
+    def shutdown(self, wait=True):
+        self._executor.shutdown(wait=wait)
+
 
 def handle_executor_exceptions(func):
     """
@@ -14,6 +14,7 @@ import re
 import tempfile
 import time
 import subprocess
+from collections import deque
 from datetime import datetime
 from enum import Enum
 from io import BytesIO
@@ -31,6 +32,7 @@ from .metadata_provider import MetaDatum
 from .metaflow_config import (
     FEAT_ALWAYS_UPLOAD_CODE_PACKAGE,
     MAX_ATTEMPTS,
+    RUNTIME_ZYGOTE,
     UI_URL,
     SPIN_ALLOWED_DECORATORS,
     SPIN_DISALLOWED_DECORATORS,
@@ -58,6 +60,7 @@ from .unbounded_foreach import (
 
 from .user_configs.config_options import ConfigInput
 from .user_configs.config_parameters import dump_config_values
+from .zygote import TaskZygotes
 
 import metaflow.tracing as tracing
 
@@ -447,10 +450,12 @@ class NativeRuntime(object):
                 clone_run_id,
                 prefetch_data_artifacts=PREFETCH_DATA_ARTIFACTS,
             )
-        self._run_queue = []
+        self._run_queue = deque()
         self._poll = procpoll.make_poll()
         self._workers = {}  # fd -> subprocess mapping
-        self._finished = {}
+        # Tasks are forked off of pre-warmed processes if enabled
+        self._zygotes = TaskZygotes(logger) if RUNTIME_ZYGOTE else None
+        self._finished = FinishedTasks()
         self._is_cloned = {}
         # NOTE: In case of unbounded foreach, we need the following to schedule
         # the (sibling) mapper tasks  of the control task (in case of resume);
@@ -794,7 +799,7 @@ class NativeRuntime(object):
     def execute(self):
         if len(self._cloned_tasks) > 0:
             # mutable list storing the cloned tasks.
-            self._run_queue = []
+            self._run_queue = deque()
             self._active_tasks[0] = 0
         else:
             if self._params_task:
@@ -962,6 +967,8 @@ class NativeRuntime(object):
                 exception = ex
                 raise
             finally:
+                if self._zygotes is not None:
+                    self._zygotes.close()
                 # on finish clean tasks
                 if not self._skip_decorator_hooks:
                     for step in self._flow:
@@ -1153,7 +1160,7 @@ class NativeRuntime(object):
                 return
             # Note that we are scheduling this to run
             self._ran_or_scheduled_task_index.add(index)
-        self._run_queue.insert(0, (step, task_kwargs))
+        self._run_queue.appendleft((step, task_kwargs))
         # For foreaches, this will happen multiple time but is ok, becomes a no-op
         self._unprocessed_steps.discard(step)
 
@@ -1271,6 +1278,21 @@ class NativeRuntime(object):
 
             # next step is a foreach join
             if matching_split.type == "foreach":
+                required_count = foreach_stack[-1].num_splits
+                index = self._translate_index(task, next_step, "join")
+                # Checking how many split-siblings of the finished task are done
+                # is O(1); we only gather them once they are all done.
+                num_finished = sum(
+                    self._finished.num_finished_siblings(
+                        p, foreach_stack, iteration_stack
+                    )
+                    for p in direct_parents
+                )
+                if (
+                    num_finished != required_count
+                    or index in self._ran_or_scheduled_task_index
+                ):
+                    return
 
                 def siblings(foreach_stack):
                     top = foreach_stack[-1]
@@ -1289,9 +1311,7 @@ class NativeRuntime(object):
                         ],
                     )
                 )
-                required_count = task.finished_id[1][-1].num_splits
                 join_type = "foreach"
-                index = self._translate_index(task, next_step, "join")
             else:
                 # next step is a split
                 required_tasks = list(
@@ -1563,7 +1583,12 @@ class NativeRuntime(object):
             )
             return
 
-        worker = Worker(task, self._max_log_size, self._config_file_name)
+        worker = Worker(
+            task,
+            self._max_log_size,
+            self._config_file_name,
+            zygotes=self._zygotes,
+        )
         for fd in worker.fds():
             self._workers[fd] = worker
             self._poll.add(fd)
@@ -2063,6 +2088,47 @@ class TaskFailed(MetaflowException):
         super(TaskFailed, self).__init__(body)
 
 
+class FinishedTasks(dict):
+    """
+    Mapping of finished_id -> pathspec of the finished tasks.
+
+    Finished ids are (step, foreach_stack, iteration_stack) tuples. In addition
+    to the mapping, this keeps count of how many tasks of each step have
+    finished within a given foreach split so that the runtime can tell whether
+    a foreach join is ready without going over all the siblings.
+    """
+
+    def __init__(self):
+        super(FinishedTasks, self).__init__()
+        self._split_counts = {}
+
+    @staticmethod
+    def _split_key(step, foreach_stack, iteration_stack):
+        top = foreach_stack[-1]
+        return (
+            step,
+            tuple(foreach_stack[:-1]) + (top._replace(index=None),),
+            iteration_stack,
+        )
+
+    def __setitem__(self, finished_id, path):
+        if finished_id not in self:
+            step, foreach_stack, iteration_stack = finished_id
+            if foreach_stack:
+                key = self._split_key(step, foreach_stack, iteration_stack)
+                self._split_counts[key] = self._split_counts.get(key, 0) + 1
+        super(FinishedTasks, self).__setitem__(finished_id, path)
+
+    def num_finished_siblings(self, step, foreach_stack, iteration_stack):
+        """
+        Returns the number of tasks of `step` that finished in the foreach split
+        at the top of `foreach_stack` (including the task itself if finished).
+        """
+        return self._split_counts.get(
+            self._split_key(step, foreach_stack, iteration_stack), 0
+        )
+
+
 class TruncatedBuffer(object):
     def __init__(self, name, maxsize):
         self.name = name
@@ -2246,9 +2312,11 @@ class Worker(object):
         artifacts_module=None,
         persist=True,
         skip_decorators=False,
+        zygotes=None,
     ):
         self.task = task
         self._config_file_name = config_file_name
+        self._zygotes = zygotes
         self._orig_flow_datastore = orig_flow_datastore
         self._spin_pathspec = spin_pathspec
         self._artifacts_module = artifacts_module
@@ -2341,6 +2409,14 @@ class Worker(object):
         cmdline = args.get_args()
         from_start(f"Command line: {' '.join(cmdline)}")
         debug.subcommand_exec(cmdline)
+        if self._zygotes is not None:
+            # Falls back to a regular subprocess if the task cannot be forked
+            # off of a zygote
+            proc = self._zygotes.launch(
+                args.entrypoint, cmdline[len(args.entrypoint) :], env
+            )
+            if proc is not None:
+                return proc
         return subprocess.Popen(
             cmdline,
             env=env,
@@ -1,5 +1,6 @@
 from __future__ import print_function
 from io import BytesIO
+from itertools import islice
 import math
 import sys
 import os
@@ -12,7 +13,11 @@ from metaflow.sidecar import Message, MessageTypes
 from metaflow.datastore.exceptions import DataException
 
 from metaflow.plugins import METADATA_PROVIDERS
-from .metaflow_config import MAX_ATTEMPTS
+from .metaflow_config import (
+    FOREACH_SHARD_SIZE,
+    FOREACH_SHARDED_INPUTS,
+    MAX_ATTEMPTS,
+)
 from .metadata_provider import MetaDatum
 from .metaflow_profile import from_start
 from .mflog import TASK_LOG_SOURCE
@@ -417,6 +422,38 @@ class MetaflowTask(object):
         elif "_foreach_stack" in inputs[0]:
             self.flow._foreach_stack = inputs[0]["_foreach_stack"]
 
+    def _save_foreach_shards(self, output):
+        # Save the foreach iterable of a split step in shards so that each
+        # task of the foreach loads only the shard holding its input (see
+        # FlowSpec._find_input). The shards are listed in the _foreach_shards
+        # artifact, which identifies the foreach they belong to.
+        var = self.flow._foreach_var
+        num_splits = self.flow._foreach_num_splits
+        if num_splits is None:
+            # unbounded foreach: the control task does the splitting
+            return
+        values = getattr(self.flow, var)
+        # Elements are looked up the same way FlowSpec._find_input does
+        try:
+            elements = [values[i] for i in range(num_splits)]
+        except TypeError:
+            elements = list(islice(values, num_splits))
+        except (KeyError, IndexError):
+            return
+        size = max(1, int(FOREACH_SHARD_SIZE))
+        shards = output.save_foreach_shards(
+            var,
+            (elements[i : i + size] for i in range(0, num_splits, size)),
+            len_hint=math.ceil(num_splits / size),
+        )
+        self.flow._foreach_shards = {
+            "step": self.flow._transition[0][0],
+            "var": var,
+            "num_splits": num_splits,
+            "size": size,
+            "shards": shards,
+        }
+
     def _init_iteration(self, step_name, inputs, is_recursive_step):
         # We track the iteration "stack" for loops. At this time, we
         # only support one type of "looping" which is a recursive step but
@@ -998,6 +1035,8 @@ class MetaflowTask(object):
                         payload={**task_payload, "msg": "Task ended"},
                     )
                 try:
+                    if FOREACH_SHARDED_INPUTS and self.flow._foreach_var is not None:
+                        self._save_foreach_shards(output)
                     # persisting might fail due to unpicklable artifacts.
                     output.persist(self.flow)
                 except Exception as ex:
@@ -1024,6 +1063,9 @@ class MetaflowTask(object):
                         ],
                     )
 
+                # All the metadata of the task is recorded before it is marked
+                # as done
+                self.metadata.flush()
                 output.save_metadata({"task_end": {}})
                 from_start("MetaflowTask: output persisted")
                 # this writes a success marker indicating that the
@@ -104,9 +104,12 @@ class FlowMutatorMeta(type):
     def _check_init(mcs):
         # Delay importing FLOW_DECORATORS until we actually need it
         if not mcs._all_registered_decorators.inited:
+            from metaflow.extension_support.plugins import resolve_plugin
             from metaflow.plugins import FLOW_DECORATORS
 
-            mcs._all_registered_decorators.init([(t.name, t) for t in FLOW_DECORATORS])
+            mcs._all_registered_decorators.init(
+                [(t.name, resolve_plugin(t)) for t in FLOW_DECORATORS]
+            )
 
 
 class FlowMutator(metaclass=FlowMutatorMeta):
@@ -126,9 +126,12 @@ class UserStepDecoratorMeta(type):
     def _check_init(mcs):
         # Delay importing STEP_DECORATORS until we actually need it
         if not mcs._all_registered_decorators.inited:
+            from metaflow.extension_support.plugins import resolve_plugin
             from metaflow.plugins import STEP_DECORATORS
 
-            mcs._all_registered_decorators.init([(t.name, t) for t in STEP_DECORATORS])
+            mcs._all_registered_decorators.init(
+                [(t.name, resolve_plugin(t)) for t in STEP_DECORATORS]
+            )
 
 
 class UserStepDecoratorBase(metaclass=UserStepDecoratorMeta):
@@ -6,6 +6,7 @@ import zlib
 import base64
 import re
 
+from collections import deque
 from functools import wraps
 from io import BytesIO
 from itertools import takewhile
@@ -87,6 +88,29 @@ def all_equal(it):
     return True
 
 
+def bounded_imap(executor, func, it, max_pending=None):
+    """
+    Like executor.map(func, it) but only keeps up to max_pending items of `it`
+    in flight at any time (executor.map consumes the entire iterator upfront).
+    Results are returned in the same order as the input.
+
+    max_pending defaults to twice the number of workers of the executor.
+    """
+    if max_pending is None:
+        max_pending = 2 * getattr(executor, "_max_workers", 1)
+    pending = deque()
+    try:
+        for item in it:
+            pending.append(executor.submit(func, item))
+            if len(pending) >= max_pending:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+    finally:
+        for future in pending:
+            future.cancel()
+
+
 def url_quote(url):
     """
     Encode a unicode URL to a safe byte string
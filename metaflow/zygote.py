@@ -0,0 +1,461 @@
+"""
+Pre-forked task launcher for the local runtime
+
+Launching a task locally starts a new interpreter which then imports Metaflow,
+all plugins, the flow module and, transitively, all its dependencies. For small
+tasks, this startup cost dominates the run time of the flow.
+
+When enabled (METAFLOW_RUNTIME_ZYGOTE), the runtime instead starts a single
+"zygote" process per entrypoint. The zygote executes the flow file like a task
+would, up to the point where the CLI would parse its arguments, and then waits
+for launch requests from the runtime. For each request, it forks a child that
+resumes as a regular task process with the requested command line; the child
+therefore starts with everything already imported.
+
+Communication happens over a UNIX socket:
+  - the runtime sends, for each task, its command line and environment along
+    with three file descriptors: the write end of the stdout and stderr pipes
+    of the task and the write end of a status pipe;
+  - the zygote forks and writes the pid of the child to the status pipe and,
+    once it has reaped the child, its return code.
+
+On the runtime side, a task launched through the zygote is represented by a
+ZygoteProcess which implements the subset of the subprocess.Popen interface
+the runtime relies on, so logs, retries and worker accounting are unchanged.
+"""
+
+import array
+import json
+import os
+import random
+import select
+import signal
+import socket
+import struct
+import subprocess
+import sys
+import time
+
+# Environment variable through which the runtime passes the socket to the
+# zygote. If set when the CLI starts, the process turns into a zygote.
+ZYGOTE_FD_ENV = "METAFLOW_RUNTIME_ZYGOTE_FD"
+
+# Time (in seconds) we wait for a zygote to import the flow
+ZYGOTE_START_TIMEOUT = 120
+
+# Number of times we start a new zygote for an entrypoint (because the
+# environment read at import time changed or the previous one died) before
+# giving up on it
+ZYGOTE_MAX_RESTARTS = 3
+
+# Environment variables read when Metaflow and the flow are imported (the
+# Metaflow configuration, the module search path, ...). A zygote is reused for
+# all the tasks which agree with it on these; each task gets the rest of its
+# environment once forked.
+ZYGOTE_IMPORT_ENV_PREFIXES = ("METAFLOW_", "PYTHON")
+ZYGOTE_IMPORT_ENV_VARS = (
+    "LD_LIBRARY_PATH",
+    "LD_PRELOAD",
+    "VIRTUAL_ENV",
+    "CONDA_PREFIX",
+)
+
+_HEADER = struct.Struct("!I")
+_NUM_FDS = 3
+
+
+def _send_msg(sock, msg, fds=None):
+    data = json.dumps(msg).encode("utf-8")
+    data = _HEADER.pack(len(data)) + data
+    if fds:
+        sent = sock.sendmsg(
+            [data], [(socket.SOL_SOCKET, socket.SCM_RIGHTS, array.array("i", fds))]
+        )
+    else:
+        sent = sock.send(data)
+    if sent < len(data):
+        sock.sendall(data[sent:])
+
+
+def _recv_exactly(sock, size, data=b""):
+    while len(data) < size:
+        chunk = sock.recv(size - len(data))
+        if not chunk:
+            return None
+        data += chunk
+    return data
+
+
+def _recv_msg(sock, with_fds=False):
+    # Returns (msg, fds) or (None, []) if the other side went away
+    fds = array.array("i")
+    if with_fds:
+        # File descriptors come along with the first byte of the message
+        data, ancdata, _, _ = sock.recvmsg(
+            _HEADER.size, socket.CMSG_LEN(_NUM_FDS * fds.itemsize)
+        )
+        for level, kind, cdata in ancdata:
+            if level == socket.SOL_SOCKET and kind == socket.SCM_RIGHTS:
+                fds.frombytes(cdata[: len(cdata) - (len(cdata) % fds.itemsize)])
+        if not data:
+            return None, list(fds)
+    else:
+        data = b""
+    header = _recv_exactly(sock, _HEADER.size, data)
+    if header is None:
+        return None, list(fds)
+    payload = _recv_exactly(sock, _HEADER.unpack(header)[0])
+    if payload is None:
+        return None, list(fds)
+    return json.loads(payload.decode("utf-8")), list(fds)
+
+
+def _import_env(env):
+    return {
+        k: v
+        for k, v in env.items()
+        if k.startswith(ZYGOTE_IMPORT_ENV_PREFIXES) or k in ZYGOTE_IMPORT_ENV_VARS
+    }
+
+
+def _returncode(status):
+    # Same convention as subprocess: -N if the child was killed by signal N
+    if os.WIFSIGNALED(status):
+        return -os.WTERMSIG(status)
+    return os.WEXITSTATUS(status)
+
+
+def _close(fd):
+    try:
+        os.close(fd)
+    except OSError:
+        pass
+
+
+def serve(sock_fd):
+    """
+    Main loop of the zygote.
+
+    This function returns only in the forked task processes, after having set
+    up sys.argv, the environment and the standard file descriptors for the
+    task; the caller then proceeds as a regular task process would. The zygote
+    itself exits once the runtime closes its end of the socket.
+    """
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM, 0, sock_fd)
+    wakeup_r, wakeup_w = os.pipe()
+    for fd in (wakeup_r, wakeup_w):
+        os.set_blocking(fd, False)
+    # SIGCHLD wakes up the select() below through the wakeup fd; the runtime
+    # takes care of interrupting tasks so the zygote itself ignores SIGINT.
+    signal.signal(signal.SIGCHLD, lambda *args: None)
+    signal.set_wakeup_fd(wakeup_w)
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+
+    children = {}  # pid -> status fd
+    _send_msg(sock, {"ready": os.getpid()})
+    while True:
+        readable, _, _ = select.select([sock, wakeup_r], [], [])
+        if wakeup_r in readable:
+            try:
+                while os.read(wakeup_r, 1024):
+                    pass
+            except OSError:
+                pass
+            _reap(children)
+        if sock in readable:
+            request, fds = _recv_msg(sock, with_fds=True)
+            if request is None or len(fds) != _NUM_FDS:
+                for fd in fds:
+                    _close(fd)
+                if request is None:
+                    break
+                continue
+            stdout_fd, stderr_fd, status_fd = fds
+            sys.stdout.flush()
+            sys.stderr.flush()
+            try:
+                pid = os.fork()
+            except OSError:
+                pid = -1
+            if pid == 0:
+                sock.close()
+                _init_child(
+                    request,
+                    stdout_fd,
+                    stderr_fd,
+                    [wakeup_r, wakeup_w, status_fd] + list(children.values()),
+                )
+                return
+            _close(stdout_fd)
+            _close(stderr_fd)
+            if pid < 0:
+                os.write(status_fd, b"error\n")
+                _close(status_fd)
+            else:
+                os.write(status_fd, b"%d\n" % pid)
+                children[pid] = status_fd
+            # The child may already be gone
+            _reap(children)
+    for fd in children.values():
+        _close(fd)
+    sys.exit(0)
+
+
+def _reap(children):
+    while children:
+        try:
+            pid, status = os.waitpid(-1, os.WNOHANG)
+        except ChildProcessError:
+            break
+        if pid == 0:
+            break
+        status_fd = children.pop(pid, None)
+        if status_fd is not None:
+            try:
+                os.write(status_fd, b"%d\n" % _returncode(status))
+            except OSError:
+                pass
+            _close(status_fd)
+
+
+def _init_child(request, stdout_fd, stderr_fd, zygote_fds):
+    signal.set_wakeup_fd(-1)
+    signal.signal(signal.SIGCHLD, signal.SIG_DFL)
+    signal.signal(signal.SIGINT, signal.default_int_handler)
+    for fd in zygote_fds:
+        _close(fd)
+
+    devnull = os.open(os.devnull, os.O_RDONLY)
+    os.dup2(devnull, 0)
+    os.dup2(stdout_fd, 1)
+    os.dup2(stderr_fd, 2)
+    for fd in (devnull, stdout_fd, stderr_fd):
+        _close(fd)
+
+    os.environ.clear()
+    os.environ.update(request["env"])
+    sys.argv = [sys.argv[0]] + request["args"]
+
+    # Each task must get its own random state, as a new process would
+    random.seed()
+    if "numpy" in sys.modules:
+        try:
+            sys.modules["numpy"].random.seed()
+        except Exception:
+            pass
+
+
+class ZygoteProcess(object):
+    """
+    Handle on a task forked by a zygote, quacking like subprocess.Popen.
+    """
+
+    def __init__(self, pid, stdout, stderr, status_fd):
+        self.pid = pid
+        self.stdout = stdout
+        self.stderr = stderr
+        self.returncode = None
+        self._status_fd = status_fd
+        self._status_buf = b""
+        os.set_blocking(status_fd, False)
+
+    def _read_status(self, block):
+        while self.returncode is None and self._status_fd is not None:
+            if block:
+                select.select([self._status_fd], [], [])
+            try:
+                data = os.read(self._status_fd, 64)
+            except BlockingIOError:
+                if block:
+                    continue
+                return
+            if data:
+                self._status_buf += data
+                if self._status_buf.endswith(b"\n"):
+                    self.returncode = int(self._status_buf)
+                    self._close_status()
+                continue
+            # The zygote went away before reporting on this task (it was
+            # killed for example). We can only wait for the task to be gone.
+            self._close_status()
+        while self.returncode is None:
+            try:
+                os.kill(self.pid, 0)
+            except ProcessLookupError:
+                self.returncode = -signal.SIGKILL
+                break
+            except OSError:
+                pass
+            if not block:
+                return
+            time.sleep(0.1)
+
+    def _close_status(self):
+        _close(self._status_fd)
+        self._status_fd = None
+
+    def poll(self):
+        self._read_status(block=False)
+        return self.returncode
+
+    def wait(self):
+        self._read_status(block=True)
+        return self.returncode
+
+    def kill(self):
+        if self.poll() is None:
+            try:
+                os.kill(self.pid, signal.SIGKILL)
+            except ProcessLookupError:
+                pass
+
+    def terminate(self):
+        if self.poll() is None:
+            try:
+                os.kill(self.pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+
+class _Zygote(object):
+    def __init__(self, entrypoint, env):
+        self.import_env = _import_env(env)
+        sock, child_sock = socket.socketpair(socket.AF_UNIX, socket.SOCK_STREAM)
+        zygote_env = dict(env)
+        zygote_env[ZYGOTE_FD_ENV] = str(child_sock.fileno())
+        try:
+            self._proc = subprocess.Popen(
+                entrypoint,
+                env=zygote_env,
+                pass_fds=[child_sock.fileno()],
+                stdin=subprocess.DEVNULL,
+                stdout=subprocess.DEVNULL,
+                stderr=subprocess.DEVNULL,
+            )
+        except OSError:
+            sock.close()
+            raise
+        finally:
+            child_sock.close()
+        self._sock = sock
+        ready, _, _ = select.select([sock], [], [], ZYGOTE_START_TIMEOUT)
+        msg = _recv_msg(sock)[0] if ready else None
+        if msg is None or "ready" not in msg:
+            self.close()
+            raise OSError("Zygote did not start")
+
+    def launch(self, args, env):
+        stdout_r, stdout_w = os.pipe()
+        stderr_r, stderr_w = os.pipe()
+        status_r, status_w = os.pipe()
+        try:
+            _send_msg(
+                self._sock,
+                {"args": args, "env": env},
+                fds=[stdout_w, stderr_w, status_w],
+            )
+        except OSError:
+            for fd in (stdout_r, stderr_r, status_r):
+                _close(fd)
+            raise
+        finally:
+            for fd in (stdout_w, stderr_w, status_w):
+                _close(fd)
+        pid = b""
+        while not pid.endswith(b"\n"):
+            data = os.read(status_r, 64)
+            if not data:
+                break
+            pid += data
+        if not pid.strip().isdigit():
+            for fd in (stdout_r, stderr_r, status_r):
+                _close(fd)
+            raise OSError("Zygote could not fork")
+        return ZygoteProcess(
+            int(pid),
+            os.fdopen(stdout_r, "rb"),
+            os.fdopen(stderr_r, "rb"),
+            status_r,
+        )
+
+    def close(self):
+        # The zygote exits when the socket is closed; running tasks are not
+        # affected.
+        self._sock.close()
+        try:
+            self._proc.wait(timeout=5)
+        except subprocess.TimeoutExpired:
+            self._proc.kill()
+            self._proc.wait()
+
+
+class TaskZygotes(object):
+    """
+    Launches tasks through zygotes, one per entrypoint, started lazily.
+
+    Each task gets its own environment once forked. A zygote can however only
+    be reused for a task which agrees with it on the variables read at import
+    time (see ZYGOTE_IMPORT_ENV_PREFIXES) since modules, including the
+    Metaflow configuration, were imported with them. If those change, a new
+    zygote is started; if this happens too often or the zygote cannot be
+    started, tasks with that entrypoint are launched as regular subprocesses.
+    A different interpreter is a different entrypoint and so gets its own
+    zygote.
+    """
+
+    def __init__(self, logger=None):
+        self._logger = logger
+        # tuple(entrypoint) -> [_Zygote or None, number of starts]
+        self._zygotes = {}
+
+    def launch(self, entrypoint, args, env):
+        """
+        Launches a task with the given command line (entrypoint + args) and
+        environment. Returns a ZygoteProcess or None if the task needs to be
+        launched as a regular subprocess.
+        """
+        key = tuple(entrypoint)
+        zygote, starts = self._zygotes.get(key, (None, 0))
+        if starts > ZYGOTE_MAX_RESTARTS:
+            return None
+        if zygote is not None and zygote.import_env != _import_env(env):
+            zygote.close()
+            zygote = None
+        if zygote is None:
+            starts += 1
+            if starts > ZYGOTE_MAX_RESTARTS:
+                self._zygotes[key] = (None, starts)
+                self._log(
+                    "Too many restarts of the task zygote for %s; launching "
+                    "tasks as subprocesses instead." % " ".join(entrypoint)
+                )
+                return None
+            try:
+                zygote = _Zygote(entrypoint, env)
+            except OSError:
+                zygote = None
+                self._log(
+                    "Could not start the task zygote for %s; launching tasks "
+                    "as subprocesses instead." % " ".join(entrypoint)
+                )
+                starts = ZYGOTE_MAX_RESTARTS + 1
+            self._zygotes[key] = (zygote, starts)
+            if zygote is None:
+                return None
+        try:
+            return zygote.launch(args, env)
+        except OSError:
+            # The zygote died; the next task will start a new one.
+            zygote.close()
+            self._zygotes[key] = (None, starts)
+            return None
+
+    def close(self):
+        for zygote, _ in self._zygotes.values():
+            if zygote is not None:
+                zygote.close()
+        self._zygotes = {}
+
+    def _log(self, msg):
+        if self._logger:
+            self._logger(msg, system_msg=True)
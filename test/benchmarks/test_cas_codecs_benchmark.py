@@ -0,0 +1,66 @@
+import os
+import pickle
+import random
+
+import pytest
+
+pytest.importorskip("pytest_benchmark")
+
+from metaflow.datastore.content_addressed_store import (
+    ContentAddressedStore,
+    is_codec_available,
+)
+from metaflow.plugins.datastores.local_storage import LocalStorage
+
+CODECS = ["gzip", "none", "zstd", "lz4"]
+
+
+def _payloads():
+    rnd = random.Random(42)
+    return {
+        # Typical pickled Python data: compresses well
+        "pickled_records": pickle.dumps(
+            [
+                {"id": i, "name": "row-%d" % i, "value": rnd.random()}
+                for i in range(200000)
+            ],
+            protocol=4,
+        ),
+        # Already compressed or random content: does not compress
+        "random_bytes": os.urandom(16 * 1024 * 1024),
+    }
+
+
+PAYLOADS = _payloads()
+
+
+@pytest.mark.parametrize("payload", sorted(PAYLOADS))
+@pytest.mark.parametrize("codec", CODECS)
+def test_cas_codec_save_load(benchmark, tmp_path, codec, payload):
+    if not is_codec_available(codec):
+        pytest.skip("codec %s is not installed" % codec)
+    blob = PAYLOADS[payload]
+    storage = LocalStorage(str(tmp_path))
+
+    def _do():
+        # Use a fresh prefix for each round so that every save compresses
+        store = ContentAddressedStore(
+            os.path.basename(str(tmp_path)) + str(random.random()),
+            storage,
+            codec=codec,
+        )
+        key = store.save_blobs(iter([blob]))[0].key
+        return store, key, dict(store.load_blobs([key]))[key]
+
+    store, key, loaded = benchmark(_do)
+    assert loaded == blob
+
+    stored_size = os.path.getsize(
+        os.path.join(str(tmp_path), store._prefix, key[:2], key)
+    )
+    benchmark.extra_info["raw_size"] = len(blob)
+    benchmark.extra_info["stored_size"] = stored_size
+    benchmark.extra_info["ratio"] = len(blob) / float(stored_size)
+    benchmark.extra_info["throughput_mb_s"] = (
+        len(blob) / (1024 * 1024) / benchmark.stats.stats.mean
+    )
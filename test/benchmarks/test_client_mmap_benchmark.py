@@ -0,0 +1,46 @@
+import os
+import tracemalloc
+
+import pytest
+
+pytest.importorskip("pytest_benchmark")
+
+from metaflow.client.filecache import FileBlobCache, FileCache
+from metaflow.datastore.content_addressed_store import ContentAddressedStore
+from metaflow.plugins.datastores.local_storage import LocalStorage
+
+BLOB_SIZE = 256 * 1024 * 1024
+
+
+@pytest.fixture(scope="module")
+def saved_blob(tmp_path_factory):
+    root = tmp_path_factory.mktemp("ds")
+    blob = os.urandom(1024 * 1024) * (BLOB_SIZE // (1024 * 1024))
+    store = ContentAddressedStore("data", LocalStorage(str(root)), codec="none")
+    return str(root), store.save_blobs(iter([blob]))[0].key
+
+
+@pytest.mark.parametrize("use_mmap", [False, True])
+def test_load_large_blob(benchmark, tmp_path, saved_blob, use_mmap):
+    root, key = saved_blob
+    peaks = []
+
+    def _setup():
+        # Each round starts with an empty client cache
+        cache_dir = str(tmp_path / ("cache%d" % len(peaks)))
+        store = ContentAddressedStore("data", LocalStorage(root))
+        store.set_blob_cache(
+            FileBlobCache(FileCache(cache_dir=cache_dir, max_size=1024), "bench")
+        )
+        return (store,), {}
+
+    def _do(store):
+        tracemalloc.start()
+        blob = dict(store.load_blobs([key], use_mmap=use_mmap))[key]
+        peaks.append(tracemalloc.get_traced_memory()[1])
+        tracemalloc.stop()
+        return blob
+
+    benchmark.pedantic(_do, setup=_setup, rounds=3)
+    benchmark.extra_info["blob_mb"] = BLOB_SIZE / (1024 * 1024)
+    benchmark.extra_info["peak_python_alloc_mb"] = max(peaks) / (1024 * 1024)
@@ -0,0 +1,139 @@
+import os
+import time
+
+import pytest
+
+pytest.importorskip("pytest_benchmark")
+
+from metaflow.client.filecache import (
+    FileCache,
+    _HeapCacheIndex,
+    _SqliteCacheIndex,
+)
+
+NUM_OBJECTS = 100000
+OBJECT_SIZE = 1024
+NUM_WRITES = 1000
+
+
+@pytest.fixture(scope="module")
+def populated_cache(tmp_path_factory):
+    # A cache directory laid out like the client cache, with NUM_OBJECTS
+    # small objects in it.
+    cache_dir = str(tmp_path_factory.mktemp("cache"))
+    payload = b"x" * OBJECT_SIZE
+    for i in range(NUM_OBJECTS):
+        name = "%040x" % i
+        dirname = os.path.join(cache_dir, "local.root.Flow", name[-2:])
+        if i < 256:
+            os.makedirs(dirname)
+        with open(os.path.join(dirname, name + ".blob"), "wb") as f:
+            f.write(payload)
+    # Build the persistent index once; later opens reuse it
+    _SqliteCacheIndex(cache_dir).close()
+    return cache_dir
+
+
+def _legacy_index(cache_dir):
+    # What FileCache._index_objects used to do on the first write of every
+    # process: a full walk, inserting at the head of a list.
+    objects = []
+    for flow_ds_id in os.listdir(cache_dir):
+        root = os.path.join(cache_dir, flow_ds_id)
+        if not os.path.isdir(root):
+            continue
+        for subdir in os.listdir(root):
+            root = os.path.join(cache_dir, flow_ds_id, subdir)
+            for obj in os.listdir(root):
+                path = os.path.join(root, obj)
+                objects.insert(0, (os.path.getctime(path), os.path.getsize(path), path))
+    return sorted(objects)
+
+
+@pytest.mark.parametrize("impl", ["legacy", "heap", "sqlite"])
+def test_open_index(benchmark, populated_cache, impl):
+    # Cost paid by a new process before its first write to the cache
+    if impl == "legacy":
+        benchmark.pedantic(_legacy_index, args=(populated_cache,), rounds=3)
+    elif impl == "heap":
+        benchmark.pedantic(_HeapCacheIndex, args=(populated_cache,), rounds=3)
+    else:
+
+        def _open():
+            index = _SqliteCacheIndex(populated_cache)
+            n = len(index)
+            index.close()
+            return n
+
+        assert benchmark.pedantic(_open, rounds=3) == NUM_OBJECTS
+    benchmark.extra_info["num_objects"] = NUM_OBJECTS
+
+
+def _fill(index, count):
+    now = time.time() - 3600
+    if isinstance(index, _SqliteCacheIndex):
+        with index._transaction(index._connection()) as conn:
+            conn.executemany(
+                "INSERT INTO objects (path, size, atime) VALUES (?, ?, ?)",
+                (("obj%d" % i, OBJECT_SIZE, now + i * 0.001) for i in range(count)),
+            )
+    else:
+        for i in range(count):
+            index.add("obj%d" % i, OBJECT_SIZE, now + i * 0.001)
+
+
+@pytest.mark.parametrize("index_cls", [_HeapCacheIndex, _SqliteCacheIndex])
+def test_write_and_evict_full_cache(benchmark, tmp_path, index_cls):
+    # Steady state of a full cache: every write evicts the least recently
+    # used object and a fraction of the objects are read in between.
+    rounds = []
+
+    def _setup():
+        cache_dir = str(tmp_path / ("cache%d" % len(rounds)))
+        os.makedirs(cache_dir)
+        index = index_cls(cache_dir)
+        _fill(index, NUM_OBJECTS)
+        rounds.append(index)
+        return (index,), {}
+
+    def _do(index):
+        max_size = NUM_OBJECTS * OBJECT_SIZE
+        evicted = 0
+        for i in range(NUM_WRITES):
+            now = time.time()
+            if i % 10 == 0:
+                index.touch({"obj%d" % (i * 7): now})
+            index.add("new%d" % i, OBJECT_SIZE, now)
+            evicted += len(index.evict(max_size, now))
+        return evicted
+
+    assert benchmark.pedantic(_do, setup=_setup, rounds=3) == NUM_WRITES
+    benchmark.extra_info["num_objects"] = NUM_OBJECTS
+    benchmark.extra_info["num_writes"] = NUM_WRITES
+
+
+def test_filecache_create_file_full_cache(benchmark, tmp_path):
+    # End to end: FileCache.create_file on a cache holding NUM_OBJECTS
+    # objects, including the file system operations.
+    cache_dir = str(tmp_path / "cache")
+    os.makedirs(cache_dir)
+    index = _SqliteCacheIndex(cache_dir)
+    _fill(index, NUM_OBJECTS)
+    index.close()
+    # Slightly less than what is in the index so every write evicts
+    cache = FileCache(
+        cache_dir=cache_dir, max_size=NUM_OBJECTS * OBJECT_SIZE // 1024**2
+    )
+    payload = b"x" * OBJECT_SIZE
+    counter = [0]
+
+    def _do():
+        counter[0] += 1
+        name = "%040x" % counter[0]
+        cache.create_file(
+            os.path.join(cache_dir, "local.root.Flow", name[-2:], name + ".blob"),
+            payload,
+        )
+
+    benchmark(_do)
+    benchmark.extra_info["num_objects"] = NUM_OBJECTS
@@ -0,0 +1,71 @@
+import os
+import subprocess
+import sys
+
+import pytest
+
+pytest.importorskip("pytest_benchmark")
+
+FLOW = """
+from metaflow import FlowSpec, step
+
+
+class ImportTimeFlow(FlowSpec):
+    @step
+    def start(self):
+        self.next(self.end)
+
+    @step
+    def end(self):
+        pass
+
+
+if __name__ == "__main__":
+    ImportTimeFlow()
+"""
+
+
+def _import_time(args, lazy, cwd):
+    # Cumulative time (in us) of "import metaflow" as reported by -X importtime
+    env = dict(
+        os.environ,
+        METAFLOW_PLUGINS_LAZY_RESOLVE="1" if lazy else "0",
+        PYTHONPATH=os.path.dirname(os.path.dirname(os.path.dirname(__file__))),
+        USERNAME="benchmark",
+    )
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime"] + args,
+        env=env,
+        cwd=cwd,
+        capture_output=True,
+        text=True,
+    )
+    for line in result.stderr.splitlines():
+        fields = [f.strip() for f in line.split("|")]
+        if len(fields) == 3 and fields[2] == "metaflow":
+            return int(fields[1])
+    raise AssertionError("metaflow was not imported:\n%s" % result.stderr)
+
+
+@pytest.mark.parametrize("lazy", [False, True], ids=["eager", "lazy"])
+def test_import_metaflow(benchmark, lazy, tmp_path):
+    times = []
+    benchmark.pedantic(
+        lambda: times.append(
+            _import_time(["-c", "import metaflow"], lazy, str(tmp_path))
+        ),
+        rounds=5,
+    )
+    benchmark.extra_info["import_us"] = min(times)
+
+
+@pytest.mark.parametrize("lazy", [False, True], ids=["eager", "lazy"])
+def test_task_startup(benchmark, lazy, tmp_path):
+    # What a task pays before running user code: the `step` command of a flow
+    (tmp_path / "flow.py").write_text(FLOW)
+    args = ["flow.py", "--quiet", "--no-pylint", "step", "--help"]
+    times = []
+    benchmark.pedantic(
+        lambda: times.append(_import_time(args, lazy, str(tmp_path))), rounds=5
+    )
+    benchmark.extra_info["import_us"] = min(times)
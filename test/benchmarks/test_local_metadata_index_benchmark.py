@@ -0,0 +1,68 @@
+from types import SimpleNamespace
+from unittest.mock import MagicMock
+
+import pytest
+
+pytest.importorskip("pytest_benchmark")
+
+from metaflow.metadata_provider import MetaDatum
+from metaflow.plugins.datastores.local_storage import LocalStorage
+from metaflow.plugins.metadata_providers import local as local_module
+from metaflow.plugins.metadata_providers.local import LocalMetadataProvider
+
+FLOW = "LineageFlow"
+RUN = "1"
+# Roughly the number of metadata entries Metaflow registers for each task
+FIELDS_PER_TASK = 20
+
+
+@pytest.fixture(scope="module", params=[1000, 5000])
+def run_with_tasks(request, tmp_path_factory):
+    num_tasks = request.param
+    root = tmp_path_factory.mktemp("metadata") / ".metaflow"
+    saved_root = LocalStorage.datastore_root
+    LocalStorage.datastore_root = str(root)
+    # The index is maintained as the tasks register their metadata
+    local_module.LOCAL_METADATA_INDEX = True
+    provider = LocalMetadataProvider(
+        MagicMock(), SimpleNamespace(name=FLOW), None, None
+    )
+    provider._ensure_meta("flow", None, None, None)
+    provider._ensure_meta("run", RUN, None, None)
+    provider._ensure_meta("step", RUN, "work", None)
+    for task_id in range(num_tasks):
+        provider._ensure_meta("task", RUN, "work", str(task_id))
+        provider.register_metadata(
+            RUN,
+            "work",
+            str(task_id),
+            [
+                MetaDatum(
+                    field="foreach-execution-path",
+                    value="start:%d" % task_id,
+                    type="foreach-execution-path",
+                    tags=[],
+                )
+            ]
+            + [
+                MetaDatum(field="field-%d" % i, value="v", type="t", tags=[])
+                for i in range(FIELDS_PER_TASK - 1)
+            ],
+        )
+    local_module.LOCAL_METADATA_INDEX = False
+    yield num_tasks
+    LocalStorage.datastore_root = saved_root
+
+
+@pytest.mark.parametrize("indexed", [False, True])
+def test_filter_tasks_by_metadata(benchmark, run_with_tasks, indexed, monkeypatch):
+    monkeypatch.setattr(local_module, "LOCAL_METADATA_INDEX", indexed)
+
+    def _filter():
+        return LocalMetadataProvider.filter_tasks_by_metadata(
+            FLOW, RUN, "work", "foreach-execution-path", "start:7$"
+        )
+
+    result = benchmark.pedantic(_filter, rounds=3)
+    assert result == ["%s/%s/work/7" % (FLOW, RUN)]
+    benchmark.extra_info["num_tasks"] = run_with_tasks
@@ -0,0 +1,105 @@
+import json
+import os
+import sys
+
+import pytest
+
+pytest.importorskip("pytest_benchmark")
+
+from io import BytesIO
+
+from metaflow import FlowSpec, step
+from metaflow import package as package_module
+from metaflow.datastore.flow_datastore import FlowDataStore
+from metaflow.metaflow_environment import MetaflowEnvironment
+from metaflow.package import MetaflowPackage
+from metaflow.packaging_sys.backend import PackagingBackend
+from metaflow.plugins.datastores.local_storage import LocalStorage
+
+
+class ColdStartFlow(FlowSpec):
+    @step
+    def start(self):
+        self.next(self.end)
+
+    @step
+    def end(self):
+        pass
+
+
+def _build(flow_ds, archive_format, shared_layer):
+    package_module.PACKAGE_SHARED_LAYER = shared_layer
+    try:
+        pkg = MetaflowPackage(
+            ColdStartFlow(use_cli=False),
+            MetaflowEnvironment(None),
+            lambda *args, **kwargs: None,
+            flow_datastore=flow_ds,
+            backend=PackagingBackend.get_backend(archive_format),
+        )
+        metadata = pkg.package_metadata
+    finally:
+        package_module.PACKAGE_SHARED_LAYER = False
+    layers = [
+        (layer, next(flow_ds.shared_ca_store.load_blobs([layer["sha"]]))[1])
+        for layer in json.loads(metadata).get("layers", [])
+    ]
+    return metadata, pkg.blob, layers
+
+
+@pytest.fixture(scope="module")
+def packages(tmp_path_factory):
+    # A flow directory with a bit of user code next to the flow
+    flow_dir = tmp_path_factory.mktemp("flow")
+    for i in range(50):
+        (flow_dir / ("module_%d.py" % i)).write_text("X = %r\n" % ("x" * 2000))
+    argv = sys.argv
+    sys.argv = [str(flow_dir / "flow.py")]
+    try:
+        flow_ds = FlowDataStore(
+            "ColdStartFlow",
+            storage_impl=LocalStorage,
+            ds_root=str(tmp_path_factory.mktemp("ds")),
+        )
+        return {
+            "tgz": _build(flow_ds, "tgz", False),
+            "zip": _build(flow_ds, "zip", False),
+            "zip-shared-layer": _build(flow_ds, "zip", True),
+        }
+    finally:
+        sys.argv = argv
+
+
+@pytest.mark.parametrize("kind", ["tgz", "zip", "zip-shared-layer"])
+def test_task_cold_start(benchmark, packages, kind, tmp_path):
+    # What a task does before it starts: get the package and extract it. Layers
+    # are already in the layer cache of the node so they are only extracted.
+    metadata, blob, layers = packages[kind]
+    backend = MetaflowPackage.get_backend(metadata)
+    rounds = iter(range(1000))
+
+    def _extract():
+        dest_dir = str(tmp_path / str(next(rounds)))
+        for layer, layer_blob in layers:
+            layer_backend = PackagingBackend.get_backend(layer["archive_format"])
+            with layer_backend.cls_open(BytesIO(layer_blob)) as archive:
+                layer_backend.cls_extract_members(archive, dest_dir=dest_dir)
+        MetaflowPackage.cls_extract_into(metadata, BytesIO(blob), dest_dir)
+        return dest_dir
+
+    dest_dir = benchmark.pedantic(_extract, rounds=5)
+
+    assert os.path.exists(os.path.join(dest_dir, "module_0.py"))
+    benchmark.extra_info["archive_format"] = backend.backend_type()
+    benchmark.extra_info["bytes_downloaded"] = len(blob)
+    benchmark.extra_info["bytes_in_layers"] = sum(len(b) for _, b in layers)
+
+
+@pytest.mark.parametrize("kind", ["tgz", "zip"])
+def test_read_package_info(benchmark, packages, kind):
+    # Reading one member (as the client does for the INFO of a run)
+    metadata, blob, _ = packages[kind]
+
+    info = benchmark(lambda: MetaflowPackage.cls_get_info(metadata, BytesIO(blob)))
+
+    assert info
@@ -0,0 +1,41 @@
+import pytest
+
+pytest.importorskip("pytest_benchmark")
+
+from metaflow.multicore_utils import parallel_map
+
+# The process per item mode is too slow to map over as many items
+NUM_ITEMS = {None: 50, 1000: 100000}
+
+
+@pytest.mark.parametrize("chunk_size", [None, 1000], ids=["per-item", "chunked"])
+def test_small_items(benchmark, chunk_size):
+    num_items = NUM_ITEMS[chunk_size]
+
+    result = benchmark.pedantic(
+        parallel_map,
+        args=(lambda x: x * 2, range(num_items)),
+        kwargs={"max_parallel": 4, "chunk_size": chunk_size},
+        rounds=3,
+    )
+
+    assert len(result) == num_items
+    benchmark.extra_info["num_items"] = num_items
+    benchmark.extra_info["items_per_second"] = num_items / benchmark.stats["mean"]
+
+
+@pytest.mark.parametrize("chunk_size", [None, 1], ids=["per-item", "chunked"])
+def test_large_results(benchmark, chunk_size):
+    np = pytest.importorskip("numpy")
+    num_items = 16
+
+    result = benchmark.pedantic(
+        parallel_map,
+        args=(lambda x: np.full(1 << 20, x), range(num_items)),
+        kwargs={"max_parallel": 4, "chunk_size": chunk_size},
+        rounds=3,
+    )
+
+    assert len(result) == num_items
+    benchmark.extra_info["result_mb"] = num_items * 8
+    benchmark.extra_info["items_per_second"] = num_items / benchmark.stats["mean"]
@@ -0,0 +1,123 @@
+from collections import deque
+
+import pytest
+
+pytest.importorskip("pytest_benchmark")
+
+from metaflow import FlowSpec, step
+from metaflow.graph import FlowGraph
+from metaflow.runtime import FinishedTasks, NativeRuntime
+from metaflow.tuple_util import ForeachFrame
+
+
+class WideForeachFlow(FlowSpec):
+    @step
+    def start(self):
+        self.next(self.work, foreach="items")
+
+    @step
+    def work(self):
+        self.next(self.join)
+
+    @step
+    def join(self, inputs):
+        self.next(self.end)
+
+    @step
+    def end(self):
+        pass
+
+
+class _Results(dict):
+    def is_none(self, name):
+        return self.get(name) is None
+
+
+class _FinishedTask(object):
+    is_cloned = False
+
+    def __init__(self, step, path, task_index, transition, foreach_stack, **results):
+        self.step = step
+        self.path = path
+        self.task_index = task_index
+        self.results = _Results(
+            _transition=transition,
+            _foreach_stack=foreach_stack,
+            _iteration_stack=[],
+            **results
+        )
+
+    @property
+    def finished_id(self):
+        return (
+            self.step,
+            tuple(f._replace(value=0) for f in self.results["_foreach_stack"]),
+            (),
+        )
+
+
+def _make_runtime(num_splits):
+    rt = NativeRuntime.__new__(NativeRuntime)
+    rt._graph = FlowGraph(WideForeachFlow)
+    rt._finished = FinishedTasks()
+    rt._is_cloned = {}
+    rt._run_queue = deque()
+    rt._ran_or_scheduled_task_index = set()
+    rt._unprocessed_steps = set(n.name for n in rt._graph)
+    rt._control_num_splits = {}
+    rt._max_num_splits = num_splits
+    return rt
+
+
+def _simulate_foreach(rt, num_splits):
+    # The start step finishes and fans out; every child is then popped from the
+    # queue and finishes immediately, in queue order, as with a runtime with an
+    # unlimited number of workers and instantaneous tasks.
+    start = _FinishedTask(
+        "start",
+        "run/start/1",
+        "start[][]",
+        (["work"], "items"),
+        [],
+        _foreach_num_splits=num_splits,
+    )
+    rt._queue_tasks([start])
+    task_id = 1
+    while rt._run_queue:
+        step_name, kwargs = rt._queue_pop()
+        if step_name != "work":
+            return step_name, kwargs
+        task_id += 1
+        split_index = int(kwargs["split_index"])
+        frame = ForeachFrame(
+            step="start",
+            var="items",
+            num_splits=num_splits,
+            index=split_index,
+            value=split_index,
+        )
+        rt._queue_tasks(
+            [
+                _FinishedTask(
+                    "work",
+                    "run/work/%d" % task_id,
+                    "work[%d][]" % split_index,
+                    (["join"], None),
+                    [frame],
+                )
+            ]
+        )
+
+
+@pytest.mark.parametrize("num_splits", [1000, 10000, 100000])
+def test_schedule_wide_foreach(benchmark, num_splits):
+    def _setup():
+        return (_make_runtime(num_splits), num_splits), {}
+
+    step_name, kwargs = benchmark.pedantic(_simulate_foreach, setup=_setup, rounds=3)
+    assert step_name == "join"
+    assert len(kwargs["input_paths"]) == num_splits
+    benchmark.extra_info["num_splits"] = num_splits
+    benchmark.extra_info["us_per_task"] = (
+        benchmark.stats["mean"] * 1e6 / float(num_splits)
+    )
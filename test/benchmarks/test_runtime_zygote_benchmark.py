@@ -0,0 +1,69 @@
+import os
+import subprocess
+import sys
+import textwrap
+
+import pytest
+
+pytest.importorskip("pytest_benchmark")
+
+NUM_SPLITS = 32
+
+FLOW = (
+    """
+from metaflow import FlowSpec, step
+
+
+class TrivialForeachFlow(FlowSpec):
+    @step
+    def start(self):
+        self.items = list(range(%d))
+        self.next(self.work, foreach="items")
+
+    @step
+    def work(self):
+        self.next(self.join)
+
+    @step
+    def join(self, inputs):
+        self.next(self.end)
+
+    @step
+    def end(self):
+        pass
+
+
+if __name__ == "__main__":
+    TrivialForeachFlow()
+"""
+    % NUM_SPLITS
+)
+
+
+@pytest.mark.parametrize("zygote", [False, True])
+def test_trivial_tasks_per_second(benchmark, tmp_path, zygote):
+    flow = tmp_path / "trivial_foreach_flow.py"
+    flow.write_text(textwrap.dedent(FLOW))
+    env = dict(os.environ)
+    env.update(
+        {
+            "METAFLOW_RUNTIME_ZYGOTE": "1" if zygote else "0",
+            "METAFLOW_DATASTORE_SYSROOT_LOCAL": str(tmp_path),
+            "METAFLOW_DEFAULT_METADATA": "local",
+            "USER": os.environ.get("USER", "benchmark"),
+        }
+    )
+
+    def _run():
+        subprocess.run(
+            [sys.executable, str(flow), "--no-pylint", "--quiet", "run"],
+            cwd=str(tmp_path),
+            env=env,
+            check=True,
+            stdout=subprocess.DEVNULL,
+        )
+
+    benchmark.pedantic(_run, rounds=3)
+    num_tasks = NUM_SPLITS + 3
+    benchmark.extra_info["num_tasks"] = num_tasks
+    benchmark.extra_info["tasks_per_second"] = num_tasks / benchmark.stats["mean"]
@@ -0,0 +1,83 @@
+import subprocess
+
+import pytest
+
+pytest.importorskip("pytest_benchmark")
+moto_server = pytest.importorskip("moto.server")
+
+import boto3
+
+import metaflow.plugins.datastores.s3_storage as s3_storage_module
+from metaflow.datastore.flow_datastore import FlowDataStore
+from metaflow.metaflow_config import DATATOOLS_CLIENT_PARAMS
+from metaflow.plugins.datastores.s3_storage import S3Storage
+
+NUM_ARTIFACTS = 24
+
+
+@pytest.fixture(scope="module")
+def s3_root(tmp_path_factory):
+    # Local S3 stand-in; s3op subprocesses reach it through the environment
+    server = moto_server.ThreadedMotoServer(ip_address="127.0.0.1", port=0)
+    server.start()
+    endpoint = "http://%s:%d" % server.get_host_and_port()
+    with pytest.MonkeyPatch.context() as mp:
+        mp.setenv("AWS_ACCESS_KEY_ID", "testing")
+        mp.setenv("AWS_SECRET_ACCESS_KEY", "testing")
+        mp.setenv("AWS_DEFAULT_REGION", "us-east-1")
+        mp.setenv("METAFLOW_S3_ENDPOINT_URL", endpoint)
+        mp.setitem(DATATOOLS_CLIENT_PARAMS, "endpoint_url", endpoint)
+        mp.setattr(
+            s3_storage_module,
+            "ARTIFACT_LOCALROOT",
+            str(tmp_path_factory.mktemp("tmproot")),
+        )
+        boto3.client("s3", endpoint_url=endpoint).create_bucket(Bucket="benchmark")
+        yield "s3://benchmark/metaflow"
+    server.stop()
+
+
+def _task(flow_ds, task_id):
+    # Datastore traffic of a task: read the inputs written by the previous
+    # task, then save its own artifacts and mark itself as done
+    if task_id:
+        (parent,) = flow_ds.get_task_datastores(pathspecs=["1/work/%d" % (task_id - 1)])
+        inputs = list(parent.load_artifacts(list(parent)))
+        assert len(inputs) == NUM_ARTIFACTS
+    task_ds = flow_ds.get_task_datastore("1", "work", str(task_id), 0, mode="w")
+    task_ds.init_task()
+    task_ds.save_artifacts(
+        iter(
+            ("artifact_%d" % i, "%d-%d" % (task_id, i) * 1000)
+            for i in range(NUM_ARTIFACTS)
+        ),
+        len_hint=NUM_ARTIFACTS,
+    )
+    task_ds.done()
+
+
+@pytest.mark.parametrize("session", [False, True])
+def test_task_datastore_traffic(benchmark, s3_root, session, monkeypatch):
+    monkeypatch.setattr(s3_storage_module, "S3_STORAGE_SESSION", session)
+    flow_ds = FlowDataStore(
+        "SessionFlow",
+        storage_impl=S3Storage,
+        ds_root="%s/%s" % (s3_root, "session" if session else "default"),
+    )
+    launches = []
+    check_output = subprocess.check_output
+
+    def _counting_check_output(*args, **kwargs):
+        launches.append(args)
+        return check_output(*args, **kwargs)
+
+    monkeypatch.setattr(subprocess, "check_output", _counting_check_output)
+    task_ids = []
+
+    def _setup():
+        task_ids.append(len(task_ids))
+        return (flow_ds, task_ids[-1]), {}
+
+    benchmark.pedantic(_task, setup=_setup, rounds=4)
+    benchmark.extra_info["s3op_launches_per_task"] = len(launches) / len(task_ids)
+    s3_storage_module._S3StorageSession.close_all()
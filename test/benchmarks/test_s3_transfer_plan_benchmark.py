@@ -0,0 +1,105 @@
+import socket
+import subprocess
+import sys
+import time
+from io import BytesIO
+
+import pytest
+
+pytest.importorskip("pytest_benchmark")
+moto_server = pytest.importorskip("moto.server")
+
+import boto3
+
+import metaflow.plugins.datastores.s3_storage as s3_storage_module
+from metaflow.metaflow_config import DATATOOLS_CLIENT_PARAMS
+from metaflow.plugins.datastores.s3_storage import S3Storage
+
+MB = 1024 * 1024
+
+WORKLOADS = {
+    "single-huge": [128 * MB],
+    "few-large": [24 * MB] * 4,
+    "many-small": [4096] * 300,
+    "mixed": [80 * MB] + [4096] * 100,
+}
+
+
+@pytest.fixture(scope="module")
+def s3_root(tmp_path_factory):
+    # Local S3 stand-in, in its own process so that it does not compete with
+    # the transfers for the GIL. s3op subprocesses reach it through the
+    # environment.
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+    endpoint = "http://127.0.0.1:%d" % port
+    server = subprocess.Popen(
+        [sys.executable, "-m", "moto.server", "-H", "127.0.0.1", "-p", str(port)],
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    try:
+        with pytest.MonkeyPatch.context() as mp:
+            mp.setenv("AWS_ACCESS_KEY_ID", "testing")
+            mp.setenv("AWS_SECRET_ACCESS_KEY", "testing")
+            mp.setenv("AWS_DEFAULT_REGION", "us-east-1")
+            mp.setenv("METAFLOW_S3_ENDPOINT_URL", endpoint)
+            mp.setitem(DATATOOLS_CLIENT_PARAMS, "endpoint_url", endpoint)
+            mp.setattr(
+                s3_storage_module,
+                "ARTIFACT_LOCALROOT",
+                str(tmp_path_factory.mktemp("tmproot")),
+            )
+            client = boto3.client("s3", endpoint_url=endpoint)
+            for _ in range(100):
+                try:
+                    client.create_bucket(Bucket="benchmark")
+                    break
+                except Exception:
+                    time.sleep(0.1)
+            yield "s3://benchmark/metaflow"
+    finally:
+        server.terminate()
+        server.wait()
+
+
+def _force(monkeypatch, strategy):
+    # Use a single strategy for all the objects instead of the planned ones
+    monkeypatch.setattr(
+        s3_storage_module,
+        "plan_transfer",
+        lambda num_objects, total_size=None: strategy,
+    )
+    monkeypatch.setattr(
+        s3_storage_module,
+        "plan_upload",
+        lambda sizes: ([], list(range(len(sizes))), strategy),
+    )
+
+
+@pytest.mark.parametrize("workload", list(WORKLOADS))
+@pytest.mark.parametrize("strategy", ["planned", "sequential", "threads", "s3op"])
+def test_transfer_roundtrip(benchmark, s3_root, monkeypatch, workload, strategy):
+    if strategy != "planned":
+        _force(monkeypatch, strategy)
+    sizes = WORKLOADS[workload]
+    storage = S3Storage("%s/%s/%s" % (s3_root, workload, strategy))
+    blobs = [bytes([i % 256]) * size for i, size in enumerate(sizes)]
+    paths = ["obj/%d" % i for i in range(len(sizes))]
+
+    def _roundtrip():
+        storage.save_bytes(
+            ((p, BytesIO(b)) for p, b in zip(paths, blobs)),
+            overwrite=True,
+            len_hint=len(paths),
+        )
+        with storage.load_bytes(paths) as results:
+            loaded = sum(1 for _, path, _ in results if path is not None)
+        assert loaded == len(paths)
+
+    benchmark.pedantic(_roundtrip, rounds=3)
+    benchmark.extra_info["num_objects"] = len(sizes)
+    benchmark.extra_info["total_mb"] = sum(sizes) / MB
+    if strategy == "planned":
+        benchmark.extra_info["plan"] = s3_storage_module.plan_upload(sizes)[2]
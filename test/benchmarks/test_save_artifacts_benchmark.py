@@ -0,0 +1,44 @@
+import os
+
+import pytest
+
+pytest.importorskip("pytest_benchmark")
+
+from metaflow import metaflow_config
+from metaflow.datastore.flow_datastore import FlowDataStore
+from metaflow.plugins.datastores.local_storage import LocalStorage
+from metaflow.plugins.datastores.serializers.pickle_serializer import PickleSerializer
+
+NUM_ARTIFACTS = 50
+ARTIFACT_SIZE = 4 * 1024 * 1024
+
+
+def _artifacts(round_id):
+    # Each round saves new content so that nothing is deduplicated by the CAS
+    return [
+        ("artifact_%d" % i, (b"%d-%d-" % (round_id, i)) * (ARTIFACT_SIZE // 8))
+        for i in range(NUM_ARTIFACTS)
+    ]
+
+
+@pytest.mark.parametrize("workers", [1, 4, 8])
+def test_save_artifacts(benchmark, tmp_path, monkeypatch, workers):
+    monkeypatch.setattr(metaflow_config, "DATASTORE_SAVE_WORKERS", workers)
+    flow_ds = FlowDataStore(
+        "BenchmarkFlow", storage_impl=LocalStorage, ds_root=str(tmp_path)
+    )
+    rounds = []
+
+    def _setup():
+        task_id = str(len(rounds))
+        rounds.append(task_id)
+        task_ds = flow_ds.get_task_datastore("1", "start", task_id, 0, mode="w")
+        task_ds._serializers = [PickleSerializer]
+        return (task_ds, _artifacts(len(rounds))), {}
+
+    def _do(task_ds, artifacts):
+        task_ds.save_artifacts(iter(artifacts), len_hint=len(artifacts))
+
+    benchmark.pedantic(_do, setup=_setup, rounds=3)
+    benchmark.extra_info["total_mb"] = NUM_ARTIFACTS * ARTIFACT_SIZE / (1024 * 1024)
+    benchmark.extra_info["cpu_count"] = os.cpu_count()
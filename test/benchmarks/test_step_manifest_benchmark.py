@@ -0,0 +1,52 @@
+import pytest
+
+pytest.importorskip("pytest_benchmark")
+
+from metaflow import metaflow_config
+from metaflow.datastore.flow_datastore import FlowDataStore
+from metaflow.plugins.datastores.local_storage import LocalStorage
+
+
+class _CountingStorage(LocalStorage):
+    # Counts the objects fetched: on a remote datastore each is a request
+    num_loaded = 0
+
+    def load_bytes(self, paths):
+        _CountingStorage.num_loaded += len(paths)
+        return super(_CountingStorage, self).load_bytes(paths)
+
+
+@pytest.fixture(scope="module", params=[2000, 10000])
+def foreach_step(request, tmp_path_factory):
+    num_tasks = request.param
+    flow_ds = FlowDataStore(
+        "JoinFlow",
+        storage_impl=_CountingStorage,
+        ds_root=str(tmp_path_factory.mktemp("ds")),
+    )
+    metaflow_config.DATASTORE_STEP_MANIFEST = True
+    try:
+        for task_id in range(num_tasks):
+            task_ds = flow_ds.get_task_datastore("1", "work", str(task_id), 0, mode="w")
+            task_ds.init_task()
+            task_ds.save_artifacts(iter([("value", task_id)]))
+            task_ds.done()
+    finally:
+        metaflow_config.DATASTORE_STEP_MANIFEST = False
+    return flow_ds, num_tasks
+
+
+@pytest.mark.parametrize("manifest", [False, True])
+def test_resolve_join_inputs(benchmark, foreach_step, manifest, monkeypatch):
+    flow_ds, num_tasks = foreach_step
+    monkeypatch.setattr(metaflow_config, "DATASTORE_STEP_MANIFEST", manifest)
+    pathspecs = ["1/work/%d" % t for t in range(num_tasks)]
+    _CountingStorage.num_loaded = 0
+
+    result = benchmark.pedantic(
+        flow_ds.get_task_datastores, kwargs={"pathspecs": pathspecs}, rounds=3
+    )
+
+    assert len(result) == num_tasks
+    benchmark.extra_info["num_tasks"] = num_tasks
+    benchmark.extra_info["objects_loaded_per_round"] = _CountingStorage.num_loaded / 3
@@ -0,0 +1,181 @@
+import io
+import json
+import sys
+import threading
+
+import pytest
+
+from metaflow.plugins.cards import card_creator as card_creator_module
+from metaflow.plugins.cards.card_creator import CardCreator
+from metaflow.plugins.cards.card_worker import (
+    STATUS_COALESCED,
+    STATUS_FAILED,
+    STATUS_OK,
+    CardRenderWorker,
+    CardRenderWorkerException,
+    CardRenderWorkerTimeout,
+    serve,
+)
+
+# Worker rendering nothing: it records the requests and their components in
+# the output of failed requests so that the tests can check them.
+WORKER_SCRIPT = """
+import json, sys, time
+from metaflow.plugins.cards.card_worker import serve
+
+def render(request, components):
+    if request["args"].get("sleep"):
+        time.sleep(request["args"]["sleep"])
+    if request["args"].get("exit"):
+        sys.exit(1)
+    raise Exception(json.dumps([request["mode"], components]))
+
+serve(render, sys.stdin.buffer, sys.stdout.buffer)
+"""
+
+
+def _request(request_id, card_uuid="card", mode="render_runtime", **extra):
+    request = {"id": request_id, "card_uuid": card_uuid, "mode": mode, "args": {}}
+    request.update(extra)
+    return json.dumps(request).encode("utf-8") + b"\n"
+
+
+def _replies(outfile):
+    return [json.loads(line) for line in outfile.getvalue().splitlines()]
+
+
+def test_serve_applies_component_updates():
+    rendered = []
+    requests = _request(0, components=["a", "b"]) + _request(
+        1, component_updates=[[1, "c"]]
+    )
+    outfile = io.BytesIO()
+
+    serve(lambda r, c: rendered.append(c), io.BytesIO(requests), outfile)
+
+    # Both requests may be coalesced; the latest components are rendered
+    assert rendered[-1] == ["a", "c"]
+    assert _replies(outfile)[-1] == {"id": 1, "status": STATUS_OK, "output": ""}
+
+
+def test_serve_coalesces_requests_of_a_busy_worker():
+    rendered = []
+    started, release = threading.Event(), threading.Event()
+
+    def _render(request, components):
+        rendered.append(request["id"])
+        if request["id"] == 0:
+            started.set()
+            release.wait()
+
+    class _Requests(object):
+        # Sends the first request, then a burst of requests while it renders
+        def __iter__(self):
+            yield _request(0)
+            started.wait()
+            for request_id in range(1, 5):
+                yield _request(request_id)
+            yield _request(5, mode="refresh")
+            release.set()
+
+    outfile = io.BytesIO()
+    serve(_render, _Requests(), outfile)
+
+    assert rendered == [0, 4, 5]
+    statuses = {reply["id"]: reply["status"] for reply in _replies(outfile)}
+    assert statuses == {
+        0: STATUS_OK,
+        1: STATUS_COALESCED,
+        2: STATUS_COALESCED,
+        3: STATUS_COALESCED,
+        4: STATUS_OK,
+        5: STATUS_OK,
+    }
+
+
+def test_serve_reports_failures():
+    def _render(request, components):
+        raise ValueError("cannot render")
+
+    outfile = io.BytesIO()
+    serve(_render, io.BytesIO(_request(0)), outfile)
+
+    (reply,) = _replies(outfile)
+    assert reply["status"] == STATUS_FAILED
+    assert "cannot render" in reply["output"]
+
+
+@pytest.fixture
+def worker():
+    worker = CardRenderWorker([sys.executable, "-c", WORKER_SCRIPT], None)
+    yield worker
+    worker.kill()
+
+
+def test_worker_sends_only_changed_components(worker):
+    status, output = worker.render(
+        "card", "render_runtime", {}, ["a", "b"], wait=True, timeout=30
+    )
+    assert status == STATUS_FAILED
+    assert json.loads(output.strip().splitlines()[-1].split(": ", 1)[1]) == [
+        "render_runtime",
+        ["a", "b"],
+    ]
+    request = {}
+    worker._add_components(request, "card", ["a", "c"])
+    assert request == {"component_updates": [[1, "c"]]}
+    request = {}
+    worker._add_components(request, "card", ["a", "c"])
+    assert request == {}
+    request = {}
+    worker._add_components(request, "card", ["a"])
+    assert request == {"components": ["a"]}
+
+
+def test_worker_async_requests_and_progress(worker):
+    assert worker.render("card", "refresh", {}, [], timeout=30) == (STATUS_OK, "")
+    assert worker.render("card", "render", {}, ["x"], wait=True, timeout=30)[0] == (
+        STATUS_FAILED
+    )
+    assert not worker.is_stuck()
+    assert worker.is_alive()
+
+
+def test_worker_timeout(worker):
+    worker.render("card", "render", {"sleep": 2}, [], timeout=0.1)
+    with pytest.raises(CardRenderWorkerTimeout):
+        worker.render("card", "refresh", {}, [], wait=True, timeout=0.5)
+    assert worker.is_stuck()
+
+
+def test_worker_death(worker):
+    with pytest.raises(CardRenderWorkerException):
+        worker.render("card", "render", {"exit": True}, [], wait=True, timeout=30)
+    worker._proc.wait(timeout=30)
+    assert not worker.is_alive()
+
+
+def test_card_creator_falls_back_to_subprocess(mocker):
+    creator = CardCreator(
+        top_level_options=[], should_save_metadata_lambda=lambda _: (False, {})
+    )
+    mocker.patch.object(card_creator_module, "CARD_RENDER_WORKER", True)
+    mocker.patch.object(
+        card_creator_module,
+        "CardRenderWorker",
+        side_effect=OSError("cannot start"),
+    )
+    run_command = mocker.patch.object(
+        creator, "_run_command", return_value=(b"", False)
+    )
+    attributes = {"type": "blank", "timeout": None, "save_errors": True}
+
+    for _ in range(card_creator_module.MAX_RENDER_WORKER_FAILURES + 1):
+        creator._run_cards_subprocess(
+            "card", None, "refresh", "1/start/1", attributes, None, [], None, None
+        )
+
+    assert run_command.call_count == card_creator_module.MAX_RENDER_WORKER_FAILURES + 1
+    assert card_creator_module.CardRenderWorker.call_count == (
+        card_creator_module.MAX_RENDER_WORKER_FAILURES
+    )
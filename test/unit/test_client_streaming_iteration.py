@@ -0,0 +1,164 @@
+import os
+from types import SimpleNamespace
+from unittest.mock import MagicMock
+from urllib.parse import parse_qs, urlparse
+
+import pytest
+
+from metaflow.client import core
+from metaflow.metadata_provider import MetadataProvider
+from metaflow.plugins.datastores.local_storage import LocalStorage
+from metaflow.plugins.metadata_providers.local import LocalMetadataProvider
+from metaflow.plugins.metadata_providers.service import ServiceMetadataProvider
+
+FLOW = "StreamingFlow"
+NUM_RUNS = 5
+NUM_TASKS = 7
+
+
+def _set_created(provider_cls, ts, *path):
+    # Gives a deterministic creation time to an object
+    self_file = os.path.join(provider_cls._get_metadir(FLOW, *path), "_self.json")
+    os.utime(self_file, (ts, ts))
+
+
+@pytest.fixture
+def local_flow(tmp_path, monkeypatch):
+    monkeypatch.setattr(LocalStorage, "datastore_root", str(tmp_path / ".metaflow"))
+    monkeypatch.setattr(core, "current_metadata", LocalMetadataProvider)
+    monkeypatch.setattr(core, "CLIENT_STREAMING_ITERATION", True)
+    monkeypatch.setattr(core, "CLIENT_ITERATION_PAGE_SIZE", 2)
+    provider = LocalMetadataProvider(
+        MagicMock(), SimpleNamespace(name=FLOW), None, None
+    )
+    provider._ensure_meta("flow", None, None, None)
+    for run in range(NUM_RUNS):
+        run_id = str(run)
+        tags = ["even"] if run % 2 == 0 else ["odd"]
+        provider._ensure_meta("run", run_id, None, None, tags=tags)
+        _set_created(LocalMetadataProvider, 1000 + run, run_id)
+    provider._ensure_meta("step", "4", "start", None)
+    for task in range(NUM_TASKS):
+        provider._ensure_meta("task", "4", "start", str(task))
+        _set_created(LocalMetadataProvider, 2000 + task, "4", "start", str(task))
+    return core.Flow(FLOW, _namespace_check=False)
+
+
+def test_runs_are_streamed_newest_first(local_flow, mocker):
+    read = mocker.spy(LocalMetadataProvider, "_read_json_file")
+
+    assert next(iter(local_flow)).id == "4"
+    # Only the first page was read
+    assert read.call_count == 2
+
+    assert [run.id for run in local_flow] == ["4", "3", "2", "1", "0"]
+
+
+def test_latest_run_reads_a_single_page(local_flow, mocker):
+    read = mocker.spy(LocalMetadataProvider, "_read_json_file")
+
+    assert local_flow.latest_run.id == "4"
+    assert read.call_count == 2
+
+
+def test_tasks_are_streamed_with_the_tags_of_their_run(local_flow, mocker):
+    step = local_flow["4"]["start"]
+    get_object = mocker.spy(LocalMetadataProvider, "get_object")
+
+    tasks = list(step)
+
+    assert [task.id for task in tasks] == [str(t) for t in reversed(range(NUM_TASKS))]
+    assert all("even" in task.tags for task in tasks)
+    # The run is only looked up once for all its tasks
+    assert get_object.call_count == 1
+
+
+def test_streamed_children_are_filtered_and_limited(local_flow):
+    runs = list(
+        LocalMetadataProvider.iter_objects(
+            "flow", "run", {"any_tags": "even"}, FLOW, page_size=2
+        )
+    )
+    assert [run["run_number"] for run in runs] == ["4", "2", "0"]
+
+    runs = list(
+        LocalMetadataProvider.iter_objects(
+            "flow", "run", {"any_tags": "odd"}, FLOW, limit=1, page_size=2
+        )
+    )
+    assert [run["run_number"] for run in runs] == ["3"]
+
+
+def test_default_iteration_sorts_all_children():
+    class Provider(MetadataProvider):
+        @classmethod
+        def _get_object_internal(
+            cls, obj_type, obj_order, sub_type, sub_order, filters, attempt, *args
+        ):
+            return [{"run_number": str(i), "ts_epoch": i} for i in (2, 5, 1, 4, 3)]
+
+    runs = Provider.iter_objects("flow", "run", None, FLOW, limit=4, page_size=3)
+    assert [run["run_number"] for run in runs] == ["5", "4", "3", "2"]
+
+
+@pytest.mark.parametrize("paginates", [True, False])
+def test_service_pages_through_the_children(monkeypatch, paginates):
+    all_runs = [{"run_number": str(i), "ts_epoch": i} for i in range(10)]
+    requests = []
+
+    def _request(monitor, path, method, *args, **kwargs):
+        url = urlparse(path)
+        requests.append(url.path)
+        assert url.path == "/flows/%s/runs" % FLOW
+        if not paginates:
+            return list(all_runs), None
+        query = parse_qs(url.query)
+        assert query["_order"] == ["-ts_epoch"]
+        limit, page = int(query["_limit"][0]), int(query["_page"][0])
+        ordered = sorted(all_runs, key=lambda r: -r["ts_epoch"])
+        return ordered[(page - 1) * limit : page * limit], None
+
+    monkeypatch.setattr(ServiceMetadataProvider, "_request", _request)
+
+    runs = ServiceMetadataProvider.iter_objects("flow", "run", None, FLOW, page_size=4)
+    assert next(runs)["run_number"] == "9"
+    assert len(requests) == 1
+    assert [run["run_number"] for run in runs] == [str(i) for i in range(8, -1, -1)]
+    assert len(requests) == (3 if paginates else 1)
+
+
+def test_latest_run_in_namespace_is_found_in_a_few_requests(monkeypatch):
+    # The runs of the namespace are behind many runs of other namespaces
+    all_runs = [
+        {
+            "flow_id": FLOW,
+            "run_number": str(i),
+            "ts_epoch": i,
+            "tags": ["user:me" if i == 0 else "user:other"],
+            "system_tags": [],
+        }
+        for i in range(100)
+    ]
+    requests = []
+
+    def _request(monitor, path, method, *args, **kwargs):
+        url = urlparse(path)
+        requests.append(url.path)
+        query = parse_qs(url.query)
+        limit, page = int(query["_limit"][0]), int(query["_page"][0])
+        ordered = sorted(all_runs, key=lambda r: -r["ts_epoch"])
+        return ordered[(page - 1) * limit : page * limit], None
+
+    monkeypatch.setattr(ServiceMetadataProvider, "_request", _request)
+    monkeypatch.setattr(core, "current_metadata", ServiceMetadataProvider)
+    monkeypatch.setattr(core, "CLIENT_STREAMING_ITERATION", True)
+    monkeypatch.setattr(core, "CLIENT_ITERATION_PAGE_SIZE", 50)
+
+    flow = core.Flow(
+        _object={"flow_id": FLOW, "ts_epoch": 0, "tags": [], "system_tags": []},
+        _current_namespace="user:me",
+    )
+    # The namespace check of the flow stops at the first run of the namespace
+    assert len(requests) == 2
+    assert flow.latest_run.id == "0"
+    assert len(requests) == 4
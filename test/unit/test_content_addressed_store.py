@@ -1,3 +1,4 @@
+import os
 from contextlib import contextmanager
 
 import pytest
@@ -93,3 +94,247 @@ def test_load_blobs_error_message_uses_current_path_key(
     assert stale_path not in message
     for expected in expected_substrings:
         assert expected in message
+
+
+class _CountingStorageImpl(_FakeStorageImpl):
+    def __init__(self, existing=()):
+        super(_CountingStorageImpl, self).__init__([])
+        self.existing = set(existing)
+        self.is_file_calls = []
+        self.saved = []
+
+    def is_file(self, paths):
+        self.is_file_calls.append(list(paths))
+        return [p in self.existing for p in paths]
+
+    def save_bytes(self, path_and_bytes_iter, overwrite=False, len_hint=0):
+        for path, (byte_obj, meta) in path_and_bytes_iter:
+            self.saved.append((path, byte_obj.read(), meta, len_hint))
+            self.existing.add(path)
+
+
+def test_save_blobs_checks_existence_in_one_call():
+    storage = _CountingStorageImpl()
+    store = ContentAddressedStore("prefix", storage)
+    blobs = [("blob-%d" % i).encode("utf-8") for i in range(50)]
+
+    results = store.save_blobs(iter(blobs), raw=True, len_hint=len(blobs))
+
+    assert len(storage.is_file_calls) == 1
+    assert len(storage.is_file_calls[0]) == 50
+    assert len(results) == 50
+    assert all(r.uri.startswith("fake://prefix/") for r in results)
+    assert [s[1] for s in storage.saved] == blobs
+    assert all(s[3] == 50 for s in storage.saved)
+
+
+def test_save_blobs_uploads_only_missing_and_deduplicates():
+    storage = _CountingStorageImpl()
+    store = ContentAddressedStore("prefix", storage)
+    first = store.save_blobs(iter([b"a", b"b"]), raw=True)
+    assert len(storage.saved) == 2
+
+    results = store.save_blobs(iter([b"a", b"c", b"c", b"b"]), raw=True)
+
+    assert len(storage.is_file_calls) == 2
+    # "c" is checked once even though it appears twice in the batch
+    assert len(storage.is_file_calls[1]) == 3
+    assert [s[1] for s in storage.saved] == [b"a", b"b", b"c"]
+    assert [r.key for r in results] == [
+        first[0].key,
+        results[1].key,
+        results[1].key,
+        first[1].key,
+    ]
+
+
+def test_save_blobs_empty_iterator_makes_no_calls():
+    storage = _CountingStorageImpl()
+    store = ContentAddressedStore("prefix", storage)
+    assert store.save_blobs(iter([])) == []
+    assert storage.is_file_calls == []
+    assert storage.saved == []
+
+
+def test_save_blobs_local_storage_round_trip(tmp_path, mocker):
+    from metaflow.plugins.datastores.local_storage import LocalStorage
+
+    storage = LocalStorage(str(tmp_path))
+    is_file_spy = mocker.spy(storage, "is_file")
+    store = ContentAddressedStore("data", storage)
+    blobs = [("artifact-%d" % i).encode("utf-8") for i in range(100)]
+
+    results = store.save_blobs(iter(blobs))
+    assert is_file_spy.call_count == 1
+
+    # Saving the same artifacts again finds them all and uploads nothing
+    save_spy = mocker.spy(storage, "save_bytes")
+    store.save_blobs(iter(blobs))
+    assert is_file_spy.call_count == 2
+    assert save_spy.call_count == 0
+
+    loaded = dict(store.load_blobs([r.key for r in results]))
+    assert [loaded[r.key] for r in results] == blobs
+
+
+def test_save_blobs_s3_storage_uses_one_bulk_info_call(mocker, monkeypatch):
+    import metaflow.plugins.datastores.s3_storage as s3_storage_module
+    from metaflow.plugins.datastores.s3_storage import S3Storage
+
+    # Too many objects to be checked and uploaded from the process
+    monkeypatch.setattr(s3_storage_module, "S3_TRANSFER_INPROCESS_MAX_COUNT", 10)
+    monkeypatch.setattr(s3_storage_module, "_multiple_cpus", True)
+
+    s3 = mocker.MagicMock()
+    s3.info_many.side_effect = lambda paths, return_missing: [
+        mocker.MagicMock(exists=False) for _ in paths
+    ]
+    s3_cm = mocker.MagicMock()
+    s3_cm.__enter__.return_value = s3
+    s3_cm.__exit__.return_value = False
+    mocker.patch.object(s3_storage_module, "S3", return_value=s3_cm)
+
+    storage = object.__new__(S3Storage)
+    storage.datastore_root = "s3://unit-test-root"
+    storage.s3_client = object()
+    store = ContentAddressedStore("data", storage)
+
+    store.save_blobs(iter([("artifact-%d" % i).encode("utf-8") for i in range(100)]))
+
+    # One bulk existence check and one parallel upload instead of 100 HEAD
+    # requests followed by an upload.
+    assert s3.info.call_count == 0
+    assert s3.info_many.call_count == 1
+    assert s3.put_many.call_count == 1
+
+
+_PAYLOAD = b"metaflow artifact payload " * 4096
+
+
+@pytest.mark.parametrize("codec", ["gzip", "none", "zstd", "lz4"])
+def test_codec_round_trip(tmp_path, codec):
+    from metaflow.datastore.content_addressed_store import is_codec_available
+    from metaflow.plugins.datastores.local_storage import LocalStorage
+
+    if not is_codec_available(codec):
+        pytest.skip("codec %s is not installed" % codec)
+    storage = LocalStorage(str(tmp_path))
+    store = ContentAddressedStore("data", storage, codec=codec)
+
+    key = store.save_blobs(iter([_PAYLOAD]))[0].key
+    _, meta = storage.info_file("data/%s/%s" % (key[:2], key))
+    if codec == "gzip":
+        assert meta == {"cas_raw": False, "cas_version": 1}
+    else:
+        assert meta == {"cas_raw": False, "cas_version": 2, "cas_codec": codec}
+
+    # A store configured with a different codec can still read the blob
+    reader = ContentAddressedStore("data", storage, codec="gzip")
+    assert dict(reader.load_blobs([key]))[key] == _PAYLOAD
+
+
+def test_large_blob_codec_selection(tmp_path):
+    from metaflow.plugins.datastores.local_storage import LocalStorage
+
+    storage = LocalStorage(str(tmp_path))
+    store = ContentAddressedStore(
+        "data", storage, codec="gzip", large_blob_codec=("none", 1024)
+    )
+    small, large = store.save_blobs(iter([b"small", _PAYLOAD]))
+
+    _, small_meta = storage.info_file("data/%s/%s" % (small.key[:2], small.key))
+    _, large_meta = storage.info_file("data/%s/%s" % (large.key[:2], large.key))
+    assert small_meta["cas_version"] == 1
+    assert large_meta == {"cas_raw": False, "cas_version": 2, "cas_codec": "none"}
+    assert os.path.getsize(
+        os.path.join(str(tmp_path), "data", large.key[:2], large.key)
+    ) == len(_PAYLOAD)
+
+
+def test_unavailable_codec_falls_back_to_v1(tmp_path, monkeypatch):
+    import metaflow.datastore.content_addressed_store as cas_module
+    from metaflow.plugins.datastores.local_storage import LocalStorage
+
+    def _missing():
+        raise ImportError("No module named 'zstandard'")
+
+    monkeypatch.setitem(cas_module._CODECS, "zstd", _missing)
+    monkeypatch.setattr(cas_module, "_loaded_codecs", {})
+    storage = LocalStorage(str(tmp_path))
+    store = ContentAddressedStore("data", storage, codec="zstd")
+
+    key = store.save_blobs(iter([_PAYLOAD]))[0].key
+    _, meta = storage.info_file("data/%s/%s" % (key[:2], key))
+    assert meta == {"cas_raw": False, "cas_version": 1}
+
+
+def test_v1_blobs_are_encoded_by_the_gzip_codec(tmp_path, mocker):
+    import gzip
+
+    import metaflow.datastore.content_addressed_store as cas_module
+    from metaflow.plugins.datastores.local_storage import LocalStorage
+
+    compress = mocker.spy(cas_module, "_gzip_compress")
+    storage = LocalStorage(str(tmp_path))
+    store = ContentAddressedStore("data", storage, codec="gzip")
+
+    key = store.save_blobs(iter([_PAYLOAD]))[0].key
+    assert compress.call_count == 1
+    with open(os.path.join(str(tmp_path), "data", key[:2], key), "rb") as f:
+        assert gzip.decompress(f.read()) == _PAYLOAD
+
+
+@pytest.mark.parametrize(
+    "meta, expected",
+    [
+        ({"cas_version": 2, "cas_raw": False}, "Missing compression codec"),
+        (
+            {"cas_version": 2, "cas_raw": False, "cas_codec": "brotli"},
+            "Unknown compression codec 'brotli'",
+        ),
+    ],
+    ids=["missing_codec", "unknown_codec"],
+)
+def test_load_v2_blob_with_bad_codec(tmp_path, meta, expected):
+    key = "cccccccccc"
+    path = "prefix/cc/%s" % key
+    store = _make_store([(path, _write_blob_file(tmp_path), meta)])
+
+    with pytest.raises(DataException) as exc:
+        list(store.load_blobs([key]))
+    assert expected in str(exc.value)
+    assert path in str(exc.value)
+
+
+@pytest.mark.parametrize("codec", ["gzip", "none", "zstd"])
+def test_load_blobs_mmap_streams_into_blob_cache(tmp_path, monkeypatch, codec):
+    import mmap
+
+    from metaflow.client.filecache import FileBlobCache, FileCache
+    from metaflow.datastore.content_addressed_store import is_codec_available
+    from metaflow.plugins.datastores.local_storage import LocalStorage
+
+    if not is_codec_available(codec):
+        pytest.skip("codec %s is not installed" % codec)
+    storage = LocalStorage(str(tmp_path / "ds"))
+    store = ContentAddressedStore("data", storage, codec=codec)
+    key = store.save_blobs(iter([_PAYLOAD]))[0].key
+
+    filecache = FileCache(cache_dir=str(tmp_path / "cache"), max_size=100)
+    store.set_blob_cache(FileBlobCache(filecache, "test"))
+
+    def _no_in_memory_unpack(*args):
+        raise AssertionError("blob should be decoded directly into the cache")
+
+    monkeypatch.setattr(store, "_unpack_v1", _no_in_memory_unpack)
+    monkeypatch.setattr(store, "_unpack_v2", _no_in_memory_unpack)
+
+    # Both the first load (from the datastore) and the second one (from the
+    # cache) return a memory-mapped view of the cached file
+    for _ in range(2):
+        blob = dict(store.load_blobs([key], use_mmap=True))[key]
+        assert isinstance(blob, mmap.mmap)
+        assert blob[:] == _PAYLOAD
+        # The mapping is copy-on-write
+        blob[0:1] = b"X"
+    assert dict(store.load_blobs([key]))[key] == _PAYLOAD
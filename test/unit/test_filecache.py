@@ -0,0 +1,148 @@
+import multiprocessing
+import os
+import time
+
+import pytest
+
+from metaflow.client import filecache as filecache_module
+from metaflow.client.filecache import (
+    INDEX_FILE,
+    FileCache,
+    _HeapCacheIndex,
+    _SqliteCacheIndex,
+)
+
+INDEXES = [_SqliteCacheIndex, _HeapCacheIndex]
+
+
+def _obj_path(cache_dir, name, ext=".blob"):
+    return os.path.join(str(cache_dir), "local.root.Flow", name[:2], name + ext)
+
+
+def _write(path, size):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "wb") as f:
+        f.write(b"x" * size)
+
+
+@pytest.mark.parametrize("index_cls", INDEXES)
+def test_index_evicts_least_recently_used(tmp_path, index_cls):
+    index = index_cls(str(tmp_path))
+    for i, name in enumerate(["a", "b", "c", "d"]):
+        index.add(name, 10, float(i))
+    assert index.total_size() == 40
+    # "a" is the oldest but was accessed most recently
+    index.touch({"a": 10.0})
+    assert index.evict(20, not_after=100.0) == ["b", "c"]
+    assert index.total_size() == 20
+    assert len(index) == 2
+    assert index.evict(0, not_after=100.0) == ["d", "a"]
+
+
+@pytest.mark.parametrize("index_cls", INDEXES)
+def test_index_respects_quarantine(tmp_path, index_cls):
+    index = index_cls(str(tmp_path))
+    index.add("old", 10, 1.0)
+    index.add("new", 10, 50.0)
+    assert index.evict(0, not_after=10.0) == ["old"]
+    assert index.total_size() == 10
+
+
+@pytest.mark.parametrize("index_cls", INDEXES)
+def test_index_add_existing_replaces_size(tmp_path, index_cls):
+    index = index_cls(str(tmp_path))
+    index.add("a", 10, 1.0)
+    index.add("a", 25, 2.0)
+    assert index.total_size() == 25
+    assert len(index) == 1
+    # touching an unknown object is a no-op
+    index.touch({"unknown": 3.0})
+    assert len(index) == 1
+
+
+@pytest.mark.parametrize("index_cls", INDEXES)
+def test_index_bootstraps_from_existing_cache(tmp_path, index_cls):
+    paths = [_obj_path(tmp_path, "ab%02d" % i) for i in range(5)]
+    for p in paths:
+        _write(p, 100)
+    _write(_obj_path(tmp_path, "log", ext=".cached"), 50)
+    # temporary files and files at the wrong depth are not cached objects
+    _write(os.path.join(str(tmp_path), "local.root.Flow", "ab", "dlobjtmp"), 1000)
+    _write(os.path.join(str(tmp_path), "stray.blob"), 1000)
+
+    index = index_cls(str(tmp_path))
+    assert len(index) == 6
+    assert index.total_size() == 550
+
+
+def test_sqlite_index_is_shared(tmp_path):
+    first = _SqliteCacheIndex(str(tmp_path))
+    second = _SqliteCacheIndex(str(tmp_path))
+    first.add("a", 10, 1.0)
+    second.add("b", 10, 2.0)
+    assert first.total_size() == second.total_size() == 20
+    assert second.evict(10, not_after=100.0) == ["a"]
+    assert first.evict(10, not_after=100.0) == []
+    assert len(first) == 1
+
+
+def _add_objects(cache_dir, worker, count):
+    index = _SqliteCacheIndex(cache_dir)
+    for i in range(count):
+        index.add("%d-%d" % (worker, i), 1, float(i))
+    index.close()
+
+
+def test_sqlite_index_concurrent_processes(tmp_path):
+    ctx = multiprocessing.get_context("fork")
+    procs = [
+        ctx.Process(target=_add_objects, args=(str(tmp_path), w, 200)) for w in range(4)
+    ]
+    for p in procs:
+        p.start()
+    for p in procs:
+        p.join()
+        assert p.exitcode == 0
+    index = _SqliteCacheIndex(str(tmp_path))
+    assert len(index) == 800
+    assert index.total_size() == 800
+
+
+def test_filecache_garbage_collects_lru(tmp_path, monkeypatch):
+    monkeypatch.setattr(filecache_module, "NEW_FILE_QUARANTINE", 0)
+    # Max size is in MB
+    cache = FileCache(cache_dir=str(tmp_path), max_size=1)
+    blob = b"x" * (400 * 1024)
+    paths = [_obj_path(tmp_path, "%02d" % i) for i in range(3)]
+    cache.create_file(paths[0], blob)
+    time.sleep(0.01)
+    cache.create_file(paths[1], blob)
+    time.sleep(0.01)
+    # Reading paths[0] makes paths[1] the least recently used one
+    assert cache.read_file(paths[0]) == blob
+    cache._flush_accesses()
+    time.sleep(0.01)
+    cache.create_file(paths[2], blob)
+
+    assert os.path.exists(paths[0])
+    assert not os.path.exists(paths[1])
+    assert os.path.exists(paths[2])
+    assert os.path.exists(os.path.join(str(tmp_path), INDEX_FILE))
+
+    # Another cache on the same directory sees the same state
+    other = FileCache(cache_dir=str(tmp_path), max_size=1)
+    assert other._get_index().total_size() == 2 * len(blob)
+
+
+def test_filecache_without_sqlite(tmp_path, monkeypatch):
+    monkeypatch.setattr(filecache_module, "sqlite3", None)
+    monkeypatch.setattr(filecache_module, "NEW_FILE_QUARANTINE", 0)
+    cache = FileCache(cache_dir=str(tmp_path), max_size=1)
+    blob = b"x" * (600 * 1024)
+    first, second = _obj_path(tmp_path, "01"), _obj_path(tmp_path, "02")
+    cache.create_file(first, blob)
+    time.sleep(0.01)
+    cache.create_file(second, blob)
+    assert isinstance(cache._get_index(), _HeapCacheIndex)
+    assert not os.path.exists(first)
+    assert cache.read_file(second) == blob
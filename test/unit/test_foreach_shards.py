@@ -0,0 +1,87 @@
+from types import SimpleNamespace
+
+import pytest
+
+from metaflow import FlowSpec, step
+from metaflow import task as task_module
+from metaflow.datastore.content_addressed_store import ContentAddressedStore
+from metaflow.datastore.flow_datastore import FlowDataStore
+from metaflow.plugins.datastores.local_storage import LocalStorage
+from metaflow.task import MetaflowTask
+from metaflow.tuple_util import ForeachFrame
+
+NUM_SPLITS = 10
+
+
+class ShardFlow(FlowSpec):
+    @step
+    def start(self):
+        self.next(self.end)
+
+    @step
+    def end(self):
+        pass
+
+
+@pytest.fixture
+def flow_ds(tmp_path):
+    return FlowDataStore(
+        "ShardFlow", storage_impl=LocalStorage, ds_root=str(tmp_path / ".metaflow")
+    )
+
+
+def _run_split(flow_ds, shard_size, monkeypatch):
+    # Runs the end of a split step over `items`, as MetaflowTask does
+    monkeypatch.setattr(task_module, "FOREACH_SHARD_SIZE", shard_size)
+    flow = SimpleNamespace(
+        items=[{"element": i} for i in range(NUM_SPLITS)],
+        _foreach_var="items",
+        _foreach_num_splits=NUM_SPLITS,
+        _transition=(["train"], "items"),
+    )
+    output = flow_ds.get_task_datastore("1", "start", "1", 0, mode="w")
+    output.init_task()
+    MetaflowTask._save_foreach_shards(SimpleNamespace(flow=flow), output)
+    output.save_artifacts(iter(vars(flow).items()))
+    output.done()
+    return flow_ds.get_task_datastore("1", "start", "1", mode="r")
+
+
+def _child(parent_ds, index, step_name="train"):
+    flow = ShardFlow(use_cli=False)
+    flow._datastore = parent_ds
+    flow._foreach_stack = [ForeachFrame(step_name, "items", NUM_SPLITS, index, None)]
+    return flow
+
+
+@pytest.mark.parametrize("shard_size", [1, 3])
+def test_children_load_only_their_shard(flow_ds, shard_size, monkeypatch, mocker):
+    parent_ds = _run_split(flow_ds, shard_size, monkeypatch)
+    shards = parent_ds["_foreach_shards"]
+    assert len(shards["shards"]) == -(-NUM_SPLITS // shard_size)
+    items_key = parent_ds.keys_for_artifacts(["items"])[0]
+    load_blobs = mocker.spy(ContentAddressedStore, "load_blobs")
+
+    for index in range(NUM_SPLITS):
+        assert _child(parent_ds, index).input == {"element": index}
+
+    loaded = [key for call in load_blobs.call_args_list for key in call.args[1]]
+    assert items_key not in loaded
+
+
+def test_shards_of_another_foreach_are_ignored(flow_ds, monkeypatch, mocker):
+    parent_ds = _run_split(flow_ds, 1, monkeypatch)
+    load_blobs = mocker.spy(ContentAddressedStore, "load_blobs")
+
+    # A task of a foreach over `items` which did not save it in shards
+    assert _child(parent_ds, 4, step_name="other").input == {"element": 4}
+
+    loaded = [key for call in load_blobs.call_args_list for key in call.args[1]]
+    assert parent_ds.keys_for_artifacts(["items"])[0] in loaded
+
+
+def test_overwritten_iterable_is_used(flow_ds, monkeypatch):
+    parent_ds = _run_split(flow_ds, 1, monkeypatch)
+    flow = _child(parent_ds, 2)
+    flow.items = ["a", "b", "c"]
+    assert flow.input == "c"
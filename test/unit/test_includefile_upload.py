@@ -0,0 +1,92 @@
+import gzip
+import os
+
+import pytest
+
+from metaflow import includefile
+from metaflow.exception import MetaflowException
+from metaflow.includefile import IncludedFile, IncludeFile, UploaderV2
+from metaflow.plugins.datatools import local
+from metaflow.plugins.datatools.local import Local
+
+CONTENT = "line %d\n" * 3 % (1, 2, 3)
+
+
+@pytest.fixture
+def data_root(tmp_path, monkeypatch):
+    root = str(tmp_path / "data")
+    monkeypatch.setattr(local, "DATATOOLS_LOCALROOT", root)
+    monkeypatch.setattr(includefile, "CLIENT_CACHE_PATH", str(tmp_path / "cache"))
+    monkeypatch.setattr(includefile, "_CHUNK_SIZE", 4)
+    return root
+
+
+@pytest.fixture
+def data_file(tmp_path):
+    path = tmp_path / "input.txt"
+    path.write_text(CONTENT)
+    return str(path)
+
+
+def _store(path, is_text=True):
+    return UploaderV2.store("IncludeFlow", path, is_text, "utf-8", Local, print)
+
+
+def test_file_is_stored_and_loaded(data_root, data_file):
+    descriptor = _store(data_file)
+
+    assert descriptor["size"] == len(CONTENT)
+    assert descriptor["url"].startswith("local://" + data_root)
+    with gzip.open(descriptor["url"][len("local://") :], "rt") as f:
+        assert f.read() == CONTENT
+    assert IncludedFile(descriptor).decode("data") == CONTENT
+    assert UploaderV2.load(_store(data_file, is_text=False)) == CONTENT.encode()
+
+
+def test_included_file_is_streamed(data_root, data_file):
+    with IncludedFile(_store(data_file)).open() as f:
+        assert next(f) == "line 1\n"
+        assert f.read() == "line 2\nline 3\n"
+    with IncludedFile(_store(data_file, is_text=False)).open() as f:
+        assert f.read(4) == b"line"
+
+
+def test_unchanged_content_is_not_uploaded_again(data_root, data_file, mocker):
+    put = mocker.spy(Local, "put")
+    gzip_file = mocker.spy(includefile.gzip, "GzipFile")
+
+    first = _store(data_file)
+    assert put.call_count == 1
+    second = _store(data_file)
+
+    assert second["url"] == first["url"]
+    assert put.call_count == 1
+    assert gzip_file.call_count == 1
+
+
+def test_sha_of_unchanged_file_is_cached(data_root, data_file, monkeypatch):
+    monkeypatch.setattr(includefile, "INCLUDEFILE_SHA_CACHE", True)
+    sha = includefile._file_sha(data_file)
+
+    # Same size and modification time: the file is not read again
+    st = os.stat(data_file)
+    with open(data_file, "w") as f:
+        f.write(CONTENT.upper())
+    os.utime(data_file, ns=(st.st_atime_ns, st.st_mtime_ns))
+    assert includefile._file_sha(data_file) == sha
+
+    os.utime(data_file, ns=(st.st_atime_ns, st.st_mtime_ns + 1000))
+    assert includefile._file_sha(data_file) != sha
+
+    monkeypatch.setattr(includefile, "INCLUDEFILE_SHA_CACHE", False)
+    os.utime(data_file, ns=(st.st_atime_ns, st.st_mtime_ns))
+    assert includefile._file_sha(data_file) != sha
+
+
+def test_lazy_parameter_is_not_loaded(data_root, data_file):
+    value = IncludedFile(_store(data_file))
+
+    assert IncludeFile("data").load_parameter(value) == CONTENT
+    assert IncludeFile("data", lazy=True).load_parameter(value) is value
+    with pytest.raises(MetaflowException):
+        IncludeFile("data", lazy=True, parser=lambda s: s)
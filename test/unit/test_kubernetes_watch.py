@@ -0,0 +1,330 @@
+import fcntl
+import json
+import os
+import queue
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import pytest
+
+kubernetes = pytest.importorskip("kubernetes")
+
+from metaflow.plugins.kubernetes import kubernetes_watch
+from metaflow.plugins.kubernetes.kubernetes_job import RunningJob
+from metaflow.plugins.kubernetes.kubernetes_watch import KubernetesRunWatch
+
+NAMESPACE = "ns"
+PATHS = {
+    "/apis/batch/v1/namespaces/%s/jobs" % NAMESPACE: "jobs",
+    "/api/v1/namespaces/%s/pods" % NAMESPACE: "pods",
+}
+
+
+def _job(name, run_id="1", **status):
+    return {
+        "apiVersion": "batch/v1",
+        "kind": "Job",
+        "metadata": {
+            "name": name,
+            "namespace": NAMESPACE,
+            "labels": {
+                "app.kubernetes.io/name": "metaflow-task",
+                "metaflow/run_id": run_id,
+            },
+            "annotations": {
+                "metaflow/flow_name": "WatchFlow",
+                "metaflow/run_id": run_id,
+            },
+        },
+        "spec": {
+            "parallelism": 1,
+            "template": {"spec": {"containers": [{"name": "main"}]}},
+        },
+        "status": status or {"active": 1},
+    }
+
+
+def _pod(job_name, phase):
+    return {
+        "apiVersion": "v1",
+        "kind": "Pod",
+        "metadata": {
+            "name": "%s-pod" % job_name,
+            "namespace": NAMESPACE,
+            "labels": {
+                "app.kubernetes.io/name": "metaflow-task",
+                "metaflow/run_id": "1",
+                "job-name": job_name,
+            },
+            "annotations": {
+                "metaflow/flow_name": "WatchFlow",
+                "metaflow/run_id": "1",
+            },
+        },
+        "spec": {"containers": [{"name": "main"}]},
+        "status": {"phase": phase},
+    }
+
+
+def _matches(obj, label_selector):
+    labels = obj["metadata"].get("labels") or {}
+    return all(
+        labels.get(key) == value
+        for key, value in (term.split("=", 1) for term in label_selector.split(","))
+    )
+
+
+class FakeApiServer(object):
+    # Serves the list and watch requests of jobs and pods. Everything the
+    # server and the watch do is notified through `changed`, on which the
+    # test waits.
+    def __init__(self, jobs):
+        self.items = {"jobs": jobs, "pods": []}
+        self.events = {"jobs": queue.Queue(), "pods": queue.Queue()}
+        self.requests = []
+        self.label_selectors = set()
+        self.changed = threading.Condition()
+        self.watches_ended = threading.Event()
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            # Watch events are streamed in chunks, as by the API server
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, *args):
+                pass
+
+            def _send_chunk(self, data):
+                self.wfile.write(b"%x\r\n%s\r\n" % (len(data), data))
+                self.wfile.flush()
+
+            def do_GET(self):
+                url = urlparse(self.path)
+                query = parse_qs(url.query)
+                kind = PATHS.get(url.path)
+                if kind is None:
+                    server.requests.append(("get", url.path))
+                    self.send_response(404)
+                    self.send_header("Content-Length", "0")
+                    self.end_headers()
+                    return
+                label_selector = query["labelSelector"][0]
+                server.label_selectors.add(label_selector)
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                if query.get("watch") != ["true"]:
+                    server.requests.append(("list", kind))
+                    server.notify()
+                    body = {
+                        "metadata": {"resourceVersion": "1"},
+                        "items": [
+                            item
+                            for item in server.items[kind]
+                            if _matches(item, label_selector)
+                        ],
+                    }
+                    data = json.dumps(body).encode("utf-8")
+                    self.send_header("Content-Length", str(len(data)))
+                    self.end_headers()
+                    self.wfile.write(data)
+                    return
+                self.send_header("Transfer-Encoding", "chunked")
+                self.end_headers()
+                server.requests.append(("watch", kind))
+                server.notify()
+                # The watch lasts until the test ends it, whatever its timeout
+                while not server.watches_ended.is_set():
+                    try:
+                        event = server.events[kind].get(timeout=0.05)
+                    except queue.Empty:
+                        continue
+                    self._send_chunk(json.dumps(event).encode("utf-8") + b"\n")
+                self._send_chunk(b"")
+
+        self._httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self._httpd.daemon_threads = True
+        self.host = "http://127.0.0.1:%d" % self._httpd.server_address[1]
+        threading.Thread(target=self._httpd.serve_forever, daemon=True).start()
+
+    def notify(self):
+        with self.changed:
+            self.changed.notify_all()
+
+    def wait_for(self, condition):
+        # Only bounded so that a broken watch fails instead of hanging
+        with self.changed:
+            if not self.changed.wait_for(condition, timeout=600):
+                raise AssertionError("Timed out")
+            return condition()
+
+    def send(self, kind, event_type, obj):
+        self.events[kind].put({"type": event_type, "object": obj})
+
+    def end_watches(self):
+        # Ends the watch requests so that the watching threads can stop
+        self.watches_ended.set()
+
+    def shutdown(self):
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+
+class FakeKubernetesClient(object):
+    def get(self):
+        return kubernetes.client
+
+
+@pytest.fixture
+def api_server(monkeypatch):
+    server = FakeApiServer([_job("t-1"), _job("t-2", run_id="2")])
+    for method in ("_publish", "_heartbeat"):
+        monkeypatch.setattr(KubernetesRunWatch, method, _notifying(server, method))
+    config = kubernetes.client.Configuration()
+    config.host = server.host
+    kubernetes.client.Configuration.set_default(config)
+    yield server
+    kubernetes.client.Configuration.set_default(None)
+    server.shutdown()
+
+
+def _notifying(server, method):
+    func = getattr(KubernetesRunWatch, method)
+
+    def wrapper(self, *args):
+        try:
+            return func(self, *args)
+        finally:
+            server.notify()
+
+    return wrapper
+
+
+def _run_watch(root):
+    return KubernetesRunWatch(
+        FakeKubernetesClient(), NAMESPACE, "WatchFlow", "1", root=str(root)
+    )
+
+
+def test_watch_publishes_the_jobs_and_pods_of_the_run(api_server, tmp_path):
+    watch = _run_watch(tmp_path)
+    try:
+        job = api_server.wait_for(lambda: watch.job("t-1"))
+        assert watch.is_leader
+        assert job["status"]["active"] == 1
+        # Other runs are not published
+        assert watch.job("t-2") is None
+        # The job is known and has no pod yet
+        assert watch.pod("t-1") == {}
+
+        api_server.send("pods", "ADDED", _pod("t-1", "Running"))
+        pod = api_server.wait_for(lambda: watch.pod("t-1"))
+        assert pod["status"]["phase"] == "Running"
+
+        api_server.send("jobs", "MODIFIED", _job("t-1", succeeded=1))
+        api_server.wait_for(lambda: watch.job("t-1")["status"].get("succeeded") == 1)
+
+        api_server.send("jobs", "DELETED", _job("t-1", succeeded=1))
+        api_server.wait_for(lambda: watch.job("t-1") is None)
+    finally:
+        api_server.end_watches()
+        watch.close()
+    # Jobs and pods are only ever listed and watched, and only those of the run
+    assert {request[0] for request in api_server.requests} == {"list", "watch"}
+    assert api_server.label_selectors == {
+        "app.kubernetes.io/name=metaflow-task,metaflow/run_id=1"
+    }
+
+
+def test_follower_reads_the_state_and_takes_over(api_server, tmp_path):
+    leader = _run_watch(tmp_path)
+    follower = _run_watch(tmp_path)
+    try:
+        api_server.wait_for(lambda: leader.job("t-1"))
+        assert follower.job("t-1")["metadata"]["name"] == "t-1"
+        assert leader.is_leader and not follower.is_leader
+        num_watches = len(api_server.requests)
+
+        api_server.end_watches()
+        leader.close()
+        assert follower.job("t-1") is not None
+        assert follower.is_leader
+        api_server.wait_for(lambda: len(api_server.requests) > num_watches)
+    finally:
+        api_server.end_watches()
+        leader.close()
+        follower.close()
+
+
+def test_last_watch_removes_the_state(api_server, tmp_path):
+    leader = _run_watch(tmp_path)
+    follower = _run_watch(tmp_path)
+    state_dir = leader._dir
+    try:
+        api_server.wait_for(lambda: leader.job("t-1"))
+        api_server.end_watches()
+        leader.close()
+        # The follower still uses the state
+        assert follower.job("t-1") is not None
+        assert os.path.isdir(state_dir)
+    finally:
+        api_server.end_watches()
+        leader.close()
+        follower.close()
+    assert os.listdir(os.path.dirname(state_dir)) == []
+
+    # A new watch of the run starts afresh
+    watch = _run_watch(tmp_path)
+    assert os.path.isdir(os.path.join(state_dir, "jobs"))
+    watch.close()
+    assert not os.path.exists(state_dir)
+
+
+def test_run_ids_which_are_not_labels_are_not_watched():
+    assert kubernetes_watch.run_labels("1") == {"metaflow/run_id": "1"}
+    assert kubernetes_watch.run_labels("argo-{{workflow.name}}") is None
+    assert (
+        KubernetesRunWatch.get(FakeKubernetesClient(), NAMESPACE, "WatchFlow", "a/b")
+        is None
+    )
+
+
+def test_stale_state_is_not_used(tmp_path):
+    watch = _run_watch(tmp_path)
+    job_dir = os.path.join(watch._dir, "jobs")
+    with open(os.path.join(job_dir, "t-1.json"), "w") as f:
+        json.dump(_job("t-1"), f)
+    # Another process leads, but stopped refreshing the state
+    with open(os.path.join(watch._dir, "leader.lock"), "a") as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        stale = time.time() - 2 * kubernetes_watch.WATCH_STALE_SECONDS
+        for kind in ("jobs", "pods"):
+            watch._heartbeat(kind)
+            os.utime(watch._heartbeat_path(kind), (stale, stale))
+        assert watch.job("t-1") is None
+        assert not watch.is_leader
+
+        for kind in ("jobs", "pods"):
+            watch._heartbeat(kind)
+        assert watch.job("t-1")["metadata"]["name"] == "t-1"
+    watch.close()
+
+
+def test_running_job_falls_back_to_the_api(mocker):
+    job = RunningJob.__new__(RunningJob)
+    job._name = "t-1"
+    job._watch = mocker.Mock()
+    read_job = mocker.patch.object(RunningJob, "_read_job", return_value={"api": 1})
+    read_pod = mocker.patch.object(RunningJob, "_read_pod", return_value={"api": 1})
+
+    job._watch.job.return_value = {"watch": 1}
+    job._watch.pod.return_value = {}
+    assert job._fetch_job() == {"watch": 1}
+    assert job._fetch_pod() == {}
+    assert not read_job.called and not read_pod.called
+
+    job._watch.job.return_value = None
+    job._watch.pod.return_value = None
+    assert job._fetch_job() == {"api": 1}
+    assert job._fetch_pod() == {"api": 1}
@@ -0,0 +1,111 @@
+import os
+import subprocess
+import sys
+
+import pytest
+
+from metaflow.extension_support.plugins import (
+    LazyPlugin,
+    resolve_plugin,
+    resolve_plugins,
+)
+
+PLUGIN_MODULE = """
+class LazyStorage(object):
+    TYPE = "lazy"
+    datastore_root = None
+
+    def __init__(self, root):
+        self.root = root
+"""
+
+
+@pytest.fixture
+def plugin_module(tmp_path, monkeypatch):
+    name = "lazy_plugin_%d" % os.getpid()
+    (tmp_path / ("%s.py" % name)).write_text(PLUGIN_MODULE)
+    monkeypatch.syspath_prepend(str(tmp_path))
+    yield name
+    sys.modules.pop(name, None)
+
+
+def test_plugin_is_imported_when_used(plugin_module):
+    plugin = LazyPlugin("datastore", "%s.LazyStorage" % plugin_module, "lazy")
+
+    # Looking the plugin up by name does not import it
+    assert plugin.TYPE == "lazy"
+    assert plugin_module not in sys.modules
+
+    plugin.datastore_root = "/tmp/root"
+    assert plugin_module in sys.modules
+    cls = resolve_plugin(plugin)
+    assert cls.__name__ == "LazyStorage"
+    assert cls.datastore_root == "/tmp/root"
+    storage = plugin("root")
+    assert isinstance(storage, plugin) and isinstance(storage, cls)
+    assert storage.root == "root"
+
+
+def test_plugin_name_is_checked(plugin_module):
+    plugin = LazyPlugin("datastore", "%s.LazyStorage" % plugin_module, "other")
+    assert plugin.TYPE == "other"
+    with pytest.raises(ValueError):
+        plugin("root")
+
+
+@pytest.mark.parametrize(
+    "category", ["datastore", "step_decorator", "sidecar", "environment"]
+)
+def test_lazy_plugins_match_plugins(category):
+    plugins = resolve_plugins(category)
+    lazy_plugins = resolve_plugins(category, lazy=True)
+
+    if isinstance(plugins, dict):
+        assert set(lazy_plugins) == set(plugins)
+        lazy_plugins = [lazy_plugins[k] for k in plugins]
+        plugins = list(plugins.values())
+    else:
+        name_attr = "TYPE" if category in ("datastore", "environment") else "name"
+        by_name = {getattr(p, name_attr): p for p in lazy_plugins}
+        assert set(by_name) == set(getattr(p, name_attr) for p in plugins)
+        lazy_plugins = [by_name[getattr(p, name_attr)] for p in plugins]
+    assert all(isinstance(p, LazyPlugin) for p in lazy_plugins)
+    assert [resolve_plugin(p) for p in lazy_plugins] == plugins
+
+
+def _discover_extensions(ext_dir, cache_dir):
+    env = dict(
+        os.environ,
+        PYTHONPATH=os.pathsep.join([str(ext_dir)] + sys.path),
+        METAFLOW_EXTENSIONS_CACHE_DIR=str(cache_dir),
+        METAFLOW_DEBUG_EXT="1",
+    )
+    result = subprocess.run(
+        [
+            sys.executable,
+            "-c",
+            "from metaflow.extension_support import _all_packages as p;"
+            "print(sorted(p['_pythonpath_0']['files']))",
+        ],
+        env=env,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    return result.stdout.strip(), "Loading cached information" in result.stderr
+
+
+def test_extension_discovery_is_cached(tmp_path):
+    plugins_dir = tmp_path / "ext" / "metaflow_extensions" / "myext" / "plugins"
+    plugins_dir.mkdir(parents=True)
+    (plugins_dir / "mfextinit_myext.py").write_text("STEP_DECORATORS_DESC = []\n")
+    cache_dir = tmp_path / "cache"
+
+    files, cached = _discover_extensions(tmp_path / "ext", cache_dir)
+    assert "mfextinit_myext.py" in files and not cached
+    assert _discover_extensions(tmp_path / "ext", cache_dir) == (files, True)
+
+    # A new file in the extension is found
+    (plugins_dir / "helper.py").write_text("X = 1\n")
+    files, cached = _discover_extensions(tmp_path / "ext", cache_dir)
+    assert "helper.py" in files and not cached
@@ -0,0 +1,127 @@
+import json
+import os
+from types import SimpleNamespace
+from unittest.mock import MagicMock
+
+import pytest
+
+from metaflow.metadata_provider import MetaDatum
+from metaflow.plugins.datastores.local_storage import LocalStorage
+from metaflow.plugins.metadata_providers import local as local_module
+from metaflow.plugins.metadata_providers.local import LocalMetadataProvider
+from metaflow.plugins.metadata_providers.local_index import (
+    INDEX_FILE,
+    RunMetadataIndex,
+)
+
+FLOW = "IndexFlow"
+RUN = "1"
+
+
+@pytest.fixture
+def provider(tmp_path, monkeypatch):
+    monkeypatch.setattr(local_module, "LOCAL_METADATA_INDEX", True)
+    monkeypatch.setattr(LocalStorage, "datastore_root", str(tmp_path / ".metaflow"))
+    provider = LocalMetadataProvider(
+        MagicMock(), SimpleNamespace(name=FLOW), None, None
+    )
+    provider._ensure_meta("flow", None, None, None)
+    provider._ensure_meta("run", RUN, None, None)
+    return provider
+
+
+def _new_task(provider, step, task_id, path):
+    provider._ensure_meta("step", RUN, step, None)
+    provider._ensure_meta("task", RUN, step, task_id)
+    provider.register_metadata(
+        RUN,
+        step,
+        task_id,
+        [
+            MetaDatum(field="foreach-execution-path", value=path, type="t", tags=[]),
+            MetaDatum(field="other", value=path, type="t", tags=[]),
+        ],
+    )
+
+
+def _filter(pattern, step="work"):
+    return sorted(
+        LocalMetadataProvider.filter_tasks_by_metadata(
+            FLOW, RUN, step, "foreach-execution-path", pattern
+        )
+    )
+
+
+def _expected(*task_ids, step="work"):
+    return sorted("%s/%s/%s/%s" % (FLOW, RUN, step, t) for t in task_ids)
+
+
+def _task_metadir(step, task_id):
+    return LocalMetadataProvider._get_metadir(FLOW, RUN, step, task_id)
+
+
+def test_filter_uses_index(provider, mocker):
+    for i in range(4):
+        _new_task(provider, "work", str(i), "start:%d" % (i % 2))
+    assert os.path.isfile(
+        os.path.join(LocalMetadataProvider._get_metadir(FLOW, RUN), INDEX_FILE)
+    )
+
+    get_object = mocker.spy(LocalMetadataProvider, "get_object")
+    assert _filter("start:1") == _expected("1", "3")
+    assert _filter("start:[01]$") == _expected("0", "1", "2", "3")
+    assert _filter("nothing") == []
+    get_object.assert_not_called()
+
+
+def test_files_written_without_index_are_picked_up(provider):
+    _new_task(provider, "work", "0", "start:0")
+    _new_task(provider, "work", "1", "start:1")
+    assert _filter("start:0") == _expected("0")
+
+    # E.g. metadata synced from a remote task, or written by an older version
+    meta_dir = _task_metadir("work", "1")
+    with open(
+        os.path.join(meta_dir, "sysmeta_foreach-execution-path_2.json"), "w"
+    ) as f:
+        json.dump({"field_name": "foreach-execution-path", "value": "start:0"}, f)
+    # Make sure the modification time changes on coarse filesystems
+    st = os.stat(meta_dir)
+    os.utime(meta_dir, ns=(st.st_atime_ns, st.st_mtime_ns + 10**9))
+    assert _filter("start:0") == _expected("0", "1")
+
+    # A task without any indexed metadata
+    provider._ensure_meta("task", RUN, "work", "2")
+    with open(
+        os.path.join(
+            _task_metadir("work", "2"), "sysmeta_foreach-execution-path_1.json"
+        ),
+        "w",
+    ) as f:
+        json.dump({"field_name": "foreach-execution-path", "value": "start:0"}, f)
+    assert _filter("start:0") == _expected("0", "1", "2")
+
+
+def test_artifact_registration_keeps_task_indexed(provider, mocker):
+    _new_task(provider, "work", "0", "start:0")
+    provider.register_data_artifacts(RUN, "work", "0", 0, [])
+    reindex = mocker.spy(RunMetadataIndex, "_reindex")
+    assert _filter("start:0") == _expected("0")
+    reindex.assert_not_called()
+
+
+@pytest.mark.parametrize("reason", ["disabled", "no_sqlite"])
+def test_fallback_to_files(provider, monkeypatch, reason):
+    if reason == "disabled":
+        monkeypatch.setattr(local_module, "LOCAL_METADATA_INDEX", False)
+    else:
+        monkeypatch.setattr(
+            "metaflow.plugins.metadata_providers.local_index.sqlite3", None
+        )
+    for i in range(3):
+        _new_task(provider, "work", str(i), "start:%d" % i)
+    assert not os.path.exists(
+        os.path.join(LocalMetadataProvider._get_metadir(FLOW, RUN), INDEX_FILE)
+    )
+    assert _filter("start:2") == _expected("2")
+    assert _filter(".*") == _expected("0", "1", "2")
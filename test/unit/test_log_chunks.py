@@ -0,0 +1,99 @@
+import pytest
+
+from metaflow.datastore.flow_datastore import FlowDataStore
+from metaflow.mflog import TASK_LOG_SOURCE
+from metaflow.mflog.chunk_tail import LogChunkTail
+from metaflow.mflog.save_logs_periodically import LogChunkUploader
+from metaflow.plugins.datastores.local_storage import LocalStorage
+
+
+@pytest.fixture
+def flow_ds(tmp_path):
+    return FlowDataStore(
+        "TestFlow", storage_impl=LocalStorage, ds_root=str(tmp_path / "ds")
+    )
+
+
+@pytest.fixture
+def task_ds(flow_ds):
+    task_ds = flow_ds.get_task_datastore("1", "start", "1", 0, mode="w")
+    task_ds.init_task()
+    return task_ds
+
+
+def _reader(flow_ds):
+    return flow_ds.get_task_datastore(
+        "1", "start", "1", attempt=0, data_metadata={"objects": {}, "info": {}}
+    )
+
+
+def _logs(flow_ds, stream):
+    return dict(_reader(flow_ds).load_logs([TASK_LOG_SOURCE], stream))
+
+
+@pytest.fixture
+def log_files(tmp_path):
+    return tmp_path / "stdout", tmp_path / "stderr"
+
+
+def test_uploader_appends_complete_lines_only(flow_ds, task_ds, log_files):
+    stdout, stderr = log_files
+    uploader = LogChunkUploader([str(stdout), str(stderr)], task_datastore=task_ds)
+    assert uploader.upload() == {}
+
+    stdout.write_bytes(b"first\nsec")
+    assert uploader.upload() == {"stdout": 6}
+    assert _logs(flow_ds, "stdout") == {TASK_LOG_SOURCE: b"first\n"}
+    assert _logs(flow_ds, "stderr") == {TASK_LOG_SOURCE: b""}
+
+    with open(str(stdout), "ab") as f:
+        f.write(b"ond\nthird\n")
+    stderr.write_bytes(b"error\n")
+    assert uploader.upload() == {"stdout": 13, "stderr": 6}
+    # Nothing changed, nothing is uploaded
+    assert uploader.upload() == {}
+
+    assert _logs(flow_ds, "stdout") == {TASK_LOG_SOURCE: b"first\nsecond\nthird\n"}
+    assert _logs(flow_ds, "stderr") == {TASK_LOG_SOURCE: b"error\n"}
+    reader = _reader(flow_ds)
+    assert reader.get_log_size([TASK_LOG_SOURCE], "stdout") == 19
+
+
+def test_complete_log_takes_precedence(flow_ds, task_ds, log_files):
+    stdout, stderr = log_files
+    uploader = LogChunkUploader([str(stdout), str(stderr)], task_datastore=task_ds)
+    stdout.write_bytes(b"line\npartial")
+    uploader.upload()
+    task_ds.save_logs(TASK_LOG_SOURCE, {"stdout": b"line\npartial"})
+    assert _logs(flow_ds, "stdout") == {TASK_LOG_SOURCE: b"line\npartial"}
+    assert _reader(flow_ds).get_log_size([TASK_LOG_SOURCE], "stdout") == 12
+
+
+def test_scrub_logs_redacts_chunks(flow_ds, task_ds):
+    task_ds.save_log_chunks(TASK_LOG_SOURCE, {"stdout": (0, 0, b"secret\n")})
+    task_ds.save_log_chunks(TASK_LOG_SOURCE, {"stdout": (1, 7, b"secret\n")})
+    flow_ds.get_task_datastore(
+        "1", "start", "1", 0, mode="d", allow_not_done=True
+    ).scrub_logs([TASK_LOG_SOURCE], "stdout")
+    assert _logs(flow_ds, "stdout") == {
+        TASK_LOG_SOURCE: b"[REDACTED %s stdout]" % TASK_LOG_SOURCE.encode()
+    }
+
+
+def test_tail_follows_chunks_then_complete_log(flow_ds, task_ds):
+    tail = LogChunkTail(
+        task_ds.get_log_location(TASK_LOG_SOURCE, "stdout"), LocalStorage
+    )
+    assert list(tail) == []
+
+    task_ds.save_log_chunks(TASK_LOG_SOURCE, {"stdout": (0, 0, b"a\nb")})
+    assert list(tail) == [b"a\n"]
+    assert tail.tail == b"b"
+    task_ds.save_log_chunks(TASK_LOG_SOURCE, {"stdout": (1, 3, b"\nc\n")})
+    assert list(tail) == [b"b\n", b"c\n"]
+    assert list(tail) == []
+
+    task_ds.save_logs(TASK_LOG_SOURCE, {"stdout": b"a\nb\nc\nd\n"})
+    assert list(tail) == [b"d\n"]
+    assert tail.bytes_read == 8
+    assert list(tail) == []
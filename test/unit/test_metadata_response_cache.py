@@ -0,0 +1,172 @@
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from metaflow.plugins.metadata_providers import response_cache, service
+from metaflow.plugins.metadata_providers.service import ServiceMetadataProvider
+
+TASK = ("CacheFlow", "1", "start", "2")
+TASK_PATH = "/flows/CacheFlow/runs/1/steps/start/tasks/2"
+
+
+class StubService(object):
+    # Serves fixed responses and counts the requests; supports ETags
+    def __init__(self):
+        self.responses = {}
+        self.etags = {}
+        self.requests = []
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def do_GET(self):
+                server.requests.append(self.path)
+                if self.path not in server.responses:
+                    self.send_response(404)
+                    self.end_headers()
+                    return
+                etag = server.etags.get(self.path)
+                if etag is not None and self.headers.get("If-None-Match") == etag:
+                    self.send_response(304)
+                    self.end_headers()
+                    return
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                if etag is not None:
+                    self.send_header("ETag", etag)
+                self.end_headers()
+                self.wfile.write(json.dumps(server.responses[self.path]).encode())
+
+        self._httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self._httpd.daemon_threads = True
+        self.url = "http://127.0.0.1:%d" % self._httpd.server_address[1]
+        threading.Thread(target=self._httpd.serve_forever, daemon=True).start()
+
+    def count(self, path):
+        return self.requests.count(path)
+
+    def shutdown(self):
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+
+@pytest.fixture
+def stub(tmp_path, monkeypatch):
+    server = StubService()
+    monkeypatch.setattr(ServiceMetadataProvider, "_INFO", server.url)
+    monkeypatch.setattr(ServiceMetadataProvider, "_response_caches", {})
+    monkeypatch.setattr(service, "CLIENT_METADATA_CACHE", True)
+    monkeypatch.setattr(response_cache, "CLIENT_CACHE_PATH", str(tmp_path))
+    yield server
+    server.shutdown()
+
+
+def _new_process():
+    # Responses are only shared through the cache directory
+    ServiceMetadataProvider._response_caches.clear()
+
+
+def _metadata(*fields):
+    values = {"attempt": "0", "attempt_ok": "True", "attempt-done": "0"}
+    return [
+        {"field_name": f, "value": values[f], "tags": ["attempt_id:0"]} for f in fields
+    ]
+
+
+def _get(obj_type, sub_type, *args):
+    return ServiceMetadataProvider.get_object(obj_type, sub_type, None, None, *args)
+
+
+def test_finished_tasks_are_cached_for_good(stub, monkeypatch):
+    monkeypatch.setattr(response_cache, "CLIENT_METADATA_CACHE_TTL", 0)
+    stub.responses[TASK_PATH + "/metadata"] = _metadata(
+        "attempt", "attempt_ok", "attempt-done"
+    )
+    stub.responses[TASK_PATH + "/artifacts"] = [{"name": "x", "ts_epoch": 1}]
+
+    for _ in range(3):
+        _new_process()
+        assert len(_get("task", "metadata", *TASK)) == 3
+        assert _get("task", "artifact", *TASK)[0]["name"] == "x"
+
+    assert stub.count(TASK_PATH + "/metadata") == 1
+    assert stub.count(TASK_PATH + "/artifacts") == 1
+
+
+def test_running_tasks_are_revalidated(stub, monkeypatch):
+    monkeypatch.setattr(response_cache, "CLIENT_METADATA_CACHE_TTL", 0)
+    path = TASK_PATH + "/metadata"
+    stub.responses[path] = _metadata("attempt")
+    stub.etags[path] = '"v1"'
+
+    assert len(_get("task", "metadata", *TASK)) == 1
+    assert len(_get("task", "metadata", *TASK)) == 1
+    # The second request was answered with a 304
+    assert stub.count(path) == 2
+
+    stub.responses[path] = _metadata("attempt", "attempt_ok", "attempt-done")
+    stub.etags[path] = '"v2"'
+    assert len(_get("task", "metadata", *TASK)) == 3
+    assert len(_get("task", "metadata", *TASK)) == 3
+    assert stub.count(path) == 3
+
+
+def test_tasks_finishing_their_attempt_are_not_cached_for_good(stub, monkeypatch):
+    # attempt_ok is recorded before the attempt is done: its artifacts and
+    # attempt-done come after it
+    monkeypatch.setattr(response_cache, "CLIENT_METADATA_CACHE_TTL", 0)
+    stub.responses[TASK_PATH + "/metadata"] = _metadata("attempt", "attempt_ok")
+    stub.responses[TASK_PATH + "/artifacts"] = [{"name": "x", "ts_epoch": 1}]
+
+    for _ in range(2):
+        _new_process()
+        assert len(_get("task", "metadata", *TASK)) == 2
+        assert len(_get("task", "artifact", *TASK)) == 1
+    assert stub.count(TASK_PATH + "/metadata") == 2
+    assert stub.count(TASK_PATH + "/artifacts") == 2
+
+    # attempt-done of a previous attempt does not finish the task
+    stub.responses[TASK_PATH + "/metadata"] = _metadata("attempt", "attempt_ok") + [
+        {"field_name": "attempt-done", "value": "1", "tags": ["attempt_id:1"]}
+    ]
+    for _ in range(2):
+        _new_process()
+        _get("task", "metadata", *TASK)
+    assert stub.count(TASK_PATH + "/metadata") == 4
+
+
+def test_mutable_objects_are_refetched_after_their_ttl(stub, monkeypatch):
+    path = "/flows/CacheFlow/runs/1"
+    stub.responses[path] = {"run_number": 1, "tags": ["a"], "system_tags": []}
+
+    assert _get("run", "self", "CacheFlow", "1")["tags"] == ["a"]
+    stub.responses[path]["tags"] = ["a", "b"]
+    # Served from the cache within the TTL
+    assert _get("run", "self", "CacheFlow", "1")["tags"] == ["a"]
+    assert stub.count(path) == 1
+
+    monkeypatch.setattr(response_cache, "CLIENT_METADATA_CACHE_TTL", 0)
+    _new_process()
+    assert _get("run", "self", "CacheFlow", "1")["tags"] == ["a", "b"]
+    assert stub.count(path) == 2
+
+
+def test_missing_objects_are_not_cached(stub):
+    assert _get("run", "self", "CacheFlow", "2") is None
+    stub.responses["/flows/CacheFlow/runs/2"] = {"run_number": 2}
+    assert _get("run", "self", "CacheFlow", "2") == {"run_number": 2}
+    assert stub.count("/flows/CacheFlow/runs/2") == 2
+
+
+def test_invalidated_responses_are_fetched_again(stub, monkeypatch):
+    path = "/flows/CacheFlow/runs/1"
+    stub.responses[path] = {"run_number": 1, "tags": ["a"], "system_tags": []}
+    assert _get("run", "self", "CacheFlow", "1")["tags"] == ["a"]
+
+    ServiceMetadataProvider._response_cache().invalidate(path)
+    stub.responses[path]["tags"] = ["b"]
+    assert _get("run", "self", "CacheFlow", "1")["tags"] == ["b"]
@@ -1,4 +1,14 @@
-from metaflow.multicore_utils import parallel_map
+import os
+import time
+
+import pytest
+
+from metaflow import multicore_utils
+from metaflow.multicore_utils import (
+    MulticoreException,
+    parallel_imap_unordered,
+    parallel_map,
+)
 
 
 def test_parallel_map():
@@ -10,3 +20,79 @@ def test_parallel_map():
         "E",
         "F",
     ]
+
+
+@pytest.fixture
+def shm_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(multicore_utils, "_SHARED_MEMORY_DIR", str(tmp_path))
+    monkeypatch.setattr(multicore_utils, "SHARED_MEMORY_MIN_SIZE", 1024)
+    return tmp_path
+
+
+def test_parallel_map_chunks():
+    # Arguments are inherited by the workers and do not need to be picklable
+    funcs = [lambda i=i: i * 2 for i in range(1000)]
+    assert parallel_map(lambda f: f(), funcs, max_parallel=3, chunk_size=7) == [
+        i * 2 for i in range(1000)
+    ]
+    assert parallel_map(lambda x: x, [], chunk_size=10) == []
+
+
+def test_parallel_imap_unordered_chunks_reuse_workers():
+    results = list(
+        parallel_imap_unordered(
+            lambda x: (x, os.getpid()), range(100), max_parallel=2, chunk_size=5
+        )
+    )
+    assert sorted(x for x, _ in results) == list(range(100))
+    assert len(set(pid for _, pid in results)) == 2
+
+
+def test_parallel_map_chunks_failure():
+    with pytest.raises(MulticoreException):
+        parallel_map(lambda x: 1 // x, [1, 2, 0, 3], max_parallel=2, chunk_size=1)
+
+
+def test_parallel_map_chunks_large_results(shm_dir):
+    results = parallel_map(
+        lambda x: bytes([x]) * 4096 if x % 2 else bytearray([x]) * 10,
+        range(6),
+        max_parallel=2,
+        chunk_size=2,
+    )
+    assert results == [
+        bytes([x]) * 4096 if x % 2 else bytearray([x]) * 10 for x in range(6)
+    ]
+    assert [type(r) for r in results] == [bytearray, bytes] * 3
+    assert os.listdir(str(shm_dir)) == []
+
+
+def test_parallel_map_chunks_numpy_results(shm_dir):
+    np = pytest.importorskip("numpy")
+    results = parallel_map(
+        lambda x: {"array": np.full(1024, x), "x": x}, range(4), chunk_size=1
+    )
+    for x, result in enumerate(results):
+        assert result["x"] == x
+        assert (result["array"] == x).all()
+    # The arrays are backed by a private copy of the shared memory
+    results[0]["array"][0] = 5
+    assert os.listdir(str(shm_dir)) == []
+
+
+@pytest.mark.parametrize("chunk_size", [0, -1])
+def test_parallel_map_invalid_chunk_size(chunk_size):
+    with pytest.raises(ValueError, match="chunk_size"):
+        parallel_map(lambda x: x, range(4), chunk_size=chunk_size)
+
+
+def test_parallel_imap_unordered_chunks_stopped_early(shm_dir):
+    results = parallel_imap_unordered(
+        lambda x: bytes([x]) * 4096, range(20), max_parallel=2, chunk_size=1
+    )
+    assert len(next(results)) == 4096
+    # The results the workers already returned are not left behind
+    while not any(files for _, _, files in os.walk(str(shm_dir))):
+        time.sleep(0.01)
+    results.close()
+    assert os.listdir(str(shm_dir)) == []
@@ -0,0 +1,168 @@
+import json
+import os
+import shlex
+import stat
+import subprocess
+import sys
+
+from io import BytesIO
+
+import pytest
+
+from metaflow import FlowSpec, step
+from metaflow import package as package_module
+from metaflow.datastore.flow_datastore import FlowDataStore
+from metaflow.metaflow_environment import MetaflowEnvironment
+from metaflow.package import MetaflowPackage, manifest
+from metaflow.packaging_sys.backend import PackagingBackend
+from metaflow.packaging_sys.zip_backend import ZipPackagingBackend
+from metaflow.plugins.datastores.local_storage import LocalStorage
+
+
+class LayerFlow(FlowSpec):
+    @step
+    def start(self):
+        self.next(self.end)
+
+    @step
+    def end(self):
+        pass
+
+
+def test_zip_archive_members(tmp_path):
+    script = tmp_path / "run.sh"
+    script.write_text("echo hi\n")
+    script.chmod(0o755)
+
+    with ZipPackagingBackend().create() as archive:
+        archive.add_file(str(script), arcname="bin/run.sh")
+        archive.add_data(BytesIO(b"{}"), arcname="INFO")
+    blob = archive.get_blob()
+
+    assert PackagingBackend.get_backend("zip") is ZipPackagingBackend
+    with ZipPackagingBackend.cls_open(BytesIO(blob)) as opened:
+        assert ZipPackagingBackend.cls_list_names(opened) == ["bin/run.sh", "INFO"]
+        assert ZipPackagingBackend.cls_get_member(opened, "INFO") == b"{}"
+        assert ZipPackagingBackend.cls_get_member(opened, "missing") is None
+        assert not ZipPackagingBackend.cls_has_member(opened, "missing")
+        ZipPackagingBackend.cls_extract_members(opened, dest_dir=str(tmp_path / "out"))
+    extracted = tmp_path / "out" / "bin" / "run.sh"
+    assert extracted.read_text() == "echo hi\n"
+    assert stat.S_IMODE(extracted.stat().st_mode) == 0o755
+
+    # The archive does not depend on when it was built
+    os.utime(script, ns=(0, 10**9))
+    with ZipPackagingBackend().create() as again:
+        again.add_file(str(script), arcname="bin/run.sh")
+        again.add_data(BytesIO(b"{}"), arcname="INFO")
+    assert again.get_blob() == blob
+
+
+@pytest.fixture
+def flow_ds(tmp_path, monkeypatch):
+    flow_dir = tmp_path / "flow"
+    flow_dir.mkdir()
+    (flow_dir / "flow.py").write_text("# flow\n")
+    monkeypatch.setattr(sys, "argv", [str(flow_dir / "flow.py")])
+    monkeypatch.setattr(package_module, "PACKAGE_SHARED_LAYER", True)
+    return FlowDataStore(
+        "LayerFlow", storage_impl=LocalStorage, ds_root=str(tmp_path / "ds")
+    )
+
+
+def _package(flow_ds, backend=ZipPackagingBackend):
+    pkg = MetaflowPackage(
+        LayerFlow(use_cli=False),
+        MetaflowEnvironment(None),
+        lambda *args, **kwargs: None,
+        flow_datastore=flow_ds,
+        backend=backend,
+    )
+    pkg.package_sha()
+    return pkg
+
+
+def _layer_blob(flow_ds, layer):
+    return next(flow_ds.shared_ca_store.load_blobs([layer["sha"]]))[1]
+
+
+def test_metaflow_is_packaged_in_a_shared_layer(flow_ds, tmp_path):
+    pkg = _package(flow_ds)
+    metadata = json.loads(pkg.package_metadata)
+    assert metadata["archive_format"] == "zip"
+    (layer,) = metadata["layers"]
+
+    shared_names = set(n for _, n in pkg._mfcontent.shared_contents())
+    with ZipPackagingBackend.cls_open(BytesIO(pkg.blob)) as opened:
+        user_names = set(ZipPackagingBackend.cls_list_names(opened))
+    with ZipPackagingBackend.cls_open(BytesIO(_layer_blob(flow_ds, layer))) as opened:
+        assert set(ZipPackagingBackend.cls_list_names(opened)) == shared_names
+    assert "flow.py" in user_names
+    assert not user_names & shared_names
+    assert user_names | shared_names == set(n for _, n in pkg.path_tuples())
+    # The package only holds what the client needs to know about it
+    assert MetaflowPackage.cls_get_info(pkg.package_metadata, BytesIO(pkg.blob))
+
+    # The layer is stored once for all flows using the same Metaflow
+    other_ds = FlowDataStore(
+        "OtherFlow", storage_impl=LocalStorage, ds_root=flow_ds.datastore_root
+    )
+    assert json.loads(_package(other_ds).package_metadata)["layers"][0] == layer
+
+
+def test_layers_are_extracted_before_the_package(flow_ds, tmp_path, monkeypatch):
+    pkg = _package(flow_ds)
+    (layer,) = json.loads(pkg.package_metadata)["layers"]
+    layer_path = str(tmp_path / "layer.zip")
+    with open(layer_path, "wb") as f:
+        f.write(_layer_blob(flow_ds, layer))
+
+    env = MetaflowEnvironment(None)
+    monkeypatch.setattr(
+        env,
+        "_get_download_code_package_cmd",
+        lambda url, ds_type, output_file="job.tar": "cp %s %s"
+        % (layer_path, output_file),
+    )
+    cmds = env._get_code_layer_cmds(pkg.package_metadata, "s3")
+    _, shared_name = next(pkg._mfcontent.shared_contents())
+    script = "mflog() { :; } && " + " && ".join(cmds)
+
+    cache_dir = tmp_path / "cache"
+    run_env = dict(os.environ, METAFLOW_CODE_LAYER_CACHE_DIR=str(cache_dir))
+    for attempt in range(2):
+        work_dir = tmp_path / ("task%d" % attempt)
+        work_dir.mkdir()
+        subprocess.check_call(
+            shlex.split('bash -c "%s"' % script), cwd=str(work_dir), env=run_env
+        )
+        assert (work_dir / shared_name).exists()
+        # The second task uses the layer kept by the first one
+        if attempt == 0:
+            os.remove(layer_path)
+    assert os.listdir(str(cache_dir)) == [layer["sha"]]
+
+
+def test_package_without_layer(flow_ds, monkeypatch):
+    monkeypatch.setattr(package_module, "PACKAGE_SHARED_LAYER", False)
+    pkg = _package(flow_ds)
+    assert "layers" not in json.loads(pkg.package_metadata)
+    with ZipPackagingBackend.cls_open(BytesIO(pkg.blob)) as opened:
+        names = set(ZipPackagingBackend.cls_list_names(opened))
+    assert set(n for _, n in pkg._mfcontent.shared_contents()) < names
+
+
+def test_layered_package_is_reused(flow_ds, tmp_path, monkeypatch):
+    monkeypatch.setattr(manifest, "CLIENT_CACHE_PATH", str(tmp_path / "cache"))
+    monkeypatch.setattr(package_module, "PACKAGE_MANIFEST_CACHE", True)
+    built = _package(flow_ds)
+
+    reused = _package(flow_ds)
+    assert reused._time_saved is not None
+    assert reused.package_metadata == built.package_metadata
+
+    # A package without layers is built when layers are no longer wanted
+    monkeypatch.setattr(package_module, "PACKAGE_SHARED_LAYER", False)
+    rebuilt = _package(flow_ds)
+    assert rebuilt._time_saved is None
+    assert "layers" not in json.loads(rebuilt.package_metadata)
@@ -0,0 +1,107 @@
+import os
+import sys
+
+import pytest
+
+from metaflow import FlowSpec, step
+from metaflow import package as package_module
+from metaflow.datastore.flow_datastore import FlowDataStore
+from metaflow.metaflow_environment import MetaflowEnvironment
+from metaflow.package import MetaflowPackage, manifest
+from metaflow.package.manifest import PackageManifest
+from metaflow.plugins.datastores.local_storage import LocalStorage
+
+
+class ManifestFlow(FlowSpec):
+    @step
+    def start(self):
+        self.next(self.end)
+
+    @step
+    def end(self):
+        pass
+
+
+@pytest.fixture
+def flow_dir(tmp_path, monkeypatch):
+    flow_dir = tmp_path / "flow"
+    flow_dir.mkdir()
+    (flow_dir / "flow.py").write_text("# flow\n")
+    (flow_dir / "helper.py").write_text("X = 1\n")
+    monkeypatch.setattr(sys, "argv", [str(flow_dir / "flow.py")])
+    monkeypatch.setattr(manifest, "CLIENT_CACHE_PATH", str(tmp_path / "cache"))
+    monkeypatch.setattr(package_module, "PACKAGE_MANIFEST_CACHE", True)
+    return flow_dir
+
+
+def _contents(flow_dir):
+    return [
+        (str(flow_dir / "flow.py"), "flow.py"),
+        (str(flow_dir / "helper.py"), "helper.py"),
+        (b"generated", "INFO"),
+    ]
+
+
+def test_manifest_tracks_content(flow_dir, tmp_path, mocker):
+    path = str(tmp_path / "manifest.json")
+    first = PackageManifest(path)
+    digest = first.digest("{}", _contents(flow_dir))
+    assert first.lookup() is None
+    first.store("sha", "url", 10, 1.5)
+
+    # Same content, touched file: the hash of the other files is reused
+    helper = flow_dir / "helper.py"
+    os.utime(helper, ns=(0, 10**9))
+    file_sha = mocker.spy(manifest, "_file_sha")
+    second = PackageManifest(path)
+    assert second.digest("{}", _contents(flow_dir)) == digest
+    assert second.lookup() == {
+        "sha": "sha",
+        "url": "url",
+        "size": 10,
+        "build_time": 1.5,
+    }
+    assert [c.args[0] for c in file_sha.call_args_list] == [str(helper)]
+
+    helper.write_text("X = 2\n")
+    third = PackageManifest(path)
+    assert third.digest("{}", _contents(flow_dir)) != digest
+    assert third.lookup() is None
+    assert PackageManifest(path).digest("{ }", _contents(flow_dir)) != digest
+
+
+def _package(flow_ds, upload=True):
+    pkg = MetaflowPackage(
+        ManifestFlow(use_cli=False),
+        MetaflowEnvironment(None),
+        lambda *args, **kwargs: None,
+        flow_datastore=flow_ds,
+        upload=upload,
+    )
+    pkg.package_sha()
+    return pkg
+
+
+def test_unchanged_package_is_reused(flow_dir, tmp_path, mocker):
+    flow_ds = FlowDataStore(
+        "ManifestFlow", storage_impl=LocalStorage, ds_root=str(tmp_path / "ds")
+    )
+    # Nothing is stored by a package which is not uploaded
+    assert _package(flow_ds, upload=False)._time_saved is None
+    built = _package(flow_ds)
+    assert built._build_time is not None
+
+    make = mocker.spy(MetaflowPackage, "_make")
+    reused = _package(flow_ds, upload=False)
+    assert make.call_count == 0
+    assert reused._time_saved is not None
+    assert "reused the stored package" in reused.show()
+    assert (reused.package_sha(), reused.package_url()) == (
+        built.package_sha(),
+        built.package_url(),
+    )
+    assert reused.blob == built.blob
+
+    (flow_dir / "helper.py").write_text("X = 2\n")
+    assert _package(flow_ds).package_sha() != built.package_sha()
+    assert make.call_count == 1
@@ -0,0 +1,140 @@
+import os
+import pickle
+
+import pytest
+
+from metaflow import metaflow_config
+from metaflow.datastore.artifacts.serializer import (
+    SerializationMetadata,
+    SerializerStore,
+)
+from metaflow.plugins.datastores.serializers.pickle_oob_serializer import (
+    PickleOOBSerializer,
+)
+from metaflow.plugins.datastores.serializers.pickle_serializer import PickleSerializer
+
+
+@pytest.fixture
+def oob_enabled(monkeypatch):
+    monkeypatch.setattr(metaflow_config, "DATASTORE_PICKLE_OOB", True)
+    monkeypatch.setattr(metaflow_config, "DATASTORE_PICKLE_OOB_MIN_BUFFER_SIZE", 16)
+
+
+# ---------------------------------------------------------------------------
+# Registration and dispatch
+# ---------------------------------------------------------------------------
+
+
+def test_registered_in_store():
+    assert SerializerStore._all_serializers["pickle_oob"] is PickleOOBSerializer
+
+
+def test_tried_before_pickle():
+    assert PickleOOBSerializer.PRIORITY < PickleSerializer.PRIORITY
+
+
+def test_disabled_by_default():
+    np = pytest.importorskip("numpy")
+    assert not PickleOOBSerializer.can_serialize(np.arange(10))
+
+
+def test_only_claims_buffer_backed_types(oob_enabled):
+    np = pytest.importorskip("numpy")
+    assert PickleOOBSerializer.can_serialize(np.arange(10))
+    assert not PickleOOBSerializer.can_serialize({"a": 1})
+    assert not PickleOOBSerializer.can_serialize(b"bytes")
+
+
+def test_can_deserialize():
+    meta = SerializationMetadata("x", 1, "pickle-v5-oob", {})
+    assert PickleOOBSerializer.can_deserialize(meta)
+    meta = SerializationMetadata("x", 1, "pickle-v4", {})
+    assert not PickleOOBSerializer.can_deserialize(meta)
+
+
+# ---------------------------------------------------------------------------
+# Serialization
+# ---------------------------------------------------------------------------
+
+
+def test_large_buffers_are_out_of_band(oob_enabled):
+    large = bytearray(os.urandom(1024))
+    small = bytearray(b"tiny")
+    obj = [pickle.PickleBuffer(large), pickle.PickleBuffer(small)]
+
+    blobs, meta = PickleOOBSerializer.serialize(obj)
+
+    assert len(blobs) == 2
+    assert meta.encoding == "pickle-v5-oob"
+    assert meta.serializer_info == {"num_buffers": 1}
+    # The out-of-band buffer is a view on the original data, not a copy
+    assert isinstance(blobs[1].value, memoryview)
+    assert blobs[1].value.obj is large
+    assert meta.size == len(blobs[0].value) + len(large)
+
+    loaded = PickleOOBSerializer.deserialize([blobs[0].value, bytes(large)], meta)
+    assert bytes(loaded[0]) == bytes(large)
+    assert bytes(loaded[1]) == bytes(small)
+
+
+def test_numpy_round_trip_writable(oob_enabled):
+    np = pytest.importorskip("numpy")
+    arr = np.arange(1000, dtype=np.float64).reshape(10, 100)
+
+    blobs, meta = PickleOOBSerializer.serialize(arr)
+    assert len(blobs) == 2
+
+    loaded = PickleOOBSerializer.deserialize(
+        [blobs[0].value] + [bytes(b.value) for b in blobs[1:]], meta
+    )
+    np.testing.assert_array_equal(loaded, arr)
+    loaded[0, 0] = -1
+    assert arr[0, 0] == 0
+
+
+def test_unpicklable_raises(oob_enabled):
+    import threading
+
+    from metaflow.datastore.exceptions import UnpicklableArtifactException
+
+    with pytest.raises(UnpicklableArtifactException):
+        PickleOOBSerializer.serialize(threading.Lock())
+
+
+# ---------------------------------------------------------------------------
+# Through the datastore and the client blob cache
+# ---------------------------------------------------------------------------
+
+
+def test_task_datastore_round_trip_with_mmap(tmp_path, oob_enabled):
+    np = pytest.importorskip("numpy")
+    from metaflow.client.filecache import FileBlobCache, FileCache
+    from metaflow.datastore.flow_datastore import FlowDataStore
+    from metaflow.plugins.datastores.local_storage import LocalStorage
+
+    flow_ds = FlowDataStore(
+        "TestFlow", storage_impl=LocalStorage, ds_root=str(tmp_path / "ds")
+    )
+    task_ds = flow_ds.get_task_datastore("1", "start", "1", 0, mode="w")
+    task_ds.init_task()
+    task_ds._serializers = [PickleOOBSerializer, PickleSerializer]
+    arr = np.arange(100000, dtype=np.int64)
+    task_ds.save_artifacts(iter([("arr", arr), ("alias", arr), ("other", 1)]))
+    task_ds.done()
+
+    assert len(task_ds._info["arr"]["blobs"]) == 2
+
+    filecache = FileCache(cache_dir=str(tmp_path / "cache"), max_size=100)
+    flow_ds.ca_store.set_blob_cache(FileBlobCache(filecache, "test"))
+    reader = flow_ds.get_task_datastore("1", "start", "1")
+    reader._serializers = [PickleOOBSerializer, PickleSerializer]
+    for _ in range(2):
+        # The second iteration is served from the client cache
+        loaded = dict(reader.load_artifacts(["arr", "alias", "other"]))
+        np.testing.assert_array_equal(loaded["arr"], arr)
+        np.testing.assert_array_equal(loaded["alias"], arr)
+        assert loaded["other"] == 1
+
+        # Arrays are writable but do not alias each other or the cache
+        loaded["arr"][0] = -1
+        assert loaded["alias"][0] == 0
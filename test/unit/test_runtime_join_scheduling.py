@@ -0,0 +1,147 @@
+import random
+from collections import deque
+
+import pytest
+
+from metaflow import FlowSpec, step
+from metaflow.graph import FlowGraph
+from metaflow.runtime import FinishedTasks, NativeRuntime
+from metaflow.tuple_util import ForeachFrame
+
+
+class NestedForeachFlow(FlowSpec):
+    @step
+    def start(self):
+        self.next(self.outer, foreach="x")
+
+    @step
+    def outer(self):
+        self.next(self.inner, foreach="y")
+
+    @step
+    def inner(self):
+        self.next(self.inner_join)
+
+    @step
+    def inner_join(self, inputs):
+        self.next(self.outer_join)
+
+    @step
+    def outer_join(self, inputs):
+        self.next(self.end)
+
+    @step
+    def end(self):
+        pass
+
+
+class _Results(dict):
+    def is_none(self, name):
+        return self.get(name) is None
+
+
+class _FinishedTask(object):
+    """Minimal stand-in for runtime.Task once it has finished"""
+
+    is_cloned = False
+
+    def __init__(self, step, foreach_stack, next_step, path):
+        self.step = step
+        self.path = path
+        self.results = _Results(
+            _transition=([next_step], None),
+            _foreach_stack=foreach_stack,
+            _iteration_stack=[],
+        )
+        indices = ",".join(str(f.index) for f in foreach_stack)
+        self.task_index = "%s[%s][]" % (step, indices)
+
+    @property
+    def finished_id(self):
+        return (
+            self.step,
+            tuple(f._replace(value=0) for f in self.results["_foreach_stack"]),
+            (),
+        )
+
+
+def _frame(step, num_splits, index):
+    return ForeachFrame(
+        step=step, var="v", num_splits=num_splits, index=index, value=index
+    )
+
+
+@pytest.fixture
+def runtime():
+    # Only the scheduling state of the runtime is needed
+    rt = NativeRuntime.__new__(NativeRuntime)
+    rt._graph = FlowGraph(NestedForeachFlow)
+    rt._finished = FinishedTasks()
+    rt._is_cloned = {}
+    rt._run_queue = deque()
+    rt._ran_or_scheduled_task_index = set()
+    rt._unprocessed_steps = set(n.name for n in rt._graph)
+    rt._control_num_splits = {}
+    return rt
+
+
+def _inner_tasks(outer_index, num_outer, num_inner):
+    return [
+        _FinishedTask(
+            "inner",
+            [_frame("start", num_outer, outer_index), _frame("outer", num_inner, i)],
+            "inner_join",
+            "run/inner/%d-%d" % (outer_index, i),
+        )
+        for i in range(num_inner)
+    ]
+
+
+def test_foreach_join_queued_once_when_all_siblings_finish(runtime):
+    tasks = _inner_tasks(0, 1, 50)
+    order = list(tasks)
+    random.Random(1).shuffle(order)
+    for task in order[:-1]:
+        runtime._queue_tasks([task])
+        assert not runtime._run_queue
+    runtime._queue_tasks([order[-1]])
+    assert len(runtime._run_queue) == 1
+    step, kwargs = runtime._run_queue.pop()
+    assert step == "inner_join"
+    assert kwargs["join_type"] == "foreach"
+    # Inputs are ordered by split index, not by completion order
+    assert kwargs["input_paths"] == [t.path for t in tasks]
+
+
+def test_nested_foreach_splits_are_counted_separately(runtime):
+    first, second = _inner_tasks(0, 2, 3), _inner_tasks(1, 2, 3)
+    for a, b in zip(first[:-1], second[:-1]):
+        runtime._queue_tasks([a, b])
+    assert not runtime._run_queue
+    runtime._queue_tasks([second[-1]])
+    assert len(runtime._run_queue) == 1
+    _, kwargs = runtime._run_queue.pop()
+    assert kwargs["input_paths"] == [t.path for t in second]
+    runtime._queue_tasks([first[-1]])
+    _, kwargs = runtime._run_queue.pop()
+    assert kwargs["input_paths"] == [t.path for t in first]
+
+
+def test_join_not_queued_twice_when_siblings_already_finished(runtime):
+    # This is what happens on resume: all cloned siblings are marked finished
+    # before being processed.
+    tasks = _inner_tasks(0, 1, 10)
+    for task in tasks:
+        runtime._finished[task.finished_id] = task.path
+    runtime._queue_tasks(tasks)
+    assert len(runtime._run_queue) == 1
+
+
+def test_finished_tasks_counts_each_task_once():
+    finished = FinishedTasks()
+    task = _inner_tasks(0, 1, 2)[0]
+    finished[task.finished_id] = task.path
+    finished[task.finished_id] = task.path
+    _, foreach_stack, iteration_stack = task.finished_id
+    assert finished.num_finished_siblings("inner", foreach_stack, iteration_stack) == 1
+    assert finished.num_finished_siblings("outer", foreach_stack, iteration_stack) == 0
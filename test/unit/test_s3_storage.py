@@ -1,8 +1,10 @@
+import os
 from io import BytesIO
 
 import pytest
 
 import metaflow.plugins.datastores.s3_storage as s3_storage_module
+from metaflow.metaflow_config import DATATOOLS_CLIENT_PARAMS
 from metaflow.plugins.datastores.s3_storage import S3Storage
 
 
@@ -13,6 +15,12 @@ def _make_storage():
     return storage
 
 
+@pytest.fixture(autouse=True)
+def multiple_cpus(monkeypatch):
+    # The planner only uses s3op subprocesses if there are several CPUs
+    monkeypatch.setattr(s3_storage_module, "_multiple_cpus", True)
+
+
 @pytest.fixture
 def test_items():
     """Fresh BytesIO objects per test so cursor state does not bleed."""
@@ -33,7 +41,10 @@ def patched_s3(mocker):
     return s3
 
 
-def test_save_bytes_put_many_preserves_metadata_slot(patched_s3, test_items):
+def test_save_bytes_put_many_preserves_metadata_slot(
+    patched_s3, test_items, monkeypatch
+):
+    monkeypatch.setattr(s3_storage_module, "S3_TRANSFER_INPROCESS_MAX_COUNT", 1)
     storage = _make_storage()
     storage.save_bytes(iter(test_items), overwrite=True, len_hint=11)
 
@@ -46,13 +57,202 @@ def test_save_bytes_put_many_preserves_metadata_slot(patched_s3, test_items):
     assert put_objs[1].metadata is None
 
 
-def test_save_bytes_sequential_preserves_metadata(patched_s3, test_items):
+def test_save_bytes_in_process_preserves_metadata(patched_s3, test_items):
     storage = _make_storage()
     storage.save_bytes(iter(test_items), overwrite=False, len_hint=2)
 
-    put_calls = patched_s3.put.call_args_list
+    # The objects are uploaded by worker threads, in any order
+    put_calls = sorted(patched_s3.put.call_args_list, key=lambda c: c[0][0])
     assert len(put_calls) == 2
     assert put_calls[0][0][0] == "a"
     assert put_calls[0][1]["metadata"] == {"k": "v"}
     assert put_calls[1][0][0] == "b"
     assert put_calls[1][1]["metadata"] is None
+
+
+@pytest.mark.parametrize(
+    "sizes,expected",
+    [
+        ([10], ([], [0], "sequential")),
+        ([10, 20, 30], ([], [0, 1, 2], "threads")),
+        ([10] * 20, ([], list(range(20)), "s3op")),
+        # Too many bytes to transfer in the process
+        ([60, 60], ([], [0, 1], "s3op")),
+        # Unknown sizes are transferred as a batch
+        ([None, 10], ([], [0, 1], "threads")),
+        # Large objects are uploaded one at a time
+        ([1000, 10, 2000, 20], ([0, 2], [1, 3], "threads")),
+        ([1000, 2000], ([0, 1], [], "sequential")),
+    ],
+)
+def test_plan_upload(monkeypatch, sizes, expected):
+    monkeypatch.setattr(s3_storage_module, "S3_TRANSFER_INPROCESS_MAX_COUNT", 16)
+    monkeypatch.setattr(s3_storage_module, "S3_TRANSFER_INPROCESS_MAX_BYTES", 100)
+    monkeypatch.setattr(s3_storage_module, "S3_TRANSFER_LARGE_OBJECT_SIZE", 1000)
+    assert s3_storage_module.plan_upload(sizes) == expected
+
+
+def test_plan_transfer_without_multiple_cpus(monkeypatch):
+    monkeypatch.setattr(s3_storage_module, "_multiple_cpus", False)
+    monkeypatch.setattr(s3_storage_module, "S3_TRANSFER_INPROCESS_MAX_COUNT", 16)
+    assert s3_storage_module.plan_transfer(1000) == "threads"
+
+
+def test_save_bytes_uploads_large_objects_first(patched_s3, monkeypatch):
+    monkeypatch.setattr(s3_storage_module, "S3_TRANSFER_INPROCESS_MAX_COUNT", 1)
+    monkeypatch.setattr(s3_storage_module, "S3_TRANSFER_LARGE_OBJECT_SIZE", 100)
+    storage = _make_storage()
+    storage.save_bytes(
+        iter(
+            [
+                ("small-0", BytesIO(b"x")),
+                ("large", BytesIO(b"x" * 100)),
+                ("small-1", BytesIO(b"x")),
+            ]
+        )
+    )
+    assert [c[0][0] for c in patched_s3.put.call_args_list] == ["large"]
+    put_objs, _ = patched_s3.put_many.call_args[0]
+    assert [o.key for o in put_objs] == ["small-0", "small-1"]
+
+
+@pytest.mark.parametrize(
+    "max_count,max_bytes,expected",
+    [
+        (4, 1000, [4, 4, 2]),
+        (16, 15, [2, 2, 2, 2, 2]),
+    ],
+)
+def test_save_bytes_uploads_bounded_batches(
+    patched_s3, monkeypatch, max_count, max_bytes, expected
+):
+    monkeypatch.setattr(s3_storage_module, "S3_TRANSFER_INPROCESS_MAX_COUNT", 1)
+    monkeypatch.setattr(s3_storage_module, "S3_UPLOAD_BATCH_MAX_COUNT", max_count)
+    monkeypatch.setattr(s3_storage_module, "S3_UPLOAD_BATCH_MAX_BYTES", max_bytes)
+    consumed = []
+    uploaded = []
+    batches = []
+
+    def _items():
+        for i in range(10):
+            consumed.append(i)
+            yield "obj-%d" % i, BytesIO(b"x" * 10)
+
+    def _put_many(objs, overwrite):
+        objs = list(objs)
+        # The objects are read one batch at a time
+        assert len(consumed) == len(uploaded) + len(objs)
+        uploaded.extend(o.key for o in objs)
+        batches.append(len(objs))
+
+    patched_s3.put_many.side_effect = _put_many
+    storage = _make_storage()
+    storage.save_bytes(_items())
+
+    assert batches == expected
+    assert uploaded == ["obj-%d" % i for i in range(10)]
+
+
+@pytest.fixture(scope="module")
+def s3_server():
+    """Local S3 stand-in; s3op subprocesses reach it through the environment."""
+    moto_server = pytest.importorskip("moto.server")
+    import boto3
+
+    server = moto_server.ThreadedMotoServer(ip_address="127.0.0.1", port=0)
+    server.start()
+    endpoint = "http://%s:%d" % server.get_host_and_port()
+    with pytest.MonkeyPatch.context() as mp:
+        mp.setenv("AWS_ACCESS_KEY_ID", "testing")
+        mp.setenv("AWS_SECRET_ACCESS_KEY", "testing")
+        mp.setenv("AWS_DEFAULT_REGION", "us-east-1")
+        mp.setenv("METAFLOW_S3_ENDPOINT_URL", endpoint)
+        # Keep the s3op subprocesses cheap to start
+        mp.setenv("METAFLOW_S3_WORKER_COUNT", "2")
+        mp.setitem(DATATOOLS_CLIENT_PARAMS, "endpoint_url", endpoint)
+        boto3.client("s3", endpoint_url=endpoint).create_bucket(Bucket="session")
+        yield "s3://session/root"
+    server.stop()
+
+
+@pytest.fixture
+def session_storage(s3_server, tmp_path, monkeypatch):
+    monkeypatch.setattr(s3_storage_module, "S3_STORAGE_SESSION", True)
+    monkeypatch.setattr(s3_storage_module, "S3_TRANSFER_INPROCESS_MAX_COUNT", 16)
+    monkeypatch.setattr(s3_storage_module, "ARTIFACT_LOCALROOT", str(tmp_path))
+    s3_storage_module._S3StorageSession.close_all()
+    yield S3Storage(s3_server + "/%s" % tmp_path.name)
+    s3_storage_module._S3StorageSession.close_all()
+
+
+@pytest.fixture
+def s3op_launches(mocker):
+    import subprocess
+
+    return mocker.spy(subprocess, "check_output")
+
+
+def _save(storage, num_objects, prefix="obj"):
+    items = [
+        ("%s/%d" % (prefix, i), (BytesIO(b"data-%d" % i), {"i": i}))
+        for i in range(num_objects)
+    ]
+    storage.save_bytes(iter(items), len_hint=num_objects)
+    return ["%s/%d" % (prefix, i) for i in range(num_objects)]
+
+
+def _load(storage, paths):
+    with storage.load_bytes(paths) as results:
+        loaded = {}
+        for key, path, meta in results:
+            if path is None:
+                loaded[key] = None
+            else:
+                with open(path, "rb") as f:
+                    loaded[key] = (f.read(), meta)
+        return loaded
+
+
+def test_session_operations_run_in_process(session_storage, s3op_launches, mocker):
+    new_s3 = mocker.spy(s3_storage_module, "S3")
+    paths = _save(session_storage, 12)
+    session_storage.save_bytes(iter([("single", BytesIO(b"x"))]))
+
+    assert session_storage.is_file(paths + ["missing"]) == [True] * 12 + [False]
+    assert session_storage.info_file("obj/3") == (True, {"i": 3})
+    assert session_storage.size_file("obj/10") == len(b"data-10")
+    assert sorted(session_storage.list_content([""])) == [
+        S3Storage.list_content_result(path="obj/", is_file=False),
+        S3Storage.list_content_result(path="single", is_file=True),
+    ]
+    assert len(session_storage.list_content(["obj"])) == 12
+    loaded = _load(session_storage, paths + ["missing"])
+    assert loaded["missing"] is None
+    assert loaded["obj/7"] == (b"data-7", {"i": 7})
+    assert _load(session_storage, ["single"]) == {"single": (b"x", None)}
+
+    # A single S3 context and no s3op subprocess for all these operations
+    assert new_s3.call_count == 1
+    assert s3op_launches.call_count == 0
+
+
+def test_session_large_operations_use_s3op(session_storage, s3op_launches):
+    paths = _save(session_storage, 20)
+    assert session_storage.is_file(paths) == [True] * 20
+    loaded = _load(session_storage, paths)
+    assert loaded["obj/19"] == (b"data-19", {"i": 19})
+    assert s3op_launches.call_count == 3
+
+
+def test_session_load_bytes_removes_its_files(session_storage):
+    paths = _save(session_storage, 4)
+    with session_storage.load_bytes(paths) as results:
+        local_paths = [path for _, path, _ in results]
+    assert local_paths and not any(os.path.exists(p) for p in local_paths)
+    # The temporary directory of the session is kept until the process exits
+    tmpdir = s3_storage_module._S3StorageSession.get(
+        session_storage.datastore_root
+    ).s3._tmpdir
+    assert os.path.isdir(tmpdir)
+    s3_storage_module._S3StorageSession.close_all()
+    assert not os.path.exists(tmpdir)
@@ -271,3 +271,33 @@ def test_call_save_logs_confirms_absence_of_logs_when_child_crashes(
     assert returncode == -9
     assert _read_uploader_messages(uploader_log) == []
     process.communicate.assert_called_once_with()
+
+
+def test_update_loop_uploads_chunks_in_process(monkeypatch, mocker, tmp_path):
+    stdout = tmp_path / "stdout"
+    stderr = tmp_path / "stderr"
+    stdout.write_bytes(b"out\n")
+    monkeypatch.setenv("MFLOG_STDOUT", str(stdout))
+    monkeypatch.setenv("MFLOG_STDERR", str(stderr))
+    monkeypatch.setattr(save_logs_periodically_module, "MFLOG_INCREMENTAL_UPLOAD", True)
+    uploader = mocker.patch.object(save_logs_periodically_module, "LogChunkUploader")
+    popen = mocker.patch("metaflow.mflog.save_logs_periodically.subprocess.Popen")
+    call = mocker.patch("metaflow.mflog.save_logs_periodically.subprocess.call")
+    sidecar = _new_sidecar(False)
+    sidecar.is_alive = True
+    sleeps = []
+
+    def _sleep(_):
+        # The second iteration sees the same sizes and uploads nothing
+        sleeps.append(1)
+        if len(sleeps) == 2:
+            sidecar.is_alive = False
+
+    mocker.patch("metaflow.mflog.save_logs_periodically.time.sleep", side_effect=_sleep)
+
+    sidecar._update_loop()
+
+    uploader.assert_called_once_with([str(stdout), str(stderr)])
+    uploader.return_value.upload.assert_called_once_with()
+    popen.assert_not_called()
+    call.assert_not_called()
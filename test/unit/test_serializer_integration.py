@@ -306,6 +306,58 @@ def test_info_without_object_raises_key_error(task_datastore):
         list(task_datastore.load_artifacts(["metadata_only"]))
 
 
+# ---------------------------------------------------------------------------
+# Pipelined mode: artifacts serialized, hashed and compressed on a thread pool
+# ---------------------------------------------------------------------------
+
+
+@pytest.fixture
+def pipelined(monkeypatch):
+    from metaflow import metaflow_config
+
+    monkeypatch.setattr(metaflow_config, "DATASTORE_SAVE_WORKERS", 4)
+
+
+def test_pipelined_save_load_round_trip(task_datastore, pipelined):
+    artifacts = [("artifact_%d" % i, list(range(i * 1000))) for i in range(50)]
+    artifacts.append(("duplicate", list(range(1000))))
+    task_datastore.save_artifacts(iter(artifacts), len_hint=len(artifacts))
+
+    assert set(task_datastore._objects) == set(name for name, _ in artifacts)
+    assert task_datastore._objects["duplicate"] == task_datastore._objects["artifact_1"]
+    loaded = dict(task_datastore.load_artifacts([name for name, _ in artifacts]))
+    for name, value in artifacts:
+        assert loaded[name] == value
+        assert task_datastore._info[name]["encoding"] == "pickle-v4"
+
+
+def test_pipelined_save_propagates_artifact_errors(task_datastore, pipelined):
+    import threading
+
+    from metaflow.datastore.exceptions import UnpicklableArtifactException
+
+    artifacts = [("good_%d" % i, i) for i in range(10)]
+    artifacts.insert(5, ("bad_one", threading.Lock()))
+    with pytest.raises(UnpicklableArtifactException, match='named "bad_one"'):
+        task_datastore.save_artifacts(iter(artifacts))
+    assert "bad_one" not in task_datastore._info
+
+
+def test_save_artifacts_in_bounded_batches(task_datastore, mocker):
+    """Artifacts are streamed to the storage backend in batches of at most
+    DATASTORE_SAVE_BATCH_MAX_BYTES instead of being accumulated in memory."""
+    ca_store = task_datastore._ca_store
+    mocker.patch.object(ca_store, "_batch_max_bytes", 1024)
+    save_spy = mocker.spy(ca_store._storage_impl, "save_bytes")
+
+    artifacts = [("artifact_%d" % i, b"x" * 600 + bytes([i])) for i in range(10)]
+    task_datastore.save_artifacts(iter(artifacts))
+
+    assert save_spy.call_count == 5
+    loaded = dict(task_datastore.load_artifacts([name for name, _ in artifacts]))
+    assert loaded == dict(artifacts)
+
+
 # ---------------------------------------------------------------------------
 # Dynamic registry: lazy registrations reach long-lived datastores
 # ---------------------------------------------------------------------------
@@ -352,7 +404,8 @@ def test_post_init_registration_reaches_existing_datastore(task_datastore):
 
 
 # ---------------------------------------------------------------------------
-# Blob-count validation must happen before ``_info`` is mutated
+# Blob-count validation must happen before ``_info`` is mutated; multi-blob
+# artifacts are stored as one CAS object per blob
 # ---------------------------------------------------------------------------
 
 
@@ -397,9 +450,9 @@ def test_info_not_populated_when_serializer_returns_no_blobs(task_datastore):
         SerializerStore._ordered_cache = None
 
 
-def test_info_not_populated_when_serializer_returns_multi_blob(task_datastore):
-    """Same guarantee as above for the multi-blob rejection path."""
-    from metaflow.datastore.exceptions import DataException
+def test_multi_blob_serializer_round_trip(task_datastore):
+    """Serializers may return several blobs (and references to blobs that are
+    already stored); they are stored separately and handed back in order."""
 
     class _MultiBlobSerializer(ArtifactSerializer):
         TYPE = "test_multi_blob"
@@ -407,28 +460,52 @@ def test_info_not_populated_when_serializer_returns_multi_blob(task_datastore):
 
         @classmethod
         def can_serialize(cls, obj):
-            return True
+            return isinstance(obj, tuple)
 
         @classmethod
         def can_deserialize(cls, metadata):
-            return False
+            return metadata.encoding == "test_multi_blob"
 
         @classmethod
         def serialize(cls, obj, format="storage"):
             return (
-                [SerializedBlob(b"a"), SerializedBlob(b"b")],
-                SerializationMetadata("x", 2, "test_multi_blob", {}),
+                [SerializedBlob(part) for part in obj],
+                SerializationMetadata("x", len(obj), "test_multi_blob", {}),
             )
 
         @classmethod
         def deserialize(cls, data, metadata=None, format="storage"):
-            raise NotImplementedError
+            return tuple(bytes(d) for d in data)
 
     task_datastore._serializers = [_MultiBlobSerializer, PickleSerializer]
     try:
-        with pytest.raises(DataException, match="single-blob serializers"):
-            task_datastore.save_artifacts(iter([("bad", object())]))
-        assert "bad" not in task_datastore._info
+        task_datastore.save_artifacts(iter([("first", (b"a", b"b"))]))
+        ref = task_datastore._info["first"]["blobs"][1]
+        task_datastore.save_artifacts(
+            iter(
+                [
+                    ("multi", (b"head", bytearray(b"body"), memoryview(b"tail"))),
+                    ("with_ref", (b"c", ref)),
+                    ("single", 42),
+                ]
+            )
+        )
+
+        blobs = task_datastore._info["multi"]["blobs"]
+        assert len(blobs) == 3
+        assert task_datastore._objects["multi"] == blobs[0]
+        assert task_datastore._info["with_ref"]["blobs"][1] == ref
+        assert "blobs" not in task_datastore._info["single"]
+
+        loaded = dict(
+            task_datastore.load_artifacts(["first", "multi", "with_ref", "single"])
+        )
+        assert loaded == {
+            "first": (b"a", b"b"),
+            "multi": (b"head", b"body", b"tail"),
+            "with_ref": (b"c", b"b"),
+            "single": 42,
+        }
     finally:
         SerializerStore._all_serializers.pop("test_multi_blob", None)
         SerializerStore._ordered_cache = None
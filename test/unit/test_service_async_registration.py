@@ -0,0 +1,160 @@
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from types import SimpleNamespace
+from unittest.mock import MagicMock
+
+import pytest
+
+from metaflow.datastore.flow_datastore import FlowDataStore
+from metaflow.metadata_provider import DataArtifact, MetaDatum
+from metaflow.plugins.datastores.local_storage import LocalStorage
+from metaflow.plugins.metadata_providers import service
+from metaflow.plugins.metadata_providers.service import (
+    ServiceException,
+    ServiceMetadataProvider,
+)
+
+FLOW = "AsyncFlow"
+LATENCY = 0.3
+
+
+class StubService(object):
+    # Records the registrations it receives, slowly
+    def __init__(self):
+        self.requests = []
+        self.fail_paths = set()
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def do_POST(self):
+                body = self.rfile.read(int(self.headers["Content-Length"]))
+                time.sleep(LATENCY)
+                server.requests.append((self.path, json.loads(body)))
+                status = 400 if self.path in server.fail_paths else 200
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.end_headers()
+                self.wfile.write(b"{}")
+
+        self._httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self._httpd.daemon_threads = True
+        self.url = "http://127.0.0.1:%d" % self._httpd.server_address[1]
+        threading.Thread(target=self._httpd.serve_forever, daemon=True).start()
+
+    def shutdown(self):
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+
+@pytest.fixture
+def stub(monkeypatch):
+    server = StubService()
+    monkeypatch.setattr(service, "SERVICE_URL", server.url)
+    monkeypatch.setattr(ServiceMetadataProvider, "_INFO", server.url)
+    yield server
+    server.shutdown()
+
+
+def _provider(monkeypatch, async_registration):
+    monkeypatch.setattr(service, "SERVICE_ASYNC_REGISTRATION", async_registration)
+    return ServiceMetadataProvider(MagicMock(), SimpleNamespace(name=FLOW), None, None)
+
+
+def _metadata(field):
+    return [MetaDatum(field=field, value="v", type="t", tags=[])]
+
+
+def _register_task_data(provider):
+    for i in range(5):
+        provider.register_metadata("1", "start", "2", _metadata("m%d" % i))
+    artifact = DataArtifact(
+        name="x", ds_type="local", ds_root="/tmp", url=None, type="t", sha="s"
+    )
+    provider.register_data_artifacts("1", "start", "2", 0, [artifact])
+    provider.register_metadata("1", "start", "2", _metadata("attempt_ok"))
+
+
+def _received(stub):
+    return [
+        (path.rsplit("/", 1)[1], item.get("field_name", item.get("name")))
+        for path, items in stub.requests
+        for item in items
+    ]
+
+
+EXPECTED = [("metadata", "m%d" % i) for i in range(5)] + [
+    ("artifact", "x"),
+    ("metadata", "attempt_ok"),
+]
+
+
+def test_registrations_are_sent_in_order_in_the_background(stub, monkeypatch):
+    provider = _provider(monkeypatch, True)
+
+    start = time.time()
+    _register_task_data(provider)
+    assert time.time() - start < LATENCY
+
+    provider.flush()
+    assert _received(stub) == EXPECTED
+    # The metadata queued while the first registration was in flight was sent
+    # in a single request
+    assert len(stub.requests) <= 4
+
+
+def test_registrations_are_synchronous_by_default(stub, monkeypatch):
+    provider = _provider(monkeypatch, False)
+
+    _register_task_data(provider)
+
+    assert _received(stub) == EXPECTED
+    assert len(stub.requests) == 7
+
+
+def test_failed_registration_is_raised(stub, monkeypatch):
+    provider = _provider(monkeypatch, True)
+    stub.fail_paths.add("/flows/%s/runs/1/steps/start/tasks/2/artifact" % FLOW)
+
+    _register_task_data(provider)
+    with pytest.raises(ServiceException):
+        provider.flush()
+
+    # Nothing is sent after the failed registration
+    assert ("metadata", "attempt_ok") not in _received(stub)
+    with pytest.raises(ServiceException):
+        provider.register_metadata("1", "start", "2", _metadata("late"))
+
+
+def _done_task(provider, tmp_path):
+    flow_ds = FlowDataStore(
+        FLOW,
+        metadata=provider,
+        storage_impl=LocalStorage,
+        ds_root=str(tmp_path),
+    )
+    task_ds = flow_ds.get_task_datastore("1", "start", "2", attempt=0, mode="w")
+    task_ds.init_task()
+    task_ds.save_artifacts(iter([("x", 1)]))
+    task_ds.done()
+
+
+def test_done_waits_for_the_registrations(stub, monkeypatch, tmp_path):
+    provider = _provider(monkeypatch, True)
+
+    _done_task(provider, tmp_path)
+
+    # attempt-done and the artifacts are sent before done() returns
+    assert _received(stub) == [("artifact", "x"), ("metadata", "attempt-done")]
+
+
+def test_done_fails_when_a_registration_fails(stub, monkeypatch, tmp_path):
+    provider = _provider(monkeypatch, True)
+    stub.fail_paths.add("/flows/%s/runs/1/steps/start/tasks/2/artifact" % FLOW)
+
+    with pytest.raises(ServiceException):
+        _done_task(provider, tmp_path)
@@ -0,0 +1,79 @@
+from types import SimpleNamespace
+from unittest.mock import MagicMock
+
+import pytest
+
+from metaflow.client import core
+from metaflow.client.filecache import FileCache
+from metaflow.datastore.content_addressed_store import ContentAddressedStore
+from metaflow.datastore.flow_datastore import FlowDataStore
+from metaflow.metadata_provider import MetaDatum
+from metaflow.plugins.datastores.local_storage import LocalStorage
+from metaflow.plugins.metadata_providers.local import LocalMetadataProvider
+
+FLOW = "BulkFlow"
+NUM_TASKS = 12
+
+
+def _run_task(flow_ds, task_id, value):
+    task_ds = flow_ds.get_task_datastore("1", "train", str(task_id), 0, mode="w")
+    task_ds.init_task()
+    artifacts = [("other", task_id)]
+    if value is not None:
+        artifacts.append(("model", value))
+    task_ds.save_artifacts(iter(artifacts))
+    task_ds.done()
+
+
+@pytest.fixture
+def step(tmp_path, monkeypatch):
+    ds_root = str(tmp_path / ".metaflow")
+    monkeypatch.setattr(LocalStorage, "datastore_root", ds_root)
+    monkeypatch.setattr(core, "current_metadata", LocalMetadataProvider)
+    monkeypatch.setattr(core, "filecache", FileCache(cache_dir=str(tmp_path / "c")))
+    flow_ds = FlowDataStore(FLOW, storage_impl=LocalStorage, ds_root=ds_root)
+    provider = LocalMetadataProvider(
+        MagicMock(), SimpleNamespace(name=FLOW), None, None
+    )
+    provider._ensure_meta("flow", None, None, None)
+    provider._ensure_meta("run", "1", None, None)
+    provider._ensure_meta("step", "1", "train", None)
+    for task_id in range(NUM_TASKS):
+        provider._ensure_meta("task", "1", "train", str(task_id))
+        provider.register_metadata(
+            "1",
+            "train",
+            str(task_id),
+            [
+                MetaDatum(field="ds-type", value="local", type="ds-type", tags=[]),
+                MetaDatum(field="ds-root", value=ds_root, type="ds-root", tags=[]),
+            ],
+        )
+        # The last task does not produce the artifact; the others share three
+        # distinct values.
+        value = None if task_id == NUM_TASKS - 1 else {"weights": task_id % 3}
+        _run_task(flow_ds, task_id, value)
+    return core.Step("%s/1/train" % FLOW, _namespace_check=False)
+
+
+def _expected():
+    return {
+        "%s/1/train/%d" % (FLOW, t): {"weights": t % 3} for t in range(NUM_TASKS - 1)
+    }
+
+
+def test_identical_blobs_are_fetched_once_in_one_batch(step, mocker):
+    load_blobs = mocker.spy(ContentAddressedStore, "load_blobs")
+
+    assert step.artifact_data("model", as_dict=True) == _expected()
+
+    assert load_blobs.call_count == 1
+    assert len(load_blobs.call_args.args[1]) == 3
+
+
+def test_values_are_streamed(step):
+    values = step.artifact_data("model")
+    pathspec, value = next(values)
+    assert _expected()[pathspec] == value
+    assert dict([(pathspec, value)] + list(values)) == _expected()
+    assert step.artifact_data("missing", as_dict=True) == {}
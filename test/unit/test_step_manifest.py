@@ -0,0 +1,180 @@
+import pytest
+
+from metaflow import metaflow_config
+from metaflow.client import filecache as filecache_module
+from metaflow.client.filecache import FileCache
+from metaflow.datastore.flow_datastore import FlowDataStore
+from metaflow.plugins.datastores.local_storage import LocalStorage
+
+NUM_TASKS = 80
+
+
+@pytest.fixture
+def flow_ds(tmp_path, monkeypatch):
+    monkeypatch.setattr(metaflow_config, "DATASTORE_STEP_MANIFEST", True)
+    return FlowDataStore(
+        "TestFlow", storage_impl=LocalStorage, ds_root=str(tmp_path / "ds")
+    )
+
+
+def _run_task(flow_ds, task_id, attempt=0, done=True, step="work"):
+    task_ds = flow_ds.get_task_datastore("1", step, str(task_id), attempt, mode="w")
+    task_ds.init_task()
+    task_ds.save_artifacts(iter([("value", (task_id, attempt))]))
+    if done:
+        task_ds.done()
+
+
+def _run_tasks(flow_ds, num_tasks=NUM_TASKS):
+    for task_id in range(num_tasks):
+        # Task 3 fails its first attempt
+        if task_id == 3:
+            _run_task(flow_ds, task_id, attempt=0, done=False)
+            _run_task(flow_ds, task_id, attempt=1)
+        else:
+            _run_task(flow_ds, task_id)
+
+
+def _loaded_paths(mocker, flow_ds):
+    load_bytes = mocker.spy(flow_ds._storage_impl, "load_bytes")
+
+    def _paths():
+        return [p for call in load_bytes.call_args_list for p in call.args[0]]
+
+    return _paths
+
+
+def _values(task_datastores):
+    return {ds.task_id: (ds.attempt, ds["value"]) for ds in task_datastores}
+
+
+def _expected(num_tasks=NUM_TASKS):
+    return {str(t): (1, (t, 1)) if t == 3 else (0, (t, 0)) for t in range(num_tasks)}
+
+
+def test_tasks_are_resolved_from_manifest(flow_ds, mocker):
+    _run_tasks(flow_ds)
+    loaded = _loaded_paths(mocker, flow_ds)
+
+    task_datastores = flow_ds.get_task_datastores("1", steps=["work"])
+
+    assert _values(task_datastores) == _expected()
+    # No attempt or done markers were probed
+    assert not any(p.endswith((".attempt.json", ".DONE.lock")) for p in loaded())
+    # The entries were compacted for the next reader
+    loaded_before = len(loaded())
+    assert _values(flow_ds.get_task_datastores("1", steps=["work"])) == _expected()
+    manifest_loads = [p for p in loaded()[loaded_before:] if "/_manifest/" in p]
+    # (with the start of the retry of task 3)
+    assert manifest_loads == ["TestFlow/1/work/_manifest/_segment.%d" % (NUM_TASKS + 1)]
+
+
+def test_pathspecs_keep_their_order(flow_ds):
+    _run_tasks(flow_ds, 20)
+    pathspecs = ["1/work/%d" % t for t in reversed(range(20))]
+    task_datastores = flow_ds.get_task_datastores(pathspecs=pathspecs)
+    assert [ds.pathspec for ds in task_datastores] == pathspecs
+
+
+def test_tasks_missing_from_manifest_are_probed(flow_ds, monkeypatch):
+    monkeypatch.setattr(metaflow_config, "DATASTORE_STEP_MANIFEST", False)
+    _run_tasks(flow_ds, 10)
+    monkeypatch.setattr(metaflow_config, "DATASTORE_STEP_MANIFEST", True)
+    for task_id in range(10, 20):
+        _run_task(flow_ds, task_id)
+    # A task which is not done is not returned
+    _run_task(flow_ds, 20, done=False)
+
+    task_datastores = flow_ds.get_task_datastores("1", steps=["work"])
+    assert _values(task_datastores) == _expected(20)
+
+
+def test_previous_attempt_is_not_used_while_a_retry_runs(flow_ds):
+    _run_tasks(flow_ds, 10)
+    # Task 5 is retried (e.g. by resume) and its new attempt did not finish
+    _run_task(flow_ds, 5, attempt=1, done=False)
+
+    task_datastores = flow_ds.get_task_datastores("1", steps=["work"])
+    expected = _expected(10)
+    del expected["5"]
+    assert _values(task_datastores) == expected
+
+    _run_task(flow_ds, 5, attempt=1)
+    task_datastores = flow_ds.get_task_datastores("1", steps=["work"])
+    assert _values(task_datastores)["5"] == (1, (5, 1))
+
+
+@pytest.mark.parametrize("num_tasks", [20, 200])
+def test_storage_calls_do_not_depend_on_the_number_of_tasks(flow_ds, mocker, num_tasks):
+    _run_tasks(flow_ds, num_tasks)
+    storage = flow_ds._storage_impl
+    calls = {
+        name: mocker.spy(storage, name)
+        for name in ("list_content", "load_bytes", "is_file", "info_file")
+    }
+
+    # e.g. the inputs of a join
+    task_datastores = flow_ds.get_task_datastores(
+        pathspecs=["1/work/%d" % t for t in range(num_tasks)]
+    )
+
+    # One listing and one load of the manifest (and a load of what the
+    # manifest did not resolve, nothing), whatever the number of tasks
+    assert calls["list_content"].call_count == 1
+    assert calls["load_bytes"].call_count == 2
+    assert calls["info_file"].call_count == 0
+    # The local storage checks the listed entries of the manifest itself; no
+    # task is probed
+    assert not [
+        p
+        for call in calls["is_file"].call_args_list
+        for p in call.args[0]
+        if "/_manifest/" not in p
+    ]
+    assert _values(task_datastores) == _expected(num_tasks)
+
+
+def test_not_done_and_prior_attempts_still_probe(flow_ds):
+    _run_tasks(flow_ds, 10)
+    task_datastores = flow_ds.get_task_datastores(
+        pathspecs=["1/work/3"], attempt=1, include_prior=True
+    )
+    assert sorted(ds.attempt for ds in task_datastores) == [1]
+    task_datastores = flow_ds.get_task_datastores(
+        "1", steps=["work"], allow_not_done=True
+    )
+    assert len(task_datastores) == 10
+
+
+def test_client_uses_manifest(flow_ds, tmp_path, mocker, monkeypatch):
+    monkeypatch.setattr(filecache_module, "DATASTORE_STEP_MANIFEST", True)
+    _run_tasks(flow_ds, 20)
+    filecache = FileCache(cache_dir=str(tmp_path / "cache"), max_size=1 << 20)
+    client_ds = filecache._get_flow_datastore(
+        "local", flow_ds.datastore_root, "TestFlow"
+    )
+    load_manifest = mocker.spy(client_ds, "load_step_manifest")
+    probe = mocker.spy(client_ds._storage_impl, "is_file")
+
+    for task_id in range(20):
+        attempt = 1 if task_id == 3 else 0
+        data = filecache.get_task_data_metadata(
+            "local",
+            flow_ds.datastore_root,
+            attempt,
+            "TestFlow",
+            "1",
+            "work",
+            str(task_id),
+        )
+        assert "value" in data["objects"]
+
+    assert load_manifest.call_count == 1
+    # Only the tasks accessed before the manifest was loaded were probed
+    probed = set(
+        p.split("/")[3]
+        for call in probe.call_args_list
+        for p in call.args[0]
+        if "/_manifest/" not in p
+    )
+    assert len(probed) < FlowDataStore.STEP_MANIFEST_MIN_TASKS
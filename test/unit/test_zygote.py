@@ -0,0 +1,174 @@
+import os
+import signal
+import subprocess
+import sys
+import textwrap
+
+import pytest
+
+from metaflow.zygote import TaskZygotes
+
+ENTRYPOINT_SCRIPT = """
+import os
+import sys
+import time
+
+from metaflow.zygote import ZYGOTE_FD_ENV, serve
+
+ZYGOTE_PID = os.getpid()
+if ZYGOTE_FD_ENV in os.environ:
+    serve(int(os.environ.pop(ZYGOTE_FD_ENV)))
+
+cmd = sys.argv[1]
+if cmd == "echo":
+    print(" ".join(sys.argv[2:]))
+    print("env=%s" % os.environ.get("ZYGOTE_TEST_VAR"))
+    print("zygote=%d" % ZYGOTE_PID)
+    print("config=%s" % os.environ.get("METAFLOW_ZYGOTE_TEST_VAR"))
+    sys.stderr.write("to stderr\\n")
+elif cmd == "exit":
+    sys.exit(int(sys.argv[2]))
+elif cmd == "sleep":
+    time.sleep(60)
+"""
+
+FLOW = """
+import os
+from metaflow import FlowSpec, step, retry
+
+
+class ZygoteTestFlow(FlowSpec):
+    @step
+    def start(self):
+        self.items = list(range(4))
+        self.next(self.work, foreach="items")
+
+    @retry(times=1)
+    @step
+    def work(self):
+        self.ppid = os.getppid()
+        print("working on %d" % self.input)
+        if self.input == 2 and not os.path.exists("failed_once"):
+            open("failed_once", "w").close()
+            raise Exception("failing once")
+        self.next(self.join)
+
+    @step
+    def join(self, inputs):
+        self.ppids = set(i.ppid for i in inputs)
+        self.next(self.end)
+
+    @step
+    def end(self):
+        assert len(self.ppids) == 1 and os.getpid() not in self.ppids
+        print("zygote tasks ok")
+
+
+if __name__ == "__main__":
+    ZygoteTestFlow()
+"""
+
+
+@pytest.fixture
+def entrypoint(tmp_path):
+    script = tmp_path / "entrypoint.py"
+    script.write_text(ENTRYPOINT_SCRIPT)
+    return [sys.executable, str(script)]
+
+
+@pytest.fixture
+def zygotes():
+    z = TaskZygotes()
+    yield z
+    z.close()
+
+
+def _env(**kwargs):
+    env = dict(os.environ)
+    env.update(kwargs)
+    return env
+
+
+def test_launch_captures_output_and_return_code(entrypoint, zygotes):
+    proc = zygotes.launch(entrypoint, ["echo", "hello", "world"], _env())
+    assert proc is not None
+    assert proc.wait() == 0
+    out = proc.stdout.read().decode().splitlines()
+    assert out[0] == "hello world"
+    assert proc.stderr.read() == b"to stderr\n"
+
+    proc = zygotes.launch(entrypoint, ["exit", "3"], _env())
+    assert proc.wait() == 3
+    assert proc.poll() == 3
+
+
+def test_tasks_share_one_zygote(entrypoint, zygotes):
+    zygote_pids = set()
+    for _ in range(3):
+        proc = zygotes.launch(entrypoint, ["echo"], _env())
+        proc.wait()
+        zygote_line = proc.stdout.read().decode().splitlines()[2]
+        zygote_pid = int(zygote_line.split("=")[1])
+        assert proc.pid != zygote_pid
+        zygote_pids.add(zygote_pid)
+    assert len(zygote_pids) == 1
+
+
+def test_tasks_with_different_environments_share_one_zygote(entrypoint, zygotes):
+    outputs = []
+    for value in ("a", "b", "c"):
+        proc = zygotes.launch(entrypoint, ["echo"], _env(ZYGOTE_TEST_VAR=value))
+        proc.wait()
+        outputs.append(proc.stdout.read().decode().splitlines())
+    assert [out[1] for out in outputs] == ["env=a", "env=b", "env=c"]
+    assert len(set(out[2] for out in outputs)) == 1
+
+
+def test_import_environment_change_restarts_zygote(entrypoint, zygotes):
+    outputs = []
+    for value in ("a", "b"):
+        proc = zygotes.launch(
+            entrypoint, ["echo"], _env(METAFLOW_ZYGOTE_TEST_VAR=value)
+        )
+        proc.wait()
+        outputs.append(proc.stdout.read().decode().splitlines())
+    assert outputs[0][3] == "config=a"
+    assert outputs[1][3] == "config=b"
+    assert outputs[0][2] != outputs[1][2]
+
+
+def test_kill(entrypoint, zygotes):
+    proc = zygotes.launch(entrypoint, ["sleep"], _env())
+    assert proc.poll() is None
+    proc.kill()
+    assert proc.wait() == -signal.SIGKILL
+
+
+def test_falls_back_if_zygote_cannot_start(tmp_path, zygotes):
+    script = tmp_path / "broken.py"
+    script.write_text("raise Exception('cannot import')\n")
+    assert zygotes.launch([sys.executable, str(script)], ["echo"], _env()) is None
+    # We do not retry starting it for every task
+    assert zygotes.launch([sys.executable, str(script)], ["echo"], _env()) is None
+
+
+def test_flow_run_with_zygote(tmp_path):
+    flow = tmp_path / "zygote_flow.py"
+    flow.write_text(textwrap.dedent(FLOW))
+    env = _env(
+        METAFLOW_RUNTIME_ZYGOTE="1",
+        METAFLOW_DATASTORE_SYSROOT_LOCAL=str(tmp_path),
+        USER=os.environ.get("USER", "tester"),
+    )
+    result = subprocess.run(
+        [sys.executable, str(flow), "--no-pylint", "run", "--max-workers", "2"],
+        cwd=str(tmp_path),
+        env=env,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.STDOUT,
+    )
+    output = result.stdout.decode()
+    assert result.returncode == 0, output
+    assert "zygote tasks ok" in output
+    assert "failing once" in output
+    assert "Task is starting (retry)." in output